@@ -0,0 +1,282 @@
+"""Reusable cache tiers for results which are expensive to fetch again.
+
+These know nothing about HTTP or any particular service. Service-specific
+caches (e.g. for geocoding) build on them, deciding what the keys are and how
+values are encoded.
+
+* LRUCache is an in-memory, size-bounded tier for one process.
+* SQLiteCache is an on-disk tier which can be shared across processes.
+
+Every entry may have its own time-to-live. Expired entries are treated as
+missing and dropped when they are noticed.
+
+All tiers are safe to use from multiple threads.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+    Text,
+    Tuple,
+)
+
+
+#: Returned by get() methods on a miss, so that None can be cached.
+MISSING = object()
+
+
+class LRUCache(object):
+    """In-memory cache which evicts the least recently used entries.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, clock=None):
+        # type: (int, Optional[float], Optional[Callable[[], float]]) -> None
+        """
+        :arg max_size:
+            Maximum number of entries to hold.
+        :arg ttl:
+            Optional. Default time-to-live for entries, in seconds. If None,
+            entries don't expire unless a ttl is given to set().
+        :arg clock:
+            Optional. Function returning the current time in seconds.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        # key -> (value, expires_at or None), least recently used first
+        self._data = OrderedDict()  # type: OrderedDict
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._data)
+
+    def __contains__(self, key):
+        # type: (Any) -> bool
+        return self.get(key, MISSING, touch=False) is not MISSING
+
+    def get(self, key, default=None, touch=True):
+        # type: (Any, Any, bool) -> Any
+        """Fetch the value for key, or default if it is missing or expired.
+
+        :arg touch:
+            If true (the default), mark the entry as recently used.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                return default
+            if touch:
+                # Move to the most recently used end.
+                del self._data[key]
+                self._data[key] = entry
+            return value
+
+    def set(self, key, value, ttl=None):
+        # type: (Any, Any, Optional[float]) -> None
+        """Store value under key, evicting old entries if needed.
+
+        :arg ttl:
+            Optional. Time-to-live in seconds, overriding the default.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        # type: (Any) -> None
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(object):
+    """On-disk cache in an SQLite database, shareable across processes.
+
+    Keys are text and values are bytes; encoding values is up to the caller.
+
+    Each thread gets its own connection, since SQLite connections can't be
+    shared across threads. The database uses write-ahead logging so that
+    readers in other processes don't block writers.
+    """
+
+    def __init__(self, path, table="cache", ttl=None, clock=None,
+                 timeout=30.0):
+        # type: (Text, Text, Optional[float], Optional[Callable[[], float]], float) -> None
+        """
+        :arg path:
+            Filesystem path of the database. It is created if necessary.
+        :arg table:
+            Name of the table to use, so several caches can share one file.
+        :arg ttl:
+            Optional. Default time-to-live for entries, in seconds.
+        :arg clock:
+            Optional. Function returning the current time in seconds.
+        :arg timeout:
+            Seconds to wait for another process's lock before giving up.
+        """
+        if not table.replace("_", "").isalnum():
+            raise ValueError("invalid table name {0!r}".format(table))
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.timeout = timeout
+        self._clock = clock or time.time
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS {0} ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " expires_at REAL"
+                ")".format(self.table)
+            )
+
+    def _connection(self):
+        # type: () -> sqlite3.Connection
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key, default=None):
+        # type: (Text, Any) -> Any
+        """Fetch the bytes stored for key, or default if missing or expired.
+        """
+        entry = self.get_entry(key)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def get_entry(self, key):
+        # type: (Text) -> Optional[Tuple[bytes, Optional[float]]]
+        """Fetch (value, expires_at) for key, or None if missing or expired.
+
+        This lets callers copying entries into a faster tier keep the
+        original expiry time.
+        """
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM {0} WHERE key = ?"
+            .format(self.table),
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= self._clock():
+            self.delete(key)
+            return None
+        return bytes(value), expires_at
+
+    def get_many(self, keys):
+        # type: (List[Text]) -> dict
+        """Fetch several keys in one query, returning a dict of the hits.
+        """
+        found = {}
+        now = self._clock()
+        connection = self._connection()
+        # Stay well under SQLite's limit on the number of bound parameters.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = connection.execute(
+                "SELECT key, value, expires_at FROM {0} WHERE key IN ({1})"
+                .format(self.table, ", ".join("?" * len(chunk))),
+                chunk,
+            )
+            for key, value, expires_at in rows:
+                if expires_at is None or expires_at > now:
+                    found[key] = bytes(value)
+        return found
+
+    def set(self, key, value, ttl=None):
+        # type: (Text, bytes, Optional[float]) -> None
+        """Store bytes under key.
+
+        :arg ttl:
+            Optional. Time-to-live in seconds, overriding the default.
+        """
+        self.set_many([(key, value)], ttl=ttl)
+
+    def set_many(self, items, ttl=None):
+        # type: (List[Any], Optional[float]) -> None
+        """Store several (key, value) pairs in one transaction.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl is not None else None
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO {0} (key, value, expires_at)"
+                " VALUES (?, ?, ?)".format(self.table),
+                [
+                    (key, sqlite3.Binary(value), expires_at)
+                    for key, value in items
+                ],
+            )
+
+    def delete(self, key):
+        # type: (Text) -> None
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "DELETE FROM {0} WHERE key = ?".format(self.table), (key,),
+            )
+
+    def purge(self):
+        # type: () -> int
+        """Delete all expired entries, returning how many were deleted.
+        """
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                "DELETE FROM {0} WHERE expires_at IS NOT NULL"
+                " AND expires_at <= ?".format(self.table),
+                (self._clock(),),
+            )
+        return cursor.rowcount
+
+    def clear(self):
+        # type: () -> None
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM {0}".format(self.table))
+
+    def close(self):
+        # type: () -> None
+        """Close this thread's connection, if it has one.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+__all__ = ["LRUCache", "MISSING", "SQLiteCache"]
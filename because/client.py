@@ -82,8 +82,11 @@ class Client(object):
         """
         # The mediation of this method allows customizations in addition to
         # swapping out for a different transfer_cls.
+        # Pass ssl_config on, or each transfer would make its own, which
+        # can be slower than the request.
         return self.transfer_cls(
             request=request,
+            ssl_config=self.ssl_config,
             log=log,
         )
 
@@ -45,3 +45,16 @@ class InvalidObject(BecauseError):
     def __init__(self, message):
         # type: (Text) -> None
         super(InvalidObject, self).__init__(message)
+
+
+class EndpointUnavailable(ParseError):
+    """The server answered, but does not offer the requested endpoint.
+
+    This is used for endpoints which are not deployed everywhere yet (e.g.
+    batch endpoints), so callers can fall back to some other approach instead
+    of treating the response as a hard failure.
+    """
+
+
+#: HTTP statuses indicating that an endpoint is not available on the server.
+UNAVAILABLE_STATUSES = frozenset([404, 405, 501])
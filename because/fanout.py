@@ -0,0 +1,245 @@
+"""Apply a blocking function to many items with bounded concurrency.
+
+Bulk methods on Frontend (geocode_many and friends) are built on fan_out().
+Each item is handed to a small pool of worker threads, so at most a fixed
+number of requests are in flight at once, and results are yielded as they
+become available instead of being collected into one big list first.
+
+Errors are reported per item as Outcome instances rather than raised, so that
+one bad address in a million does not abort the whole job. Likewise, a call
+which runs past its timeout is reported as a FanOutTimeout without waiting for
+it, so one slow item does not hold back the rest.
+
+:note: The function passed to fan_out() is called from worker threads. This
+works for the python and concurrent interfaces, whose wait() simply blocks.
+It is not suitable for Qt-based interfaces, which expect to be driven from an
+event loop in their own thread.
+"""
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+try:
+    from concurrent import futures
+except ImportError:
+    futures = None  # type: ignore
+from . errors import BecauseError
+from . reprs import ReprMixin
+
+
+class FanOutTimeout(BecauseError):
+    """A call made by fan_out did not finish within its timeout.
+    """
+
+
+class Outcome(ReprMixin):
+    """What happened to one item of a bulk operation.
+
+    Exactly one of value and error is meaningful: if error is None, the item
+    succeeded and value holds its result.
+    """
+    def __init__(self, index, item, value=None, error=None):
+        # type: (int, Any, Any, Optional[Exception]) -> None
+        """
+        :arg index:
+            Position of the item in the input iterable.
+        :arg item:
+            The input item itself, e.g. an address.
+        :arg value:
+            Result computed for the item, if it succeeded.
+        :arg error:
+            Exception raised while computing the result, if it failed.
+        """
+        self.index = index
+        self.item = item
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        # type: () -> bool
+        return self.error is None
+
+    def unwrap(self):
+        # type: () -> Any
+        """Return the value, or raise the error if the item failed.
+        """
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def __eq__(self, other):
+        # type: (Any) -> bool
+        attrs = ["index", "item", "value", "error"]
+        return all(
+            getattr(self, attr) == getattr(other, attr, None)
+            for attr in attrs
+        )
+
+    def repr_data(self):
+        return OrderedDict([
+            ("index", self.index),
+            ("item", self.item),
+            ("value", self.value),
+            ("error", self.error),
+        ])
+
+
+def attempt(function, index, item):
+    # type: (Callable, int, Any) -> Outcome
+    """Call function on item, capturing either its return value or its error.
+    """
+    try:
+        value = function(item)
+    except Exception as error:
+        return Outcome(index, item, error=error)
+    return Outcome(index, item, value=value)
+
+
+def chunked(items, size):
+    # type: (Iterable[Any], int) -> Iterator[Tuple[int, List[Any]]]
+    """Split an iterable into lists of at most size items.
+
+    Yields (start, chunk) tuples, where start is the index of the first item
+    of the chunk in the original iterable. Only one chunk is held at a time,
+    so this is safe to use on very long or unbounded inputs.
+    """
+    if size < 1:
+        raise ValueError("chunk size must be at least 1")
+    iterator = iter(items)
+    start = 0
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def fan_out(function, items, concurrency=8, ordered=True, timeout=None,
+            window=None):
+    # type: (Callable, Iterable[Any], int, bool, Optional[float], Optional[int]) -> Iterator[Outcome]
+    """Apply function to each item, running up to concurrency calls at once.
+
+    Items are pulled from the iterable lazily; at most window items are held
+    in memory at any time, whether waiting to run or waiting to be yielded.
+
+    If the consumer stops iterating early (or closes the generator), calls
+    which have not started yet are cancelled.
+
+    :arg function:
+        Callable taking one item. It is called from worker threads.
+    :arg items:
+        Iterable of items. It may be a generator of unknown length.
+    :arg concurrency:
+        Maximum number of calls to run at the same time.
+    :arg ordered:
+        If true, yield outcomes in input order. Otherwise, yield them in
+        completion order, which keeps the pipeline fuller when call durations
+        vary a lot.
+    :arg timeout:
+        Optional. Seconds from when an item is handed to the thread pool
+        until its Outcome is given a FanOutTimeout error, whether or not a
+        worker has started on it yet. A call which has started can't be
+        interrupted, so it is left to finish in its worker thread and its
+        result is thrown away; until then, that worker can't take other
+        items. A call which hasn't started is cancelled. Needs a thread pool,
+        so it can't be used on Python 2 without the futures backport.
+    :arg window:
+        Optional. Most items to have taken from the iterable whose Outcomes
+        haven't been yielded yet; twice concurrency by default.
+    :returns:
+        Iterator of Outcome instances, one per item.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if window is not None and window < 1:
+        raise ValueError("window must be at least 1")
+    if timeout is not None and futures is None:
+        raise ValueError("timeout needs concurrent.futures")
+    indexed = enumerate(items)
+
+    # Without a thread pool, degrade to doing one item at a time. A timeout
+    # needs the pool even then, so that the caller isn't the one blocked.
+    if futures is None or (concurrency == 1 and timeout is None):
+        for index, item in indexed:
+            yield attempt(function, index, item)
+        return
+
+    # Bound items held in memory, whether running, queued or buffered
+    # waiting for an earlier item to finish (ordered mode only).
+    if window is None:
+        window = concurrency * 2
+    pending = {}  # type: dict
+    done = {}  # type: dict[int, Outcome]
+    # When each pending item was submitted, which its deadline counts from.
+    submitted = {}  # type: dict[int, float]
+    next_index = 0
+    exhausted = False
+    executor = futures.ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        while True:
+            while not exhausted and len(pending) + len(done) < window:
+                try:
+                    index, item = next(indexed)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future = executor.submit(attempt, function, index, item)
+                pending[future] = (index, item)
+                submitted[index] = time.time()
+
+            if ordered:
+                while next_index in done:
+                    yield done.pop(next_index)
+                    next_index += 1
+            if not pending:
+                if exhausted and not done:
+                    return
+                continue
+
+            wait_for = None
+            if timeout is not None:
+                earliest = min(
+                    submitted[index] for index, _ in pending.values()
+                )
+                wait_for = max(0.0, earliest + timeout - time.time())
+            finished, _ = futures.wait(
+                list(pending), timeout=wait_for,
+                return_when=futures.FIRST_COMPLETED,
+            )
+            outcomes = [
+                future.result() for future in finished
+                if pending.pop(future, None) is not None
+            ]
+            if timeout is not None:
+                now = time.time()
+                for future, (index, item) in list(pending.items()):
+                    if now - submitted[index] >= timeout:
+                        del pending[future]
+                        future.cancel()
+                        error = FanOutTimeout(
+                            "call did not finish within {0}s".format(timeout),
+                        )
+                        outcomes.append(Outcome(index, item, error=error))
+            for outcome in outcomes:
+                submitted.pop(outcome.index, None)
+                if ordered:
+                    done[outcome.index] = outcome
+                else:
+                    yield outcome
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+__all__ = ["FanOutTimeout", "Outcome", "attempt", "chunked", "fan_out"]
@@ -3,21 +3,47 @@ Combine boundless service definitions with host definitions to provide a
 very high-level, all-in-one interface for quickstarts.
 """
 
+import threading
+from itertools import count, islice
 from logging import Logger, getLogger as get_logger
 from typing import (
     Any,
     Optional,
+    Tuple,
 )
-from . errors import InvalidObject
+from . errors import InvalidObject, EndpointUnavailable, ParseError
+from . request import Request
 from . response import Response
 from . ssl_config import SSLConfig
-from . headers import Headers
+from . headers import FrozenHeaders, Headers
 from . future import Result, Present
+from . fanout import Outcome, chunked, fan_out
+from . json_stream import DEFAULT_CHUNK_SIZE
+from . polling import Poller, Status
 from . services.token.service import TokenService
 from . services.search.service import SearchService
+from . services.search.federated import FederatedSearch
+from . services.search.index import SearchIndex
 from . services.routing.service import RoutingService
+from . services.routing.matrix import (
+    RouteMatrix,
+    location_key,
+    location_from_key,
+    location_values,
+    plan_matrix,
+)
 from . services.basemaps.service import BasemapsService
+from . services.basemaps.cache import BASEMAPS_CACHE, BasemapsCache
+from . services.basemaps.tile_cache import (
+    TileCache,
+    conditional_headers,
+    tile_data,
+)
+from . services.basemaps.vector_tile import VectorTile
 from . services.geocoding.service import GeocodingService
+from . services.geocoding.cache import GeocodeCache
+from . services.geocoding.reverse_cache import ReverseGeocodeCache
+from . services.geocoding.table import CandidateTable
 from . hosts import HOSTS
 from . interfaces import INTERFACES
 
@@ -45,15 +71,40 @@ class Frontend(object):
     """
     log = LOG.getChild("Frontend")
 
+    #: Interfaces whose transfers can be waited on from a helper thread, so
+    #: that stale basemaps metadata can be revalidated in the background.
+    #: Qt transfers belong to the thread which created them.
+    background_interfaces = frozenset(["python", "concurrent"])
+
     def __init__(
             self,
             interface="python",
             env="dev",
             ssl_config=None,
             log=None,
+            geocode_cache=None,
+            reverse_geocode_cache=None,
+            basemaps_cache=None,
+            search_index=None,
+            tile_cache=None,
     ):
-        # type: (str, str, Optional[SSLConfig], Optional[Logger]) -> None
+        # type: (str, str, Optional[SSLConfig], Optional[Logger], Optional[GeocodeCache], Optional[ReverseGeocodeCache], Optional[BasemapsCache], Optional[SearchIndex], Optional[TileCache]) -> None
         """
+        :arg geocode_cache:
+            Optional. A GeocodeCache to consult before making forward
+            geocoding requests, and to store their results in.
+        :arg reverse_geocode_cache:
+            Optional. A ReverseGeocodeCache to consult before making reverse
+            geocoding requests, and to store their results in.
+        :arg basemaps_cache:
+            Optional. The BasemapsCache to share basemaps metadata through.
+            By default, all instances share one cache for the process.
+        :arg search_index:
+            Optional. A SearchIndex to add all search results to, so that
+            search_local() can answer queries from them.
+        :arg tile_cache:
+            Optional. A TileCache to consult before requesting basemap
+            tiles, and to store them in.
         """
 
         client_cls = INTERFACES.get(interface)
@@ -79,23 +130,50 @@ class Frontend(object):
         self.basemaps_service = BasemapsService()
         self.search_service = SearchService()
 
+        self.geocode_cache = geocode_cache
+        self.reverse_geocode_cache = reverse_geocode_cache
+        self.basemaps_cache = (
+            basemaps_cache if basemaps_cache is not None else BASEMAPS_CACHE
+        )
+        self.search_index = search_index
+        self.tile_cache = tile_cache
+        self._background_refresh = interface in self.background_interfaces
+
         # Store token to use in Authorization headers
         self.token = None  # type: Optional[bytes]
 
-        # Cache basemaps from the enumeration endpoint.
-        # Indexed by strings like "Mapbox Satellite"
-        self._basemaps = None  # type: Any
+        # (token, host, headers) for the last headers() result, so the
+        # Authorization header is only built once per token.
+        self._auth_headers = None  # type: Optional[Tuple[Any, Any, FrozenHeaders]]
+
+        # Whether the geocoding batch endpoint works on this host.
+        # None means we haven't found out yet.
+        self._geocode_batch_available = None  # type: Optional[bool]
 
     def headers(self):
-        if not self.token:
+        # type: () -> FrozenHeaders
+        """Get the headers to send with each request: the host's, and auth.
+
+        The result is frozen and reused until the token or host changes;
+        copy() it to make changes.
+        """
+        token = self.token
+        if not token:
             raise NotLoggedIn()
-        return Headers([
+        host = self.host
+        cached = self._auth_headers
+        if cached is not None and cached[0] is token and cached[1] is host:
+            return cached[2]
+        auth = Headers([
             (
                 b"Authorization", "Bearer {0}".format(
-                    self.token.as_text(),
+                    token.as_text(),
                 ).encode("utf-8")
             ),
         ])
+        headers = Headers.layered(host.headers(), auth)
+        self._auth_headers = (token, host, headers)
+        return headers
 
     def login(self, username, password):
         # type: (bytes, bytes) -> Result
@@ -141,21 +219,75 @@ class Frontend(object):
     def basemaps(self):
         """Use the basemaps service to enumerate available basemaps.
 
-        For now this has to be called and waited on before doing basemap
-        stuff... :(
+        Results are shared through basemaps_cache, so this only makes a
+        request the first time for each host, or when the cached metadata has
+        gone stale. Stale metadata is still returned right away where the
+        interface allows revalidating it in the background.
         """
         if not self.token:
             raise NotLoggedIn()
 
-        # Return from cache
-        if self._basemaps:
-            return Present(self._basemaps)
+        cache = self.basemaps_cache
+        entry = cache.get(self.host.url)
+        if entry is not None:
+            if cache.is_fresh(entry):
+                return Present(entry.basemaps)
+            if self._background_refresh:
+                if cache.begin_refresh(self.host.url):
+                    self._refresh_basemaps(entry)
+                return Present(entry.basemaps)
+        return self._fetch_basemaps(entry)
+
+    def _refresh_basemaps(self, entry):
+        """Revalidate stale basemaps metadata on a daemon thread.
+
+        The caller must have claimed the refresh with begin_refresh().
+        """
+        host = self.host.url
+        try:
+            result = self._fetch_basemaps(entry)
+        except Exception:
+            # Let go of the claim, or this host would never be refreshed.
+            self.basemaps_cache.end_refresh(host)
+            raise
+
+        def run():
+            try:
+                result.wait()
+            except Exception:
+                self.log.warning(
+                    "background refresh of basemaps failed", exc_info=True,
+                )
+            finally:
+                self.basemaps_cache.end_refresh(host)
+
+        thread = threading.Thread(target=run, name="because-basemaps-refresh")
+        thread.daemon = True
+        try:
+            thread.start()
+        except Exception:
+            self.basemaps_cache.end_refresh(host)
+            raise
+
+    def _fetch_basemaps(self, entry=None):
+        """Request basemaps metadata, storing it in basemaps_cache.
+
+        :arg entry:
+            Optional. A stale cache entry to revalidate with its ETag.
+        """
+        host = self.host.url
+        cache = self.basemaps_cache
+        headers = self.headers()
+        if entry is not None and entry.etag:
+            headers = Headers.layered(
+                headers, Headers([(b"If-None-Match", entry.etag)]),
+            )
 
         request = self.basemaps_service.request(
             u"metadata",
             method=u"GET",
-            base=self.host.url,
-            headers=self.headers(),
+            base=host,
+            headers=headers,
         )
 
         # Ask client to start sending the request.
@@ -170,13 +302,21 @@ class Frontend(object):
         def cache_basemaps(response):
             """Define how to intercept basemaps requests to cache results.
             """
+            if response.status == 304 and entry is not None:
+                return cache.touch(host, entry).basemaps
             basemaps = self.basemaps_service.parse_metadata(response)
-            self._basemaps = basemaps
+            etags = response.headers[b"ETag"] if b"ETag" in response.headers \
+                else []
+            cache.store(
+                host, response.body,
+                etag=etags[0] if etags else None,
+                basemaps=basemaps,
+            )
             return basemaps
 
         # Now we wrap the transfer in a result: when the caller waits on this
         # result, the result waits on the transfer, then runs cache_basemaps to
-        # cache the result on this Frontend instance, then return the result.
+        # cache the result for every Frontend, then return the result.
         return Result(transfer, cache_basemaps)
 
     def basemap(self, name):
@@ -187,15 +327,129 @@ class Frontend(object):
         if not self.token:
             raise NotLoggedIn()
 
+        basemaps = self.basemaps()
+
+        # Answer straight away if the metadata was cached.
+        if isinstance(basemaps, Present):
+            return Present(basemaps.wait().get(name.lower()))
+
         # To be run on the result of self.basemaps().
         def extract_basemap(basemaps):
             return basemaps.get(name.lower())
 
-        return Result(self.basemaps(), extract_basemap)
+        return Result(basemaps, extract_basemap)
+
+    def tile(self, basemap, x, y, z):
+        """Get the image of one tile of a basemap, as bytes.
+
+        The result is None if the basemap has no image for the tile. With a
+        tile_cache, fresh cached tiles are returned without a request, and
+        stale ones are revalidated.
+        """
+        url = basemap.tile_url(x, y, z)
+        cache = self.tile_cache
+        cached = cache.get(url) if cache is not None else None
+        if cached is not None and cached.fresh:
+            return Present(cached.data)
+
+        request = Request(
+            b"GET", url.encode("utf-8"), headers=conditional_headers(cached),
+        )
+        transfer = self.client.send(request)
+
+        def cache_tile(response):
+            if cache is None:
+                return tile_data(response)
+            return cache.store_response(url, response, cached)
+
+        return Result(transfer, cache_tile)
+
+    def vector_tile(self, basemap, x, y, z):
+        """Get one tile of a PBF basemap, decoded as a VectorTile.
+
+        The result is None if the basemap has no data for the tile. Tiles are
+        fetched and cached as for tile().
+        """
+        if basemap.tile_format != "PBF":
+            raise InvalidObject(
+                "basemap {0!r} has {1} tiles, not PBF".format(
+                    basemap.title or basemap.url, basemap.tile_format,
+                )
+            )
+
+        def decode(data):
+            return VectorTile(data) if data is not None else None
+
+        tile = self.tile(basemap, x, y, z)
+        if isinstance(tile, Present):
+            return Present(decode(tile.wait()))
+        return Result(tile, decode)
 
     def geocode(self, address, service="mapbox"):
         """Use the geocoding service to geocode an address.
         """
+        return self._geocode(address, service, strict=False)
+
+    def _geocode(self, address, service, strict):
+        """Geocode an address, raising ParseError on errors if strict.
+
+        Otherwise, an error response gives an empty list, as it always has.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        if not address:
+            raise Exception("FIXME")
+
+        cache = self.geocode_cache
+        if cache is not None:
+            cached = cache.get(address, service)
+            if cached is not None:
+                return Present(cached)
+
+        request = self.geocoding_service.request(
+            u"forward",
+            method=u"GET",
+            base=self.host.url,
+            values={
+                "service": service,
+                "address": address,
+            },
+            headers=self.headers(),
+        )
+        transfer = self.client.send(request)
+        if cache is None and not strict:
+            return Result(transfer, self.geocoding_service.parse_forward)
+
+        def cache_geocode(response):
+            """Parse the response, caching the result only if it parsed.
+            """
+            try:
+                candidates = self.geocoding_service.parse_forward_strict(
+                    response,
+                )
+            except ParseError:
+                if strict:
+                    raise
+                # Don't cache errors as if they were empty results.
+                return self.geocoding_service.parse_forward(response)
+            if cache is not None:
+                cache.set(address, service, candidates)
+            return candidates
+
+        return Result(transfer, cache_geocode)
+
+    def iter_geocode(self, address, service="mapbox",
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+        """Geocode an address, yielding Candidates as the response arrives.
+
+        With the python interface, the first candidate is available before
+        the whole response has downloaded, and only one candidate's JSON is
+        held in memory at a time. Other interfaces wait for the whole response
+        first. The geocode cache is not used.
+
+        :raises ParseError: while iterating, if the response has an error.
+        """
         if not self.token:
             raise NotLoggedIn()
 
@@ -212,8 +466,150 @@ class Frontend(object):
             },
             headers=self.headers(),
         )
+        response, chunks = self._stream(request, chunk_size)
+        return self.geocoding_service.iter_forward(response, chunks)
+
+    def _stream(self, request, chunk_size):
+        """Perform a request, getting its response head and body chunks.
+        """
+        transfer = self.client.transfer(request, log=self.client.log)
+        return transfer.stream(chunk_size)
+
+    def geocode_batch(self, addresses, service="mapbox"):
+        """Use the geocoding batch endpoint to geocode several addresses.
+
+        The result is a list with one entry per address: either a list of
+        Candidate instances, or a ParseError for an address which failed.
+        Waiting on the result raises EndpointUnavailable if the host does not
+        offer the batch endpoint.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        request = self.geocoding_service.request(
+            u"batch",
+            method=u"POST",
+            base=self.host.url,
+            values={
+                "service": service,
+            },
+            body=self.geocoding_service.batch_body(addresses),
+            headers=self.headers(),
+        )
         transfer = self.client.send(request)
-        return Result(transfer, self.geocoding_service.parse_forward)
+        return Result(transfer, self.geocoding_service.parse_batch)
+
+    def geocode_many(self, addresses, service="mapbox", concurrency=8,
+                     use_batch=True, batch_size=100, ordered=True):
+        """Geocode many addresses, yielding results as they become available.
+
+        Addresses are consumed lazily, so this can be fed a generator over a
+        file with millions of rows.
+
+        If use_batch is true, addresses are sent in chunks of batch_size to
+        the batch endpoint. If the host turns out not to offer that endpoint,
+        this falls back to one request per address. Either way, up to
+        concurrency requests are in flight at once.
+
+        :returns:
+            Iterator of Outcome instances, one per address, where value is the
+            list of Candidate instances for that address. A failure for one
+            address is reported in its Outcome's error and does not stop the
+            others.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        size = batch_size if use_batch else 1
+
+        def geocode_chunk(indexed_chunk):
+            _, chunk = indexed_chunk
+            return self._geocode_chunk(chunk, service, use_batch)
+
+        chunks = fan_out(
+            geocode_chunk,
+            chunked(addresses, size),
+            concurrency=concurrency,
+            ordered=ordered,
+        )
+        return self._flatten_chunk_outcomes(chunks)
+
+    def geocode_table(self, addresses, service="mapbox", **kwargs):
+        """Geocode many addresses into one CandidateTable.
+
+        Takes the same arguments as geocode_many. Candidates are stored in
+        columns as they arrive, which takes far less memory than keeping
+        the Candidate lists; the row of each candidate is the position of
+        its address in addresses, and failures are kept in the table's
+        errors.
+        """
+        return CandidateTable.from_outcomes(
+            self.geocode_many(addresses, service=service, **kwargs)
+        )
+
+    def _geocode_chunk(self, addresses, service, use_batch):
+        """Geocode one chunk of addresses for geocode_many.
+
+        Returns a list of results, with an exception instance in place of the
+        result for each address which failed.
+        """
+        cache = self.geocode_cache
+        results = [None] * len(addresses)  # type: list
+        misses = []
+        for index, address in enumerate(addresses):
+            cached = cache.get(address, service) if cache is not None else None
+            if cached is None:
+                misses.append(index)
+            else:
+                results[index] = cached
+        if not misses:
+            return results
+
+        if use_batch and self._geocode_batch_available is not False:
+            try:
+                batch = self.geocode_batch(
+                    [addresses[index] for index in misses], service,
+                ).wait()
+            except EndpointUnavailable:
+                self.log.info("batch geocoding unavailable, falling back")
+                self._geocode_batch_available = False
+            else:
+                self._geocode_batch_available = True
+                for index, result in zip(misses, batch):
+                    results[index] = result
+                    if cache is not None and not isinstance(result, Exception):
+                        cache.set(addresses[index], service, result)
+                return results
+
+        # Strictly, so that an error response is that item's error, as in a
+        # batch, rather than an empty result.
+        for index in misses:
+            try:
+                results[index] = self._geocode(
+                    addresses[index], service, strict=True,
+                ).wait()
+            except Exception as error:
+                results[index] = error
+        return results
+
+    @staticmethod
+    def _flatten_chunk_outcomes(chunk_outcomes):
+        """Turn outcomes for chunks of items into outcomes for each item.
+        """
+        for chunk_outcome in chunk_outcomes:
+            start, chunk = chunk_outcome.item
+            if chunk_outcome.error is not None:
+                results = [chunk_outcome.error] * len(chunk)
+            else:
+                results = chunk_outcome.value
+            for offset, item in enumerate(chunk):
+                result = results[offset] if offset < len(results) else None
+                if result is None:
+                    result = InvalidObject("no result returned for item")
+                if isinstance(result, Exception):
+                    yield Outcome(start + offset, item, error=result)
+                else:
+                    yield Outcome(start + offset, item, value=result)
 
     def reverse_geocode(self, x, y, service="mapbox"):
         """Use the geocoding service to reverse-geocode a location.
@@ -221,6 +617,12 @@ class Frontend(object):
         if not self.token:
             raise NotLoggedIn()
 
+        cache = self.reverse_geocode_cache
+        if cache is not None:
+            cached = cache.get(x, y, service)
+            if cached is not None:
+                return Present(cached)
+
         request = self.geocoding_service.request(
             u"reverse",
             method=u"GET",
@@ -233,7 +635,82 @@ class Frontend(object):
             headers=self.headers(),
         )
         transfer = self.client.send(request)
-        return Result(transfer, self.geocoding_service.parse_reverse)
+        if cache is None:
+            return Result(transfer, self.geocoding_service.parse_reverse)
+
+        def cache_reverse_geocode(response):
+            """Parse the response, caching the result only if it parsed.
+            """
+            try:
+                candidates = self.geocoding_service.parse_reverse_strict(
+                    response,
+                )
+            except ParseError:
+                return self.geocoding_service.parse_reverse(response)
+            cache.set(x, y, service, candidates)
+            return candidates
+
+        return Result(transfer, cache_reverse_geocode)
+
+    def reverse_geocode_many(self, points, service="mapbox", concurrency=8):
+        """Reverse-geocode many (x, y) points.
+
+        With a reverse_geocode_cache, points which hit the cache are yielded
+        first, without requests. The remaining points are grouped by cache
+        cell and one point per cell is queried; the others in the cell reuse
+        its result if they are close enough, and are queried separately if
+        not.
+
+        :returns:
+            Iterator of Outcome instances, one per point, in completion order.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        def fetch(point):
+            x, y = point
+            return self.reverse_geocode(x, y, service).wait()
+
+        cache = self.reverse_geocode_cache
+        if cache is None:
+            return fan_out(fetch, points, concurrency=concurrency,
+                           ordered=False)
+        return self._reverse_geocode_many(points, service, concurrency, cache,
+                                          fetch)
+
+    def _reverse_geocode_many(self, points, service, concurrency, cache,
+                              fetch):
+        hits, misses = cache.partition(points, service)
+        for index, point, candidates in hits:
+            yield Outcome(index, point, value=candidates)
+
+        def fetch_first(members):
+            return fetch(members[0][1])
+
+        groups = list(cache.group(misses, service).values())
+        leftovers = []
+        outcomes = fan_out(fetch_first, groups, concurrency=concurrency,
+                           ordered=False)
+        for outcome in outcomes:
+            members = outcome.item
+            index, point = members[0]
+            yield Outcome(index, point, value=outcome.value,
+                          error=outcome.error)
+            for index, point in members[1:]:
+                cached = None
+                if outcome.error is None:
+                    cached = cache.get(point[0], point[1], service)
+                if cached is None:
+                    leftovers.append((index, point))
+                else:
+                    yield Outcome(index, point, value=cached)
+
+        outcomes = fan_out(fetch, [point for _, point in leftovers],
+                           concurrency=concurrency, ordered=False)
+        for outcome in outcomes:
+            index, point = leftovers[outcome.index]
+            yield Outcome(index, point, value=outcome.value,
+                          error=outcome.error)
 
     def route(self, origin, *waypoints, **kwargs):
         """Use the routing service to get a route through locations/addresses.
@@ -261,6 +738,244 @@ class Frontend(object):
         transfer = self.client.send(request)
         return Result(transfer, self.routing_service.parse)
 
+    def iter_route_steps(self, origin, *waypoints, **kwargs):
+        """Get a route, yielding its Steps as the response arrives.
+
+        Takes the same arguments as route(), plus an optional chunk_size.
+        Steps of all legs are yielded in order; the totals are not given.
+        """
+        service = kwargs.get("service") or "mapbox"
+        chunk_size = kwargs.get("chunk_size") or DEFAULT_CHUNK_SIZE
+
+        if not self.token:
+            raise NotLoggedIn()
+
+        if not origin or not waypoints:
+            raise Exception("FIXME")
+        waypoints = "|".join([origin] + list(waypoints))
+
+        request = self.routing_service.request(
+            u"waypoints",
+            method=u"GET",
+            base=self.host.url,
+            values={
+                "service": service,
+                "waypoints": waypoints,
+            },
+            headers=self.headers(),
+        )
+        response, chunks = self._stream(request, chunk_size)
+        return self.routing_service.iter_steps(response, chunks)
+
+    def route_summary(self, origin, destination, service="mapbox"):
+        """Get just the distance and duration of a route between two places.
+
+        This skips parsing the route's legs, steps and geometry.
+
+        :arg origin:
+            Address text, or an (x, y) tuple of WGS84 coordinates.
+        :arg destination:
+            Address text, or an (x, y) tuple of WGS84 coordinates.
+        :returns:
+            Result giving a (distance, duration) tuple.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        origin_a, origin_b = location_values(location_key(origin))
+        dest_a, dest_b = location_values(location_key(destination))
+        if origin_b is not None and dest_b is not None:
+            request = self.routing_service.request(
+                u"latlon",
+                method=u"GET",
+                base=self.host.url,
+                values={
+                    "service": service,
+                    "origin_x": origin_a,
+                    "origin_y": origin_b,
+                    "destination_x": dest_a,
+                    "destination_y": dest_b,
+                },
+                headers=self.headers(),
+            )
+        else:
+            # The waypoints endpoint takes addresses or "x,y" strings.
+            waypoints = "|".join(
+                text if y is None else "{0},{1}".format(text, y)
+                for text, y in [(origin_a, origin_b), (dest_a, dest_b)]
+            )
+            request = self.routing_service.request(
+                u"waypoints",
+                method=u"GET",
+                base=self.host.url,
+                values={
+                    "service": service,
+                    "waypoints": waypoints,
+                },
+                headers=self.headers(),
+            )
+        transfer = self.client.send(request)
+        return Result(transfer, self.routing_service.parse_summary)
+
+    def route_matrix(self, origins, destinations, service="mapbox",
+                     concurrency=8, symmetric=False):
+        """Compute distances and durations between many places.
+
+        Each distinct origin/destination pair is fetched once, with up to
+        concurrency requests in flight. Cells whose origin and destination are
+        the same place get zero distance and duration without a request.
+
+        :arg origins:
+            Sequence of places, each address text or an (x, y) tuple.
+        :arg destinations:
+            Sequence of places, each address text or an (x, y) tuple.
+        :arg symmetric:
+            If true, reuse the route from A to B for B to A.
+        :returns:
+            A RouteMatrix. Cells which failed hold NaN, with their errors in
+            the matrix's errors dict.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        origins, destinations = list(origins), list(destinations)
+        matrix = RouteMatrix(len(origins), len(destinations))
+        needed, same = plan_matrix(origins, destinations, symmetric=symmetric)
+        for i, j in same:
+            matrix.set(i, j, 0.0, 0.0)
+
+        def fetch(pair):
+            origin_key, destination_key = pair
+            return self.route_summary(
+                location_from_key(origin_key),
+                location_from_key(destination_key),
+                service=service,
+            ).wait()
+
+        outcomes = fan_out(
+            fetch, needed, concurrency=concurrency, ordered=False,
+        )
+        for outcome in outcomes:
+            for i, j in needed[outcome.item]:
+                if outcome.error is not None:
+                    matrix.errors[(i, j)] = outcome.error
+                else:
+                    distance, duration = outcome.value
+                    matrix.set(i, j, distance, duration)
+        return matrix
+
+    def route_batch(self, routes, service="mapbox"):
+        """Submit a batch routing job.
+
+        :arg routes:
+            List of waypoint sequences, e.g. [(origin, destination), ...].
+        :returns:
+            Result giving the uuid of the job, for use with route_batch_status.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        request = self.routing_service.request(
+            u"batch",
+            method=u"POST",
+            base=self.host.url,
+            values={
+                "service": service,
+            },
+            body=self.routing_service.batch_body(routes),
+            headers=self.headers(),
+        )
+        transfer = self.client.send(request)
+        return Result(transfer, self.routing_service.parse_batch_submission)
+
+    def route_batch_status(self, uuid, service="mapbox"):
+        """Check the status of a batch routing job.
+
+        :returns:
+            Result giving a BatchStatus.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        request = self.routing_service.request(
+            u"batch_status",
+            method=u"GET",
+            base=self.host.url,
+            values={
+                "service": service,
+                "uuid": uuid,
+            },
+            headers=self.headers(),
+        )
+        transfer = self.client.send(request)
+        return Result(transfer, self.routing_service.parse_batch_status)
+
+    def route_many(self, pairs, service="mapbox", batch_size=50, max_jobs=8,
+                   timeout=None, poller=None):
+        """Route many origin/destination pairs using batch routing jobs.
+
+        Pairs are submitted in chunks of batch_size, one batch job per chunk,
+        with at most max_jobs jobs outstanding at once. All outstanding jobs
+        are polled from one shared Poller, which backs off while jobs make no
+        progress.
+
+        :arg pairs:
+            Iterable of waypoint sequences, e.g. (origin, destination) tuples
+            of addresses. It is consumed lazily.
+        :arg timeout:
+            Optional. Seconds after which a job is given up on.
+        :arg poller:
+            Optional. Poller to use, e.g. one with different backoff settings.
+        :returns:
+            Iterator of Outcome instances, one per pair, where value is a
+            Route. Outcomes are yielded a job at a time, as jobs complete.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        jobs = self._route_jobs(
+            pairs, service, batch_size, max_jobs, timeout,
+            poller if poller is not None else Poller(),
+        )
+        return self._flatten_chunk_outcomes(jobs)
+
+    def _route_jobs(self, pairs, service, batch_size, max_jobs, timeout,
+                    poller):
+        """Submit and poll batch routing jobs for route_many.
+
+        Yields an Outcome for each chunk of pairs, whose item is a tuple of
+        (start, chunk) and whose value is the list of routes for the chunk.
+        """
+        def status_check(uuid):
+            def check():
+                status = self.route_batch_status(uuid, service).wait()
+                return Status(
+                    status.done,
+                    value=status.routes,
+                    progress=status.completed,
+                    retry_after=status.retry_after,
+                )
+            return check
+
+        chunks = chunked(pairs, batch_size)
+        exhausted = False
+        while True:
+            while not exhausted and len(poller) < max_jobs:
+                try:
+                    start, chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                try:
+                    uuid = self.route_batch(chunk, service).wait()
+                except Exception as error:
+                    yield Outcome(start, (start, chunk), error=error)
+                    continue
+                poller.add((start, chunk), status_check(uuid), timeout=timeout)
+            if not len(poller):
+                return
+            yield poller.next()
+
     def search_categories(self):
         if not self.token:
             raise NotLoggedIn()
@@ -291,9 +1006,143 @@ class Frontend(object):
             headers=self.headers(),
         )
         transfer = self.client.send(request)
-        return Result(transfer, self.search_service.parse_category)
+        return Result(
+            transfer, self._indexing(self.search_service.parse_category),
+        )
+
+    def federated_search(self, q, categories=None, concurrency=8,
+                         timeout=None):
+        """Search many categories at once for the same query.
+
+        Categories are searched concurrently, and their results are yielded
+        as each one answers. A category which fails or takes longer than
+        timeout is skipped and recorded in the returned object's errors.
+
+        As with geocode_many, searches run in worker threads, so this suits
+        the python and concurrent interfaces but not Qt-based ones.
+
+        :arg categories:
+            Optional. Keys (or SearchCategory instances) of the categories
+            to search; by default, all of them.
+        :arg concurrency:
+            Maximum number of categories to search at once.
+        :arg timeout:
+            Optional. Seconds to wait for each category.
+        :returns:
+            FederatedSearch, iterable over FederatedHits, whose ranked()
+            merges the results of all categories into one ranking.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+        if categories is None:
+            categories = self.search_categories().wait()
+        keys = [getattr(category, "key", category) for category in categories]
+
+        def search(key):
+            return self.search_category(key, q).wait()
+
+        return FederatedSearch(
+            search, keys, concurrency=concurrency, timeout=timeout,
+        )
+
+    def iter_search_category(self, category, q,
+                             chunk_size=DEFAULT_CHUNK_SIZE):
+        """Search a category, yielding SearchResults as the response arrives.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        request = self.search_service.request(
+            u"category",
+            method=u"GET",
+            base=self.host.url,
+            values={
+                "category": category,
+                "q": q,
+            },
+            headers=self.headers(),
+        )
+        response, chunks = self._stream(request, chunk_size)
+        results = self.search_service.iter_category(response, chunks)
+        if self.search_index is None:
+            return results
+        return self._iter_indexing(results)
+
+    def _indexing(self, parse):
+        """Wrap a parse callback to add the results it returns to search_index.
+        """
+        def parse_and_index(response):
+            results = parse(response)
+            if self.search_index is not None:
+                self.search_index.add_all(results)
+            return results
+        return parse_and_index
+
+    def _iter_indexing(self, results):
+        """Add results to search_index as they are yielded.
+        """
+        for result in results:
+            self.search_index.add(result)
+            yield result
+
+    def search_local(self, q, category=None, limit=20, refresh=True):
+        """Answer a search query from search_index, without waiting.
+
+        Every result previously fetched by search_category, opensearch and
+        the methods built on them is searched. If a category is given and
+        refresh is true, that category is also searched on the server in the
+        background (with the python and concurrent interfaces), adding its
+        results to the index for later queries. A query isn't refreshed
+        again within the index's max_age.
+
+        :returns:
+            List of SearchResults, best first.
+        """
+        index = self.search_index
+        if index is None:
+            raise InvalidObject("no search_index to search")
+        results = index.search(q, limit=limit)
+        if refresh and category is not None and q.strip() and \
+                self._background_refresh and self.token:
+            key = (category, q.strip().lower())
+            if index.begin_refresh(key):
+                self._refresh_search(category, q, key)
+        return results
+
+    def _refresh_search(self, category, q, key):
+        """Search a category on a daemon thread, to update search_index.
 
-    def opensearch(self, query, category="ALL", start_page=0, page_size=20):
+        The caller must have claimed the refresh with begin_refresh().
+        """
+        try:
+            result = self.search_category(category, q)
+        except Exception:
+            # Let go of the claim, or this search would never be refreshed.
+            self.search_index.end_refresh(key, False)
+            raise
+
+        def run():
+            succeeded = False
+            try:
+                result.wait()
+                succeeded = True
+            except Exception:
+                self.log.warning(
+                    "background refresh of search results failed",
+                    exc_info=True,
+                )
+            finally:
+                self.search_index.end_refresh(key, succeeded)
+
+        thread = threading.Thread(target=run, name="because-search-refresh")
+        thread.daemon = True
+        try:
+            thread.start()
+        except Exception:
+            self.search_index.end_refresh(key, False)
+            raise
+
+    def opensearch(self, query, category=u"ALL", start_page=0, page_size=20):
         if not self.token:
             raise NotLoggedIn()
 
@@ -315,7 +1164,56 @@ class Frontend(object):
             headers=self.headers(),
         )
         transfer = self.client.send(request)
-        return Result(transfer, self.search_service.parse_opensearch)
+        return Result(
+            transfer, self._indexing(self.search_service.parse_opensearch),
+        )
+
+    def iter_opensearch(self, query, category=u"ALL", start_page=0,
+                        page_size=20, prefetch=2, max_pages=None):
+        """Yield opensearch results across pages, fetching pages ahead.
+
+        Up to prefetch pages are requested or waiting to be read at once,
+        counting the one the caller is working through. Paging stops after
+        the first page with fewer than page_size results, by which time up to
+        prefetch - 1 requests for pages past it may have been sent; their
+        results are discarded. If the caller stops early (or closes the
+        generator), page requests which haven't started are cancelled and any
+        others are left to finish and be discarded.
+
+        As with geocode_many, pages are requested from worker threads, so this
+        suits the python and concurrent interfaces but not Qt-based ones.
+
+        :arg prefetch:
+            Number of page requests to have in flight at once; 1 fetches
+            one page at a time.
+        :arg max_pages:
+            Optional. Stop after this many pages.
+        """
+        if not self.token:
+            raise NotLoggedIn()
+
+        pages = count(start_page)
+        if max_pages is not None:
+            pages = islice(pages, max_pages)
+
+        def fetch(page):
+            return self.opensearch(
+                query, category=category, start_page=page,
+                page_size=page_size,
+            ).wait()
+
+        prefetch = max(1, prefetch)
+        outcomes = fan_out(fetch, pages, concurrency=prefetch, window=prefetch)
+        try:
+            for outcome in outcomes:
+                results = outcome.unwrap()
+                for result in results:
+                    yield result
+                if len(results) < page_size:
+                    return
+        finally:
+            # Cancel the prefetched pages now rather than when collected.
+            outcomes.close()
 
     def search_data(self):
         if not self.token:
@@ -5,7 +5,7 @@ information that may be needed per HTTP standards.
 """
 from typing import (
     Any,
-    DefaultDict,
+    Dict,
     List,
     Optional,
     Sequence,
@@ -14,6 +14,7 @@ from typing import (
     Tuple,
 )
 import collections
+from itertools import chain
 from . reprs import ReprMixin
 from . pretty import PrettyMixin
 from . utils import is_iterable
@@ -40,6 +41,64 @@ class InvalidHeader(InvalidHeaders):
     """
 
 
+# Header names seen so far, mapping each spelling to one shared lowercase
+# bytes object. Most instances hold the same few names, so this saves memory
+# and makes later normalization a dict hit instead of a lower() call.
+_NAMES = {}  # type: Dict[bytes, bytes]
+
+# Display form of each lowercase name, e.g. b"Content-type".
+_DISPLAY = {}  # type: Dict[bytes, bytes]
+
+# Instances with more pairs than this get an index for lookups; smaller ones
+# are just scanned, which is about as fast and costs no memory.
+_INDEX_THRESHOLD = 16
+
+# Stop remembering names past this many, so that e.g. a server sending
+# random header names can't grow the tables forever.
+_MAX_NAMES = 4096
+
+
+def _name(key):
+    # type: (bytes) -> bytes
+    """Normalize a header name to its shared lowercase form.
+    """
+    name = _NAMES.get(key)
+    if name is None:
+        lower = key.lower()
+        name = _NAMES.get(lower, lower)
+        if len(_NAMES) < _MAX_NAMES:
+            _NAMES[lower] = name
+            _NAMES[key] = name
+    return name
+
+
+def _display(name):
+    # type: (bytes) -> bytes
+    """Get the display form of a lowercase header name.
+    """
+    display = _DISPLAY.get(name)
+    if display is None:
+        display = name.capitalize()
+        if len(_DISPLAY) < _MAX_NAMES:
+            _DISPLAY[name] = display
+    return display
+
+
+def _layer_pairs(layers):
+    # type: (List[tuple]) -> tuple
+    """Combine tuples of pairs, names in later ones replacing earlier ones.
+    """
+    pieces = []
+    later = set()  # type: set
+    for pairs in reversed(layers):
+        if later:
+            pairs = tuple(pair for pair in pairs if pair[0] not in later)
+        pieces.append(pairs)
+        later.update(name for name, _ in pairs)
+    pieces.reverse()
+    return tuple(chain.from_iterable(pieces))
+
+
 class Headers(ReprMixin, PrettyMixin):
     """Storage for HTTP headers.
 
@@ -47,11 +106,6 @@ class Headers(ReprMixin, PrettyMixin):
     but it must also satisfy a few special considerations that make it
     unsatisfying to use a list of tuples.
 
-    For efficiency, values must be indexed by header name. Otherwise a list
-    would have to be traversed, e.g., to find the values of a particular
-    header, to delete a particular header, to ensure a header is not
-    duplicated, etc.
-    
     Header names are case-insensitive, so keys have to be internally
     normalized.
 
@@ -62,11 +116,12 @@ class Headers(ReprMixin, PrettyMixin):
     Header ordering does not generally matter -- *except* for ordering among
     headers with the same name, which must be preserved. So one can't use sets.
 
-    Both of those considerations are handled by storing a list for each header
-    name.
-
-    This list is exposed to allow operations like insert, append and remove
-    without writing a lot of new methods on this class.
+    Since many thousands of instances may be kept around (e.g. in cached
+    Responses), storage is compact: one tuple of (name, value) pairs, in the
+    order they were added, with names lowercased and shared across instances.
+    Small instances are scanned to look names up; larger ones build an index
+    from names to values the first time one is looked up. Changing an
+    instance replaces its tuple, so copies can share it.
 
     Lastly, it's not a big deal, but when the same complex kind of list or dict
     gets passed around a lot, there tend to be a lot of exposed interfaces
@@ -76,6 +131,8 @@ class Headers(ReprMixin, PrettyMixin):
     somewhere could get wrong, so you might as well formalize the arrangement.
     """
 
+    __slots__ = ("_pairs", "_index")
+
     def __init__(self, pairs=None):
         # type: (Optional[Sequence[Tuple[Text, Text]]]) -> None
         """
@@ -84,7 +141,8 @@ class Headers(ReprMixin, PrettyMixin):
             header_name and header_value must be bytes.
         """
         # Set up internal state
-        self._data = collections.defaultdict(list)  # type: DefaultDict[Text, list]
+        self._pairs = ()  # type: Tuple[Tuple[bytes, bytes], ...]
+        self._index = None  # type: Optional[Dict[bytes, Tuple[bytes, ...]]]
 
         if not pairs:
             return
@@ -100,6 +158,7 @@ class Headers(ReprMixin, PrettyMixin):
                 "cannot initialize with value of type {0!r}"
                 .format(type(pairs))
             )
+        stored = []
         for pair in pairs:
             try:
                 key, value = pair
@@ -111,7 +170,61 @@ class Headers(ReprMixin, PrettyMixin):
                 raise InvalidHeader("key is not bytes: {0!r}".format(key))
             if not isinstance(value, bytes):
                 raise InvalidHeader("key is not bytes: {0!r}".format(key))
-            self[key].append(value)
+            stored.append((_name(key), value))
+        self._pairs = tuple(stored)
+
+    @classmethod
+    def _trusted(cls, pairs):
+        # type: (tuple) -> Headers
+        """Make an instance around already-normalized internal data.
+
+        This skips all validation, so it is only for use on data taken from
+        other instances: a tuple of (lowercase name, value) pairs.
+        """
+        instance = cls.__new__(cls)
+        instance._pairs = pairs
+        instance._index = None
+        return instance
+
+    def _lookup(self):
+        # type: () -> Dict[bytes, Tuple[bytes, ...]]
+        """Get the index of values by name, building it if needed.
+        """
+        index = self._index
+        if index is None:
+            index = {}
+            for name, value in self._pairs:
+                values = index.get(name)
+                index[name] = (value,) if values is None else values + (value,)
+            self._index = index
+        return index
+
+    def _get(self, key):
+        # type: (bytes) -> Tuple[bytes, ...]
+        """Get the values for a name as a tuple, empty if it isn't set.
+        """
+        name = _name(key)
+        pairs = self._pairs
+        if len(pairs) > _INDEX_THRESHOLD:
+            return self._lookup().get(name, ())
+        return tuple([value for other, value in pairs if other == name])
+
+    def _replace(self, pairs):
+        # type: (tuple) -> None
+        self._pairs = pairs
+        self._index = None
+
+    def _names(self):
+        # type: () -> List[bytes]
+        """Get the names set in this instance, in order of first appearance.
+        """
+        names = []
+        seen = set()  # type: set
+        for name, _ in self._pairs:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+        return names
 
     def copy(self):
         # type: () -> Headers
@@ -120,27 +233,42 @@ class Headers(ReprMixin, PrettyMixin):
         The main use for this is to make defensive copies of a Headers instance
         that you want to pass to another unit without allowing that unit to
         make changes. Otherwise, there is normally no reason to use this.
+
+        The copy is always mutable, even if this instance is frozen. It is
+        cheap: the copy shares storage until one of them is changed.
         """
-        return type(self)(pairs=list(self.pairs()))
+        return Headers._trusted(self._pairs)
+
+    def freeze(self):
+        # type: () -> FrozenHeaders
+        """Get an immutable snapshot of this instance.
+
+        Frozen instances can be shared freely, so the snapshot should be
+        kept and reused rather than made again for each use.
+        """
+        return FrozenHeaders._trusted(self._pairs)
 
     def __eq__(self, other):
         # type: (Any) -> bool
         """Compare the contents of two instances, as in h1 == h2.
         """
-        return bool(self._data == other._data)
+        if not isinstance(other, Headers):
+            return False
+        return self._lookup() == other._lookup()
 
-    # TODO: ensure defensive copy on all input
+    def __ne__(self, other):
+        # type: (Any) -> bool
+        return not self == other
 
     def __getitem__(self, key):
         # type: (Text) -> List[Text]
         """Fetch all values under the given key.
 
-        Always returns a list; if header is not set, this list is empty.
+        Always returns a new list; if header is not set, this list is empty.
+        Looking up a header never changes the instance, so use set(), add()
+        or item assignment to make changes.
         """
-        # No defensive copy - return the actual list.
-        # This means user can append, insert, etc. without having to
-        # reimplement that stuff.
-        return self._data[key.lower()]
+        return list(self._get(key))
 
     def __setitem__(self, key, values):
         # type: (Text, List[Text]) -> None
@@ -155,12 +283,25 @@ class Headers(ReprMixin, PrettyMixin):
             raise InvalidHeader("values cannot have a string type")
         if not is_iterable(values):
             raise InvalidHeader("values must be iterable")
+        name = _name(key)
         # Defensive copy/any sequence, order matters, allow duplicate values
-        self._data[key.lower()] = list(values)
+        added = tuple((name, value) for value in values)
+        for _, value in added:
+            if not isinstance(value, bytes):
+                raise InvalidHeader("value is not bytes: {0!r}".format(value))
+        kept = tuple(pair for pair in self._pairs if pair[0] != name)
+        self._replace(kept + added)
 
     def __contains__(self, key):
         # type: (Text) -> bool
-        return key.lower() in self._data
+        name = _name(key)
+        pairs = self._pairs
+        if len(pairs) > _INDEX_THRESHOLD:
+            return name in self._lookup()
+        for other, _ in pairs:
+            if other == name:
+                return True
+        return False
 
     def set(self, key, value):
         # type: (Text, Text) ->  None
@@ -173,23 +314,7 @@ class Headers(ReprMixin, PrettyMixin):
         """
         if isinstance(value, list):
             raise InvalidHeader("value can't be a list")
-        key = key.lower()
-        self._data[key][:] = []
-        try:
-            del self._data[key]
-        except KeyError:
-            pass
-        assert key not in self._data
-        assert self._data[key] == []
-        assert not isinstance(value, list)
-        values = [value]
-        assert values == [value]
-        # assert value == 2, value
-
-        self._data[key] = values
-
-        # assert self._data[key] == [value]
-        # self[key] = [value]
+        self[key] = [value]
 
     @classmethod
     def merged(cls, *objs):
@@ -200,15 +325,42 @@ class Headers(ReprMixin, PrettyMixin):
         passed objects. Otherwise, objects earlier in the list are overridden
         from objects later in the list.
         """
-        instance = cls()
+        layers = []
         for obj in objs:
             # Allow e.g. {} to signify an empty headers list
-            if not obj:
+            if obj is None:
                 continue
-            for key, values in obj.items():
-                instance[key] = values
+            if not isinstance(obj, Headers):
+                if not obj:
+                    continue
+                instance = Headers()
+                for key, values in obj.items():
+                    instance[key] = values
+                obj = instance
+            if obj._pairs:
+                layers.append(obj._pairs)
+        return cls._trusted(_layer_pairs(layers))
 
-        return instance
+    @classmethod
+    def layered(cls, *objs):
+        # type: (*Optional[Headers]) -> FrozenHeaders
+        """Stack Headers instances into one frozen instance.
+
+        As with merged(), later instances override earlier ones. But the
+        result is frozen, and when only one layer has any headers, that layer
+        is returned as it is if it is already frozen. So stacking shared
+        defaults under nothing costs nothing.
+        """
+        layers = [obj for obj in objs if obj is not None and obj._pairs]
+        if not layers:
+            return EMPTY_HEADERS
+        if len(layers) == 1:
+            if isinstance(layers[0], FrozenHeaders):
+                return layers[0]
+            return layers[0].freeze()
+        return FrozenHeaders._trusted(
+            _layer_pairs([obj._pairs for obj in layers])
+        )
 
     def unset(self, key):
         # type: (Text) -> None
@@ -218,23 +370,27 @@ class Headers(ReprMixin, PrettyMixin):
 
         This is just a shortcut for a common need.
         """
-        del self._data[key.lower()]
+        name = _name(key)
+        if key in self:
+            self._replace(
+                tuple(pair for pair in self._pairs if pair[0] != name)
+            )
 
     def add(self, key, value):
         # type: (Text, Text) -> None
         """Append the given value under the given key.
-
-        h.add(k, v) is just a nicer spelling for h[k].append(v).
         """
-        self._data[key.lower()].append(value)
+        name = _name(key)
+        self._pairs += ((name, value),)
+        index = self._index
+        if index is not None:
+            index[name] = index.get(name, ()) + (value,)
 
     def keys(self):
         # type: () -> Iterator[Text]
         """Give the keys set in this instance, as dict.keys().
         """
-        return (
-            key.capitalize() for key in self._data.keys()
-        )
+        return (_display(name) for name in self._names())
 
     def values(self):
         # type: () -> List[List[Text]]
@@ -243,7 +399,8 @@ class Headers(ReprMixin, PrettyMixin):
         Note the subtle distinction here that this gives a list of lists,
         with one list for each key, rather than a flat list of values.
         """
-        return list(self._data.values())
+        index = self._lookup()
+        return [list(index[name]) for name in self._names()]
 
     def items(self):
         # type: () -> Iterator[Tuple[Text, List[Text]]]
@@ -255,9 +412,10 @@ class Headers(ReprMixin, PrettyMixin):
 
         The capitalization of the keys is normalized on the way out.
         """
+        index = self._lookup()
         return (
-            (key.capitalize(), value)
-            for key, value in self._data.items()
+            (_display(name), list(index[name]))
+            for name in self._names()
         )
 
     def pairs(self):
@@ -268,11 +426,10 @@ class Headers(ReprMixin, PrettyMixin):
         values) tuples: Tuple[Text, List[Text]]. pairs() returns (key, value)
         tuples: Tuple[Text, Text].
 
-        Returns an iterator of (header_name, header_value) pairs.
+        Returns an iterator of (header_name, header_value) pairs, in the order
+        they were added.
         """
-        for key, values in self.items():
-            for value in values:
-                yield (key, value)
+        return ((_display(name), value) for name, value in self._pairs)
 
     def combined_pairs(self):
         """Get all the items as pairs with multivalues joined by commas.
@@ -322,3 +479,37 @@ class Headers(ReprMixin, PrettyMixin):
     def pretty_tuples(self):
         # type: () -> List[Tuple[Text, Any]]
         return list(self.pairs())
+
+
+class FrozenHeaders(Headers):
+    """Immutable Headers, which can be shared without defensive copies.
+
+    Methods which would change the instance raise InvalidHeader instead; use
+    copy() to get a mutable instance. Looking up a name gives a tuple.
+    """
+
+    __slots__ = ()
+
+    def freeze(self):
+        # type: () -> FrozenHeaders
+        return self
+
+    def __getitem__(self, key):
+        # type: (Text) -> Tuple[Text, ...]
+        """Fetch all values under the given key, as a tuple.
+
+        If the header is not set, the tuple is empty.
+        """
+        return self._get(key)
+
+    def _frozen(self, *args, **kwargs):
+        raise InvalidHeader("frozen headers can't be changed; copy() them")
+
+    __setitem__ = _frozen
+    set = _frozen
+    unset = _frozen
+    add = _frozen
+
+
+#: Shared empty instance.
+EMPTY_HEADERS = FrozenHeaders._trusted(())
@@ -23,6 +23,7 @@ class Client(_Client):
     def transfer(self, request, log=None):
         return self.transfer_cls(
             request=request,
+            ssl_config=self.ssl_config,
             log=log,
             _executor=self._executor,
         )
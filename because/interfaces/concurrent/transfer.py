@@ -5,6 +5,7 @@ import logging
 from datetime import datetime as Datetime
 from typing import (
     Any,
+    Callable,
     Union,
     Optional,
     Tuple,
@@ -162,6 +163,16 @@ class Transfer(_Transfer):
         if self._future:
             return self._future.cancel()
 
+    def add_done_callback(self, function):
+        # type: (Callable[[Transfer], Any]) -> None
+        """Call function with this transfer when it finishes or is cancelled.
+
+        It runs on the thread which ran the transfer, or straight away if
+        the transfer is already done.
+        """
+        self.start()
+        self._future.add_done_callback(lambda _: function(self))
+
     def _done(self):
         """What to do after we're done waiting.
         """
@@ -12,3 +12,20 @@ class Client(_Client):
     # Just drop in the Python stdlib implementations
     ssl_config_cls = SSLConfig
     transfer_cls = Transfer
+
+    def __init__(self, ssl_config=None, log=None, pool=None):
+        """
+        :arg pool:
+            Optional. ConnectionPool to reuse connections from; by default,
+            each request has a connection of its own.
+        """
+        super(Client, self).__init__(ssl_config=ssl_config, log=log)
+        self.pool = pool
+
+    def transfer(self, request, log=None):
+        return self.transfer_cls(
+            request=request,
+            ssl_config=self.ssl_config,
+            log=log,
+            pool=self.pool,
+        )
@@ -0,0 +1,146 @@
+"""Keep HTTP connections open for reuse by later requests.
+
+By default, the python interface opens a new connection for every request,
+which costs a TCP handshake and, for HTTPS, a TLS handshake: more than the
+request itself for small responses such as map tiles. A ConnectionPool keeps
+each connection open once its response has been read, for the next request
+to the same host from the same thread.
+
+httplib connections can't be shared between threads, so each thread has its
+own connections.
+"""
+import threading
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+try:
+    import http.client as httplib
+except ImportError:
+    import httplib  # type: ignore
+from because.transfer import InvalidTransfer
+from . ssl_config import SSLConfig
+
+# Errors meaning a kept connection was closed by the server while idle,
+# before it sent any of a response. Timeouts and resets part way through a
+# response are not among them: the server may have acted on the request.
+# RemoteDisconnected is a BadStatusLine, and new in Python 3.5.
+STALE_CONNECTION_ERRORS = (httplib.BadStatusLine, httplib.CannotSendRequest)
+
+#: Methods which may be sent again when a kept connection turns out stale.
+IDEMPOTENT_METHODS = frozenset([
+    "GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE",
+])
+
+
+class ConnectionPool(object):
+    """Keep-alive HTTP connections for each thread, by scheme, host and port.
+    """
+
+    def __init__(self, ssl_config=None, timeout=None):
+        # type: (Optional[SSLConfig], Optional[float]) -> None
+        """
+        :arg ssl_config:
+            SSLConfig for HTTPS connections.
+        :arg timeout:
+            Optional. Socket timeout for new connections, in seconds.
+        """
+        self.ssl_config = ssl_config or SSLConfig()
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []  # type: List[Any]
+
+    def _idle(self):
+        # type: () -> Dict[Tuple[str, Any, Any], Any]
+        idle = getattr(self._local, "idle", None)
+        if idle is None:
+            idle = self._local.idle = {}
+        return idle
+
+    def _connect(self, scheme, host, port):
+        # type: (str, Any, Any) -> Any
+        kwargs = {}  # type: Dict[str, Any]
+        if self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        if scheme == "http":
+            connection = httplib.HTTPConnection(host=host, port=port, **kwargs)
+        elif scheme == "https":
+            connection = httplib.HTTPSConnection(
+                host=host, port=port,
+                context=self.ssl_config.to_ssl_context(), **kwargs
+            )
+        else:
+            raise InvalidTransfer("unrecognized scheme {0!r}".format(scheme))
+        with self._lock:
+            self._all.append(connection)
+        return connection
+
+    def get(self, parsed):
+        # type: (Any) -> Tuple[Any, bool]
+        """Take a connection for a parsed URL out of the pool.
+
+        Returns (connection, reused), where reused says whether it was kept
+        from an earlier request, in which case the server may have closed it
+        and the request should be retried once on a new connection.
+        """
+        key = (parsed.scheme, parsed.hostname, parsed.port)
+        connection = self._idle().pop(key, None)
+        if connection is not None:
+            return connection, True
+        return self._connect(*key), False
+
+    def new(self, parsed):
+        # type: (Any) -> Any
+        """Open a new connection for a parsed URL, ignoring idle ones.
+
+        Like connections from get(), it should be given back with put() or
+        discard().
+        """
+        return self._connect(parsed.scheme, parsed.hostname, parsed.port)
+
+    def put(self, parsed, connection):
+        # type: (Any, Any) -> None
+        """Return a connection whose response has been read in full.
+        """
+        key = (parsed.scheme, parsed.hostname, parsed.port)
+        idle = self._idle()
+        previous = idle.get(key)
+        if previous is not None and previous is not connection:
+            self.discard(previous)
+        idle[key] = connection
+
+    def discard(self, connection):
+        # type: (Any) -> None
+        """Close a connection which can't be reused.
+        """
+        connection.close()
+        with self._lock:
+            try:
+                self._all.remove(connection)
+            except ValueError:
+                pass
+
+    def close(self):
+        # type: () -> None
+        """Close all connections, from every thread.
+
+        Only call this when no requests are using the pool.
+        """
+        with self._lock:
+            connections, self._all = self._all, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+
+__all__ = ["ConnectionPool"]
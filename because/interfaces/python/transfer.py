@@ -9,6 +9,7 @@ from typing import (
     List,
     Text,
     Callable,
+    Iterator,
 )
 
 import ssl
@@ -36,6 +37,11 @@ from because.transfer import (
     Transfer as _Transfer,
 )
 from because.interfaces.python.ssl_config import SSLConfig
+from because.interfaces.python.pool import (
+    ConnectionPool,
+    IDEMPOTENT_METHODS,
+    STALE_CONNECTION_ERRORS,
+)
 
 # mypy, you are wrong and I'll prove it, look:
 assert hasattr(SSLConfig, "to_ssl_context")
@@ -63,6 +69,7 @@ class Transfer(_Transfer):
             request,            # type: Request
             ssl_config=None,    # type: SSLConfig
             log=None,           # type: logging.Logger
+            pool=None,          # type: Optional[ConnectionPool]
     ):
         # type: (...) -> None
         """
@@ -70,11 +77,15 @@ class Transfer(_Transfer):
             Request object describing the HTTP request to be performed.
         :arg log:
             logger instance to use for logging messages.
+        :arg pool:
+            Optional. ConnectionPool to take a connection from, and to return
+            it to once the response has been read.
         """
         # Store passed parameters
         self.request = request
         self.ssl_config = ssl_config or SSLConfig()
         self.log = log or self.log
+        self.pool = pool
 
         # Initialize internal state
         self.response = None                         # type: Optional[Response]
@@ -153,9 +164,13 @@ class Transfer(_Transfer):
             return body.encode("utf-8")
         return body
 
-    def _get_response(self, request):
-        # type: (Request) -> Response
+    def _open(self, request):
+        # type: (Request) -> Tuple[httplib.HTTPConnection, Any, List[Tuple[bytes, bytes]]]
+        """Send the request and read the head of the response.
 
+        Returns (connection, httplib_response, headers), leaving the body to
+        be read from httplib_response.
+        """
         # httplib hardcodes str literals: bytes in Python 2, text in Python 3.
         # So we have to split on str literals.
         # So the url arg we pass to httplib has to be str.
@@ -163,29 +178,110 @@ class Transfer(_Transfer):
         method, url, body = self._get_method_url_body(request)
         headers = self._get_headers(request)
         parsed = URLPARSE.urlparse(url)
-        connection = self._get_connection(parsed)
         uri = self._get_uri(parsed)
 
-        # Actually start it, and block until it finishes.
-        # This returns None - response must be obtained from connection itself
-        connection.request(method=method, url=uri, headers=headers, body=body)
+        if self.pool is None:
+            connection = self._get_connection(parsed)
+            reused = False
+        else:
+            connection, reused = self.pool.get(parsed)
 
-        # Collect and repack as Response for backend-agnostic consumers.
-        httplib_response = connection.getresponse()
-        status = httplib_response.status
+        # Actually start it, and block until the response head arrives.
+        # This returns None - response must be obtained from connection itself
+        try:
+            httplib_response = self._send(connection, method, uri, headers,
+                                          body)
+        except Exception as error:
+            if self.pool is None:
+                raise
+            self.pool.discard(connection)
+            if not (reused and isinstance(error, STALE_CONNECTION_ERRORS) and
+                    method.upper() in IDEMPOTENT_METHODS):
+                raise
+            # The server closed the kept connection before answering; try
+            # once on a new one.
+            connection = self.pool.new(parsed)
+            try:
+                httplib_response = self._send(connection, method, uri,
+                                              headers, body)
+            except Exception:
+                self.pool.discard(connection)
+                raise
         headers_bytes = self._decode_headers(httplib_response.getheaders())
+        self._parsed = parsed
+        return connection, httplib_response, headers_bytes
+
+    def _send(self, connection, method, uri, headers, body):
+        # type: (Any, Text, Text, Any, Any) -> Any
+        """Send a request on a connection and read the response head.
+        """
+        connection.request(
+            method=method, url=uri, headers=headers, body=body,
+        )
+        return connection.getresponse()
+
+    def _release(self, connection, httplib_response, finished):
+        # type: (Any, Any, bool) -> None
+        """Give a connection back to the pool, or close it.
 
-        # TODO: the whole response is read into memory here, not ideal
-        raw = httplib_response.read()
+        :arg finished:
+            Whether the whole response was read, which it must have been for
+            the connection to be reused.
+        """
+        if self.pool is None:
+            connection.close()
+        elif finished and not httplib_response.will_close:
+            self.pool.put(self._parsed, connection)
+        else:
+            self.pool.discard(connection)
+
+    def _get_response(self, request):
+        # type: (Request) -> Response
+        connection, httplib_response, headers_bytes = self._open(request)
+
+        # Collect and repack as Response for backend-agnostic consumers.
+        # Use stream() to avoid reading the whole body into memory here.
+        try:
+            raw = httplib_response.read()
+        except Exception:
+            self._release(connection, httplib_response, False)
+            raise
         decoded = self._decode_body(raw)
 
         # NOTE: "Note that you must have read the whole response before you can
-        # send a new request to the server." Not sure if this only applies to
-        # reuse of the same HTTPConnection object, which we don't do anyway.
+        # send a new request to the server." That's for reuse of the same
+        # HTTPConnection object, which only happens with a pool.
+        if self.pool is not None:
+            self._release(connection, httplib_response, True)
 
         response = Response(
-            status=status,
+            status=httplib_response.status,
             headers=headers_bytes,
             body=decoded,
         )
         return response
+
+    def stream(self, chunk_size=65536):
+        # type: (int) -> Tuple[Response, Iterator[bytes]]
+        """Get the response head, and an iterator reading the body in chunks.
+
+        The connection is closed once the body has all been read, or when the
+        iterator is closed or garbage collected.
+        """
+        connection, httplib_response, headers_bytes = self._open(self.request)
+        head = Response(status=httplib_response.status, headers=headers_bytes)
+        self.response = head
+
+        def chunks():
+            finished = False
+            try:
+                while True:
+                    chunk = httplib_response.read(chunk_size)
+                    if not chunk:
+                        finished = True
+                        break
+                    yield self._decode_body(chunk)
+            finally:
+                self._release(connection, httplib_response, finished)
+
+        return head, chunks()
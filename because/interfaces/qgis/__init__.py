@@ -3,5 +3,5 @@
 This is essentially the same as the qt interface, but it allows the use of QGIS
 facilities like the QgsNetworkAccessManager, and also provides some extras like
 a raster layer class for viewing XYZ basemaps based on QgsRasterLayer (based on
-GDAL).
+GDAL), and a layer class for viewing them with tiles fetched by because.
 """
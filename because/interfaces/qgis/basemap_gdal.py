@@ -152,6 +152,8 @@ class _TMSConfig(object):
             image_format="png",
             bands_count=3,
             user_agent=None,
+            cache=None,
+            max_connections=None,
     ):
         """
         :arg endpoint:
@@ -208,6 +210,15 @@ class _TMSConfig(object):
         :arg user_agent
             User-Agent string to present. Polite clients set this to identify
             themselves.
+
+        :arg cache:
+            Optional. A TileCache for GDAL to keep tiles in, so they are
+            shared with because clients and kept across sessions. By default,
+            GDAL picks its own cache location and size.
+
+        :arg max_connections:
+            Optional. Maximum number of connections GDAL opens at once to
+            download tiles. GDAL's default is 2.
         """
         self.endpoint = endpoint.strip()
         self.projection = projection
@@ -223,6 +234,8 @@ class _TMSConfig(object):
         self.image_format = image_format.lower()
         self.bands_count = bands_count
         self.user_agent = user_agent or "Because"
+        self.cache = cache
+        self.max_connections = max_connections
 
     def as_xml(self):
         # String template for generating GDAL TMS blobs for QgsRasterLayer.
@@ -250,9 +263,7 @@ class _TMSConfig(object):
               <BlockSizeX>{block_size.x}</BlockSizeX>
               <BlockSizeY>{block_size.y}</BlockSizeY>
               <BandsCount>{bands_count}</BandsCount>
-              <Cache>
-                <Extension>.{image_format}</Extension>
-              </Cache>
+              {cache}{max_connections}
               <UserAgent>{user_agent}</UserAgent>
               <ZeroBlockHttpCodes>403,404,503</ZeroBlockHttpCodes>
             </GDAL_WMS>
@@ -260,6 +271,18 @@ class _TMSConfig(object):
         ).strip()
         upper_left = self.bbox.upper_left
         lower_right = self.bbox.lower_right
+        if self.cache is not None:
+            cache = self.cache.gdal_cache_xml()
+        else:
+            cache = "<Cache><Extension>.{0}</Extension></Cache>".format(
+                self.image_format,
+            )
+        max_connections = ""
+        if self.max_connections is not None:
+            max_connections = (
+                "\n  <MaxConnections>{0:d}</MaxConnections>"
+                .format(self.max_connections)
+            )
         return xml_template.format(
             endpoint=self.endpoint,
             image_format=self.image_format,
@@ -278,6 +301,8 @@ class _TMSConfig(object):
             bands_count=self.bands_count,
             y_origin=self.y_origin,
             user_agent=self.user_agent,
+            cache=cache,
+            max_connections=max_connections,
         )
 
 
@@ -286,6 +311,7 @@ class GDALBasemapLayer(QgsRasterLayer):
 
     This technique offloads the downloading details, but it isn't very
     flexible and it still requires building a complex XML blob for GDAL.
+    See tile_layer.TileLayer for a layer whose downloads because controls.
     """
 
     # 3857 is the conventional CRS for XYZ TMS layers.
@@ -302,7 +328,8 @@ class GDALBasemapLayer(QgsRasterLayer):
         y_origin="top"  # guess?
     )
 
-    def __init__(self, endpoint, name, user_agent=None, y_origin="top"):
+    def __init__(self, endpoint, name, user_agent=None, y_origin="top",
+                 cache=None, max_connections=None):
         """
         :arg endpoint:
             Endpoint template for the basemap service to use.
@@ -313,11 +340,20 @@ class GDALBasemapLayer(QgsRasterLayer):
         :arg user_agent:
             User-Agent string to send to the service.
             Please be polite and specify your own.
+
+        :arg cache:
+            Optional. TileCache to share tiles through with because clients,
+            e.g. one a seeding job has already filled.
+
+        :arg max_connections:
+            Optional. Maximum number of connections GDAL opens at once.
         """
         config = _TMSConfig(
             endpoint=endpoint,
             bbox=self._default_bbox,
             user_agent=user_agent,
+            cache=cache,
+            max_connections=max_connections,
             # Boundless basemaps should normally use these defaults
             y_origin=y_origin,
             projection="EPSG:3857",
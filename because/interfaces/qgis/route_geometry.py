@@ -0,0 +1,19 @@
+"""Make QGIS geometries of routes, without a QgsPointXY per vertex.
+"""
+from qgis.core import QgsGeometry
+
+
+def to_geometry(item, **kwargs):
+    """Make a QgsGeometry from a Route, Leg or Coordinates.
+
+    The geometry is built from WKB written straight from the route's arrays,
+    which is much faster for long routes than adding points one by one.
+
+    :arg item:
+        Anything with a to_wkb() method, e.g. a Route, Leg or Coordinates.
+    :arg kwargs:
+        Passed to to_wkb(), e.g. multi=True for a Route.
+    """
+    geometry = QgsGeometry()
+    geometry.fromWkb(item.to_wkb(**kwargs))
+    return geometry
@@ -0,0 +1,337 @@
+"""An XYZ basemap layer for QGIS 3 whose tiles are fetched by because.
+
+Unlike GDALBasemapLayer, which leaves downloading to GDAL_WMS, this layer
+requests tiles through the because QGIS client, so it controls how many are
+downloaded at once, which come first, which headers are sent and where they
+are cached:
+
+* Visible tiles are requested from the centre of the map outward, at most
+  max_in_flight at a time, by a QtTileScheduler.
+* When the map is panned or zoomed, requests for tiles which are no longer
+  visible are cancelled, so the network is only busy with tiles to be shown.
+* Tiles are kept in memory for redrawing, and optionally in a TileCache on
+  disk, which is shared with seeding jobs and GDALBasemapLayer. Stale cached
+  tiles are drawn while they are revalidated.
+
+Rendering runs in QGIS's worker threads; all network activity stays on the
+main thread, which is where the QgsNetworkAccessManager lives.
+"""
+import logging
+
+try:
+    from PyQt5.QtCore import QObject, QPointF, QRectF, Qt, QTimer, pyqtSignal
+    from PyQt5.QtGui import QImage
+except ImportError:
+    from PyQt4.QtCore import QObject, QPointF, QRectF, Qt, QTimer, pyqtSignal
+    from PyQt4.QtGui import QImage
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsMapLayerRenderer,
+    QgsPluginLayer,
+    QgsPluginLayerType,
+    QgsPointXY,
+    QgsRectangle,
+)
+
+from because.cache import LRUCache, MISSING
+from because.headers import Headers
+from because.services.basemaps.basemap import Basemap
+from because.services.basemaps.tiles import (
+    ORIGIN_SHIFT,
+    bbox_tiles,
+    center_out,
+    count_bbox_tiles,
+    mercator_to_lonlat,
+    tile_bounds_mercator,
+    zoom_for_resolution,
+)
+from .. qt.tile_scheduler import QtTileScheduler
+from . client import Client
+
+LOG = logging.getLogger(__name__)
+
+#: Name under which TileLayer is registered with QGIS.
+LAYER_TYPE = "because_tiles"
+
+# Held in memory for tiles the server has no image for.
+_EMPTY = None
+
+#: Most tiles one render may draw.
+MAX_TILES = 1024
+
+# Stands in for the basemap of a layer being loaded from a project.
+_PLACEHOLDER_URL = "about:blank#{z}/{x}/{y}"
+
+
+class _TileFetcher(QObject):
+    """Download the tiles a TileLayer wants, on the main thread.
+
+    Renderers emit wanted with the visible tiles in the order to fetch them;
+    the signal is queued, so the slot runs on the thread this object
+    belongs to whichever thread emitted it.
+    """
+    wanted = pyqtSignal(object)
+
+    def __init__(self, layer, client, max_in_flight, parent=None):
+        super(_TileFetcher, self).__init__(parent)
+        self.layer = layer
+        self.scheduler = QtTileScheduler(
+            layer.basemap, client, self._store,
+            max_in_flight=max_in_flight,
+            tile_cache=layer.tile_cache,
+            headers=layer.headers,
+            is_cached=layer.is_fresh,
+        )
+        self.wanted.connect(self.scheduler.want, Qt.QueuedConnection)
+        # Coalesce repaints, rather than redrawing once per tile.
+        self._repaint = QTimer(self)
+        self._repaint.setSingleShot(True)
+        self._repaint.setInterval(100)
+        self._repaint.timeout.connect(layer.triggerRepaint)
+
+    @property
+    def max_in_flight(self):
+        return self.scheduler.max_in_flight
+
+    def _store(self, tile, data):
+        self.layer.store(tile, data)
+        self._repaint.start()
+
+    def set_basemap(self, basemap):
+        self.cancel_all()
+        self.scheduler.basemap = basemap
+
+    def cancel_all(self):
+        self.scheduler.cancel_all()
+
+
+class _TileRenderer(QgsMapLayerRenderer):
+    """Draw a TileLayer's tiles for one render job, in a worker thread.
+    """
+
+    def __init__(self, layer, context):
+        super(_TileRenderer, self).__init__(layer.id(), context)
+        self.layer = layer
+        self.context = context
+
+    def render(self):
+        context = self.context
+        layer = self.layer
+        # The extent is in the layer's CRS, Web Mercator, whatever the
+        # project's CRS; mapUnitsPerPixel() would be in the project's.
+        extent = context.extent()
+        to_pixel = context.mapToPixel()
+        width = to_pixel.mapWidth()
+        if width <= 0 or extent.width() <= 0:
+            return True
+        zoom = zoom_for_resolution(
+            extent.width() / width, max_zoom=layer.max_zoom,
+        )
+        x_min = max(extent.xMinimum(), -ORIGIN_SHIFT)
+        y_min = max(extent.yMinimum(), -ORIGIN_SHIFT)
+        x_max = min(extent.xMaximum(), ORIGIN_SHIFT)
+        y_max = min(extent.yMaximum(), ORIGIN_SHIFT)
+        if x_min >= x_max or y_min >= y_max:
+            return True
+        west, south = mercator_to_lonlat(x_min, y_min)
+        east, north = mercator_to_lonlat(x_max, y_max)
+        center = mercator_to_lonlat((x_min + x_max) / 2, (y_min + y_max) / 2)
+        bbox = (west, south, east, north)
+        # Should the resolution still be off, e.g. for a strongly distorting
+        # projection, draw coarser tiles rather than enumerate millions.
+        while zoom > 0 and count_bbox_tiles(bbox, [zoom]) > MAX_TILES:
+            zoom -= 1
+        tiles = center_out(bbox_tiles(bbox, [zoom]), *center)
+        # Ask for all of them, so requests for tiles no longer visible are
+        # cancelled; the fetcher skips those already fresh.
+        layer.fetcher.wanted.emit(tiles)
+
+        transform = context.coordinateTransform()
+        painter = context.painter()
+        for tile in tiles:
+            if context.renderingStopped():
+                break
+            image = layer.image(tile)
+            if image is None:
+                continue
+            x_min, y_min, x_max, y_max = tile_bounds_mercator(*tile)
+            corners = [QgsPointXY(x_min, y_max), QgsPointXY(x_max, y_min)]
+            if transform.isValid():
+                corners = [transform.transform(point) for point in corners]
+            top_left, bottom_right = [
+                to_pixel.transform(point) for point in corners
+            ]
+            painter.drawImage(
+                QRectF(
+                    QPointF(top_left.x(), top_left.y()),
+                    QPointF(bottom_right.x(), bottom_right.y()),
+                ),
+                image,
+            )
+        return True
+
+
+class TileLayer(QgsPluginLayer):
+    """A basemap layer drawing tiles fetched through a because Client.
+    """
+
+    def __init__(
+            self,
+            basemap,
+            name=None,
+            tile_cache=None,
+            client=None,
+            headers=None,
+            max_in_flight=6,
+            max_zoom=22,
+            memory_size=512,
+    ):
+        """
+        :arg basemap:
+            Basemap to show, or its URL template.
+        :arg name:
+            Name of the layer. Defaults to the basemap's title.
+        :arg tile_cache:
+            Optional. TileCache to keep tiles in across sessions, shared
+            with seeding jobs and GDALBasemapLayer.
+        :arg client:
+            Optional. because QGIS Client to fetch tiles with. By default, one
+            using QGIS's network access manager, and so its proxy settings.
+        :arg headers:
+            Optional. Headers to send with each tile request, e.g. for auth.
+        :arg max_in_flight:
+            Maximum number of tile requests to have running at once.
+        :arg max_zoom:
+            Deepest zoom level the basemap has tiles for.
+        :arg memory_size:
+            Number of decoded tiles to keep in memory for redrawing.
+        """
+        if not isinstance(basemap, Basemap):
+            basemap = Basemap(basemap)
+        super(TileLayer, self).__init__(
+            LAYER_TYPE, name or basemap.title or basemap.url,
+        )
+        if headers is not None and not isinstance(headers, Headers):
+            headers = Headers(headers)
+        self.basemap = basemap
+        self.tile_cache = tile_cache
+        self.headers = headers
+        self.max_zoom = max_zoom
+        self._memory = LRUCache(max_size=memory_size)
+        self.client = client or Client()
+        self.fetcher = _TileFetcher(self, self.client, max_in_flight)
+        self.setCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+        self.setExtent(QgsRectangle(
+            -ORIGIN_SHIFT, -ORIGIN_SHIFT, ORIGIN_SHIFT, ORIGIN_SHIFT,
+        ))
+        self.setValid(True)
+
+    def image(self, tile):
+        """Get the image of an (x, y, z) tile to draw, or None.
+
+        Tiles not in memory are loaded from the tile cache, if it has them,
+        even if stale. Safe to call from render threads.
+        """
+        entry = self._memory.get(tile, MISSING)
+        if entry is MISSING:
+            entry = self._load(tile)
+        if entry is MISSING:
+            return None
+        return entry[0]
+
+    def is_fresh(self, tile):
+        """Whether a tile is in memory and needn't be fetched again.
+        """
+        entry = self._memory.get(tile, MISSING, touch=False)
+        return entry is not MISSING and entry[1]
+
+    def _load(self, tile):
+        if self.tile_cache is None:
+            return MISSING
+        cached = self.tile_cache.get(self.basemap.tile_url(*tile))
+        if cached is None:
+            return MISSING
+        entry = (_decode(cached.data), cached.fresh)
+        self._memory.set(tile, entry)
+        return entry
+
+    def store(self, tile, data):
+        """Keep newly fetched tile data in memory, for drawing.
+        """
+        image = _decode(data) if data is not None else _EMPTY
+        self._memory.set(tile, (image, True))
+
+    def createMapRenderer(self, context):
+        return _TileRenderer(self, context)
+
+    def clone(self):
+        return TileLayer(
+            self.basemap, self.name(),
+            tile_cache=self.tile_cache,
+            client=self.client,
+            headers=self.headers,
+            max_in_flight=self.fetcher.max_in_flight,
+            max_zoom=self.max_zoom,
+        )
+
+    def setTransformContext(self, context):
+        pass
+
+    def readXml(self, node, context):
+        element = node.toElement()
+        url = element.attribute("because_url")
+        if not url:
+            return False
+        self.basemap = Basemap(url)
+        self.fetcher.set_basemap(self.basemap)
+        self.max_zoom = int(element.attribute("because_max_zoom") or 22)
+        self._memory.clear()
+        return True
+
+    def writeXml(self, node, document, context):
+        element = node.toElement()
+        element.setAttribute("type", "plugin")
+        element.setAttribute("name", LAYER_TYPE)
+        element.setAttribute("because_url", self.basemap.url)
+        element.setAttribute("because_max_zoom", str(self.max_zoom))
+        return True
+
+    def close(self):
+        """Cancel outstanding tile requests.
+        """
+        self.fetcher.cancel_all()
+
+
+def _decode(data):
+    image = QImage.fromData(data)
+    if image.isNull():
+        LOG.warning("could not decode tile image of %d bytes", len(data))
+        return _EMPTY
+    return image
+
+
+class TileLayerType(QgsPluginLayerType):
+    """Lets QGIS recreate TileLayers when loading a project.
+
+    Register it once, e.g. when a plugin loads::
+
+        QgsApplication.pluginLayerRegistry().addPluginLayerType(
+            TileLayerType(tile_cache=cache)
+        )
+    """
+
+    def __init__(self, tile_cache=None):
+        super(TileLayerType, self).__init__(LAYER_TYPE)
+        self.tile_cache = tile_cache
+
+    def createLayer(self, uri=None):
+        # The real URL is read from the project by readXml().
+        return TileLayer(
+            _PLACEHOLDER_URL, LAYER_TYPE, tile_cache=self.tile_cache,
+        )
+
+    def showLayerProperties(self, layer):
+        return False
+
+
+__all__ = ["LAYER_TYPE", "TileLayer", "TileLayerType"]
@@ -134,7 +134,7 @@ class Client(_Client):
                 qnam = QNetworkAccessManager()
             else:
                 qnam = QNetworkAccessManager(parent)
-            self._qnam = qnam
+        self._qnam = qnam
 
         # This is needed so Client knows when responses are done.
         qnam.finished.connect(self._finished)
@@ -166,6 +166,22 @@ class Client(_Client):
         # q_reply.deleteLater()
         # transfer.close()
 
+    def release(self, transfer):
+        # type: (Transfer) -> None
+        """Forget a finished or cancelled transfer, and free its Qt objects.
+
+        Client holds every transfer it sends until then, so callers sending
+        many requests (e.g. map tiles) should release each one when done.
+        Don't call this from a slot connected to the transfer's own signals;
+        defer it, e.g. with QTimer.singleShot(0, ...).
+        """
+        reply = transfer._reply
+        if reply is not None:
+            self.transfers.pop(reply, None)
+        transfer.close()
+        if reply is not None:
+            reply.deleteLater()
+
     def transfer(self, request, log=None):
         # type: (Request, logging.Logger) -> Any
         """Create a Transfer object tied to this client for the given request.
@@ -1,6 +1,7 @@
 import logging
 import json
 import textwrap
+from because import json_backends
 
 
 # TODO: make a qreply -> Response conversion
@@ -80,11 +81,9 @@ class Response(object):
             body_raw = "".join(self.body)
             body_repr = body_raw
             try:
-                body_dict = json.loads(body_raw)
+                body_dict = json_backends.loads(body_raw)
                 body_repr = json.dumps(body_dict, indent=4)
-            except ValueError as error:
-                if error.message != "No JSON object could be decoded":
-                    raise
+            except ValueError:
                 body_repr = body_raw
 
             # KLUDGE: restore iterator for others
@@ -123,7 +122,7 @@ class Response(object):
         # Try to parse response body as JSON
         data = None
         try:
-            data = json.loads(body)
+            data = json_backends.loads(body)
         except ValueError:
             logging.exception("JSON parse error")
 
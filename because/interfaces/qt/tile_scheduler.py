@@ -0,0 +1,48 @@
+"""TileScheduler for Qt transfers, which finish on Qt's event loop.
+
+Use it from the thread that owns the Client, normally the GUI thread; tiles
+are delivered on that thread too.
+"""
+try:
+    from PyQt5.QtCore import QTimer
+except ImportError:
+    from PyQt4.QtCore import QTimer
+
+from because.services.basemaps.scheduler import TileScheduler
+
+
+class QtTileScheduler(TileScheduler):
+    """Request the tiles of the current viewport with a Qt Client.
+    """
+
+    def _watch(self, tile, transfer):
+        transfer.signals.finished.connect(
+            lambda: self.finished(tile, transfer)
+        )
+        transfer.signals.failure.connect(
+            lambda: self.finished(tile, transfer)
+        )
+
+    def _response(self, transfer):
+        # Qt transfers' wait() runs an event loop until the next finished
+        # signal, which has already been emitted.
+        if transfer.error is None:
+            return transfer.response
+        # An HTTP error status arrives as a network error whose code isn't
+        # the status; the scheduler needs the status to tell an empty tile
+        # from a refused one or a server which may recover.
+        response = transfer.error_response()
+        if response is None:
+            raise transfer.error
+        return response
+
+    def _retry_later(self, delay):
+        # On this thread, like everything else the scheduler does with Qt.
+        QTimer.singleShot(int(delay * 1000), self.retry)
+
+    def _forget(self, transfer):
+        # The transfer may still be emitting signals, so let go of it later.
+        QTimer.singleShot(0, lambda: self.client.release(transfer))
+
+
+__all__ = ["QtTileScheduler"]
@@ -3,6 +3,7 @@ from datetime import datetime as Datetime
 from typing import (
     Any,
     Callable,
+    Optional,
 )
 try:
     from PyQt5.QtCore import (
@@ -389,6 +390,27 @@ class Transfer(_Transfer):
             raise self.error
         return self.response  # is there one though
 
+    def error_response(self):
+        # type: () -> Optional[Response]
+        """Get the HTTP response behind error, if the server sent one.
+
+        QNetworkReply reports an HTTP error status such as 404 or 503 as a
+        network error, so error is set, with a QNetworkReply.NetworkError
+        code rather than the status, and response isn't. This reads the
+        response instead; its body may not have arrived yet, since Qt says
+        there is an error as soon as it sees the status.
+
+        Returns None if there is no error, or it isn't an HTTP one, e.g. the
+        host couldn't be reached.
+        """
+        reply = self._reply
+        if self.error is None or reply is None:
+            return None
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if status is None:
+            return None
+        return unpack_reply(reply)[0]
+
     def _abort(self):
         # type: () -> None
         """Abort the QNetworkReply if it's running, otherwise do nothing.
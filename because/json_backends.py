@@ -0,0 +1,218 @@
+"""Choose among JSON decoders, using the fastest one available.
+
+Decoding JSON is the largest CPU cost of bulk jobs, and third-party decoders
+can be several times faster than the standard library's json module. So
+because decodes through whichever registered backend is in use. By default
+that is the first importable one of orjson, simdjson and ujson, falling back
+on json from the standard library, which is always available.
+
+All backends take bytes (or bytearray or memoryview) straight from a
+response body, so the body is never decoded into a separate str first. They
+raise UnicodeDecodeError for bytes which aren't utf-8, and ValueError for
+anything else which isn't valid JSON.
+"""
+import json
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+    Text,
+)
+from . reprs import ReprMixin
+
+
+class UnknownBackend(ValueError):
+    """Raised when asking for a JSON backend which isn't registered.
+    """
+
+
+class JSONBackend(ReprMixin):
+    """A JSON decoder and the details of how to call it.
+    """
+
+    def __init__(self, name, loads, memoryview_ok=False):
+        # type: (Text, Callable[[Any], Any], bool) -> None
+        """
+        :arg name:
+            Short name for the backend, e.g. "orjson".
+        :arg loads:
+            Function decoding bytes containing utf-8 JSON.
+        :arg memoryview_ok:
+            Whether loads accepts memoryview and bytearray objects directly.
+            If not, they are copied to bytes first.
+        """
+        self.name = name
+        self._loads = loads
+        self.memoryview_ok = memoryview_ok
+
+    def loads(self, data):
+        # type: (Any) -> Any
+        """Decode JSON from bytes, bytearray, memoryview or text.
+        """
+        if not self.memoryview_ok and isinstance(data, (memoryview, bytearray)):
+            data = _bytes(data)
+        return self._loads(data)
+
+    def repr_data(self):
+        return OrderedDict([("name", self.name)])
+
+
+def _bytes(data):
+    # type: (Any) -> bytes
+    """Copy bytearray, memoryview or text into bytes.
+    """
+    if isinstance(data, memoryview):
+        # bytes() of a memoryview is its repr on Python 2.
+        return data.tobytes()
+    if isinstance(data, bytearray):
+        return bytes(data)
+    if not isinstance(data, bytes):
+        # Lone surrogates, which is how text can fail as utf-8, become "?".
+        return data.encode("utf-8", "replace")
+    return data
+
+
+def _stdlib_loads(data):
+    # type: (Any) -> Any
+    # json.loads only takes bytes from Python 3.6 on.
+    if isinstance(data, bytes) and not isinstance(data, str):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+def _make_orjson():
+    # type: () -> JSONBackend
+    import orjson
+
+    def loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as error:
+            # orjson reports bad utf-8 as a JSON error; keep them apart.
+            if "utf-8" in str(error).lower():
+                raise UnicodeDecodeError(
+                    "utf-8", _bytes(data), 0, 1, str(error),
+                )
+            raise
+    return JSONBackend("orjson", loads, memoryview_ok=True)
+
+
+def _make_simdjson():
+    # type: () -> JSONBackend
+    import simdjson
+
+    def loads(data):
+        try:
+            return simdjson.loads(data)
+        except ValueError:
+            # simdjson reports bad utf-8 as a ValueError like any other;
+            # decoding raises the UnicodeDecodeError if that was the cause.
+            if isinstance(data, bytes):
+                data.decode("utf-8")
+            raise
+    return JSONBackend("simdjson", loads)
+
+
+def _make_ujson():
+    # type: () -> JSONBackend
+    import ujson
+
+    def loads(data):
+        if isinstance(data, bytes):
+            # ujson is lax about invalid utf-8, so check it here.
+            data = data.decode("utf-8")
+        return ujson.loads(data)
+    return JSONBackend("ujson", loads)
+
+
+def _make_stdlib():
+    # type: () -> JSONBackend
+    return JSONBackend("json", _stdlib_loads)
+
+
+#: Factories for known backends, most preferred first.
+_FACTORIES = OrderedDict([
+    ("orjson", _make_orjson),
+    ("simdjson", _make_simdjson),
+    ("ujson", _make_ujson),
+    ("json", _make_stdlib),
+])
+
+#: Registered backends which could be imported, most preferred first.
+BACKENDS = OrderedDict()  # type: OrderedDict
+
+for _name, _factory in _FACTORIES.items():
+    try:
+        BACKENDS[_name] = _factory()
+    except ImportError:
+        pass
+
+_current = next(iter(BACKENDS.values()))  # type: JSONBackend
+
+
+def register(backend, prefer=False):
+    # type: (JSONBackend, bool) -> None
+    """Make a backend available by name.
+
+    :arg prefer:
+        If true, also start using it.
+    """
+    global _current
+    BACKENDS[backend.name] = backend
+    if prefer:
+        _current = backend
+
+
+def available():
+    # type: () -> List[Text]
+    """Names of the usable backends, most preferred first.
+    """
+    return list(BACKENDS)
+
+
+def backend():
+    # type: () -> JSONBackend
+    """Get the backend currently in use.
+    """
+    return _current
+
+
+def use(name=None):
+    # type: (Optional[Text]) -> JSONBackend
+    """Switch to the named backend, or the most preferred one if None.
+
+    :raises UnknownBackend: if there is no usable backend of that name.
+    """
+    global _current
+    if name is None:
+        _current = next(iter(BACKENDS.values()))
+        return _current
+    try:
+        _current = BACKENDS[name]
+    except KeyError:
+        raise UnknownBackend(
+            "no usable JSON backend {0!r}; available: {1}"
+            .format(name, ", ".join(BACKENDS))
+        )
+    return _current
+
+
+def loads(data):
+    # type: (Any) -> Any
+    """Decode JSON from bytes with the backend currently in use.
+    """
+    return _current.loads(data)
+
+
+__all__ = [
+    "BACKENDS",
+    "JSONBackend",
+    "UnknownBackend",
+    "available",
+    "backend",
+    "loads",
+    "register",
+    "use",
+]
@@ -0,0 +1,336 @@
+"""Parse the elements of a big JSON array as the body arrives.
+
+parse_json needs the whole body, and builds the whole tree of objects, before
+anything can be done with it. For responses which are mostly one long array,
+like geocodePoints or search category features, JSONArrayStream instead scans
+the body chunk by chunk and decodes each element of the array as soon as its
+closing bracket arrives. Only the element in progress is kept in memory.
+
+The containers leading to the array are walked in Python, but each element is
+found and decoded in one pass by the C scanner behind json's raw_decode, so
+the overhead over parsing the whole body at once stays small.
+"""
+import codecs
+import json
+import re
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+)
+from . errors import ParseError
+from . response import Response
+
+#: Default number of bytes to read from a streaming transfer at once.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_NON_SPACE = re.compile(r"\S")
+_NUMBER_START = frozenset(u"-0123456789")
+_NUMBER_END = re.compile(r"[^0-9.eE+\-]")
+
+# What the innermost open container expects next.
+_KEY_OR_END = 0
+_KEY = 1
+_COLON = 2
+_VALUE = 3
+_VALUE_OR_END = 4
+_COMMA_OR_END = 5
+
+
+class _Incomplete(Exception):
+    """Raised internally when the value in progress needs more data.
+    """
+
+
+class JSONArrayStream(object):
+    """Incremental scanner yielding elements of arrays at a given path.
+
+    The path is a sequence of object keys, with None standing for any index
+    of an array. For example ("geocodePoints",) finds the elements of the
+    geocodePoints array of the top-level object, and ("legs", None, "steps")
+    finds the steps of every leg.
+
+    Other members of the top-level object are decoded into the top attribute
+    as they are found, so that e.g. an error message can still be checked.
+
+    Malformed JSON raises ValueError, like json.loads, and bytes which aren't
+    utf-8 raise UnicodeDecodeError.
+    """
+
+    def __init__(self, path):
+        # type: (Sequence[Optional[Text]]) -> None
+        """
+        :arg path:
+            Keys leading from the top-level value to the target array, with
+            None for array indexes.
+        """
+        self.path = tuple(path)
+
+        #: Top-level object members which aren't on the path.
+        self.top = {}  # type: Dict[Text, Any]
+
+        #: Whether the target array (or any of them) was found.
+        self.found = False
+
+        #: Whether the whole top-level value has been scanned.
+        self.done = False
+
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._text = u""
+        # Each open container is [kind, key or index, what it expects next].
+        self._stack = []  # type: List[list]
+        # Don't try to decode the value in progress again until this much
+        # text is buffered, so a value spanning many chunks isn't rescanned
+        # from its start for every chunk.
+        self._retry_at = 0
+
+    def feed(self, data):
+        # type: (bytes) -> List[Tuple[tuple, Any]]
+        """Scan another chunk of the body.
+
+        Returns a list of (location, element) tuples for each element which
+        was completed, where location is the full path to the element, e.g.
+        ("legs", 0, "steps", 3).
+        """
+        if data:
+            self._text += self._utf8.decode(bytes(data))
+        if len(self._text) < self._retry_at:
+            return []
+        return self._scan(eof=False)
+
+    def close(self):
+        # type: () -> List[Tuple[tuple, Any]]
+        """Finish scanning once the body has all arrived.
+
+        :raises ValueError: if the body ended in the middle of a value.
+        """
+        self._text += self._utf8.decode(b"", True)
+        items = self._scan(eof=True)
+        if not self.done:
+            raise ValueError("JSON body ended before it was complete")
+        return items
+
+    def _matches(self, location, size):
+        # type: (tuple, int) -> bool
+        for key, expected in zip(location[:size], self.path[:size]):
+            if expected is None:
+                if not isinstance(key, int):
+                    return False
+            elif key != expected:
+                return False
+        return True
+
+    def _decode(self, text, index, eof):
+        # type: (Text, int, bool) -> Tuple[Any, int]
+        if (not eof and text[index] in _NUMBER_START and
+                _NUMBER_END.search(text, index) is None):
+            # More of the number may be on the way.
+            raise _Incomplete()
+        try:
+            return _DECODER.raw_decode(text, index)
+        except ValueError:
+            if eof:
+                raise
+            raise _Incomplete()
+
+    def _scan(self, eof):
+        # type: (bool) -> List[Tuple[tuple, Any]]
+        items = []  # type: List[Tuple[tuple, Any]]
+        text = self._text
+        stack = self._stack
+        pos = 0
+        try:
+            while True:
+                match = _NON_SPACE.search(text, pos)
+                if match is None:
+                    pos = len(text)
+                    break
+                index = match.start()
+                char = text[index]
+                if not stack:
+                    if self.done:
+                        raise ValueError("extra data after JSON value")
+                    pos = self._value(text, index, (), items, eof)
+                    continue
+                frame = stack[-1]
+                expect = frame[2]
+                if expect == _KEY_OR_END or expect == _KEY:
+                    if char == u'"':
+                        frame[1], pos = self._decode(text, index, eof)
+                        frame[2] = _COLON
+                    elif char == u"}" and expect == _KEY_OR_END:
+                        pos = self._end_container(index)
+                    else:
+                        raise ValueError("expected object key at {0}"
+                                         .format(index))
+                elif expect == _COLON:
+                    if char != u":":
+                        raise ValueError("expected ':' at {0}".format(index))
+                    frame[2] = _VALUE
+                    pos = index + 1
+                elif expect == _VALUE or expect == _VALUE_OR_END:
+                    if char == u"]" and expect == _VALUE_OR_END:
+                        pos = self._end_container(index)
+                    else:
+                        location = tuple(frame[1] for frame in stack)
+                        pos = self._value(text, index, location, items, eof)
+                elif char == u",":
+                    if frame[0] == u"[":
+                        frame[1] += 1
+                        frame[2] = _VALUE
+                    else:
+                        frame[2] = _KEY
+                    pos = index + 1
+                elif char == (u"]" if frame[0] == u"[" else u"}"):
+                    pos = self._end_container(index)
+                else:
+                    raise ValueError("expected ',' at {0}".format(index))
+        except _Incomplete:
+            # Wait for the text in progress to grow by half again.
+            pending = len(text) - pos
+            self._retry_at = pending + pending // 2
+        else:
+            self._retry_at = 0
+        self._text = text[pos:]
+        return items
+
+    def _value(self, text, index, location, items, eof):
+        # type: (Text, int, tuple, List[Tuple[tuple, Any]], bool) -> int
+        """Handle the value starting at index, returning where it ends.
+        """
+        char = text[index]
+        size = len(location)
+        if (char in u"[{" and size <= len(self.path) and
+                self._matches(location, size)):
+            # An ancestor of the target arrays, or one of them: descend.
+            if size == len(self.path) or self.path[size] is None:
+                wanted = u"["
+            else:
+                wanted = u"{"
+            if char == wanted:
+                if size == len(self.path):
+                    self.found = True
+                if char == u"[":
+                    self._stack.append([char, 0, _VALUE_OR_END])
+                else:
+                    self._stack.append([char, None, _KEY_OR_END])
+                return index + 1
+        value, end = self._decode(text, index, eof)
+        if size == len(self.path) + 1 and self._matches(location, size - 1):
+            items.append((location, value))
+        elif size == 1 and self._stack[0][0] == u"{":
+            self.top[location[0]] = value
+        self._value_done()
+        return end
+
+    def _end_container(self, index):
+        # type: (int) -> int
+        self._stack.pop()
+        self._value_done()
+        return index + 1
+
+    def _value_done(self):
+        # type: () -> None
+        if self._stack:
+            self._stack[-1][2] = _COMMA_OR_END
+        else:
+            self.done = True
+
+
+def iter_json_items(chunks, path, stream=None):
+    # type: (Iterable[bytes], Sequence[Optional[Text]], Optional[JSONArrayStream]) -> Iterator[Tuple[tuple, Any]]
+    """Yield (location, element) tuples from a JSON body given in chunks.
+
+    :arg chunks:
+        Iterable of bytes, e.g. from Transfer.stream().
+    :arg path:
+        Path to the target arrays, as for JSONArrayStream.
+    :arg stream:
+        Optional. JSONArrayStream to use, so the caller can look at its top
+        and found attributes afterward.
+    """
+    stream = stream or JSONArrayStream(path)
+    for chunk in chunks:
+        for item in stream.feed(chunk):
+            yield item
+    for item in stream.close():
+        yield item
+
+
+def stream_json(response, chunks, path, check=None):
+    # type: (Response, Iterable[bytes], Sequence[Optional[Text]], Any) -> Iterator[Tuple[tuple, Any]]
+    """Streaming counterpart of parse_json.
+
+    Does the same checks as parse_json, raising ParseError for any which fail.
+    But since elements are yielded before the body has all arrived, an error
+    given in the body, or a missing target array, is only noticed at the end.
+
+    :arg response:
+        The response, whose body may be empty since it comes in chunks.
+    :arg chunks:
+        Iterable of bytes making up the body.
+    :arg path:
+        Path to the target arrays, as for JSONArrayStream.
+    :arg check:
+        Optional. Function taking the dict of other top-level members and the
+        response, to look for errors specific to a service.
+    """
+    if not response:
+        raise ParseError("response was falsy", response=response)
+    if response.status != 200:
+        raise ParseError(
+            "response had error status {0!r}".format(response.status),
+            response=response,
+        )
+    stream = JSONArrayStream(path)
+    received = False
+    try:
+        for chunk in chunks:
+            received = received or bool(chunk)
+            for item in stream.feed(chunk):
+                yield item
+        if not received:
+            raise ParseError("response had empty body", response=response)
+        for item in stream.close():
+            yield item
+    except UnicodeDecodeError as error:
+        raise ParseError(
+            "cannot decode bytes in response body as utf-8",
+            response=response,
+            error=error,
+        )
+    except ValueError as error:
+        raise ParseError(
+            "cannot decode response body as JSON",
+            response=response,
+            error=error,
+        )
+    if stream.top.get("error"):
+        raise ParseError(
+            "response body indicates an error occurred: {0!r}"
+            .format(stream.top.get("error")),
+            response=response,
+        )
+    if check is not None:
+        check(stream.top, response)
+    if not stream.found:
+        raise ParseError(
+            "JSON response missing required keys: {0!r}"
+            .format([path[0]] if path else []),
+            response=response,
+        )
+
+
+__all__ = [
+    "DEFAULT_CHUNK_SIZE",
+    "JSONArrayStream",
+    "iter_json_items",
+    "stream_json",
+]
@@ -0,0 +1,190 @@
+"""Poll many outstanding jobs from one scheduler, with adaptive backoff.
+
+Some services accept work asynchronously: a request submits a job and
+returns an ID, and the job's status has to be checked until it is finished.
+Checking each job in its own loop wastes requests and threads, so Poller keeps
+all outstanding jobs in one schedule, always checking whichever job is due
+soonest.
+
+Each job backs off on its own: while checks show no progress, the interval
+between checks grows geometrically up to a maximum; when progress is seen, the
+interval drops back to the initial value. A hint from the server (e.g. a
+Retry-After header) overrides the computed interval for the next check.
+"""
+import heapq
+import time
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+)
+from . errors import BecauseError
+from . fanout import Outcome
+
+
+class PollTimeout(BecauseError):
+    """A job was not finished before its deadline.
+    """
+
+
+class Status(object):
+    """What a check of a job's status found out.
+    """
+    def __init__(self, done, value=None, progress=None, retry_after=None):
+        # type: (bool, Any, Any, Optional[float]) -> None
+        """
+        :arg done:
+            True if the job is finished and value holds its result.
+        :arg value:
+            Result of the job, if it is done.
+        :arg progress:
+            Optional. Any comparable marker of progress, e.g. a count of
+            finished items. A change from the last check resets the backoff.
+        :arg retry_after:
+            Optional. Seconds the server asked us to wait before checking
+            again.
+        """
+        self.done = done
+        self.value = value
+        self.progress = progress
+        self.retry_after = retry_after
+
+
+class _Job(object):
+    """Internal bookkeeping for one job tracked by a Poller.
+    """
+    def __init__(self, index, key, check, interval, deadline):
+        self.index = index
+        self.key = key
+        self.check = check
+        self.interval = interval
+        self.deadline = deadline
+        self.progress = None  # type: Any
+
+
+class Poller(object):
+    """Schedule status checks for any number of outstanding jobs.
+
+    Jobs are added with add(). Each call to next() blocks until some job is
+    finished (or failed), then returns an Outcome for it, whose item is the key
+    given to add().
+
+    Checks are run one at a time, in the calling thread.
+    """
+
+    def __init__(
+            self,
+            initial=0.5,    # type: float
+            factor=2.0,     # type: float
+            maximum=30.0,   # type: float
+            clock=None,     # type: Optional[Callable[[], float]]
+            sleep=None,     # type: Optional[Callable[[float], Any]]
+    ):
+        # type: (...) -> None
+        """
+        :arg initial:
+            Seconds to wait before the first check of a job, and between
+            checks of a job which is making progress.
+        :arg factor:
+            Multiplier applied to a job's interval after each check which
+            showed no progress.
+        :arg maximum:
+            Upper bound on the interval between checks of one job.
+        :arg clock:
+            Optional. Function returning the current time in seconds.
+        :arg sleep:
+            Optional. Function which blocks for the given number of seconds.
+            Tests can pass fakes for clock and sleep to avoid real waits.
+        """
+        if initial < 0 or factor < 1 or maximum < initial:
+            raise ValueError("invalid backoff parameters")
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self._clock = clock or time.time
+        self._sleep = sleep or time.sleep
+        self._heap = []  # type: List[Any]
+        self._added = 0
+
+    def __len__(self):
+        # type: () -> int
+        """Number of jobs not yet finished.
+        """
+        return len(self._heap)
+
+    def add(self, key, check, timeout=None, delay=None):
+        # type: (Any, Callable[[], Status], Optional[float], Optional[float]) -> None
+        """Start tracking a job.
+
+        :arg key:
+            Anything identifying the job to the caller.
+        :arg check:
+            Callable taking no arguments which checks the job once and
+            returns a Status. If it raises, the job is finished with that
+            error.
+        :arg timeout:
+            Optional. Seconds after which the job is given up on.
+        :arg delay:
+            Optional. Seconds to wait before the first check, if not initial.
+        """
+        now = self._clock()
+        deadline = now + timeout if timeout is not None else None
+        job = _Job(self._added, key, check, self.initial, deadline)
+        due = now + (self.initial if delay is None else delay)
+        # The index breaks ties so jobs themselves are never compared.
+        heapq.heappush(self._heap, (due, job.index, job))
+        self._added += 1
+
+    def _reschedule(self, job, status, now):
+        # type: (_Job, Status, float) -> None
+        if status.progress is not None and status.progress != job.progress:
+            job.interval = self.initial
+        else:
+            job.interval = min(job.interval * self.factor, self.maximum)
+        job.progress = status.progress
+        delay = job.interval
+        if status.retry_after is not None:
+            delay = max(0.0, float(status.retry_after))
+        due = now + delay
+        if job.deadline is not None:
+            due = min(due, job.deadline)
+        heapq.heappush(self._heap, (due, job.index, job))
+
+    def next(self):
+        # type: () -> Outcome
+        """Block until some job finishes, then return its Outcome.
+
+        Raises IndexError if there are no outstanding jobs.
+        """
+        while self._heap:
+            due, _, job = self._heap[0]
+            now = self._clock()
+            if due > now:
+                self._sleep(due - now)
+                continue
+            heapq.heappop(self._heap)
+
+            try:
+                status = job.check()
+            except Exception as error:
+                return Outcome(job.index, job.key, error=error)
+            if status.done:
+                return Outcome(job.index, job.key, value=status.value)
+
+            now = self._clock()
+            if job.deadline is not None and now >= job.deadline:
+                return Outcome(job.index, job.key, error=PollTimeout(
+                    "job {0!r} not finished before deadline".format(job.key)
+                ))
+            self._reschedule(job, status, now)
+        raise IndexError("no outstanding jobs")
+
+    def __iter__(self):
+        """Yield Outcomes for all outstanding jobs as they finish.
+        """
+        while self._heap:
+            yield self.next()
+
+
+__all__ = ["Poller", "PollTimeout", "Status"]
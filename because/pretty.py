@@ -13,6 +13,8 @@ class PrettyMixin(object):
     A pretty print can span lines and doesn't need to be delimited like a repr.
     """
 
+    __slots__ = ()
+
     def pretty_tuples(self):
         # type: () -> List[Tuple[Text, Any]]
         raise NotImplementedError()
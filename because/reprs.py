@@ -50,6 +50,9 @@ class ReprMixin(object):
     * It resembles a constructor call
     """
 
+    # No instance dict of our own, so slotted subclasses stay small.
+    __slots__ = ()
+
     def repr_data(self):
         """Override this to specify what data to show in __repr__ returns.
         """
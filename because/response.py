@@ -1,4 +1,3 @@
-import json
 import collections
 from typing import (
     Any,
@@ -7,6 +6,7 @@ from typing import (
     List,
     Text,
 )
+from . import json_backends
 from . reprs import ReprMixin
 from . pretty import PrettyMixin
 from . errors import InvalidObject, ParseError
@@ -157,18 +157,17 @@ def parse_json(response, required_keys=None):
             response=response,
         )
 
+    # JSON requires utf-8, so the backend decodes the bytes directly. Bad
+    # utf-8 is reported separately, which is why it's caught first:
+    # UnicodeDecodeError is a subclass of ValueError.
     try:
-        # JSON requires utf-8, so this hardcoding is judicious
-        text = blob.decode("utf-8")
+        data = json_backends.loads(blob)
     except UnicodeDecodeError as error:
         raise ParseError(
             "cannot decode bytes in response body as utf-8",
             response=response,
             error=error,
         )
-
-    try:
-        data = json.loads(text)
     # n.b.: JSONDecodeError, in Python 3 only, subclasses of ValueError.
     except ValueError as error:
         raise ParseError(
@@ -1,13 +1,16 @@
 """Store specifications of how to access services.
 """
+from string import Formatter
 from typing import (
     Any,
+    Callable,
+    Dict,
     Optional,
     Sequence,
     List,
-    Set,
-    FrozenSet,
     Text,
+    Tuple,
+    Union,
 )
 try:
     import urllib.parse
@@ -17,7 +20,7 @@ except ImportError:
     quote = urllib.quote
 
 from . errors import InvalidObject
-from . headers import Headers
+from . headers import EMPTY_HEADERS, FrozenHeaders, Headers
 from . request import Request
 
 
@@ -36,6 +39,189 @@ class URLError(Exception):
     """
 
 
+# Bytes which quote() never escapes. Values made only of these can skip it.
+_ALWAYS_SAFE = (
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~"
+)
+
+# Characters left unescaped in values for each part of a URL. Path values
+# keep "/" as they always have; query values are escaped as a whole
+# component, so nothing in them can be mistaken for a delimiter.
+_PATH_SAFE = "/"
+_QUERY_SAFE = ""
+
+# Maps each base URL given to url() to its normalized bytes prefix.
+# Base URLs come from a handful of hosts, so this stays tiny.
+_BASE_PREFIXES = {}  # type: Dict[Union[Text, bytes], bytes]
+
+
+def _base_prefix(base):
+    # type: (Union[Text, bytes]) -> bytes
+    """Validate a base URL and convert it to bytes without trailing slashes.
+    """
+    prefix = _BASE_PREFIXES.get(base)
+    if prefix is not None:
+        return prefix
+    text = base.decode("utf-8") if isinstance(base, bytes) else base
+    if not text or not text.startswith(("http://", "https://")):
+        raise URLError(
+            "base URL must start with http:// or https://: {0!r}"
+            .format(base)
+        )
+    prefix = text.rstrip("/").encode("utf-8")
+    if len(_BASE_PREFIXES) >= 64:
+        _BASE_PREFIXES.clear()
+    _BASE_PREFIXES[base] = prefix
+    return prefix
+
+
+def _encode_value(arg, safe):
+    # type: (Any, str) -> bytes
+    """Convert one template value to URL-encoded bytes.
+    """
+    if isinstance(arg, bytes):
+        raw = arg
+    else:
+        if not isinstance(arg, Text):
+            arg = str(arg)
+        raw = arg.encode("utf-8") if isinstance(arg, Text) else arg
+    # Numbers, identifiers and such need no escaping at all.
+    if not raw.translate(None, _ALWAYS_SAFE):
+        return raw
+    return quote(raw, safe).encode("ascii")
+
+
+def _validator(name, expected):
+    # type: (Text, Any) -> Callable[[Any], None]
+    """Make a function checking values for one parameter.
+    """
+    # expectation was communicated as a set of values
+    if isinstance(expected, (set, frozenset)):
+        def check_option(arg):
+            if arg not in expected:
+                raise URLError(
+                    "invalid value for arg {0}: got {1}, expected {2}"
+                    .format(name, arg, expected)
+                )
+        return check_option
+
+    # expectation was communicated as a type
+    def check_type(arg):
+        if not isinstance(arg, expected):
+            raise URLError(
+                "invalid type for arg {0}: got {1} of {2}, expected {3}"
+                .format(name, arg, type(arg), expected)
+            )
+    return check_type
+
+
+def _encoder(name, expected, safe):
+    # type: (Text, Any, str) -> Callable[[Any], bytes]
+    """Make a function which checks and encodes values for one placeholder.
+    """
+    check = _validator(name, expected)
+
+    # There are only so many options, so encode each of them up front.
+    if isinstance(expected, (set, frozenset)):
+        encoded = dict(
+            (option, _encode_value(option, safe)) for option in expected
+        )
+
+        def encode_option(arg):
+            try:
+                return encoded[arg]
+            except (KeyError, TypeError):
+                check(arg)
+                raise
+
+        return encode_option
+
+    def encode(arg):
+        check(arg)
+        return _encode_value(arg, safe)
+
+    return encode
+
+
+class Template(object):
+    """A relative URI template, compiled for fast repeated expansion.
+
+    The path and query templates are split up front into a bytes format
+    string and a list of placeholders. Each placeholder gets a function which
+    validates its value and escapes it as needed for the part of the URL it
+    is in. Expanding is then one %-format, with no parsing or str.format().
+    """
+
+    def __init__(self, path, query=None, parameters=None):
+        # type: (Text, Optional[Text], Optional[dict]) -> None
+        """
+        :arg path:
+            Path template, as a format string.
+        :arg query:
+            Optional. Query template, as a format string without "?".
+        :arg parameters:
+            Dict mapping parameter names to a type or a set of valid values.
+        """
+        parameters = parameters or {}
+        self._validators = dict(
+            (name, _validator(name, expected))
+            for name, expected in parameters.items()
+        )
+        literals = []  # type: List[bytes]
+        slots = []  # type: List[Tuple[Text, str]]
+        self._parse(path, _PATH_SAFE, literals, slots)
+        if query:
+            literals.append(b"?")
+            self._parse(query, _QUERY_SAFE, literals, slots)
+        self._format = b"".join(literals)
+        self._names = frozenset(name for name, _ in slots)
+        self._slots = tuple(
+            # A placeholder without a declared parameter accepts anything.
+            (name, _encoder(name, parameters.get(name, object), safe))
+            for name, safe in slots
+        )
+
+    @staticmethod
+    def _parse(template, safe, literals, slots):
+        # type: (Text, str, List[bytes], List[Tuple[Text, str]]) -> None
+        for literal, name, spec, conversion in Formatter().parse(template):
+            if literal:
+                literals.append(literal.encode("utf-8").replace(b"%", b"%%"))
+            if name is None:
+                continue
+            if spec or conversion or not name:
+                raise InvalidEndpoint(
+                    "only plain named placeholders are supported: {0!r}"
+                    .format(template)
+                )
+            literals.append(b"%s")
+            slots.append((name, safe))
+
+    def expand(self, values=None):
+        # type: (Optional[dict[Text, Any]]) -> bytes
+        """Fill in the template, returning a relative URI as bytes.
+
+        :raises URLError:
+            if a value is invalid or a placeholder has no value.
+        """
+        if values is None:
+            values = {}
+        try:
+            args = tuple([encode(values[name]) for name, encode in self._slots])
+        except KeyError:
+            for name, _ in self._slots:
+                if name not in values:
+                    raise URLError("no value given for {0!r}".format(name))
+            raise
+        # Values which aren't placeholders must still be valid parameters.
+        if len(values) > len(self._names):
+            validators = self._validators
+            for key, arg in values.items():
+                if key not in self._names:
+                    validators[key](arg)
+        return self._format % args
+
+
 class Service(object):
     """Describe how to interact with a collection of related endpoints.
 
@@ -66,7 +252,7 @@ class Service(object):
             Optional. Base URL, prefixed to all endpoint URIs.
         """
         self.endpoints = endpoints
-        self._headers = headers or Headers()
+        self._headers = headers.freeze() if headers else EMPTY_HEADERS
         self.base = base
 
     def endpoint(self, endpoint_name):
@@ -91,20 +277,17 @@ class Service(object):
             raise URLError(
                 "specify a base URL for the service or in the url() call."
             )
-        # blegh
-        if isinstance(base, bytes):
-            base = base.decode("utf-8")
-
         endpoint = self.endpoint(endpoint_name)
         result = endpoint.url(base=base, values=values)
         return result
 
     def headers(self):
-        # type: () -> Headers
+        # type: () -> FrozenHeaders
         """Generate headers to be used in a request to this service.
+
+        The result is frozen and shared; copy() it to make changes.
         """
-        new = self._headers.copy()  # type: Headers
-        return new
+        return self._headers
 
     def request(self, endpoint_name, method, base, values=None, body=None,
                 headers=None):
@@ -115,13 +298,12 @@ class Service(object):
         particular kind of service.
         """
         # The endpoint can do the bulk of the request construction,
-        # but it needs to provide default headers that request overrides
+        # layering its own headers over ours and the passed ones over those.
         endpoint = self.endpoint(endpoint_name)
-        request = endpoint.request(
+        return endpoint.request(
             method, base=base, values=values, body=body, headers=headers,
+            defaults=self.headers(),
         )
-        request.headers = Headers.merged(self._headers, request.headers)
-        return request
 
 
 class Endpoint(object):
@@ -176,7 +358,25 @@ class Endpoint(object):
         self.query = query
         self.parameters = parameters or {}
         self.methods = methods or []
-        self._headers = headers or Headers()
+        self._headers = headers.freeze() if headers else EMPTY_HEADERS
+        self._template = None  # type: Optional[Template]
+        # (defaults, own headers, both layered) from the last request(), as
+        # the same shared layers are normally passed every time.
+        self._layers = None  # type: Optional[Tuple[Any, Any, FrozenHeaders]]
+
+    @property
+    def template(self):
+        # type: () -> Template
+        """The compiled form of this endpoint's templates.
+
+        This is made on first use, so endpoints must not be changed after
+        they have been used.
+        """
+        template = self._template
+        if template is None:
+            template = Template(self.path, self.query, self.parameters)
+            self._template = template
+        return template
 
     def uri(self, values=None):
         # type: (Optional[dict[Text, Any]]) -> Text
@@ -185,57 +385,10 @@ class Endpoint(object):
         :arg values:
             Dictionary of values for the template.
         """
-        if values is None:
-            values = {}
-
-        # Check args against parameter types before liftoff
-        for key, arg in values.items():
-            expected_type = self.parameters[key]
-
-            # expectation was communicated as a set of values
-            if isinstance(expected_type, (Set, FrozenSet)):
-                if arg not in expected_type:
-                    raise URLError(
-                        "invalid value for arg {0}: got {1}, expected {2}"
-                        .format(key, arg, expected_type)
-                    )
-
-            # expectation was communicated as a type
-            elif not isinstance(arg, expected_type):
-                raise URLError(
-                    "invalid type for arg {0}: got {1} of {2}, expected {3}"
-                    .format(key, arg, type(arg), expected_type)
-                )
-
-        # Build a dict of args suitable for str.format()
-        converted = {}
-        for key, arg in values.items():
-            value = None
-            if isinstance(arg, int):
-                value = str(arg)
-            elif isinstance(arg, bytes):
-                value = arg.decode("utf-8")
-            else:
-                # ugh
-                value = str(arg)
-            # Ensure Text gets urlencoded
-            if isinstance(value, Text):
-                value = quote(value)
-            converted[key] = value
-
-        # TODO: we may have to split off the query from the rest as long as the
-        # query is possibly part of the path template.
-        # the first stuff just gets used as-is (and if the path sucks so be it)
-        # but the query stuff has to be urlencode() instead of format()
-        # that's tedious to deal with
-        # maybe we just need to separate path parameters from query parameters
-        # from body parameters. but for now that much design is too much time
-
-        template = self.path + ("?{}".format(self.query) if self.query else "")
-        return template.format(**converted)
+        return self.template.expand(values).decode("utf-8")
 
     def url(self, base, values):
-        # type: (Text, dict[Text, Text]) -> Text
+        # type: (Union[Text, bytes], dict[Text, Text]) -> Text
         """Generate an absolute URL for this endpoint.
 
         :arg url:
@@ -243,23 +396,32 @@ class Endpoint(object):
         :arg values:
             Dictionary of arguments.
         """
-        # TODO: error message
-        if not base or not base.startswith(("http://", "https://")):
-            raise URLError()
-        return "/".join([
-            base.rstrip("/"),
-            self.uri(values=values).lstrip("/"),
+        return self.url_bytes(base, values).decode("utf-8")
+
+    def url_bytes(self, base, values):
+        # type: (Union[Text, bytes], dict[Text, Text]) -> bytes
+        """Generate an absolute URL for this endpoint, as bytes.
+
+        This is what request() uses, so override this rather than url() to
+        customize the URLs of requests.
+        """
+        return b"/".join([
+            _base_prefix(base),
+            self.template.expand(values).lstrip(b"/"),
         ])
 
     def headers(self, values):
         """
         This can be overridden to specify headers as a function of passed
         parameters.
+
+        The result is frozen and shared; copy() it to make changes.
         """
-        return self._headers.copy()
+        return self._headers
 
-    def request(self, method, base, values=None, headers=None, body=None):
-        # type: (Text, Text, Optional[dict[Text, Text]], Optional[Headers], Optional[bytes]) -> Request
+    def request(self, method, base, values=None, headers=None, body=None,
+                defaults=None):
+        # type: (Text, Text, Optional[dict[Text, Text]], Optional[Headers], Optional[bytes], Optional[Headers]) -> Request
         """Generate a description of an HTTP request.
 
         This method can be overridden to customize generated requests for a
@@ -273,25 +435,29 @@ class Endpoint(object):
         :arg headers:
             Optional. Headers that will override any others specified.
         :arg body:
+        :arg defaults:
+            Optional. Headers which this endpoint's headers override, e.g.
+            those of the service.
         """
-        # Allow self.headers overrides to reflect here
-        self_headers = self.headers(values)
-
-        # Combine own headers with passed headers - passed get precedence
-        headers = Headers.merged(self_headers, headers)
-
-        # Allow self.url customizations on top of the passed URL
-        url = self.url(base=base, values=values)
-
-        # TODO: blegh
-        method_bytes, url_bytes = [
-            (text.encode("utf-8") if not isinstance(text, bytes) else text)
-            for text in [method, url]
-        ]
+        # Allow self.headers overrides to reflect here. Passed headers get
+        # precedence over ours, and ours over the defaults. The result is
+        # frozen, so it can share layers instead of copying them.
+        own = self.headers(values)
+        layers = self._layers
+        if layers is None or layers[0] is not defaults or layers[1] is not own:
+            layers = (defaults, own, Headers.layered(defaults, own))
+            self._layers = layers
+        headers = Headers.layered(layers[2], headers)
+
+        # Allow self.url_bytes customizations on top of the passed URL
+        url = self.url_bytes(base=base, values=values)
+
+        if not isinstance(method, bytes):
+            method = method.encode("utf-8")
 
         return Request(
-            method=method_bytes,
-            url=url_bytes,
+            method=method,
+            url=url,
             headers=headers,
             body=body,
         )
@@ -317,7 +483,7 @@ class Host(object):
             definition.
         """
         self._url = url
-        self._headers = headers or Headers()
+        self._headers = headers.freeze() if headers else EMPTY_HEADERS
 
     @property
     def url(self):
@@ -325,13 +491,13 @@ class Host(object):
         return self._url
 
     def headers(self):
-        # type: () -> Headers
+        # type: () -> FrozenHeaders
         """Generate a dict of headers for this host.
         """
         # This method can be overridden.
 
-        # Defensive copy.
-        return self._headers.copy()
+        # Frozen, so no defensive copy is needed.
+        return self._headers
 
 
 class Parameter(object):
@@ -4,6 +4,7 @@ import re
 
 from because.pretty import PrettyMixin
 from because.errors import InvalidObject
+from because.services.basemaps.tiles import TileURLTemplate
 
 
 class InvalidBasemap(InvalidObject):
@@ -46,6 +47,7 @@ class Basemap(PrettyMixin):
         self.headers = headers
         self.style_url = style_url
         self.provider = provider
+        self._url_template = None
 
         # don't delete these untless implementation supports something else
         if self.tile_format not in ("PNG", "PBF"):
@@ -64,6 +66,25 @@ class Basemap(PrettyMixin):
                 "expected parameters for x, y, and z"
             )
 
+    def tile_url(self, x, y, z):
+        """Get the URL of one tile of this basemap.
+        """
+        return self.url_template.url(x, y, z)
+
+    def tile_urls(self, tiles):
+        """Yield the URL of each (x, y, z) tile, e.g. from tiles.bbox_tiles().
+        """
+        return self.url_template.urls(tiles)
+
+    @property
+    def url_template(self):
+        """The url, compiled as a TileURLTemplate.
+        """
+        template = self._url_template
+        if template is None or template.template != self.url:
+            template = self._url_template = TileURLTemplate(self.url)
+        return template
+
     def pretty_tuples(self):
         return [
             ("title", self.title),
@@ -0,0 +1,237 @@
+"""Share basemaps metadata across Frontend instances.
+
+The /basemaps/ enumeration rarely changes, but every new Frontend (one per
+thread, one per QGIS dialog, one per process...) used to fetch and parse it
+again before it could look up a single basemap. BasemapsCache keeps the
+metadata per host for the whole process, and optionally on disk so that a new
+process can start warm.
+
+Entries are fresh for ttl seconds. After that they are stale, but may still
+be served for up to stale_ttl more seconds while they are revalidated, using
+the ETag from the last response so an unchanged list costs a 304 and no
+parsing.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    Text,
+)
+from because import json_backends
+from because.cache import SQLiteCache
+from because.reprs import ReprMixin
+from because.response import Response
+from . service import BasemapsService
+
+#: Default seconds for which fetched metadata is fresh: 1 hour.
+DEFAULT_TTL = 60 * 60.0
+
+#: Default seconds for which stale metadata may still be served: 1 week.
+DEFAULT_STALE_TTL = 7 * 24 * 60 * 60.0
+
+
+def _parse_body(body):
+    # type: (bytes) -> Dict[Text, Any]
+    return BasemapsService().parse_metadata(Response(200, body=body))
+
+
+class BasemapsEntry(ReprMixin):
+    """Basemaps metadata fetched from one host.
+
+    The raw response body is kept so the entry can be persisted and
+    revalidated; it is only parsed into Basemap objects when first needed.
+    """
+
+    def __init__(self, body, etag=None, fetched_at=0.0, basemaps=None):
+        # type: (bytes, Optional[bytes], float, Optional[Dict[Text, Any]]) -> None
+        """
+        :arg body:
+            Body of the /basemaps/ response, as bytes.
+        :arg etag:
+            Optional. ETag header value of that response, as bytes.
+        :arg fetched_at:
+            Time the body was fetched or last revalidated, in seconds.
+        :arg basemaps:
+            Optional. The body already parsed, if the caller has it.
+        """
+        self.body = body
+        self.etag = etag
+        self.fetched_at = fetched_at
+        self._basemaps = basemaps
+        self._lock = threading.Lock()
+
+    @property
+    def basemaps(self):
+        # type: () -> Dict[Text, Any]
+        """Parsed table of Basemap objects, indexed by lowercase title.
+        """
+        with self._lock:
+            if self._basemaps is None:
+                self._basemaps = _parse_body(self.body)
+            return self._basemaps
+
+    def repr_data(self):
+        return OrderedDict([
+            ("etag", self.etag),
+            ("fetched_at", self.fetched_at),
+        ])
+
+
+class BasemapsCache(object):
+    """Process-wide cache of basemaps metadata, keyed by host URL.
+
+    Safe to use from multiple threads.
+    """
+
+    def __init__(
+            self,
+            ttl=DEFAULT_TTL,              # type: float
+            stale_ttl=DEFAULT_STALE_TTL,  # type: float
+            path=None,                    # type: Optional[Text]
+            clock=None,                   # type: Optional[Callable[[], float]]
+    ):
+        # type: (...) -> None
+        """
+        :arg ttl:
+            Seconds for which fetched metadata is fresh.
+        :arg stale_ttl:
+            Seconds after that for which stale metadata may still be served
+            while it is revalidated.
+        :arg path:
+            Optional. Path of an SQLite database to persist entries in.
+        :arg clock:
+            Optional. Function returning the current time in seconds.
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self._entries = {}  # type: Dict[Text, BasemapsEntry]
+        self._refreshing = set()  # type: set
+        self.disk = None  # type: Optional[SQLiteCache]
+        if path:
+            self.disk = SQLiteCache(path, table="basemaps", clock=self._clock)
+
+    def get(self, host):
+        # type: (Text) -> Optional[BasemapsEntry]
+        """Get the entry for a host, or None if there is no usable entry.
+
+        Stale entries are returned until they expire; use is_fresh() to tell
+        whether they should be revalidated.
+        """
+        with self._lock:
+            entry = self._entries.get(host)
+        if entry is None and self.disk is not None:
+            entry = self._load(host)
+        if entry is None:
+            return None
+        if self._clock() - entry.fetched_at > self.ttl + self.stale_ttl:
+            self.delete(host)
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        # type: (BasemapsEntry) -> bool
+        return self._clock() - entry.fetched_at <= self.ttl
+
+    def store(self, host, body, etag=None, basemaps=None):
+        # type: (Text, bytes, Optional[bytes], Optional[Dict[Text, Any]]) -> BasemapsEntry
+        """Store a freshly fetched response body for a host.
+        """
+        entry = BasemapsEntry(
+            body, etag=etag, fetched_at=self._clock(), basemaps=basemaps,
+        )
+        with self._lock:
+            self._entries[host] = entry
+        self._save(host, entry)
+        return entry
+
+    def touch(self, host, entry):
+        # type: (Text, BasemapsEntry) -> BasemapsEntry
+        """Mark an entry as fresh again, after a 304 Not Modified.
+        """
+        entry.fetched_at = self._clock()
+        with self._lock:
+            self._entries[host] = entry
+        self._save(host, entry)
+        return entry
+
+    def begin_refresh(self, host):
+        # type: (Text) -> bool
+        """Claim the right to refresh a host's entry.
+
+        Returns False if a refresh for that host is already running, so that
+        many Frontends noticing the same stale entry make one request.
+        """
+        with self._lock:
+            if host in self._refreshing:
+                return False
+            self._refreshing.add(host)
+            return True
+
+    def end_refresh(self, host):
+        # type: (Text) -> None
+        with self._lock:
+            self._refreshing.discard(host)
+
+    def delete(self, host):
+        # type: (Text) -> None
+        with self._lock:
+            self._entries.pop(host, None)
+        if self.disk is not None:
+            self.disk.delete(host)
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._entries.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def _save(self, host, entry):
+        # type: (Text, BasemapsEntry) -> None
+        if self.disk is None:
+            return
+        record = {
+            "body": entry.body.decode("utf-8"),
+            "etag": entry.etag.decode("latin-1") if entry.etag else None,
+            "fetched_at": entry.fetched_at,
+        }
+        self.disk.set(
+            host, json.dumps(record).encode("utf-8"),
+            ttl=self.ttl + self.stale_ttl,
+        )
+
+    def _load(self, host):
+        # type: (Text) -> Optional[BasemapsEntry]
+        assert self.disk is not None
+        blob = self.disk.get(host)
+        if blob is None:
+            return None
+        try:
+            record = json_backends.loads(blob)
+            entry = BasemapsEntry(
+                record["body"].encode("utf-8"),
+                etag=(record["etag"].encode("latin-1")
+                      if record.get("etag") else None),
+                fetched_at=float(record["fetched_at"]),
+            )
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Corrupt or from an incompatible version; refetch instead.
+            self.disk.delete(host)
+            return None
+        with self._lock:
+            entry = self._entries.setdefault(host, entry)
+        return entry
+
+
+#: The cache used by Frontend instances unless they are given another.
+BASEMAPS_CACHE = BasemapsCache()
+
+
+__all__ = ["BASEMAPS_CACHE", "BasemapsCache", "BasemapsEntry"]
@@ -0,0 +1,215 @@
+"""Store basemap tiles in an MBTiles file, for use offline.
+
+MBTiles is a SQLite database of tiles, which QGIS, GDAL and most mobile map
+apps can read. This uses its deduplicated layout: each distinct tile image is
+stored once in images, keyed by a hash of its content, and map says which
+image each tile has. Large areas of ocean or empty land then cost one image.
+
+Tile rows are stored as MBTiles requires, counted from the south (TMS), but
+this module's methods take XYZ (x, y, z) tiles like the rest of because.
+
+Writes are buffered and committed in batches, since a transaction per tile
+would be much slower than downloading it. Tiles which the server had no image
+for are recorded too, so that a resumed job knows not to ask for them again.
+"""
+import hashlib
+import sqlite3
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Text,
+    Tuple,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS images (tile_id TEXT PRIMARY KEY, tile_data BLOB);
+CREATE TABLE IF NOT EXISTS map (
+    zoom_level INTEGER,
+    tile_column INTEGER,
+    tile_row INTEGER,
+    tile_id TEXT,
+    PRIMARY KEY (zoom_level, tile_column, tile_row)
+);
+CREATE VIEW IF NOT EXISTS tiles AS
+    SELECT map.zoom_level AS zoom_level,
+           map.tile_column AS tile_column,
+           map.tile_row AS tile_row,
+           images.tile_data AS tile_data
+    FROM map JOIN images ON images.tile_id = map.tile_id;
+CREATE TABLE IF NOT EXISTS because_empty_tiles (
+    zoom_level INTEGER,
+    tile_column INTEGER,
+    tile_row INTEGER,
+    PRIMARY KEY (zoom_level, tile_column, tile_row)
+);
+"""
+
+# Most variables SQLite allows in one statement, in old versions.
+_MAX_VARIABLES = 999
+
+
+def _tms_row(y, zoom):
+    # type: (int, int) -> int
+    return (1 << zoom) - 1 - y
+
+
+class MBTiles(object):
+    """An MBTiles file, opened for reading and writing tiles.
+
+    Use from one thread only, as with any sqlite3 connection.
+    """
+
+    def __init__(self, path, batch_size=500):
+        # type: (Text, int) -> None
+        """
+        :arg path:
+            Path of the file, which is created if it doesn't exist.
+        :arg batch_size:
+            Number of tile writes to buffer before committing them.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+        self._tiles = []  # type: List[Tuple[int, int, int, Text]]
+        self._images = {}  # type: Dict[Text, bytes]
+        self._empty = []  # type: List[Tuple[int, int, int]]
+        #: Count of images written which were already stored.
+        self.duplicates = 0
+
+    def set_metadata(self, **values):
+        # type: (**Any) -> None
+        """Set metadata values, e.g. name, format, bounds, minzoom, maxzoom.
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+                [(name, str(value)) for name, value in values.items()],
+            )
+
+    def metadata(self):
+        # type: () -> Dict[Text, Text]
+        return dict(self._connection.execute(
+            "SELECT name, value FROM metadata"
+        ))
+
+    def put(self, tile, data):
+        # type: (Tuple[int, int, int], bytes) -> None
+        """Store the image for an (x, y, z) tile.
+        """
+        x, y, zoom = tile
+        tile_id = hashlib.sha1(data).hexdigest()
+        self._images.setdefault(tile_id, data)
+        self._tiles.append((zoom, x, _tms_row(y, zoom), tile_id))
+        self._written()
+
+    def put_empty(self, tile):
+        # type: (Tuple[int, int, int]) -> None
+        """Record that an (x, y, z) tile has no image.
+        """
+        x, y, zoom = tile
+        self._empty.append((zoom, x, _tms_row(y, zoom)))
+        self._written()
+
+    def _written(self):
+        # type: () -> None
+        if len(self._tiles) + len(self._empty) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # type: () -> None
+        """Commit buffered writes in one transaction.
+        """
+        if not (self._tiles or self._empty):
+            return
+        with self._connection as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO images (tile_id, tile_data) "
+                "VALUES (?, ?)",
+                [
+                    (tile_id, sqlite3.Binary(data))
+                    for tile_id, data in self._images.items()
+                ],
+            )
+            inserted = connection.total_changes - before
+            self.duplicates += len(self._tiles) - inserted
+            connection.executemany(
+                "INSERT OR REPLACE INTO map "
+                "(zoom_level, tile_column, tile_row, tile_id) "
+                "VALUES (?, ?, ?, ?)",
+                self._tiles,
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO because_empty_tiles "
+                "(zoom_level, tile_column, tile_row) VALUES (?, ?, ?)",
+                self._empty,
+            )
+        self._tiles = []
+        self._images = {}
+        self._empty = []
+
+    def done(self, tiles):
+        # type: (Iterable[Tuple[int, int, int]]) -> Set[Tuple[int, int, int]]
+        """Find which of some (x, y, z) tiles are stored or known empty.
+
+        Only committed writes are seen; flush() first to include the rest.
+        """
+        by_key = {
+            (zoom, x, _tms_row(y, zoom)): (x, y, zoom) for x, y, zoom in tiles
+        }
+        keys = list(by_key)
+        found = set()  # type: Set[Tuple[int, int, int]]
+        step = _MAX_VARIABLES // 3
+        for table in ("map", "because_empty_tiles"):
+            for start in range(0, len(keys), step):
+                batch = keys[start:start + step]
+                clause = " OR ".join(
+                    ["(zoom_level=? AND tile_column=? AND tile_row=?)"] *
+                    len(batch)
+                )
+                values = [value for key in batch for value in key]
+                for row in self._connection.execute(
+                        "SELECT zoom_level, tile_column, tile_row FROM " +
+                        table + " WHERE " + clause, values):
+                    found.add(by_key[tuple(row)])
+        return found
+
+    def get(self, tile):
+        # type: (Tuple[int, int, int]) -> Optional[bytes]
+        """Get the image of an (x, y, z) tile, or None if it isn't stored.
+        """
+        x, y, zoom = tile
+        row = self._connection.execute(
+            "SELECT tile_data FROM tiles "
+            "WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+            (zoom, x, _tms_row(y, zoom)),
+        ).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def counts(self):
+        # type: () -> Tuple[int, int]
+        """Count (tiles, distinct images) committed.
+        """
+        tiles = self._connection.execute("SELECT COUNT(*) FROM map")
+        images = self._connection.execute("SELECT COUNT(*) FROM images")
+        return tiles.fetchone()[0], images.fetchone()[0]
+
+    def close(self):
+        # type: () -> None
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+
+__all__ = ["MBTiles"]
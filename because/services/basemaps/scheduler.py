@@ -0,0 +1,371 @@
+"""Fetch the tiles of a map view, nearest the centre first.
+
+An interactive map wants tiles in a different way from a seeding job: which
+tiles are needed changes every time the view is panned or zoomed, and tiles
+which have scrolled out of view are no longer worth downloading. A
+TileScheduler is told the current viewport and keeps the network busy with
+only the tiles it shows:
+
+* Tiles are requested from the centre of the view outward.
+* A tile is not requested if it is already being requested, is in the tile
+  cache and fresh, or was delivered while it stayed in view.
+* At most max_in_flight requests run at once; the rest wait in a queue.
+* When the viewport changes, requests for tiles no longer in it are
+  cancelled with Transfer.cancel(), and the queue is rebuilt.
+* A tile which failed is retried after a delay which doubles with each
+  failure, or as soon as it comes back into view after leaving it. Tiles the
+  server refused with a 4xx status aren't retried at all.
+
+It works with clients whose transfers run in the background: the concurrent
+interface, and Qt's through the Qt interface's QtTileScheduler. Delivered
+tiles are passed to a callback, which runs on whichever thread finished the
+transfer.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+from because.errors import InvalidObject
+from because.headers import Headers
+from because.request import Request
+from because.reprs import ReprMixin
+from because.transfer import TransferError
+from because.services.basemaps.tile_cache import (
+    TileCache,
+    conditional_headers,
+    tile_data,
+)
+from because.services.basemaps.tiles import bbox_tiles, center_out
+
+LOG = logging.getLogger(__name__)
+
+Tile = Tuple[int, int, int]
+
+# Client error statuses which may well succeed if sent again.
+RETRYABLE_STATUSES = frozenset([408, 429])
+
+
+def _permanent(error):
+    # type: (Exception) -> bool
+    """Whether a tile request failed in a way retrying won't fix.
+    """
+    code = error.code if isinstance(error, TransferError) else None
+    return code is not None and 400 <= code < 500 and \
+        code not in RETRYABLE_STATUSES
+
+
+def viewport_tiles(bbox, zoom):
+    # type: (Sequence[float], int) -> List[Tile]
+    """List the tiles covering a viewport, nearest its centre first.
+
+    :arg bbox:
+        (west, south, east, north) in degrees. west may be greater than east
+        for a view across the antimeridian.
+    :arg zoom:
+        Zoom level of the tiles.
+    """
+    west, south, east, north = bbox
+    if west > east:
+        east += 360
+    lon = (west + east) / 2.0
+    if lon > 180:
+        lon -= 360
+    return center_out(bbox_tiles(bbox, [zoom]), lon, (south + north) / 2.0)
+
+
+class TileScheduler(ReprMixin):
+    """Request the tiles of the current viewport from a basemap.
+
+    Thread safe: set_viewport() may be called from one thread while
+    transfers finish on others.
+    """
+
+    def __init__(
+            self,
+            basemap,            # type: Any
+            client,             # type: Any
+            on_tile,            # type: Callable[[Tile, Optional[bytes]], Any]
+            max_in_flight=6,    # type: int
+            tile_cache=None,    # type: Optional[TileCache]
+            headers=None,       # type: Any
+            is_cached=None,     # type: Optional[Callable[[Tile], bool]]
+            retry_delay=2.0,    # type: float
+            max_retry_delay=120.0,  # type: float
+            clock=None,         # type: Optional[Callable[[], float]]
+    ):
+        # type: (...) -> None
+        """
+        :arg basemap:
+            Basemap whose tiles to fetch.
+        :arg client:
+            Client to send tile requests with, e.g. a concurrent interface
+            Client.
+        :arg on_tile:
+            Called with (tile, data) for each tile fetched, or taken fresh
+            from tile_cache. data is None if the basemap has no image for it.
+        :arg max_in_flight:
+            Maximum number of tile requests to have running at once.
+        :arg tile_cache:
+            Optional. TileCache to take fresh tiles from, and to store fetched
+            tiles in. Stale tiles are revalidated.
+        :arg headers:
+            Optional. Headers to send with each tile request, e.g. for auth.
+        :arg is_cached:
+            Optional. Called with a tile to say whether the caller already
+            has it, e.g. in memory, so it needn't be fetched.
+        :arg retry_delay:
+            Seconds to wait before retrying a tile which failed. The delay
+            doubles with each further failure of the same tile.
+        :arg max_retry_delay:
+            Longest delay before retrying a tile.
+        :arg clock:
+            Optional. Function returning the time in seconds; time.time by
+            default.
+        """
+        if max_in_flight < 1:
+            raise InvalidObject("max_in_flight must be at least 1")
+        if headers is not None and not isinstance(headers, Headers):
+            headers = Headers(headers)
+        self.basemap = basemap
+        self.client = client
+        self.on_tile = on_tile
+        self.max_in_flight = max_in_flight
+        self.tile_cache = tile_cache
+        self.headers = headers
+        self.is_cached = is_cached
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._clock = clock or time.time
+        # Reentrant, since a transfer can finish as it is started.
+        self._lock = threading.RLock()
+        self._queue = []  # type: List[Tile]
+        # The tiles last wanted, to look at again when retries are due.
+        self._wanted = []  # type: List[Tile]
+        # Transfers by tile, with the stale cached tile they revalidate.
+        self._in_flight = OrderedDict()  # type: Dict[Tile, Tuple[Any, Any]]
+        # Tiles delivered since they came into view.
+        self._delivered = set()  # type: Set[Tile]
+        # (time to retry, failures) for tiles which couldn't be fetched, so
+        # a broken tile doesn't cost a request on every change of view. The
+        # time is None for tiles which shouldn't be retried at all.
+        self._failed = {}  # type: Dict[Tile, Tuple[Optional[float], int]]
+        # When the next retry is scheduled for, if one is.
+        self._retry_at = None  # type: Optional[float]
+
+    def repr_data(self):
+        return OrderedDict([
+            ("queued", len(self._queue)),
+            ("in_flight", len(self._in_flight)),
+            ("failed", len(self._failed)),
+        ])
+
+    @property
+    def in_flight(self):
+        # type: () -> List[Tile]
+        """Tiles being requested, in the order they were started.
+        """
+        with self._lock:
+            return list(self._in_flight)
+
+    @property
+    def queued(self):
+        # type: () -> List[Tile]
+        """Tiles waiting to be requested, in the order they will be.
+        """
+        with self._lock:
+            return list(self._queue)
+
+    def set_viewport(self, bbox, zoom):
+        # type: (Sequence[float], int) -> None
+        """Fetch the tiles covering a (west, south, east, north) bbox.
+        """
+        self.want(viewport_tiles(bbox, zoom))
+
+    def want(self, tiles):
+        # type: (Iterable[Tile]) -> None
+        """Fetch these tiles, in this order, and no others.
+
+        Requests for other tiles are cancelled.
+        """
+        tiles = list(tiles)
+        wanted = set(tiles)
+        with self._lock:
+            self._wanted = tiles
+            self._delivered &= wanted
+            # Tiles which left the view are tried afresh if they come back,
+            # unless the server refused them outright.
+            self._failed = dict(
+                (tile, failure) for tile, failure in self._failed.items()
+                if tile in wanted or failure[0] is None
+            )
+            for tile in [t for t in self._in_flight if t not in wanted]:
+                transfer = self._in_flight.pop(tile)[0]
+                transfer.cancel()
+                self._forget(transfer)
+            is_cached = self.is_cached
+            now = self._clock()
+            self._queue = [
+                tile for tile in tiles
+                if tile not in self._in_flight and
+                tile not in self._delivered and
+                not self._backing_off(tile, now) and
+                not (is_cached is not None and is_cached(tile))
+            ]
+            self._pump()
+
+    def _backing_off(self, tile, now):
+        # type: (Tile, float) -> bool
+        failure = self._failed.get(tile)
+        if failure is None:
+            return False
+        retry_at = failure[0]
+        return retry_at is None or now < retry_at
+
+    def cancel_all(self):
+        # type: () -> None
+        """Cancel all requests, e.g. when the map is closed.
+        """
+        self.want([])
+
+    def retry_failed(self):
+        # type: () -> None
+        """Allow tiles which failed to be requested again straight away.
+        """
+        with self._lock:
+            self._failed.clear()
+            self.want(self._wanted)
+
+    def _failure(self, tile, error):
+        # type: (Tile, Exception) -> None
+        if _permanent(error):
+            self._failed[tile] = (None, 1)
+            return
+        failures = self._failed.get(tile, (None, 0))[1] + 1
+        delay = min(
+            self.max_retry_delay, self.retry_delay * 2 ** (failures - 1),
+        )
+        retry_at = self._clock() + delay
+        self._failed[tile] = (retry_at, failures)
+        if self._retry_at is None or retry_at < self._retry_at:
+            self._retry_at = retry_at
+            self._retry_later(delay)
+
+    def _retry_later(self, delay):
+        # type: (float) -> None
+        """Arrange for retry() to be called after delay seconds.
+        """
+        timer = threading.Timer(delay, self.retry)
+        timer.daemon = True
+        timer.start()
+
+    def retry(self):
+        # type: () -> None
+        """Request tiles in view whose delay after failing has passed.
+        """
+        with self._lock:
+            self._retry_at = None
+            now = self._clock()
+            pending = [
+                failure[0] for tile, failure in self._failed.items()
+                if failure[0] is not None and failure[0] > now
+            ]
+            if pending:
+                self._retry_at = min(pending)
+                self._retry_later(self._retry_at - now)
+            self.want(self._wanted)
+
+    def _pump(self):
+        # type: () -> None
+        while self._queue and len(self._in_flight) < self.max_in_flight:
+            self._start(self._queue.pop(0))
+
+    def _start(self, tile):
+        # type: (Tile) -> None
+        url = self.basemap.tile_url(*tile)
+        cache = self.tile_cache
+        cached = cache.get(url) if cache is not None else None
+        if cached is not None and cached.fresh:
+            self._deliver(tile, cached.data)
+            return
+        request = Request(
+            b"GET", url.encode("utf-8"),
+            headers=Headers.layered(self.headers, conditional_headers(cached)),
+        )
+        transfer = self.client.send(request)
+        self._in_flight[tile] = (transfer, cached)
+        self._watch(tile, transfer)
+
+    def _watch(self, tile, transfer):
+        # type: (Tile, Any) -> None
+        """Arrange for finished() to be called when the transfer finishes.
+        """
+        add_done_callback = getattr(transfer, "add_done_callback", None)
+        if add_done_callback is None:
+            raise InvalidObject(
+                "{0} transfers don't say when they finish; use the concurrent "
+                "interface, or QtTileScheduler with Qt".format(
+                    type(transfer).__name__
+                )
+            )
+        add_done_callback(lambda _: self.finished(tile, transfer))
+
+    def _forget(self, transfer):
+        # type: (Any) -> None
+        """Let go of a transfer which is finished or cancelled.
+        """
+
+    def _response(self, transfer):
+        # type: (Any) -> Any
+        """Get the response of a finished transfer, or raise its error.
+        """
+        return transfer.wait()
+
+    def finished(self, tile, transfer):
+        # type: (Tile, Any) -> None
+        """Handle a transfer for a tile finishing.
+        """
+        with self._lock:
+            entry = self._in_flight.get(tile)
+            if entry is None or entry[0] is not transfer:
+                # Cancelled, or handled already.
+                return
+            del self._in_flight[tile]
+            try:
+                response = self._response(transfer)
+                url = self.basemap.tile_url(*tile)
+                if self.tile_cache is not None:
+                    data = self.tile_cache.store_response(
+                        url, response, entry[1],
+                    )
+                else:
+                    data = tile_data(response)
+            except Exception as error:
+                LOG.warning("could not fetch tile %r: %s", tile, error)
+                self._failure(tile, error)
+            else:
+                self._failed.pop(tile, None)
+                self._deliver(tile, data)
+            self._forget(transfer)
+            self._pump()
+
+    def _deliver(self, tile, data):
+        # type: (Tile, Optional[bytes]) -> None
+        self._delivered.add(tile)
+        try:
+            self.on_tile(tile, data)
+        except Exception:
+            LOG.exception("on_tile failed for tile %r", tile)
+
+
+__all__ = ["TileScheduler", "viewport_tiles"]
@@ -0,0 +1,214 @@
+"""Download the tiles of a basemap over an area, into an MBTiles file.
+
+This is for preparing offline basemaps: seed() fetches every tile covering a
+bbox or polygon over a range of zoom levels, with a bounded number of
+requests in flight, and stores them with MBTiles, which keeps one copy of
+each distinct image.
+
+Requests reuse connections through a ConnectionPool, since a TLS handshake
+per tile would cost more than the tile. A job which is interrupted can be run
+again with the same arguments to carry on: tiles already in the file, or
+known to have no image, are not requested again.
+
+All writes happen on the calling thread; only downloads run in workers.
+"""
+from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+)
+from because.errors import InvalidObject
+from because.fanout import chunked, fan_out
+from because.headers import Headers
+from because.request import Request
+from because.reprs import ReprMixin
+from because.services.basemaps.mbtiles import MBTiles
+from because.services.basemaps.tile_cache import (
+    TileCache,
+    conditional_headers,
+    tile_data,
+)
+from because.services.basemaps.tiles import bbox_tiles, polygon_tiles
+
+
+class SeedReport(ReprMixin):
+    """Counts of what a seed() job did.
+    """
+    def __init__(self):
+        # type: () -> None
+        #: Tiles already stored by an earlier run, so not requested.
+        self.skipped = 0
+        #: Tiles downloaded and stored.
+        self.stored = 0
+        #: Stored tiles whose image was already in the file.
+        self.duplicates = 0
+        #: Tiles the server had no image for.
+        self.empty = 0
+        #: Bytes of tile images stored.
+        self.stored_bytes = 0
+        #: Errors by (x, y, z) tile, for tiles which failed to download.
+        self.errors = OrderedDict()  # type: Dict[Tuple[int, int, int], Exception]
+
+    def repr_data(self):
+        return OrderedDict([
+            ("skipped", self.skipped),
+            ("stored", self.stored),
+            ("duplicates", self.duplicates),
+            ("empty", self.empty),
+            ("errors", len(self.errors)),
+        ])
+
+
+def _fetch(client, headers, cache, tile_url):
+    # type: (Any, Any, Optional[TileCache], Tuple[Tuple[int, int, int], Text]) -> Optional[bytes]
+    """Get a tile's data, or None if the server has no image for it.
+    """
+    tile, url = tile_url
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None and cached.fresh:
+        return cached.data
+    request = Request(
+        b"GET", url.encode("utf-8"),
+        headers=Headers.layered(headers, conditional_headers(cached)),
+    )
+    response = client.transfer(request).wait()
+    if cache is None:
+        return tile_data(response)
+    return cache.store_response(url, response, cached)
+
+
+def seed(
+        basemap,            # type: Any
+        path,               # type: Text
+        zooms,              # type: Iterable[int]
+        bbox=None,          # type: Optional[Sequence[float]]
+        polygon=None,       # type: Optional[Sequence[Any]]
+        concurrency=8,      # type: int
+        batch_size=500,     # type: int
+        client=None,        # type: Any
+        headers=None,       # type: Any
+        cache=None,         # type: Optional[TileCache]
+):
+    # type: (...) -> SeedReport
+    """Download the tiles of a basemap covering an area into an MBTiles file.
+
+    :arg basemap:
+        Basemap whose tiles to download.
+    :arg path:
+        Path of the MBTiles file. If it exists, tiles it already has are
+        skipped, so an interrupted job can be resumed.
+    :arg zooms:
+        Zoom levels to download, e.g. range(0, 15).
+    :arg bbox:
+        (west, south, east, north) in degrees. Give either this or polygon.
+    :arg polygon:
+        GeoJSON Polygon coordinates, to only download the tiles it touches.
+    :arg concurrency:
+        Maximum number of tile requests in flight at once.
+    :arg batch_size:
+        Number of tiles to commit to the file in each transaction.
+    :arg client:
+        Optional. Client to request tiles with. It must block in wait(), as
+        for fan_out(). By default, a python interface Client with a
+        ConnectionPool is used, and closed at the end.
+    :arg headers:
+        Optional. Headers to send with each tile request.
+    :arg cache:
+        Optional. TileCache to take fresh tiles from, and to store downloaded
+        tiles in, so the job warms the cache used by QGIS and other clients.
+    :returns:
+        SeedReport, including any per-tile errors.
+    """
+    if (bbox is None) == (polygon is None):
+        raise InvalidObject("give one of bbox or polygon")
+    zooms = sorted(set(zooms))
+    if not zooms:
+        raise InvalidObject("give at least one zoom level")
+    if polygon is not None:
+        tiles = polygon_tiles(polygon, zooms)  # type: Iterator[Tuple[int, int, int]]
+    else:
+        tiles = bbox_tiles(bbox, zooms)
+
+    if headers is not None and not isinstance(headers, Headers):
+        headers = Headers(headers)
+
+    pool = None
+    if client is None:
+        from because.interfaces.python.client import Client
+        from because.interfaces.python.pool import ConnectionPool
+        pool = ConnectionPool()
+        client = Client(pool=pool)
+
+    report = SeedReport()
+    template = basemap.url_template
+
+    def remaining(store):
+        # type: (MBTiles) -> Iterator[Tuple[Tuple[int, int, int], Text]]
+        # Runs on the consuming thread, between outcomes, like the writes.
+        for _, chunk in chunked(tiles, batch_size):
+            done = store.done(chunk)
+            report.skipped += len(done)
+            for tile in chunk:
+                if tile not in done:
+                    yield tile, template.url(*tile)
+
+    try:
+        with MBTiles(path, batch_size=batch_size) as store:
+            if not store.metadata():
+                store.set_metadata(**_metadata(basemap, zooms, bbox, polygon))
+            duplicates = store.duplicates
+            outcomes = fan_out(
+                lambda tile_url: _fetch(client, headers, cache, tile_url),
+                remaining(store),
+                concurrency=concurrency,
+                ordered=False,
+            )
+            for outcome in outcomes:
+                tile = outcome.item[0]
+                if not outcome.ok:
+                    report.errors[tile] = outcome.error
+                    continue
+                data = outcome.value
+                if data is None:
+                    store.put_empty(tile)
+                    report.empty += 1
+                else:
+                    store.put(tile, data)
+                    report.stored += 1
+                    report.stored_bytes += len(data)
+            store.flush()
+            report.duplicates = store.duplicates - duplicates
+    finally:
+        if pool is not None:
+            pool.close()
+    return report
+
+
+def _metadata(basemap, zooms, bbox, polygon):
+    # type: (Any, List[int], Any, Any) -> Dict[str, Any]
+    if bbox is None:
+        points = [point for ring in polygon for point in ring]
+        lons = [point[0] for point in points]
+        lats = [point[1] for point in points]
+        bbox = (min(lons), min(lats), max(lons), max(lats))
+    values = {
+        "name": basemap.title or basemap.url,
+        "format": "pbf" if basemap.tile_format == "PBF" else "png",
+        "type": "baselayer",
+        "minzoom": zooms[0],
+        "maxzoom": zooms[-1],
+        "bounds": ",".join(str(value) for value in bbox),
+    }  # type: Dict[str, Any]
+    if basemap.attribution:
+        values["attribution"] = basemap.attribution
+    return values
+
+
+__all__ = ["seed", "SeedReport"]
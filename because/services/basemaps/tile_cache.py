@@ -0,0 +1,498 @@
+"""Keep downloaded basemap tiles on disk, shared with GDAL and across runs.
+
+Tiles are stored as files in the layout of GDAL's WMS file cache: a file
+named for the MD5 of the tile URL, under one directory level per leading
+hex digit of that name. So a GDALBasemapLayer pointed at the same directory
+(see TileCache.gdal_cache_xml) reads tiles which because downloaded, and
+because reads tiles which GDAL downloaded, whichever of QGIS, a seeding job
+or a script got there first.
+
+Alongside the tile files, an SQLite index records each tile's ETag, when it
+goes stale, when it was last used, and its size. Stale tiles are revalidated
+with If-None-Match, so an unchanged tile costs a 304 and no download. The
+total size is kept under a limit by removing the least recently used tiles.
+
+Files are written to a temporary name and then renamed into place, so other
+threads and processes never read a partly written tile.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+    Text,
+    Tuple,
+)
+from because.errors import InvalidObject
+from because.headers import Headers
+from because.reprs import ReprMixin
+from because.transfer import TransferError
+
+#: Default limit on the total size of cached tiles: 512 MiB.
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+#: Default seconds a tile stays fresh when the server doesn't say: 1 day.
+DEFAULT_TTL = 24 * 60 * 60.0
+
+#: Statuses meaning the server has no image for a tile, e.g. over open sea.
+EMPTY_STATUSES = (204, 404)
+
+# Name of the index, beside (not in) the directory GDAL manages, which
+# would otherwise count and remove it like a tile.
+_INDEX_NAME = "because-tiles.sqlite"
+
+# Trim down to this fraction of max_size, so that trimming doesn't run
+# again after every write once the cache is full.
+_TRIM_TARGET = 0.9
+
+# Seconds by which last use may lag, so reading a tile doesn't always cost
+# a write to the index.
+_USE_RESOLUTION = 60.0
+
+_MAX_AGE = re.compile(br"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+def max_age(headers, default=DEFAULT_TTL):
+    # type: (Headers, Optional[float]) -> Optional[float]
+    """Get how many seconds a response may be cached, from Cache-Control.
+
+    Returns 0 for no-cache or no-store, and default if no age is given.
+    """
+    for value in headers[b"Cache-Control"]:
+        lowered = value.lower()
+        if b"no-store" in lowered or b"no-cache" in lowered:
+            return 0.0
+        match = _MAX_AGE.search(value)
+        if match:
+            return float(match.group(1))
+    return default
+
+
+def tile_data(response):
+    # type: (Any) -> Optional[bytes]
+    """Get the image from a tile response, or None if there is no image.
+
+    :raises TransferError:
+        if the response had an error status.
+    """
+    if response.status in EMPTY_STATUSES:
+        return None
+    if response.status != 200:
+        raise TransferError(
+            "tile request had error status {0!r}".format(response.status),
+            code=response.status,
+        )
+    return response.body or None
+
+
+def conditional_headers(cached):
+    # type: (Optional[CachedTile]) -> Optional[Headers]
+    """Headers to revalidate a stale cached tile with, if it has an ETag.
+    """
+    if cached is None or cached.etag is None:
+        return None
+    return Headers([(b"If-None-Match", cached.etag)])
+
+
+class CachedTile(ReprMixin):
+    """A tile read from a TileCache.
+    """
+    def __init__(self, url, data, etag=None, fresh=True):
+        # type: (Text, bytes, Optional[bytes], bool) -> None
+        """
+        :arg url:
+            URL the tile was downloaded from.
+        :arg data:
+            The tile image, as bytes.
+        :arg etag:
+            Optional. ETag of the response the tile came from.
+        :arg fresh:
+            Whether the tile can be used without revalidating it.
+        """
+        self.url = url
+        self.data = data
+        self.etag = etag
+        self.fresh = fresh
+
+    def repr_data(self):
+        return OrderedDict([
+            ("url", self.url),
+            ("etag", self.etag),
+            ("fresh", self.fresh),
+        ])
+
+
+class TileCache(object):
+    """Size-bounded cache of tiles in a directory, keyed by tile URL.
+
+    Safe to use from multiple threads and processes.
+    """
+
+    def __init__(
+            self,
+            path,                       # type: Text
+            max_size=DEFAULT_MAX_SIZE,  # type: int
+            extension=".png",           # type: Text
+            depth=2,                    # type: int
+            ttl=DEFAULT_TTL,            # type: float
+            clock=None,                 # type: Optional[Callable[[], float]]
+            timeout=30.0,               # type: float
+    ):
+        # type: (...) -> None
+        """
+        :arg path:
+            Directory to keep the cache in. It is created if necessary.
+            Tile files are kept in its "tiles" subdirectory.
+        :arg max_size:
+            Limit on the total size of the tile files, in bytes.
+        :arg extension:
+            Extension for tile files, as GDAL's Cache Extension setting.
+        :arg depth:
+            Number of directory levels, as GDAL's Cache Depth setting.
+        :arg ttl:
+            Seconds a tile stays fresh if its response had no max-age.
+        :arg clock:
+            Optional. Function returning the current time in seconds.
+        :arg timeout:
+            Seconds to wait for another process's lock on the index.
+        """
+        if max_size < 1:
+            raise InvalidObject("max_size must be at least 1")
+        self.path = os.path.abspath(path)
+        self.tiles_path = os.path.join(self.path, "tiles")
+        self.max_size = max_size
+        self.extension = extension
+        self.depth = depth
+        self.ttl = ttl
+        self.timeout = timeout
+        self._clock = clock or time.time
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._written = 0
+        if not os.path.isdir(self.tiles_path):
+            try:
+                os.makedirs(self.tiles_path)
+            except OSError:
+                # Another process may have made it first.
+                if not os.path.isdir(self.tiles_path):
+                    raise
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tiles ("
+                " key TEXT PRIMARY KEY,"
+                " etag BLOB,"
+                " expires_at REAL,"
+                " used_at REAL,"
+                " size INTEGER"
+                ")"
+            )
+
+    def _connection(self):
+        # type: () -> sqlite3.Connection
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                os.path.join(self.path, _INDEX_NAME), timeout=self.timeout,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def key(self, url):
+        # type: (Text) -> Text
+        """Name of the file for a tile URL, without extension, as GDAL has it.
+        """
+        return hashlib.md5(url.encode("utf-8")).hexdigest()
+
+    def file_path(self, url):
+        # type: (Text) -> Text
+        """Path of the file for a tile URL, whether or not it exists.
+        """
+        key = self.key(url)
+        parts = [self.tiles_path] + list(key[:self.depth])
+        return os.path.join(*(parts + [key + self.extension]))
+
+    def get(self, url):
+        # type: (Text) -> Optional[CachedTile]
+        """Get the cached tile for a URL, fresh or not, or None if missing.
+        """
+        path = self.file_path(url)
+        try:
+            with open(path, "rb") as stream:
+                data = stream.read()
+        except (IOError, OSError):
+            return None
+        key = self.key(url)
+        now = self._clock()
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT etag, expires_at, used_at FROM tiles WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            # Downloaded by GDAL, so all we know is when it was written.
+            try:
+                written = os.path.getmtime(path)
+            except OSError:
+                written = now
+            etag, expires_at = None, written + self.ttl
+            self._index(key, etag, expires_at, len(data))
+        else:
+            etag, expires_at, used_at = row
+            if used_at is None or now - used_at >= _USE_RESOLUTION:
+                with connection:
+                    connection.execute(
+                        "UPDATE tiles SET used_at = ? WHERE key = ?",
+                        (now, key),
+                    )
+        return CachedTile(
+            url, data,
+            etag=bytes(etag) if etag is not None else None,
+            fresh=expires_at is not None and expires_at > now,
+        )
+
+    def put(self, url, data, etag=None, ttl=None):
+        # type: (Text, bytes, Optional[bytes], Optional[float]) -> None
+        """Store the tile for a URL.
+
+        :arg etag:
+            Optional. ETag of the response, for revalidating it later.
+        :arg ttl:
+            Optional. Seconds the tile is fresh for, instead of the default.
+        """
+        path = self.file_path(url)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        handle, temporary = tempfile.mkstemp(
+            dir=directory, prefix=".", suffix=".tmp",
+        )
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                stream.write(data)
+            _replace(temporary, path)
+        except Exception:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+        ttl = self.ttl if ttl is None else ttl
+        self._index(self.key(url), etag, self._clock() + ttl, len(data))
+        with self._lock:
+            self._written += len(data)
+            trim = self._written > self.max_size * (1 - _TRIM_TARGET) / 2
+            if trim:
+                self._written = 0
+        if trim:
+            self.trim()
+
+    def touch(self, url, ttl=None):
+        # type: (Text, Optional[float]) -> None
+        """Mark a tile fresh again, after a 304 Not Modified.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = self._clock()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "UPDATE tiles SET expires_at = ?, used_at = ? WHERE key = ?",
+                (now + ttl, now, self.key(url)),
+            )
+
+    def _index(self, key, etag, expires_at, size):
+        # type: (Text, Optional[bytes], float, int) -> None
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO tiles"
+                " (key, etag, expires_at, used_at, size)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    key, sqlite3.Binary(etag) if etag is not None else None,
+                    expires_at, self._clock(), size,
+                ),
+            )
+
+    def delete(self, url):
+        # type: (Text) -> None
+        self._remove([(self.key(url), self.file_path(url))])
+
+    def _remove(self, entries):
+        # type: (List[Tuple[Text, Text]]) -> None
+        for _, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "DELETE FROM tiles WHERE key = ?",
+                [(key,) for key, _ in entries],
+            )
+
+    def _files(self):
+        # type: () -> List[Tuple[Text, Text, int, float]]
+        """List (key, path, size, modified) of every tile file.
+        """
+        files = []
+        for directory, _, names in os.walk(self.tiles_path):
+            for name in names:
+                if not name.endswith(self.extension) or name.startswith("."):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                key = name[:len(name) - len(self.extension)]
+                files.append((key, path, status.st_size, status.st_mtime))
+        return files
+
+    def size(self):
+        # type: () -> int
+        """Total size of the tile files, in bytes.
+        """
+        return sum(size for _, _, size, _ in self._files())
+
+    def trim(self, max_size=None):
+        # type: (Optional[int]) -> int
+        """Remove least recently used tiles until under the size limit.
+
+        Trimming goes a little below the limit, so it needn't happen again
+        straight away. Returns the number of bytes removed.
+
+        :arg max_size:
+            Optional. Limit to trim to, instead of max_size.
+        """
+        limit = self.max_size if max_size is None else max_size
+        files = self._files()
+        total = sum(size for _, _, size, _ in files)
+        if total <= limit:
+            return 0
+        used = dict(self._connection().execute(
+            "SELECT key, used_at FROM tiles"
+        ))
+        # Tiles which only GDAL has used count as used when written.
+        files.sort(key=lambda item: used.get(item[0]) or item[3])
+        target = limit * _TRIM_TARGET
+        removed = []  # type: List[Tuple[Text, Text]]
+        freed = 0
+        for key, path, size, _ in files:
+            if total - freed <= target:
+                break
+            removed.append((key, path))
+            freed += size
+        self._remove(removed)
+        return freed
+
+    def clear(self):
+        # type: () -> None
+        self._remove([(key, path) for key, path, _, _ in self._files()])
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM tiles")
+
+    def store_response(self, url, response, cached=None):
+        # type: (Text, Any, Optional[CachedTile]) -> Optional[bytes]
+        """Cache a tile response, returning the tile's data.
+
+        Returns None if the server has no image for the tile.
+
+        :arg cached:
+            The stale tile revalidated by the request, if any, so that a 304
+            response can be answered from it.
+        :raises TransferError:
+            if the response had an error status.
+        """
+        headers = response.headers
+        if response.status == 304 and cached is not None:
+            self.touch(url, ttl=max_age(headers, self.ttl))
+            return cached.data
+        data = tile_data(response)
+        ttl = max_age(headers, self.ttl)
+        if data is not None and ttl:
+            etags = headers[b"ETag"]
+            self.put(url, data, etag=etags[0] if etags else None, ttl=ttl)
+        return data
+
+    def gdal_cache_xml(self):
+        # type: () -> Text
+        """Cache element for a GDAL_WMS definition, to share this cache.
+
+        Unique is off, since otherwise GDAL would add a hash of the server
+        URL to the path, and the files wouldn't be where because looks.
+        """
+        return (
+            "<Cache>"
+            "<Type>file</Type>"
+            "<Path>{path}</Path>"
+            "<Depth>{depth}</Depth>"
+            "<Extension>{extension}</Extension>"
+            "<MaxSize>{max_size}</MaxSize>"
+            "<Unique>False</Unique>"
+            "</Cache>"
+        ).format(
+            path=_escape(self.tiles_path),
+            depth=self.depth,
+            extension=_escape(self.extension),
+            max_size=self.max_size,
+        )
+
+    def close(self):
+        # type: () -> None
+        """Close this thread's connection to the index, if it has one.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def _escape(text):
+    # type: (Text) -> Text
+    return (text.replace("&", "&amp;").replace("<", "&lt;")
+            .replace(">", "&gt;"))
+
+
+def _replace(source, destination):
+    # type: (Text, Text) -> None
+    """Rename a file over another, atomically where the platform can.
+    """
+    replace = getattr(os, "replace", None)
+    if replace is not None:
+        replace(source, destination)
+        return
+    try:
+        os.rename(source, destination)
+    except OSError:
+        # Python 2 on Windows won't rename over an existing file.
+        os.remove(destination)
+        os.rename(source, destination)
+
+
+__all__ = [
+    "CachedTile",
+    "DEFAULT_MAX_SIZE",
+    "DEFAULT_TTL",
+    "EMPTY_STATUSES",
+    "TileCache",
+    "conditional_headers",
+    "max_age",
+    "tile_data",
+]
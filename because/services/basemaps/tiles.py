@@ -0,0 +1,587 @@
+"""Tile math for XYZ basemaps: which tiles cover an area, and their URLs.
+
+Tiles are in the usual web map scheme: Web Mercator (EPSG:3857), 2 ** z by
+2 ** z tiles at zoom level z, with tile (0, 0) at the north-west corner. A
+tile is identified by an (x, y, z) tuple; plain tuples are used rather than
+objects so that millions of them can be enumerated quickly.
+
+The *_many functions take and return whole arrays of coordinates. Given NumPy
+arrays they use NumPy; otherwise they loop in Python over array('d') and
+array('l'), which is still much cheaper than making a tuple per point.
+"""
+import math
+import re
+from array import array
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Text,
+    Tuple,
+)
+from because.errors import InvalidObject
+
+EARTH_RADIUS = 6378137.0
+
+#: Half the width of the Web Mercator world, in metres.
+ORIGIN_SHIFT = math.pi * EARTH_RADIUS
+
+#: Latitude at which Web Mercator is cut off, making the world square.
+MAX_LATITUDE = 85.0511287798066
+
+_DEGREES = 180.0 / math.pi
+_RADIANS = math.pi / 180.0
+
+
+def lonlat_to_mercator(lon, lat):
+    # type: (float, float) -> Tuple[float, float]
+    """Convert WGS84 degrees to Web Mercator metres.
+    """
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = lon * _RADIANS * EARTH_RADIUS
+    y = math.log(math.tan(math.pi / 4 + lat * _RADIANS / 2)) * EARTH_RADIUS
+    return x, y
+
+
+def mercator_to_lonlat(x, y):
+    # type: (float, float) -> Tuple[float, float]
+    """Convert Web Mercator metres to WGS84 degrees.
+    """
+    lon = x / EARTH_RADIUS * _DEGREES
+    lat = (2 * math.atan(math.exp(y / EARTH_RADIUS)) - math.pi / 2) * _DEGREES
+    return lon, lat
+
+
+def _clamp_tile(value, size):
+    # type: (float, int) -> int
+    index = int(math.floor(value))
+    return 0 if index < 0 else size - 1 if index >= size else index
+
+
+def lonlat_to_tile(lon, lat, zoom):
+    # type: (float, float, int) -> Tuple[int, int]
+    """Get the x and y of the tile containing a point at a zoom level.
+
+    Points outside the Web Mercator world are put in the nearest tile.
+    """
+    size = 1 << zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat)) * _RADIANS
+    x = (lon + 180.0) / 360.0 * size
+    y = (1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) \
+        / 2.0 * size
+    return _clamp_tile(x, size), _clamp_tile(y, size)
+
+
+def tile_to_lonlat(x, y, zoom):
+    # type: (float, float, int) -> Tuple[float, float]
+    """Get the north-west corner of a tile in WGS84 degrees.
+
+    Fractional x and y give points within the tile; e.g. x + 0.5, y + 0.5
+    is its center.
+    """
+    size = float(1 << zoom)
+    lon = x / size * 360.0 - 180.0
+    lat = math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / size))) * _DEGREES
+    return lon, lat
+
+
+def tile_bounds(x, y, zoom):
+    # type: (int, int, int) -> Tuple[float, float, float, float]
+    """Get the (west, south, east, north) bounds of a tile in degrees.
+    """
+    west, north = tile_to_lonlat(x, y, zoom)
+    east, south = tile_to_lonlat(x + 1, y + 1, zoom)
+    return west, south, east, north
+
+
+def tile_bounds_mercator(x, y, zoom):
+    # type: (int, int, int) -> Tuple[float, float, float, float]
+    """Get the (x_min, y_min, x_max, y_max) bounds of a tile in metres.
+    """
+    span = 2 * ORIGIN_SHIFT / (1 << zoom)
+    x_min = x * span - ORIGIN_SHIFT
+    y_max = ORIGIN_SHIFT - y * span
+    return x_min, y_max - span, x_min + span, y_max
+
+
+def tile_to_quadkey(x, y, zoom):
+    # type: (int, int, int) -> str
+    """Get the Bing Maps quadkey of a tile.
+    """
+    digits = []
+    for level in range(zoom, 0, -1):
+        mask = 1 << (level - 1)
+        digits.append("0123"[(1 if x & mask else 0) + (2 if y & mask else 0)])
+    return "".join(digits)
+
+
+def quadkey_to_tile(quadkey):
+    # type: (Text) -> Tuple[int, int, int]
+    """Get the (x, y, z) of the tile with a Bing Maps quadkey.
+    """
+    x = y = 0
+    for digit in quadkey:
+        x <<= 1
+        y <<= 1
+        if digit in "13":
+            x |= 1
+        if digit in "23":
+            y |= 1
+        if digit not in "0123":
+            raise InvalidObject("invalid quadkey {0!r}".format(quadkey))
+    return x, y, len(quadkey)
+
+
+def _is_numpy(values):
+    # type: (Any) -> bool
+    return hasattr(values, "dtype") and hasattr(values, "shape")
+
+
+def lonlat_to_mercator_many(lons, lats):
+    # type: (Sequence[float], Sequence[float]) -> Tuple[Any, Any]
+    """Convert arrays of WGS84 degrees to arrays of Web Mercator metres.
+    """
+    if _is_numpy(lons):
+        import numpy
+        lats = numpy.clip(lats, -MAX_LATITUDE, MAX_LATITUDE)
+        return (
+            numpy.asarray(lons) * (_RADIANS * EARTH_RADIUS),
+            numpy.log(numpy.tan(math.pi / 4 + lats * (_RADIANS / 2))) *
+            EARTH_RADIUS,
+        )
+    log, tan = math.log, math.tan
+    scale = _RADIANS * EARTH_RADIUS
+    quarter, half = math.pi / 4, _RADIANS / 2
+    top, bottom = MAX_LATITUDE, -MAX_LATITUDE
+    xs = array("d", [lon * scale for lon in lons])
+    ys = array("d", [
+        log(tan(quarter + (
+            top if lat > top else bottom if lat < bottom else lat
+        ) * half)) * EARTH_RADIUS
+        for lat in lats
+    ])
+    return xs, ys
+
+
+def mercator_to_lonlat_many(xs, ys):
+    # type: (Sequence[float], Sequence[float]) -> Tuple[Any, Any]
+    """Convert arrays of Web Mercator metres to arrays of WGS84 degrees.
+    """
+    if _is_numpy(xs):
+        import numpy
+        return (
+            numpy.asarray(xs) * (_DEGREES / EARTH_RADIUS),
+            (2 * numpy.arctan(numpy.exp(numpy.asarray(ys) / EARTH_RADIUS)) -
+             math.pi / 2) * _DEGREES,
+        )
+    atan, exp = math.atan, math.exp
+    scale = _DEGREES / EARTH_RADIUS
+    half_pi = math.pi / 2
+    lons = array("d", [x * scale for x in xs])
+    lats = array("d", [
+        (2 * atan(exp(y / EARTH_RADIUS)) - half_pi) * _DEGREES for y in ys
+    ])
+    return lons, lats
+
+
+def lonlat_to_tile_many(lons, lats, zoom):
+    # type: (Sequence[float], Sequence[float], int) -> Tuple[Any, Any]
+    """Get arrays of the tile x and y containing each of arrays of points.
+    """
+    size = 1 << zoom
+    if _is_numpy(lons):
+        import numpy
+        lats = numpy.radians(numpy.clip(lats, -MAX_LATITUDE, MAX_LATITUDE))
+        xs = (numpy.asarray(lons) + 180.0) / 360.0 * size
+        ys = (1.0 - numpy.log(numpy.tan(lats) + 1.0 / numpy.cos(lats)) /
+              math.pi) / 2.0 * size
+        return (
+            numpy.clip(numpy.floor(xs), 0, size - 1).astype(numpy.int64),
+            numpy.clip(numpy.floor(ys), 0, size - 1).astype(numpy.int64),
+        )
+    log, tan, cos, floor = math.log, math.tan, math.cos, math.floor
+    last = size - 1
+    x_scale = size / 360.0
+    y_scale = size / 2.0
+    top, bottom = MAX_LATITUDE, -MAX_LATITUDE
+    xs = array("l", [int(floor((lon + 180.0) * x_scale)) for lon in lons])
+    ys = array("l")
+    for lat in lats:
+        lat = (top if lat > top else bottom if lat < bottom else lat) * \
+            _RADIANS
+        ys.append(int(floor(
+            (1.0 - log(tan(lat) + 1.0 / cos(lat)) / math.pi) * y_scale
+        )))
+    # Clamp points off the edges of the world onto its edge tiles.
+    for values in (xs, ys):
+        for index, value in enumerate(values):
+            if value < 0 or value > last:
+                values[index] = 0 if value < 0 else last
+    return xs, ys
+
+
+class TileRange(object):
+    """A rectangle of tiles at one zoom level, both corners included.
+    """
+    __slots__ = ("zoom", "x_min", "y_min", "x_max", "y_max")
+
+    def __init__(self, zoom, x_min, y_min, x_max, y_max):
+        # type: (int, int, int, int, int) -> None
+        self.zoom = zoom
+        self.x_min = x_min
+        self.y_min = y_min
+        self.x_max = x_max
+        self.y_max = y_max
+
+    @property
+    def width(self):
+        # type: () -> int
+        return max(0, self.x_max - self.x_min + 1)
+
+    @property
+    def height(self):
+        # type: () -> int
+        return max(0, self.y_max - self.y_min + 1)
+
+    def __len__(self):
+        # type: () -> int
+        return self.width * self.height
+
+    def __iter__(self):
+        # type: () -> Iterator[Tuple[int, int, int]]
+        """Yield (x, y, z) for each tile, row by row.
+        """
+        zoom = self.zoom
+        xs = range(self.x_min, self.x_max + 1)
+        for y in range(self.y_min, self.y_max + 1):
+            for x in xs:
+                yield x, y, zoom
+
+    def __contains__(self, tile):
+        # type: (Any) -> bool
+        x, y, zoom = tile
+        return (zoom == self.zoom and self.x_min <= x <= self.x_max and
+                self.y_min <= y <= self.y_max)
+
+    def __eq__(self, other):
+        # type: (Any) -> bool
+        if not isinstance(other, TileRange):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+        )
+
+    def __ne__(self, other):
+        # type: (Any) -> bool
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self):
+        # type: () -> str
+        return "TileRange(zoom={0}, x={1}..{2}, y={3}..{4})".format(
+            self.zoom, self.x_min, self.x_max, self.y_min, self.y_max,
+        )
+
+
+def bbox_to_tile_ranges(bbox, zoom):
+    # type: (Sequence[float], int) -> List[TileRange]
+    """Get the tiles covering a bounding box at a zoom level.
+
+    :arg bbox:
+        (west, south, east, north) in WGS84 degrees. If west is greater than
+        east, the box crosses the antimeridian, and two ranges are returned.
+    """
+    west, south, east, north = bbox
+    if south > north:
+        raise InvalidObject("bbox south {0} is north of its north {1}".format(
+            south, north,
+        ))
+    if west > east:
+        return (bbox_to_tile_ranges((west, south, 180.0, north), zoom) +
+                bbox_to_tile_ranges((-180.0, south, east, north), zoom))
+    x_min, y_min = lonlat_to_tile(west, north, zoom)
+    x_max, y_max = lonlat_to_tile(east, south, zoom)
+    # A box with an edge exactly on a tile edge doesn't need the tile beyond,
+    # though rounding may have put the edge in it.
+    if x_max > x_min and tile_to_lonlat(x_max, 0, zoom)[0] >= east:
+        x_max -= 1
+    if y_max > y_min and tile_to_lonlat(0, y_max, zoom)[1] <= south:
+        y_max -= 1
+    if x_min < x_max and tile_to_lonlat(x_min + 1, 0, zoom)[0] <= west:
+        x_min += 1
+    if y_min < y_max and tile_to_lonlat(0, y_min + 1, zoom)[1] >= north:
+        y_min += 1
+    return [TileRange(zoom, x_min, y_min, x_max, y_max)]
+
+
+def bbox_tiles(bbox, zooms):
+    # type: (Sequence[float], Iterable[int]) -> Iterator[Tuple[int, int, int]]
+    """Yield (x, y, z) for every tile covering a bbox at each zoom level.
+    """
+    for zoom in zooms:
+        for tile_range in bbox_to_tile_ranges(bbox, zoom):
+            for tile in tile_range:
+                yield tile
+
+
+def count_bbox_tiles(bbox, zooms):
+    # type: (Sequence[float], Iterable[int]) -> int
+    """Count the tiles bbox_tiles would yield, without enumerating them.
+    """
+    return sum(
+        len(tile_range)
+        for zoom in zooms for tile_range in bbox_to_tile_ranges(bbox, zoom)
+    )
+
+
+def zoom_for_resolution(resolution, tile_size=256, max_zoom=22):
+    # type: (float, int, int) -> int
+    """Get the zoom level whose tiles best suit a map's resolution.
+
+    :arg resolution:
+        Web Mercator metres per screen pixel.
+    :arg tile_size:
+        Width of a tile image, in pixels.
+    :arg max_zoom:
+        Highest zoom level to return, e.g. the basemap's deepest level.
+    """
+    if resolution <= 0:
+        raise InvalidObject("resolution must be positive")
+    zoom = math.log(2 * ORIGIN_SHIFT / (tile_size * resolution), 2)
+    return max(0, min(max_zoom, int(math.floor(zoom + 0.5))))
+
+
+def center_out(tiles, lon, lat):
+    # type: (Iterable[Tuple[int, int, int]], float, float) -> List[Tuple[int, int, int]]
+    """Sort (x, y, z) tiles nearest first to a point, e.g. a map's centre.
+
+    Distances are measured between tile centres in tile units at each tile's
+    own zoom level, so that ties are broken the same way at every zoom, and
+    across the antimeridian where that is shorter.
+    """
+    world_x, world_y = _world_point(lon, lat)
+
+    def distance(tile):
+        # type: (Tuple[int, int, int]) -> Tuple[float, int, int, int]
+        x, y, zoom = tile
+        size = float(1 << zoom)
+        dx = abs(x + 0.5 - world_x * size)
+        dx = min(dx, size - dx)
+        dy = y + 0.5 - world_y * size
+        return dx * dx + dy * dy, zoom, y, x
+
+    return sorted(tiles, key=distance)
+
+
+def _world_point(lon, lat):
+    # type: (float, float) -> Tuple[float, float]
+    """Web Mercator position in units of the zoom 0 tile, from 0 to 1.
+    """
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat)) * _RADIANS
+    return ((lon + 180.0) / 360.0,
+            (1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) /
+            2.0)
+
+
+def _segment_hits_box(edge, x0, y0, x1, y1):
+    # type: (Tuple[float, float, float, float], float, float, float, float) -> bool
+    """Whether a segment touches a box, by Liang-Barsky clipping.
+    """
+    ax, ay, bx, by = edge
+    dx, dy = bx - ax, by - ay
+    low, high = 0.0, 1.0
+    for p, q in ((-dx, ax - x0), (dx, x1 - ax), (-dy, ay - y0), (dy, y1 - ay)):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            if t > high:
+                return False
+            if t > low:
+                low = t
+        else:
+            if t < low:
+                return False
+            if t < high:
+                high = t
+    return True
+
+
+def _contains(edges, x, y):
+    # type: (List[Tuple[float, float, float, float]], float, float) -> bool
+    """Whether a point is inside the rings made by edges, even-odd rule.
+    """
+    inside = False
+    for ax, ay, bx, by in edges:
+        if (ay > y) != (by > y) and x < (bx - ax) * (y - ay) / (by - ay) + ax:
+            inside = not inside
+    return inside
+
+
+def polygon_tiles(rings, zooms):
+    # type: (Sequence[Sequence[Sequence[float]]], Iterable[int]) -> Iterator[Tuple[int, int, int]]
+    """Yield (x, y, z) for every tile touching a polygon at each zoom level.
+
+    Tiles are found by descending from zoom 0, only splitting tiles which
+    an edge of the polygon crosses, so the cost grows with the polygon's
+    outline rather than its area. Tiles wholly inside are yielded in ranges.
+
+    :arg rings:
+        The polygon as GeoJSON Polygon coordinates: a list of rings of
+        [lon, lat] points, the first the outside and any others holes.
+    """
+    edges = []  # type: List[Tuple[float, float, float, float]]
+    for ring in rings:
+        points = [_world_point(point[0], point[1]) for point in ring]
+        if len(points) < 3:
+            raise InvalidObject("polygon ring has fewer than 3 points")
+        for (ax, ay), (bx, by) in zip(points, points[1:] + points[:1]):
+            if (ax, ay) != (bx, by):
+                edges.append((ax, ay, bx, by))
+    for zoom in zooms:
+        stack = [(0, 0, 0, edges)]
+        while stack:
+            level, x, y, candidates = stack.pop()
+            scale = float(1 << level)
+            # Shrink the tile a little, so an edge along its border (as for
+            # a polygon following a meridian) doesn't count as crossing it.
+            margin = 1e-9 / scale
+            x0, y0 = x / scale + margin, y / scale + margin
+            x1, y1 = (x + 1) / scale - margin, (y + 1) / scale - margin
+            crossing = [
+                edge for edge in candidates
+                if _segment_hits_box(edge, x0, y0, x1, y1)
+            ]
+            if not crossing:
+                if _contains(edges, (x0 + x1) / 2, (y0 + y1) / 2):
+                    shift = zoom - level
+                    for tile in TileRange(
+                            zoom, x << shift, y << shift,
+                            ((x + 1) << shift) - 1, ((y + 1) << shift) - 1):
+                        yield tile
+                continue
+            if level == zoom:
+                yield x, y, zoom
+                continue
+            x, y, level = 2 * x, 2 * y, level + 1
+            for child_y in (y + 1, y):
+                for child_x in (x + 1, x):
+                    stack.append((level, child_x, child_y, crossing))
+
+
+# A parameter in a Basemap URL, as checked by Basemap: "{x}" or "{-y}".
+_PARAMETER = re.compile(r"{(-?)([a-zA-Z_]+)}")
+
+
+class TileURLTemplate(object):
+    """A Basemap URL template, compiled to fill in quickly for many tiles.
+
+    Understands {x}, {y} and {z}, {-y} for TMS-style rows counted from the
+    south, and {quadkey}.
+    """
+
+    def __init__(self, template):
+        # type: (Text) -> None
+        self.template = template
+        parts = []  # type: List[Text]
+        self._fields = []  # type: List[Text]
+        position = 0
+        for match in _PARAMETER.finditer(template):
+            flip, name = match.groups()
+            field = "-" + name if flip else name
+            if field not in ("x", "y", "-y", "z", "quadkey"):
+                raise InvalidObject(
+                    "unknown parameter {0!r} in tile URL template".format(
+                        match.group(0),
+                    )
+                )
+            parts.append(_escape(template[position:match.start()]))
+            parts.append("{" + str(len(self._fields)) + "}")
+            self._fields.append(field)
+            position = match.end()
+        parts.append(_escape(template[position:]))
+        self._format = "".join(parts).format
+        self._simple = self._fields == [
+            field for field in self._fields if field in ("x", "y", "z")
+        ]
+
+    def _values(self, x, y, zoom):
+        # type: (int, int, int) -> List[Any]
+        values = []  # type: List[Any]
+        for field in self._fields:
+            if field == "x":
+                values.append(x)
+            elif field == "y":
+                values.append(y)
+            elif field == "-y":
+                values.append((1 << zoom) - 1 - y)
+            elif field == "z":
+                values.append(zoom)
+            else:
+                values.append(tile_to_quadkey(x, y, zoom))
+        return values
+
+    def url(self, x, y, zoom):
+        # type: (int, int, int) -> Text
+        return self._format(*self._values(x, y, zoom))
+
+    def urls(self, tiles):
+        # type: (Iterable[Tuple[int, int, int]]) -> Iterator[Text]
+        """Yield the URL of each (x, y, z) tile.
+        """
+        if not self._simple:
+            for x, y, zoom in tiles:
+                yield self._format(*self._values(x, y, zoom))
+            return
+        # Plain x, y and z: map each straight to its tuple position.
+        positions = [{"x": 0, "y": 1, "z": 2}[field] for field in self._fields]
+        fill = self._format
+        if positions == [0, 1, 2]:
+            for tile in tiles:
+                yield fill(*tile)
+        elif positions == [2, 0, 1]:
+            for x, y, zoom in tiles:
+                yield fill(zoom, x, y)
+        else:
+            for tile in tiles:
+                yield fill(*[tile[position] for position in positions])
+
+
+def _escape(text):
+    # type: (Text) -> Text
+    """Escape literal text for use in a str.format template.
+    """
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+__all__ = [
+    "EARTH_RADIUS",
+    "MAX_LATITUDE",
+    "ORIGIN_SHIFT",
+    "TileRange",
+    "TileURLTemplate",
+    "bbox_tiles",
+    "bbox_to_tile_ranges",
+    "center_out",
+    "count_bbox_tiles",
+    "lonlat_to_mercator",
+    "lonlat_to_mercator_many",
+    "lonlat_to_tile",
+    "lonlat_to_tile_many",
+    "mercator_to_lonlat",
+    "mercator_to_lonlat_many",
+    "polygon_tiles",
+    "quadkey_to_tile",
+    "tile_bounds",
+    "tile_bounds_mercator",
+    "tile_to_lonlat",
+    "tile_to_quadkey",
+    "zoom_for_resolution",
+]
@@ -0,0 +1,656 @@
+"""Decode Mapbox Vector Tiles, as served by PBF basemaps.
+
+A vector tile is a protocol buffers message holding layers, each holding
+features with properties and a geometry in tile pixel coordinates. This
+decodes it without a protobuf library or any GIS stack, and lazily:
+
+* VectorTile only notes where each layer's bytes are. A layer is decoded
+  when first asked for, so a tile with twenty layers costs little when only
+  "roads" is wanted.
+* A Layer decodes its names, keys and values, and notes where each feature's
+  bytes are. Iterating over it decodes one Feature at a time.
+* A Feature decodes its properties and geometry only when they are used.
+  Layer.where() filters on properties without decoding them at all.
+
+Geometries are decoded from the tile's drawing commands into one flat
+array('i') of x, y, x, y... per feature, plus the offsets at which each
+line or ring starts, rather than a list per vertex.
+
+If NumPy is installed, long geometries are decoded with it, several times
+faster than in Python; the results are the same arrays either way.
+"""
+import struct
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Text,
+    Tuple,
+)
+from because.errors import ParseError
+from because.services.basemaps.tiles import tile_bounds_mercator, mercator_to_lonlat_many
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
+
+#: Feature geometry types, as numbered in the vector tile spec.
+UNKNOWN, POINT, LINESTRING, POLYGON = 0, 1, 2, 3
+
+GEOMETRY_TYPES = {
+    UNKNOWN: "Unknown",
+    POINT: "Point",
+    LINESTRING: "LineString",
+    POLYGON: "Polygon",
+}
+
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+# Geometries with at least this many integers are decoded with NumPy, when
+# it's available; for shorter ones its overhead outweighs what it saves.
+NUMPY_THRESHOLD = 256
+
+_FLOAT = struct.Struct("<f")
+_DOUBLE = struct.Struct("<d")
+
+
+def _varint(buf, pos):
+    # type: (bytearray, int) -> Tuple[int, int]
+    """Read a varint at pos, returning (value, position after it).
+    """
+    byte = buf[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    result = byte & 0x7f
+    shift = 7
+    pos += 1
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf, pos, end):
+    # type: (bytearray, int, int) -> Iterator[Tuple[int, int, Any]]
+    """Yield (field number, wire type, value) for a message's fields.
+
+    The value is an int for varints, (start, end) for length-delimited
+    fields, and the offset of the bytes for fixed 32 and 64 bit fields.
+    """
+    try:
+        while pos < end:
+            key, pos = _varint(buf, pos)
+            number, wire = key >> 3, key & 7
+            if wire == 0:
+                value, pos = _varint(buf, pos)
+                yield number, wire, value
+            elif wire == 2:
+                length, pos = _varint(buf, pos)
+                if pos + length > end:
+                    raise ParseError("vector tile field overruns its message")
+                yield number, wire, (pos, pos + length)
+                pos += length
+            elif wire == 5 or wire == 1:
+                size = 4 if wire == 5 else 8
+                if pos + size > end:
+                    raise ParseError("vector tile field overruns its message")
+                yield number, wire, pos
+                pos += size
+            else:
+                raise ParseError(
+                    "unsupported protobuf wire type {0}".format(wire)
+                )
+    except IndexError as error:
+        raise ParseError("truncated vector tile", error=error)
+    if pos != end:
+        raise ParseError("truncated vector tile")
+
+
+def _packed(buf, start, end):
+    # type: (bytearray, int, int) -> array
+    """Decode a packed repeated uint32 field into array('I').
+    """
+    values = array("I")
+    append = values.append
+    pos = start
+    try:
+        while pos < end:
+            byte = buf[pos]
+            if byte < 0x80:
+                append(byte)
+                pos += 1
+            else:
+                value, pos = _varint(buf, pos)
+                append(value)
+    except IndexError as error:
+        raise ParseError("truncated vector tile", error=error)
+    return values
+
+
+def _packed_numpy(buf, start, end):
+    # type: (bytearray, int, int) -> Any
+    """Decode a packed repeated uint32 field into a NumPy array.
+
+    Each varint ends with the first byte below 0x80, so the ends of all of
+    them can be found at once, and their 7-bit groups shifted and summed.
+    """
+    data = numpy.frombuffer(buf, dtype=numpy.uint8, count=end - start,
+                            offset=start)
+    ends = numpy.flatnonzero(data < 0x80)
+    if not len(ends) or ends[-1] != len(data) - 1:
+        raise ParseError("truncated vector tile")
+    starts = numpy.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    if lengths.max() > 5:
+        raise ParseError("vector tile varint is too long for uint32")
+    shifts = (numpy.arange(len(data)) - numpy.repeat(starts, lengths)) * 7
+    groups = (data & 0x7f).astype(numpy.uint64) << shifts.astype(numpy.uint64)
+    return numpy.add.reduceat(groups, starts).astype(numpy.uint32)
+
+
+def _zigzag(value):
+    # type: (int) -> int
+    return (value >> 1) ^ -(value & 1)
+
+
+def _commands(integers):
+    # type: (Any) -> Iterator[Tuple[int, int, int]]
+    """Yield (command, count, index of first parameter) for a geometry.
+    """
+    size = len(integers)
+    index = 0
+    while index < size:
+        integer = int(integers[index])
+        command, count = integer & 0x7, integer >> 3
+        index += 1
+        if command == _CLOSE_PATH:
+            yield command, count, index
+            continue
+        if command not in (_MOVE_TO, _LINE_TO):
+            raise ParseError(
+                "unknown vector tile geometry command {0}".format(command)
+            )
+        if index + 2 * count > size:
+            raise ParseError("vector tile geometry is truncated")
+        yield command, count, index
+        index += 2 * count
+
+
+def decode_geometry(integers):
+    # type: (Any) -> Tuple[array, array]
+    """Decode geometry commands into (coordinates, parts).
+
+    :arg integers:
+        The feature's geometry field, as a sequence of uint32.
+    :returns:
+        coordinates, an array('i') of x, y, x, y... in tile pixels, and
+        parts, an array('i') of the vertex index at which each line, ring or
+        point group starts, with the total vertex count at the end.
+    """
+    if numpy is not None and isinstance(integers, numpy.ndarray):
+        return _decode_geometry_numpy(integers)
+    coordinates = array("i")
+    parts = array("i")
+    append = coordinates.append
+    x = y = 0
+    for command, count, index in _commands(integers):
+        if command == _CLOSE_PATH:
+            continue
+        if command == _MOVE_TO:
+            parts.append(len(coordinates) // 2)
+        for i in range(index, index + 2 * count, 2):
+            dx, dy = integers[i], integers[i + 1]
+            x += (dx >> 1) ^ -(dx & 1)
+            y += (dy >> 1) ^ -(dy & 1)
+            append(x)
+            append(y)
+    parts.append(len(coordinates) // 2)
+    return coordinates, parts
+
+
+def _decode_geometry_numpy(integers):
+    # type: (Any) -> Tuple[array, array]
+    """decode_geometry() for a NumPy array, with one Python step per command.
+    """
+    pieces = []
+    parts = array("i")
+    vertices = 0
+    for command, count, index in _commands(integers):
+        if command == _CLOSE_PATH:
+            continue
+        if command == _MOVE_TO:
+            parts.append(vertices)
+        pieces.append(integers[index:index + 2 * count])
+        vertices += count
+    parts.append(vertices)
+    if not pieces:
+        return array("i"), parts
+    deltas = numpy.concatenate(pieces).astype(numpy.int64)
+    deltas = (deltas >> 1) ^ -(deltas & 1)
+    # The cursor carries on from one command to the next, so positions are
+    # running totals of x deltas and of y deltas over the whole feature.
+    positions = numpy.empty_like(deltas)
+    numpy.cumsum(deltas[0::2], out=positions[0::2])
+    numpy.cumsum(deltas[1::2], out=positions[1::2])
+    coordinates = array("i")
+    data = positions.astype(numpy.int32).tobytes()
+    if hasattr(coordinates, "frombytes"):
+        coordinates.frombytes(data)
+    else:
+        coordinates.fromstring(data)
+    return coordinates, parts
+
+
+def _ring_area(coordinates, start, stop):
+    # type: (array, int, int) -> float
+    """Twice the signed area of a ring of vertices, by the shoelace formula.
+    """
+    area = 0
+    last = stop - 1
+    for vertex in range(start, stop):
+        x0, y0 = coordinates[2 * last], coordinates[2 * last + 1]
+        x1, y1 = coordinates[2 * vertex], coordinates[2 * vertex + 1]
+        area += x0 * y1 - x1 * y0
+        last = vertex
+    return area
+
+
+class Geometry(object):
+    """A feature's geometry, in tile pixel coordinates.
+    """
+    __slots__ = ("type", "coordinates", "parts")
+
+    def __init__(self, geometry_type, coordinates, parts):
+        # type: (int, array, array) -> None
+        """
+        :arg geometry_type:
+            One of POINT, LINESTRING, POLYGON or UNKNOWN.
+        :arg coordinates:
+            array('i') of x, y, x, y...
+        :arg parts:
+            array('i') of vertex indexes at which each part starts, then the
+            vertex count.
+        """
+        self.type = geometry_type
+        self.coordinates = coordinates
+        self.parts = parts
+
+    def __len__(self):
+        # type: () -> int
+        """Count the vertices.
+        """
+        return len(self.coordinates) // 2
+
+    def part_ranges(self):
+        # type: () -> List[Tuple[int, int]]
+        """List (start, stop) vertex ranges of each line, ring or points.
+        """
+        parts = self.parts
+        return [(parts[i], parts[i + 1]) for i in range(len(parts) - 1)]
+
+    def polygons(self):
+        # type: () -> List[List[Tuple[int, int]]]
+        """Group rings into polygons, each a list of (start, stop) ranges.
+
+        Per the spec, each exterior ring (positive area, with y down) starts
+        a polygon, and the interior rings after it are its holes.
+        """
+        polygons = []  # type: List[List[Tuple[int, int]]]
+        for start, stop in self.part_ranges():
+            area = _ring_area(self.coordinates, start, stop)
+            if area > 0 or not polygons:
+                polygons.append([(start, stop)])
+            elif area < 0:
+                polygons[-1].append((start, stop))
+            # Rings with no area are dropped, as the spec allows.
+        return polygons
+
+    def to_geojson(self, tile=None, extent=4096):
+        # type: (Optional[Tuple[int, int, int]], int) -> Dict[Text, Any]
+        """Make a GeoJSON geometry dict.
+
+        :arg tile:
+            Optional. The (x, y, z) of the tile, to give coordinates in WGS84
+            degrees. Otherwise they are in tile pixels.
+        :arg extent:
+            The layer's extent: pixels across the tile.
+        """
+        if tile is None:
+            values = self.coordinates
+            xs, ys = values[0::2], values[1::2]
+        else:
+            x_min, _, x_max, y_max = tile_bounds_mercator(*tile)
+            scale = (x_max - x_min) / extent
+            values = self.coordinates
+            xs, ys = mercator_to_lonlat_many(
+                [x_min + x * scale for x in values[0::2]],
+                [y_max - y * scale for y in values[1::2]],
+            )
+
+        def points(start, stop, close=False):
+            result = [[xs[i], ys[i]] for i in range(start, stop)]
+            if close and result:
+                result.append(result[0])
+            return result
+
+        ranges = self.part_ranges()
+        if self.type == POINT:
+            flat = points(0, len(self))
+            if len(flat) == 1:
+                return {"type": "Point", "coordinates": flat[0]}
+            return {"type": "MultiPoint", "coordinates": flat}
+        if self.type == LINESTRING:
+            lines = [points(start, stop) for start, stop in ranges]
+            if len(lines) == 1:
+                return {"type": "LineString", "coordinates": lines[0]}
+            return {"type": "MultiLineString", "coordinates": lines}
+        if self.type == POLYGON:
+            polygons = [
+                [points(start, stop, close=True) for start, stop in rings]
+                for rings in self.polygons()
+            ]
+            if len(polygons) == 1:
+                return {"type": "Polygon", "coordinates": polygons[0]}
+            return {"type": "MultiPolygon", "coordinates": polygons}
+        raise ParseError("can't make GeoJSON of an unknown geometry type")
+
+
+class Feature(object):
+    """One feature of a vector tile layer, decoded as it is used.
+    """
+    __slots__ = ("layer", "id", "type", "_tags", "_geometry", "_decoded")
+
+    def __init__(self, layer, feature_id, geometry_type, tags, geometry):
+        # type: (Layer, Optional[int], int, Tuple[int, int], Tuple[int, int]) -> None
+        self.layer = layer
+        #: The feature's id, or None if it has none.
+        self.id = feature_id
+        #: One of POINT, LINESTRING, POLYGON or UNKNOWN.
+        self.type = geometry_type
+        # (start, end) of the packed fields in the tile's buffer.
+        self._tags = tags
+        self._geometry = geometry
+        self._decoded = None  # type: Optional[Geometry]
+
+    def tag_ids(self):
+        # type: () -> array
+        """Indexes into the layer's keys and values, alternately.
+        """
+        return _packed(self.layer._buf, *self._tags)
+
+    @property
+    def properties(self):
+        # type: () -> Dict[Text, Any]
+        tags = self.tag_ids()
+        keys, values = self.layer.keys, self.layer.values
+        try:
+            return dict(
+                (keys[tags[i]], values[tags[i + 1]])
+                for i in range(0, len(tags) - 1, 2)
+            )
+        except IndexError as error:
+            raise ParseError("vector tile tag out of range", error=error)
+
+    @property
+    def geometry(self):
+        # type: () -> Geometry
+        if self._decoded is None:
+            buf = self.layer._buf
+            start, end = self._geometry
+            if numpy is not None and end - start >= NUMPY_THRESHOLD:
+                integers = _packed_numpy(buf, start, end)
+            else:
+                integers = _packed(buf, start, end)
+            coordinates, parts = decode_geometry(integers)
+            self._decoded = Geometry(self.type, coordinates, parts)
+        return self._decoded
+
+    def to_geojson(self, tile=None):
+        # type: (Optional[Tuple[int, int, int]]) -> Dict[Text, Any]
+        """Make a GeoJSON Feature dict.
+
+        :arg tile:
+            Optional. The (x, y, z) of the tile, to give coordinates in WGS84
+            degrees rather than tile pixels.
+        """
+        feature = {
+            "type": "Feature",
+            "geometry": self.geometry.to_geojson(tile, self.layer.extent),
+            "properties": self.properties,
+        }  # type: Dict[Text, Any]
+        if self.id is not None:
+            feature["id"] = self.id
+        return feature
+
+    def __repr__(self):
+        # type: () -> str
+        return "<Feature {0} id={1!r} in {2!r}>".format(
+            GEOMETRY_TYPES.get(self.type, self.type), self.id, self.layer.name,
+        )
+
+
+def _decode_value(buf, start, end):
+    # type: (bytearray, int, int) -> Any
+    value = None
+    for number, wire, field in _fields(buf, start, end):
+        if number == 1 and wire == 2:
+            value = bytes(buf[field[0]:field[1]]).decode("utf-8")
+        elif number == 2 and wire == 5:
+            value = _FLOAT.unpack_from(buf, field)[0]
+        elif number == 3 and wire == 1:
+            value = _DOUBLE.unpack_from(buf, field)[0]
+        elif number == 4 and wire == 0:
+            # int64 is two's complement in 64 bits.
+            value = field - (1 << 64) if field >= 1 << 63 else field
+        elif number == 5 and wire == 0:
+            value = field
+        elif number == 6 and wire == 0:
+            value = _zigzag(field)
+        elif number == 7 and wire == 0:
+            value = bool(field)
+    return value
+
+
+class Layer(object):
+    """One layer of a vector tile.
+
+    Its names, keys and values are decoded up front; features are decoded
+    one at a time as they are iterated over.
+    """
+
+    def __init__(self, buf, start, end):
+        # type: (bytearray, int, int) -> None
+        self._buf = buf
+        self.name = u""
+        self.version = 1
+        #: Pixels across the tile, in feature coordinates.
+        self.extent = 4096
+        self.keys = []  # type: List[Text]
+        self.values = []  # type: List[Any]
+        # Offsets of each feature's message in buf: start, end, start...
+        self._features = array("l")
+        for number, wire, field in _fields(buf, start, end):
+            if number == 1 and wire == 2:
+                self.name = bytes(buf[field[0]:field[1]]).decode("utf-8")
+            elif number == 2 and wire == 2:
+                self._features.extend(field)
+            elif number == 3 and wire == 2:
+                self.keys.append(
+                    bytes(buf[field[0]:field[1]]).decode("utf-8")
+                )
+            elif number == 4 and wire == 2:
+                self.values.append(_decode_value(buf, *field))
+            elif number == 5 and wire == 0:
+                self.extent = field
+            elif number == 15 and wire == 0:
+                self.version = field
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._features) // 2
+
+    def __iter__(self):
+        # type: () -> Iterator[Feature]
+        offsets = self._features
+        for i in range(0, len(offsets), 2):
+            yield self._feature(offsets[i], offsets[i + 1])
+
+    def __getitem__(self, index):
+        # type: (int) -> Feature
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("feature index out of range")
+        return self._feature(
+            self._features[2 * index], self._features[2 * index + 1],
+        )
+
+    def _feature(self, start, end):
+        # type: (int, int) -> Feature
+        feature_id = None
+        geometry_type = UNKNOWN
+        tags = geometry = (start, start)
+        for number, wire, field in _fields(self._buf, start, end):
+            if number == 1 and wire == 0:
+                feature_id = field
+            elif number == 2 and wire == 2:
+                tags = field
+            elif number == 3 and wire == 0:
+                geometry_type = field
+            elif number == 4 and wire == 2:
+                geometry = field
+        return Feature(self, feature_id, geometry_type, tags, geometry)
+
+    def where(self, **properties):
+        # type: (**Any) -> Iterator[Feature]
+        """Yield the features whose properties have all the given values.
+
+        Matching compares key and value indexes in each feature's tags, so
+        features which don't match are never decoded.
+        """
+        wanted = []  # type: List[Tuple[int, set]]
+        for key, value in properties.items():
+            if key not in self.keys:
+                return
+            indexes = set(
+                i for i, other in enumerate(self.values)
+                if other == value and
+                isinstance(other, bool) == isinstance(value, bool)
+            )
+            if not indexes:
+                return
+            wanted.append((self.keys.index(key), indexes))
+        for feature in self:
+            tags = feature.tag_ids()
+            found = dict(
+                (tags[i], tags[i + 1]) for i in range(0, len(tags) - 1, 2)
+            )
+            if all(found.get(key) in indexes for key, indexes in wanted):
+                yield feature
+
+    def __repr__(self):
+        # type: () -> str
+        return "<Layer {0!r} with {1} features>".format(self.name, len(self))
+
+
+class VectorTile(object):
+    """A decoded Mapbox Vector Tile, whose layers are decoded on demand.
+    """
+
+    def __init__(self, data):
+        # type: (bytes) -> None
+        """
+        :arg data:
+            The tile, as bytes. Tiles are often stored gzipped, and served
+            that way without a Content-Encoding header, so gzipped data is
+            decompressed.
+        """
+        if data[:2] == b"\x1f\x8b":
+            try:
+                data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+            except zlib.error as error:
+                raise ParseError("corrupt gzipped vector tile", error=error)
+        # bytearray indexes to ints in Python 2 as well as 3.
+        self._buf = bytearray(data)
+        self._offsets = OrderedDict()  # type: OrderedDict
+        self._layers = {}  # type: Dict[Text, Layer]
+        buf = self._buf
+        for number, wire, field in _fields(buf, 0, len(buf)):
+            if number != 3 or wire != 2:
+                continue
+            # Find just the layer's name, which is usually its first field.
+            for inner, inner_wire, value in _fields(buf, *field):
+                if inner == 1 and inner_wire == 2:
+                    name = bytes(buf[value[0]:value[1]]).decode("utf-8")
+                    self._offsets[name] = field
+                    break
+
+    @property
+    def names(self):
+        # type: () -> List[Text]
+        """Names of the layers, in the order they are in the tile.
+        """
+        return list(self._offsets)
+
+    def __contains__(self, name):
+        # type: (Text) -> bool
+        return name in self._offsets
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._offsets)
+
+    def __iter__(self):
+        # type: () -> Iterator[Layer]
+        for name in self._offsets:
+            yield self[name]
+
+    def __getitem__(self, name):
+        # type: (Text) -> Layer
+        layer = self._layers.get(name)
+        if layer is None:
+            start, end = self._offsets[name]
+            layer = self._layers[name] = Layer(self._buf, start, end)
+        return layer
+
+    def get(self, name):
+        # type: (Text) -> Optional[Layer]
+        return self[name] if name in self._offsets else None
+
+    def features(self, layers=None):
+        # type: (Optional[List[Text]]) -> Iterator[Feature]
+        """Yield features one at a time, from all layers or the named ones.
+        """
+        for name in (self.names if layers is None else layers):
+            if name in self._offsets:
+                for feature in self[name]:
+                    yield feature
+
+    def __repr__(self):
+        # type: () -> str
+        return "<VectorTile with layers {0!r}>".format(self.names)
+
+
+__all__ = [
+    "Feature",
+    "GEOMETRY_TYPES",
+    "Geometry",
+    "LINESTRING",
+    "Layer",
+    "POINT",
+    "POLYGON",
+    "UNKNOWN",
+    "VectorTile",
+    "decode_geometry",
+]
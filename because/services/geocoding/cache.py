@@ -0,0 +1,182 @@
+"""Cache forward geocoding results under normalized address keys.
+
+The same address tends to be written many ways: "1600 Pennsylvania Ave.,
+Washington DC" and "1600  PENNSYLVANIA AVE WASHINGTON, DC" should not cost two
+upstream calls. So addresses are normalized before being used as keys: unicode
+is folded to a compatible form with accents removed, case is folded,
+punctuation becomes whitespace and runs of whitespace are collapsed.
+
+Results are cached per provider, since e.g. mapbox and mapzen give different
+candidates for the same address.
+
+Empty results are cached too ("negative caching"), but with a shorter
+time-to-live, since they are more likely to be fixed upstream.
+"""
+import json
+import time
+import unicodedata
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+    Text,
+)
+from because import json_backends
+from because.cache import LRUCache, SQLiteCache, MISSING
+from . candidate import Candidate
+
+#: Default time-to-live for cached candidates: 30 days.
+DEFAULT_TTL = 30 * 24 * 60 * 60.0
+
+#: Default time-to-live for cached empty results: 1 day.
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60.0
+
+# Order of Candidate attributes in the compact tuple form.
+_FIELDS = ("x", "y", "address", "score", "source")
+
+
+def normalize_address(address):
+    # type: (Any) -> Text
+    """Reduce an address to a canonical form for use in cache keys.
+    """
+    if isinstance(address, bytes):
+        address = address.decode("utf-8")
+    decomposed = unicodedata.normalize("NFKD", address)
+    folded = []
+    for char in decomposed:
+        category = unicodedata.category(char)
+        if category == "Mn":
+            # Combining mark, e.g. an accent split off by NFKD.
+            continue
+        if category[0] in ("P", "S", "Z", "C"):
+            # Punctuation, symbols, separators and control characters.
+            folded.append(u" ")
+        else:
+            folded.append(char)
+    text = u"".join(folded)
+    # casefold() is more thorough than lower(), but Python 2 lacks it. Of
+    # what lower() misses, only sharp s is common in addresses.
+    if hasattr(text, "casefold"):
+        text = text.casefold()
+    else:
+        text = text.lower().replace(u"\xdf", u"ss")
+    return u" ".join(text.split())
+
+
+def cache_key(address, service):
+    # type: (Any, Text) -> Text
+    """Make the cache key for an address geocoded by the given provider.
+    """
+    return u"{0}:{1}".format(service, normalize_address(address))
+
+
+def candidates_to_tuples(candidates):
+    # type: (List[Candidate]) -> tuple
+    """Convert Candidates to a tuple of plain tuples, which is much smaller.
+    """
+    return tuple(
+        tuple(getattr(candidate, field) for field in _FIELDS)
+        for candidate in candidates
+    )
+
+
+def tuples_to_candidates(tuples):
+    # type: (tuple) -> List[Candidate]
+    """Make fresh Candidate instances from the compact tuple form.
+    """
+    return [Candidate(*values) for values in tuples]
+
+
+def encode_candidates(tuples):
+    # type: (tuple) -> bytes
+    """Serialize the compact tuple form for the disk tier.
+    """
+    return json.dumps(tuples, separators=(",", ":")).encode("utf-8")
+
+
+def decode_candidates(blob):
+    # type: (bytes) -> tuple
+    """Deserialize the compact tuple form from the disk tier.
+    """
+    return tuple(tuple(values) for values in json_backends.loads(blob))
+
+
+class GeocodeCache(object):
+    """Two-tier cache of forward geocoding results.
+
+    An in-memory LRU tier is always used. If a path is given, an SQLite tier
+    on disk sits behind it, so results survive across runs and can be shared
+    by several processes.
+
+    Callers get fresh Candidate instances from each get(), so changing them
+    doesn't affect the cache.
+    """
+
+    def __init__(
+            self,
+            path=None,                          # type: Optional[Text]
+            max_size=100000,                    # type: int
+            ttl=DEFAULT_TTL,                    # type: float
+            negative_ttl=DEFAULT_NEGATIVE_TTL,  # type: float
+            clock=None,                         # type: Optional[Callable[[], float]]
+    ):
+        # type: (...) -> None
+        """
+        :arg path:
+            Optional. Path of an SQLite database for the disk tier.
+        :arg max_size:
+            Maximum number of addresses held in memory.
+        :arg ttl:
+            Seconds to keep results with at least one candidate.
+        :arg negative_ttl:
+            Seconds to keep empty results.
+        :arg clock:
+            Optional. Function returning the current time in seconds.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock or time.time
+        self.memory = LRUCache(max_size=max_size, clock=self._clock)
+        self.disk = None  # type: Optional[SQLiteCache]
+        if path:
+            self.disk = SQLiteCache(path, table="geocode", clock=self._clock)
+
+    def get(self, address, service):
+        # type: (Any, Text) -> Optional[List[Candidate]]
+        """Get cached candidates for an address, or None on a miss.
+
+        An empty list is a hit: the address is known to have no candidates.
+        """
+        key = cache_key(address, service)
+        tuples = self.memory.get(key, MISSING)
+        if tuples is MISSING and self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                blob, expires_at = entry
+                tuples = decode_candidates(blob)
+                ttl = None if expires_at is None else expires_at - self._clock()
+                self.memory.set(key, tuples, ttl=ttl)
+        if tuples is MISSING:
+            return None
+        return tuples_to_candidates(tuples)
+
+    def set(self, address, service, candidates):
+        # type: (Any, Text, List[Candidate]) -> None
+        """Store the candidates found for an address.
+        """
+        key = cache_key(address, service)
+        tuples = candidates_to_tuples(candidates)
+        ttl = self.ttl if tuples else self.negative_ttl
+        self.memory.set(key, tuples, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, encode_candidates(tuples), ttl=ttl)
+
+    def clear(self):
+        # type: () -> None
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+__all__ = ["GeocodeCache", "cache_key", "normalize_address"]
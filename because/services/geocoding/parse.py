@@ -1,5 +1,10 @@
+from because.json_stream import stream_json
 from because.response import parse_json
-from because.errors import ParseError
+from because.errors import (
+    ParseError,
+    EndpointUnavailable,
+    UNAVAILABLE_STATUSES,
+)
 from . candidate import Candidate
 
 
@@ -49,6 +54,23 @@ def parse_forward_geocodes(response):
     return candidates
 
 
+def iter_forward_geocodes(response, chunks):
+    """Parse a forward geocoding response as it arrives, yielding Candidates.
+
+    :arg response:
+        The response head, e.g. from Transfer.stream().
+    :arg chunks:
+        Iterable of bytes making up the body.
+    """
+    for _, record in stream_json(
+            response, chunks, ("geocodePoints",), check=_check_for_errors,
+    ):
+        yield Candidate(**{
+            _map_field(key): value
+            for key, value in record.items()
+        })
+
+
 def parse_reverse_geocodes(response):
     """Parse a reverse geocoding response.
     """
@@ -67,3 +89,53 @@ def parse_reverse_geocodes(response):
         for record in records
     ]
     return candidates
+
+
+def records_to_candidates(records):
+    """Convert a list of geocodePoints records into Candidate instances.
+    """
+    return [
+        Candidate(**{
+            _map_field(key): value
+            for key, value in record.items()
+        })
+        for record in records
+    ]
+
+
+def parse_batch_geocodes(response):
+    """Parse a batch forward geocoding response.
+
+    The body is expected to look like {"results": [...]}, with one object per
+    submitted address, in submission order. Each object has the same form as
+    the body of a single forward geocoding response.
+
+    Returns a list with one entry per submitted address: either a list of
+    Candidate instances, or a ParseError instance (not raised) if the service
+    reported an error for that address alone.
+
+    Raises EndpointUnavailable if the server does not offer the batch endpoint.
+    """
+    if response is not None and response.status in UNAVAILABLE_STATUSES:
+        raise EndpointUnavailable(
+            "batch geocoding is not available (status {0!r})"
+            .format(response.status),
+            response=response,
+        )
+    data = parse_json(response, required_keys=["results"])
+    _check_for_errors(data, response)
+    results = []
+    for record in data.get("results") or []:
+        try:
+            _check_for_errors(record, response)
+            points = record.get("geocodePoints")
+            if points is None:
+                raise ParseError(
+                    "batch result missing geocodePoints",
+                    response=response,
+                )
+        except ParseError as error:
+            results.append(error)
+            continue
+        results.append(records_to_candidates(points))
+    return results
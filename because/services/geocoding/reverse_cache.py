@@ -0,0 +1,240 @@
+"""Cache reverse geocoding results for nearby points.
+
+GPS fixes from a moving (or parked) vehicle differ by a few meters each time,
+so caching by exact coordinates would almost never hit. Instead, points are
+snapped to cells, either of a regular lon/lat grid or of a geohash at some
+precision, and each cell remembers the results for one point queried in it.
+
+A cached result is only reused for a point within max_distance meters of the
+point which was actually queried, so snapping never returns an address from
+the far side of a big cell. Neighboring cells are checked as well, so points
+just across a cell boundary can still hit.
+"""
+import math
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Text,
+    Tuple,
+)
+from because.cache import LRUCache, MISSING
+from . cache import candidates_to_tuples, tuples_to_candidates
+from . candidate import Candidate
+
+#: Mean radius of the earth in meters, as used for haversine distances.
+EARTH_RADIUS = 6371008.8
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine(x1, y1, x2, y2):
+    # type: (float, float, float, float) -> float
+    """Great-circle distance in meters between two WGS84 lon/lat points.
+    """
+    phi1, phi2 = math.radians(y1), math.radians(y2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(x2 - x1)
+    a = (math.sin(dphi / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geohash(x, y, precision=7):
+    # type: (float, float, int) -> Text
+    """Encode a lon/lat point as a geohash string of the given length.
+    """
+    lon_range = [-180.0, 180.0]
+    lat_range = [-90.0, 90.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            interval, value = lon_range, x
+        else:
+            interval, value = lat_range, y
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return u"".join(chars)
+
+
+def geohash_cell_size(precision):
+    # type: (int) -> Tuple[float, float]
+    """Width and height in degrees of geohash cells of the given length.
+    """
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 360.0 / (1 << lon_bits), 180.0 / (1 << lat_bits)
+
+
+class ReverseGeocodeCache(object):
+    """In-memory LRU cache of reverse geocoding results by location.
+    """
+
+    def __init__(
+            self,
+            grid=0.0005,        # type: float
+            precision=None,     # type: Optional[int]
+            max_distance=50.0,  # type: float
+            max_size=100000,    # type: int
+            ttl=None,           # type: Optional[float]
+            clock=None,         # type: Optional[Callable[[], float]]
+    ):
+        # type: (...) -> None
+        """
+        :arg grid:
+            Size in degrees of the grid cells points are snapped to. The
+            default is roughly 50 meters north-south. Ignored if precision
+            is given.
+        :arg precision:
+            Optional. Snap points to geohash cells of this many characters
+            instead of a grid, e.g. 8 for cells of about 38 by 19 meters.
+        :arg max_distance:
+            Only reuse a result for points within this many meters of the
+            point which was queried to get it.
+        :arg max_size:
+            Maximum number of cells to remember.
+        :arg ttl:
+            Optional. Seconds to keep results.
+        :arg clock:
+            Optional. Function returning the current time in seconds.
+        """
+        if precision is not None:
+            if not 1 <= precision <= 12:
+                raise ValueError("geohash precision must be from 1 to 12")
+            self.cell_size = geohash_cell_size(precision)
+        else:
+            if grid <= 0:
+                raise ValueError("grid size must be positive")
+            self.cell_size = (grid, grid)
+        self.grid = grid
+        self.precision = precision
+        self.max_distance = max_distance
+        self._entries = LRUCache(max_size=max_size, ttl=ttl, clock=clock)
+
+    def key(self, x, y, service):
+        # type: (float, float, Text) -> Tuple
+        """Get the key of the cell containing the given point.
+        """
+        if self.precision is not None:
+            return (service, geohash(x, y, self.precision))
+        width, height = self.cell_size
+        return (service, int(math.floor(x / width)),
+                int(math.floor(y / height)))
+
+    def _neighbor_keys(self, x, y, service):
+        # type: (float, float, Text) -> List[Tuple]
+        """Keys of the point's own cell first, then the 8 around it.
+        """
+        width, height = self.cell_size
+        keys = [self.key(x, y, service)]
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if dx or dy:
+                    key = self.key(x + dx * width, y + dy * height, service)
+                    if key not in keys:
+                        keys.append(key)
+        return keys
+
+    def get(self, x, y, service="mapbox"):
+        # type: (Any, Any, Text) -> Optional[List[Candidate]]
+        """Get cached candidates for a point, or None on a miss.
+        """
+        x, y = float(x), float(y)
+        best = None
+        best_distance = None
+        for key in self._neighbor_keys(x, y, service):
+            entry = self._entries.get(key, MISSING)
+            if entry is MISSING:
+                continue
+            queried_x, queried_y, tuples = entry
+            distance = haversine(x, y, queried_x, queried_y)
+            if distance > self.max_distance:
+                continue
+            if best_distance is None or distance < best_distance:
+                best, best_distance = tuples, distance
+                if distance == 0:
+                    break
+        if best is None:
+            return None
+        return tuples_to_candidates(best)
+
+    def set(self, x, y, service, candidates):
+        # type: (Any, Any, Text, List[Candidate]) -> None
+        """Store candidates found by querying the given point.
+        """
+        x, y = float(x), float(y)
+        self._entries.set(
+            self.key(x, y, service), (x, y, candidates_to_tuples(candidates)),
+        )
+
+    def partition(self, points, service="mapbox"):
+        # type: (Iterable[Tuple[Any, Any]], Text) -> Tuple[List[Tuple[int, Tuple[Any, Any], List[Candidate]]], List[Tuple[int, Tuple[Any, Any]]]]
+        """Split a batch of points into cache hits and misses.
+
+        :arg points:
+            Iterable of (x, y) tuples.
+        :returns:
+            A tuple (hits, misses). hits is a list of (index, (x, y),
+            candidates) tuples; misses is a list of (index, (x, y)) tuples.
+            In both, index is the position of the point in the input.
+        """
+        hits = []
+        misses = []
+        for index, point in enumerate(points):
+            x, y = point
+            candidates = self.get(x, y, service)
+            if candidates is None:
+                misses.append((index, point))
+            else:
+                hits.append((index, point, candidates))
+        return hits, misses
+
+    def group(self, misses, service="mapbox"):
+        # type: (List[Tuple[int, Tuple[Any, Any]]], Text) -> OrderedDict
+        """Group missed points by cell, so each cell is queried once.
+
+        Returns an ordered dict mapping each cell key to its list of
+        (index, (x, y)) tuples; the first point of each list is the one to
+        query.
+        """
+        groups = OrderedDict()  # type: OrderedDict
+        for index, point in misses:
+            x, y = float(point[0]), float(point[1])
+            groups.setdefault(self.key(x, y, service), []).append(
+                (index, point)
+            )
+        return groups
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._entries)
+
+    def clear(self):
+        # type: () -> None
+        self._entries.clear()
+
+
+__all__ = [
+    "ReverseGeocodeCache",
+    "geohash",
+    "geohash_cell_size",
+    "haversine",
+]
@@ -1,9 +1,11 @@
 """This module is a place for code which customizes a BCS service definition.
 """
 
+import json
 from typing import Text
 from decimal import Decimal
 from because.errors import ParseError
+from because.headers import Headers
 from because.response import parse_json
 from because.services.headers import DEFAULT_HEADERS
 from because.service import Service, Endpoint
@@ -44,11 +46,17 @@ class GeocodingService(Service):
                 },
             ),
 
-            # Coming soon
+            # Give many addresses in a POST body, get candidates for each.
+            # Not deployed everywhere yet; see parse.parse_batch_geocodes.
             u"batch": Endpoint(
                 path="/geocode/{service}/batch",
+                methods=["POST"],
                 parameters={
+                    "service": WRAPPED_SERVICES,
                 },
+                headers=Headers([
+                    (b"Content-Type", b"application/json"),
+                ]),
             ),
 
         }
@@ -65,6 +73,22 @@ class GeocodingService(Service):
             results = []
         return results
 
+    def parse_forward_strict(self, response):
+        """Parse a forward geocoding response, raising ParseError on errors.
+
+        Unlike parse_forward, this lets callers tell an error apart from a
+        genuinely empty result, e.g. to avoid caching errors.
+        """
+        return parse.parse_forward_geocodes(response)
+
+    def iter_forward(self, response, chunks):
+        """Yield Candidates from a forward geocoding response as it arrives.
+
+        Unlike parse_forward, this raises ParseError on errors, which may come
+        after some candidates were already yielded.
+        """
+        return parse.iter_forward_geocodes(response, chunks)
+
     def parse_reverse(self, response):
         try:
             results = parse.parse_reverse_geocodes(response)
@@ -72,3 +96,24 @@ class GeocodingService(Service):
             print(response.pretty_text())
             results = []
         return results
+
+    def parse_reverse_strict(self, response):
+        """Parse a reverse geocoding response, raising ParseError on errors.
+        """
+        return parse.parse_reverse_geocodes(response)
+
+    def batch_body(self, addresses):
+        """Serialize a list of addresses into a body for the batch endpoint.
+        """
+        return json.dumps({
+            "addresses": [
+                address.decode("utf-8") if isinstance(address, bytes)
+                else address
+                for address in addresses
+            ],
+        }).encode("utf-8")
+
+    def parse_batch(self, response):
+        # Unlike parse_forward, errors are not swallowed here: bulk callers
+        # need to know whether to fall back to single requests.
+        return parse.parse_batch_geocodes(response)
@@ -0,0 +1,323 @@
+"""Hold many geocoding candidates compactly, in columns.
+
+A Candidate instance with its __dict__ and address costs about 140 bytes,
+which adds up to most of a process's memory when a batch job keeps millions
+of them. CandidateTable keeps the same data in columns instead: arrays of
+doubles for x, y and score, all address text in one UTF-8 buffer with an
+array of offsets into it, and integer codes for sources, each distinct
+source being stored once. That takes 40 bytes per candidate plus the
+address text: about 70 bytes in all for the addresses of
+benchmarks/bench_candidates.py.
+
+Addresses aren't deduplicated the way sources are: candidates mostly have
+different addresses, and a dict entry to look each one up would cost more
+than the text it saves.
+
+Each candidate also records the row it belongs to, i.e. the position of the
+address it was found for in the input, so results from geocode_many can be
+collected in one table and still be told apart.
+"""
+import math
+from array import array
+from itertools import compress
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Text,
+    Tuple,
+)
+from because.reprs import ReprMixin
+from collections import OrderedDict
+from . candidate import Candidate
+
+_NAN = float("nan")
+
+# 64 bit integers for address offsets. Python 2's array has no "q", but its
+# "l" is 64 bits on the platforms where address text could outgrow 32.
+_OFFSET_TYPECODE = "q" if "q" in getattr(array, "typecodes", "") else "l"
+
+# Names of fields in geocodePoints records, as for parse._map_field.
+_RECORD_FIELDS = (
+    ("x", "x"),
+    ("y", "y"),
+    ("address", "candidatePlace"),
+    ("score", "score"),
+    ("source", "candidateSource"),
+)
+
+
+class CandidateView(ReprMixin):
+    """One candidate in a CandidateTable, read from its columns on demand.
+
+    Has the same attributes as Candidate, plus row.
+    """
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table, index):
+        # type: (CandidateTable, int) -> None
+        self._table = table
+        self._index = index
+
+    @property
+    def x(self):
+        # type: () -> float
+        return self._table.x[self._index]
+
+    @property
+    def y(self):
+        # type: () -> float
+        return self._table.y[self._index]
+
+    @property
+    def score(self):
+        # type: () -> Optional[float]
+        score = self._table.score[self._index]
+        return None if math.isnan(score) else score
+
+    @property
+    def address(self):
+        # type: () -> Optional[Text]
+        return self._table.address(self._index)
+
+    @property
+    def source(self):
+        # type: () -> Optional[Text]
+        return self._table.sources[self._table.source_codes[self._index]]
+
+    @property
+    def row(self):
+        # type: () -> int
+        return self._table.rows[self._index]
+
+    def to_candidate(self):
+        # type: () -> Candidate
+        return Candidate(
+            self.x, self.y, self.address, score=self.score, source=self.source,
+        )
+
+    def repr_data(self):
+        return OrderedDict([
+            ("row", self.row),
+            ("x", self.x),
+            ("y", self.y),
+            ("address", self.address),
+            ("score", self.score),
+        ])
+
+
+class CandidateTable(object):
+    """Columnar store of geocoding candidates.
+
+    Columns are public, for fast bulk access: x, y and score are array('d')
+    (a missing score is NaN), rows and source_codes are array('i'), and the
+    codes index into sources. Use address() to get an address.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.x = array("d")
+        self.y = array("d")
+        self.score = array("d")
+        self.rows = array("i")
+        self.source_codes = array("i")
+        #: Distinct sources; code 0 is None.
+        self.sources = [None]  # type: List[Optional[Text]]
+        self._source_codes = {None: 0}  # type: Dict[Optional[Text], int]
+        # Addresses as UTF-8, one after another, and where each one ends.
+        self._address_text = bytearray()
+        self._address_ends = array(_OFFSET_TYPECODE)
+        # Indices of candidates with no address (rather than an empty one).
+        self._no_address = set()  # type: Set[int]
+        #: Errors for rows which failed, e.g. from geocode_many.
+        self.errors = {}  # type: Dict[int, Exception]
+
+    def _source_code(self, source):
+        # type: (Optional[Text]) -> int
+        code = self._source_codes.get(source)
+        if code is None:
+            code = self._source_codes[source] = len(self.sources)
+            self.sources.append(source)
+        return code
+
+    def _address_bytes(self, index):
+        # type: (int) -> bytes
+        start = self._address_ends[index - 1] if index else 0
+        return bytes(self._address_text[start:self._address_ends[index]])
+
+    def _append_address(self, address):
+        # type: (Optional[Text]) -> None
+        if address is None:
+            self._no_address.add(len(self._address_ends))
+        else:
+            self._address_text += address.encode("utf-8")
+        self._address_ends.append(len(self._address_text))
+
+    def address(self, index):
+        # type: (int) -> Optional[Text]
+        """Get the address of the candidate at index.
+        """
+        if index in self._no_address:
+            return None
+        return self._address_bytes(index).decode("utf-8")
+
+    def append(self, row, x, y, address, score=None, source=None):
+        # type: (int, float, float, Optional[Text], Optional[float], Optional[Text]) -> None
+        self.rows.append(row)
+        self.x.append(x)
+        self.y.append(y)
+        self.score.append(_NAN if score is None else score)
+        self.source_codes.append(self._source_code(source))
+        self._append_address(address)
+
+    def extend(self, row, candidates):
+        # type: (int, Iterable[Any]) -> None
+        """Add Candidates (or anything with the same attributes) for a row.
+        """
+        for candidate in candidates:
+            self.append(
+                row, candidate.x, candidate.y, candidate.address,
+                score=candidate.score, source=candidate.source,
+            )
+
+    def extend_records(self, row, records):
+        # type: (int, Iterable[Dict[Text, Any]]) -> None
+        """Add geocodePoints records for a row, without making Candidates.
+        """
+        for record in records:
+            x, y, address, score, source = (
+                record.get(key) for _, key in _RECORD_FIELDS
+            )
+            self.append(row, x, y, address, score=score, source=source)
+
+    @classmethod
+    def from_outcomes(cls, outcomes):
+        # type: (Iterable[Any]) -> CandidateTable
+        """Collect the Outcomes of geocode_many, one row per address.
+
+        Candidates are added as each Outcome arrives, so they never all
+        exist as objects at once. Failed rows are recorded in errors.
+        """
+        table = cls()
+        for outcome in outcomes:
+            if outcome.error is not None:
+                table.errors[outcome.index] = outcome.error
+            else:
+                table.extend(outcome.index, outcome.value or ())
+        return table
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.x)
+
+    def __getitem__(self, index):
+        # type: (int) -> CandidateView
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("candidate index out of range")
+        return CandidateView(self, index)
+
+    def __iter__(self):
+        # type: () -> Iterator[CandidateView]
+        for index in range(len(self)):
+            yield CandidateView(self, index)
+
+    def for_row(self, row):
+        # type: (int) -> List[CandidateView]
+        """Get the candidates found for one input row.
+        """
+        return [
+            CandidateView(self, index)
+            for index, value in enumerate(self.rows) if value == row
+        ]
+
+    def take(self, indices):
+        # type: (Iterable[int]) -> CandidateTable
+        """Make a new table of the candidates at the given indices.
+
+        The new table shares sources and errors with this one.
+        """
+        indices = list(indices)
+        table = CandidateTable()
+        for name in ("x", "y", "score", "rows", "source_codes"):
+            column = getattr(self, name)
+            setattr(table, name, array(
+                column.typecode, [column[index] for index in indices],
+            ))
+        table.sources = self.sources
+        table._source_codes = self._source_codes
+        table.errors = self.errors
+        for index in indices:
+            if index in self._no_address:
+                table._no_address.add(len(table._address_ends))
+            else:
+                table._address_text += self._address_bytes(index)
+            table._address_ends.append(len(table._address_text))
+        return table
+
+    def filter(self, min_score=None, bbox=None):
+        # type: (Optional[float], Optional[Sequence[float]]) -> CandidateTable
+        """Get a table of the candidates meeting all the given conditions.
+
+        :arg min_score:
+            Optional. Keep candidates with at least this score; candidates
+            without a score are dropped.
+        :arg bbox:
+            Optional. (x_min, y_min, x_max, y_max) which candidates must be
+            within, edges included.
+        """
+        mask = None  # type: Optional[Iterable[bool]]
+        if min_score is not None:
+            mask = [score >= min_score for score in self.score]
+        if bbox is not None:
+            x_min, y_min, x_max, y_max = bbox
+            inside = [
+                x_min <= x <= x_max and y_min <= y <= y_max
+                for x, y in zip(self.x, self.y)
+            ]
+            mask = inside if mask is None else [
+                a and b for a, b in zip(mask, inside)
+            ]
+        if mask is None:
+            return self.take(range(len(self)))
+        return self.take(compress(range(len(self)), mask))
+
+    def top_k(self, k=1):
+        # type: (int) -> CandidateTable
+        """Get a table of the k best scoring candidates for each row.
+
+        Rows come out in ascending order, and the candidates of a row from
+        best to worst. Candidates without a score come last.
+        """
+        score = self.score
+
+        def key(index):
+            # type: (int) -> Tuple[int, float]
+            value = score[index]
+            return (self.rows[index],
+                    float("inf") if math.isnan(value) else -value)
+
+        kept = []  # type: List[int]
+        current = None
+        taken = 0
+        for index in sorted(range(len(self)), key=key):
+            row = self.rows[index]
+            if row != current:
+                current, taken = row, 0
+            if taken < k:
+                kept.append(index)
+                taken += 1
+        return self.take(kept)
+
+    def to_candidates(self):
+        # type: () -> List[Candidate]
+        return [view.to_candidate() for view in self]
+
+
+__all__ = ["CandidateTable", "CandidateView"]
@@ -11,4 +11,4 @@ DEFAULT_HEADERS = Headers.coerce({
 
     # This is not always true because there's not always a body, right?
     # b"Content-Type": b"application/json",
-})
+}).freeze()
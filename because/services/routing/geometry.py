@@ -0,0 +1,309 @@
+"""Hold route geometry compactly, as flat arrays of doubles.
+
+GeoJSON coordinates parsed into nested lists cost over a hundred bytes per
+vertex. Instead, a parsed route keeps all its vertices in one array('d') of
+x, y, x, y... and each step only holds the range of vertices it covers. Step,
+Leg and Route coordinates are then Coordinates views onto that array, which
+cost nothing to make and copy nothing.
+
+The same arrays can be written out as WKB (for QgsGeometry.fromWkb, PostGIS,
+GeoPackage...) by copying their memory directly, or as GeoJSON text, without
+making Python objects for each vertex.
+"""
+import struct
+import sys
+from array import array
+from itertools import chain
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+
+#: WKB byte order flag for this machine's doubles, so they are copied as is.
+_WKB_BYTE_ORDER = 1 if sys.byteorder == "little" else 0
+
+_WKB_LINESTRING = 2
+_WKB_MULTILINESTRING = 5
+
+# Byte order flag, geometry type, then count of points or parts.
+_WKB_HEADER = struct.Struct("=BII")
+
+
+def extend_points(values, points):
+    # type: (array, Sequence[Sequence[float]]) -> int
+    """Append [x, y] points to a flat array, returning how many were added.
+
+    Any coordinates after x and y (e.g. z) are dropped.
+    """
+    size = len(values)
+    try:
+        values.extend(chain.from_iterable(points))
+    except TypeError:
+        del values[size:]
+        raise
+    if len(values) - size == 2 * len(points):
+        return len(points)
+    # Some points have more (or fewer) than two coordinates: do it slowly.
+    del values[size:]
+    for point in points:
+        values.append(point[0])
+        values.append(point[1])
+    return len(points)
+
+
+class Coordinates(object):
+    """Read-only view of a range of vertices in a flat array of doubles.
+
+    Behaves like a sequence of [x, y] lists, as the GeoJSON it came from.
+    Indexing or iterating makes those lists one at a time; slicing makes
+    another view. Use buffer or to_numpy() to get at the values in bulk
+    without making any objects per vertex.
+    """
+    __slots__ = ("_values", "_start", "_stop")
+
+    def __init__(self, values=None, start=0, stop=None):
+        # type: (Optional[array], int, Optional[int]) -> None
+        """
+        :arg values:
+            array('d') holding x, y, x, y...
+        :arg start:
+            Index of the first vertex in the view.
+        :arg stop:
+            Index after the last vertex in the view; default is the end.
+        """
+        if values is None:
+            values = array("d")
+        if stop is None:
+            stop = len(values) // 2
+        self._values = values
+        self._start = start
+        self._stop = stop
+
+    @classmethod
+    def from_points(cls, points):
+        # type: (Iterable[Sequence[float]]) -> Coordinates
+        """Copy a sequence of [x, y] points into a new view.
+        """
+        if isinstance(points, Coordinates):
+            return points
+        values = array("d")
+        extend_points(values, list(points))
+        return cls(values)
+
+    @classmethod
+    def join(cls, views):
+        # type: (Iterable[Coordinates]) -> Coordinates
+        """Make one view of several, end to end.
+
+        If they are adjacent ranges of the same array, as for the steps of a
+        parsed route, this copies nothing.
+        """
+        views = list(views)
+        if not views:
+            return cls()
+        first = views[0]
+        values = first._values
+        stop = first._stop
+        for view in views[1:]:
+            if view._values is not values or view._start != stop:
+                break
+            stop = view._stop
+        else:
+            return cls(values, first._start, stop)
+        joined = array("d")
+        for view in views:
+            joined.extend(view.buffer)
+        return cls(joined)
+
+    @property
+    def buffer(self):
+        # type: () -> memoryview
+        """Read-only memoryview of the x, y, x, y... doubles, copying nothing.
+
+        On Python 2, whose memoryview doesn't take arrays, this is a copy of
+        the doubles as an array('d') instead.
+        """
+        start, stop = 2 * self._start, 2 * self._stop
+        try:
+            view = memoryview(self._values)[start:stop]
+        except TypeError:
+            return self._values[start:stop]
+        # Python 2 and Python 3 before 3.8 can't make a read-only view.
+        return view.toreadonly() if hasattr(view, "toreadonly") else view
+
+    def to_numpy(self):
+        # type: () -> Any
+        """Get the view as an (n, 2) NumPy array sharing the same memory.
+
+        Requires NumPy, which because does not otherwise need.
+        """
+        import numpy
+        return numpy.frombuffer(self.buffer, dtype=numpy.float64).reshape(-1, 2)
+
+    def to_list(self):
+        # type: () -> List[List[float]]
+        return list(self)
+
+    def _raw(self):
+        # type: () -> Any
+        """The doubles of the view as raw bytes, preferably without copying.
+        """
+        buffer = self.buffer
+        try:
+            return buffer.cast("B")
+        except AttributeError:
+            # An array copy already, on Python 2, whose arrays have
+            # tostring() rather than tobytes().
+            if hasattr(buffer, "tobytes"):
+                return buffer.tobytes()
+            return buffer.tostring()
+
+    def _wkb_size(self):
+        # type: () -> int
+        return _WKB_HEADER.size + 16 * len(self)
+
+    def _write_wkb(self, buffer, offset):
+        # type: (bytearray, int) -> int
+        """Write the view as a WKB LineString into buffer at offset.
+
+        Returns the offset just after it.
+        """
+        _WKB_HEADER.pack_into(
+            buffer, offset, _WKB_BYTE_ORDER, _WKB_LINESTRING, len(self),
+        )
+        offset += _WKB_HEADER.size
+        end = offset + 16 * len(self)
+        buffer[offset:end] = self._raw()
+        return end
+
+    def _geojson_text(self):
+        # type: () -> str
+        if not len(self):
+            return "[]"
+        values = self._values[2 * self._start:2 * self._stop]
+        # repr gives the shortest text which reads back as the same double,
+        # as json.dumps does. Format all the numbers first, then pair them.
+        texts = list(map(repr, values))
+        text = "[[" + "],[".join(
+            map(",".join, zip(texts[0::2], texts[1::2]))
+        ) + "]]"
+        # Only nan and inf have an n in their repr, and JSON allows neither.
+        if "n" in text:
+            raise ValueError("coordinates which aren't finite can't be JSON")
+        return text
+
+    def to_wkb(self):
+        # type: () -> bytes
+        """Serialize the view as a WKB LineString.
+        """
+        buffer = bytearray(self._wkb_size())
+        self._write_wkb(buffer, 0)
+        return bytes(buffer)
+
+    def to_geojson_bytes(self):
+        # type: () -> bytes
+        """Serialize the view as a GeoJSON LineString geometry.
+        """
+        return linestring_geojson(self)
+
+    def __len__(self):
+        # type: () -> int
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        # type: (Any) -> Any
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return Coordinates.from_points(self.to_list()[index])
+            stop = max(start, stop)
+            return Coordinates(
+                self._values, self._start + start, self._start + stop,
+            )
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("coordinate index out of range")
+        offset = 2 * (self._start + index)
+        return [self._values[offset], self._values[offset + 1]]
+
+    def __iter__(self):
+        # type: () -> Iterator[List[float]]
+        values = self._values
+        for offset in range(2 * self._start, 2 * self._stop, 2):
+            yield [values[offset], values[offset + 1]]
+
+    def __eq__(self, other):
+        # type: (Any) -> bool
+        if isinstance(other, Coordinates):
+            return self.buffer == other.buffer
+        try:
+            return len(self) == len(other) and all(
+                list(mine) == list(theirs)
+                for mine, theirs in zip(self, other)
+            )
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        # type: (Any) -> bool
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self):
+        # type: () -> str
+        return "<Coordinates: {0} vertices>".format(len(self))
+
+
+def multilinestring_wkb(parts):
+    # type: (Sequence[Coordinates]) -> bytes
+    """Serialize several Coordinates views as one WKB MultiLineString.
+    """
+    size = _WKB_HEADER.size + sum(part._wkb_size() for part in parts)
+    buffer = bytearray(size)
+    _WKB_HEADER.pack_into(
+        buffer, 0, _WKB_BYTE_ORDER, _WKB_MULTILINESTRING, len(parts),
+    )
+    offset = _WKB_HEADER.size
+    for part in parts:
+        offset = part._write_wkb(buffer, offset)
+    return bytes(buffer)
+
+
+def linestring_geojson(coordinates):
+    # type: (Coordinates) -> bytes
+    """Serialize a Coordinates view as a GeoJSON LineString geometry.
+    """
+    return (
+        '{"type":"LineString","coordinates":' +
+        coordinates._geojson_text() + "}"
+    ).encode("ascii")
+
+
+def multilinestring_geojson(parts):
+    # type: (Sequence[Coordinates]) -> bytes
+    """Serialize several Coordinates views as a GeoJSON MultiLineString.
+    """
+    return (
+        '{"type":"MultiLineString","coordinates":[' +
+        ",".join(part._geojson_text() for part in parts) + "]}"
+    ).encode("ascii")
+
+
+__all__ = [
+    "Coordinates",
+    "extend_points",
+    "linestring_geojson",
+    "multilinestring_geojson",
+    "multilinestring_wkb",
+]
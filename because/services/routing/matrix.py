@@ -0,0 +1,161 @@
+"""Represent origin-destination matrices of route distances and durations.
+"""
+from array import array
+from collections import OrderedDict
+from decimal import Decimal
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+)
+from because.reprs import ReprMixin
+
+_NAN = float("nan")
+
+
+def location_key(location):
+    # type: (Any) -> Tuple
+    """Make a hashable key identifying a location given to route_matrix.
+
+    Locations are either address text or (x, y) pairs. Keys for the same
+    place compare equal even if e.g. one x was given as Decimal and the other
+    as float, or an address had extra whitespace around it.
+    """
+    if isinstance(location, bytes):
+        location = location.decode("utf-8")
+    if isinstance(location, (tuple, list)) and len(location) == 2:
+        x, y = location
+        return ("xy", float(x), float(y))
+    return ("text", u" ".join(location.split()))
+
+
+def location_from_key(key):
+    # type: (Tuple) -> Any
+    """Convert a location key back into address text or an (x, y) tuple.
+    """
+    if key[0] == "xy":
+        return key[1], key[2]
+    return key[1]
+
+
+def location_values(key):
+    # type: (Tuple) -> Tuple[Any, Any]
+    """Convert a location key back into values for a request.
+
+    Returns (x, y) as Decimals for coordinates, or (address, None) for text.
+    """
+    if key[0] == "xy":
+        # repr() gives the shortest text which round-trips the float,
+        # so we don't send 17 digits of binary noise.
+        return Decimal(repr(key[1])), Decimal(repr(key[2]))
+    return key[1], None
+
+
+class RouteMatrix(ReprMixin):
+    """Distances and durations between each origin and each destination.
+
+    Values are stored row-major (one row per origin) in flat arrays of
+    doubles, rather than as a grid of Route objects. Cells whose route could
+    not be found hold NaN, and the error for each such cell is kept in the
+    errors dict, keyed by (origin_index, destination_index).
+    """
+
+    def __init__(self, n_origins, n_destinations):
+        # type: (int, int) -> None
+        self.n_origins = n_origins
+        self.n_destinations = n_destinations
+        size = n_origins * n_destinations
+        #: Row-major distances, one row per origin.
+        self.distances = array("d", [_NAN]) * size
+        #: Row-major durations, one row per origin.
+        self.durations = array("d", [_NAN]) * size
+        #: Errors for cells which could not be filled.
+        self.errors = {}  # type: Dict[Tuple[int, int], Exception]
+
+    def _offset(self, origin, destination):
+        # type: (int, int) -> int
+        if not (0 <= origin < self.n_origins and
+                0 <= destination < self.n_destinations):
+            raise IndexError(
+                "no cell ({0}, {1}) in {2}x{3} matrix".format(
+                    origin, destination, self.n_origins, self.n_destinations,
+                )
+            )
+        return origin * self.n_destinations + destination
+
+    def set(self, origin, destination, distance, duration):
+        # type: (int, int, float, float) -> None
+        offset = self._offset(origin, destination)
+        self.distances[offset] = distance
+        self.durations[offset] = duration
+
+    def distance(self, origin, destination):
+        # type: (int, int) -> float
+        return self.distances[self._offset(origin, destination)]
+
+    def duration(self, origin, destination):
+        # type: (int, int) -> float
+        return self.durations[self._offset(origin, destination)]
+
+    def distance_rows(self):
+        # type: () -> Iterator[array]
+        """Yield the distances from each origin, as one array per origin.
+        """
+        width = self.n_destinations
+        for start in range(0, len(self.distances), width or 1):
+            yield self.distances[start:start + width]
+
+    def duration_rows(self):
+        # type: () -> Iterator[array]
+        """Yield the durations from each origin, as one array per origin.
+        """
+        width = self.n_destinations
+        for start in range(0, len(self.durations), width or 1):
+            yield self.durations[start:start + width]
+
+    def repr_data(self):
+        return OrderedDict([
+            ("n_origins", self.n_origins),
+            ("n_destinations", self.n_destinations),
+        ])
+
+
+def plan_matrix(origins, destinations, symmetric=False):
+    # type: (Sequence[Any], Sequence[Any], bool) -> Tuple[Dict[Tuple, List[Tuple[int, int]]], List[Tuple[int, int]]]
+    """Work out which distinct routes are needed to fill a matrix.
+
+    :arg symmetric:
+        If true, assume the route from A to B is as long as from B to A, so
+        only one of them is fetched.
+    :returns:
+        A tuple (needed, same), where needed is an ordered dict mapping each
+        distinct (origin_key, destination_key) pair to the list of
+        (origin_index, destination_index) cells it fills; and same is a list
+        of cells whose origin and destination are the same place.
+    """
+    origin_keys = [location_key(origin) for origin in origins]
+    destination_keys = [location_key(dest) for dest in destinations]
+    needed = OrderedDict()  # type: Dict[Tuple, List[Tuple[int, int]]]
+    same = []
+    for i, origin_key in enumerate(origin_keys):
+        for j, destination_key in enumerate(destination_keys):
+            if origin_key == destination_key:
+                same.append((i, j))
+                continue
+            pair = (origin_key, destination_key)
+            if symmetric and destination_key < origin_key:
+                pair = (destination_key, origin_key)
+            needed.setdefault(pair, []).append((i, j))
+    return needed, same
+
+
+__all__ = [
+    "RouteMatrix",
+    "location_key",
+    "location_from_key",
+    "location_values",
+    "plan_matrix",
+]
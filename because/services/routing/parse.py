@@ -1,4 +1,12 @@
+from array import array
+from because.json_stream import stream_json
 from because.response import parse_json
+from because.errors import (
+    ParseError,
+    EndpointUnavailable,
+    UNAVAILABLE_STATUSES,
+)
+from . geometry import Coordinates, extend_points
 from . route import (
     Route,
     Leg,
@@ -12,8 +20,46 @@ def parse(response):
     return dict_to_route(data)
 
 
+def iter_steps(response, chunks):
+    """Parse a routing response as it arrives, yielding the Steps of all legs.
+
+    The route and leg totals aren't given; use parse() for a whole Route.
+
+    :arg response:
+        The response head, e.g. from Transfer.stream().
+    :arg chunks:
+        Iterable of bytes making up the body.
+    """
+    for location, step_dict in stream_json(
+            response, chunks, ("legs", None, "steps"),
+    ):
+        yield dict_to_step(step_dict, parse_path=list(location))
+
+
+def parse_summary(response):
+    """Parse just the total distance and duration from a routing response.
+
+    This skips building Leg and Step objects and parsing geometry, for
+    callers like route_matrix that only need the totals.
+
+    Returns a (distance, duration) tuple of floats.
+    """
+    data = parse_json(response, ["distance", "duration"])
+    try:
+        return float(data["distance"]), float(data["duration"])
+    except (TypeError, ValueError) as error:
+        raise ParseError(
+            "non-numeric distance or duration in route",
+            response=response,
+            error=error,
+        )
+
+
 def dict_to_route(data, parse_path=None):
     parse_path = parse_path or []
+    # All the route's vertices go in this one array, which the steps' point
+    # Coordinates are views of.
+    values = array("d")
 
     try:
         distance = data["distance"]
@@ -23,7 +69,7 @@ def dict_to_route(data, parse_path=None):
     legs = []
     for index, leg_dict in enumerate(data["legs"]):
         leg = dict_to_leg(
-            leg_dict, parse_path=parse_path + ["legs", index]
+            leg_dict, parse_path=parse_path + ["legs", index], values=values,
         )
         legs.append(leg)
     return Route(
@@ -33,7 +79,7 @@ def dict_to_route(data, parse_path=None):
     )
 
 
-def dict_to_leg(data, parse_path=None):
+def dict_to_leg(data, parse_path=None, values=None):
     parse_path = parse_path or []
     try:
         steps = data["steps"]
@@ -42,7 +88,8 @@ def dict_to_leg(data, parse_path=None):
     except KeyError:
         raise InvalidObject("leg", parse_path=parse_path)
     steps = [
-        dict_to_step(step_dict, parse_path=parse_path + ["steps", index])
+        dict_to_step(step_dict, parse_path=parse_path + ["steps", index],
+                     values=values)
         for index, step_dict in enumerate(steps)
     ]
     return Leg(
@@ -52,7 +99,7 @@ def dict_to_leg(data, parse_path=None):
     )
 
 
-def dict_to_step(data, parse_path=None):
+def dict_to_step(data, parse_path=None, values=None):
     parse_path = parse_path or []
     try:
         instructions = data["instructions"]
@@ -69,7 +116,8 @@ def dict_to_step(data, parse_path=None):
             # NOTE: the "geometry" passed is one big blob of text...
             points = parse_points(
                 point_data,
-                parse_path=parse_path + ["points"]
+                parse_path=parse_path + ["points"],
+                values=values,
             )
         else:
             points = None
@@ -84,7 +132,13 @@ def dict_to_step(data, parse_path=None):
     )
 
 
-def parse_points(data, parse_path=None):
+def parse_points(data, parse_path=None, values=None):
+    """Parse a GeoJSON geometry's coordinates into a Coordinates view.
+
+    :arg values:
+        Optional. array('d') to append the vertices to, so that many steps
+        can share one array.
+    """
     parse_path = parse_path or []
     try:
         coordinates = data["coordinates"]
@@ -93,6 +147,111 @@ def parse_points(data, parse_path=None):
         parse_path = parse_path + ["coordinates"]
         raise InvalidObject("points", parse_path=parse_path)
     # I guess sometimes we get just [x, y] instead of [[x, y]]. :(
-    if coordinates and isinstance(coordinates[0], float):
+    if coordinates is None:
+        return None
+    if coordinates and isinstance(coordinates[0], (int, float)):
         coordinates = [coordinates]
-    return coordinates
+    if values is None:
+        values = array("d")
+    start = len(values) // 2
+    try:
+        count = extend_points(values, coordinates)
+    except (TypeError, IndexError):
+        parse_path = parse_path + ["coordinates"]
+        raise InvalidObject("points", parse_path=parse_path)
+    return Coordinates(values, start, start + count)
+
+
+#: Batch job states meaning no more status checks are needed.
+BATCH_FINISHED_STATES = frozenset(["complete", "failed"])
+
+
+class BatchStatus(object):
+    """State of a batch routing job, as given by the batch_status endpoint.
+    """
+    def __init__(self, state, completed=None, routes=None, retry_after=None):
+        """
+        :arg state:
+            Job state, e.g. "pending", "running", "complete" or "failed".
+        :arg completed:
+            Number of routes computed so far, if the service says.
+        :arg routes:
+            When complete, a list with one entry per submitted waypoint
+            sequence: a Route, or a ParseError for one which failed.
+        :arg retry_after:
+            Seconds the service asked us to wait before checking again.
+        """
+        self.state = state
+        self.completed = completed
+        self.routes = routes
+        self.retry_after = retry_after
+
+    @property
+    def done(self):
+        return self.state in BATCH_FINISHED_STATES
+
+
+def _check_available(response):
+    if response is not None and response.status in UNAVAILABLE_STATUSES:
+        raise EndpointUnavailable(
+            "batch routing is not available (status {0!r})"
+            .format(response.status),
+            response=response,
+        )
+
+
+def _retry_after(response):
+    values = response.headers[b"retry-after"] if response else []
+    try:
+        return float(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def parse_batch_submission(response):
+    """Parse the response to a batch job submission, returning the job uuid.
+
+    The body is expected to look like {"uuid": "..."}.
+    """
+    _check_available(response)
+    data = parse_json(response, required_keys=["uuid"])
+    return data["uuid"]
+
+
+def parse_batch_status(response):
+    """Parse the response from the batch_status endpoint into a BatchStatus.
+
+    The body is expected to look like {"status": "...", "completed": 3}, with
+    a "routes" list once the status is "complete". Each element of "routes"
+    has the same form as the body of a single routing response. A "failed"
+    job may say why in "errorMessage", as batch geocoding results do.
+    """
+    _check_available(response)
+    data = parse_json(response, required_keys=["status"])
+    state = data["status"]
+    routes = None
+    if state == "complete":
+        routes = []
+        for index, route_dict in enumerate(data.get("routes") or []):
+            try:
+                route = dict_to_route(route_dict, parse_path=["routes", index])
+            except (InvalidObject, KeyError, TypeError) as error:
+                route = ParseError(
+                    "cannot parse route {0}".format(index),
+                    response=response,
+                    error=error,
+                )
+            routes.append(route)
+    elif state == "failed":
+        raise ParseError(
+            "batch routing job failed: {0!r}".format(
+                data.get("errorMessage")
+            ),
+            response=response,
+        )
+    return BatchStatus(
+        state=state,
+        completed=data.get("completed"),
+        routes=routes,
+        retry_after=_retry_after(response),
+    )
@@ -2,6 +2,11 @@
 """
 from because.utils import is_iterable
 from because.errors import InvalidObject as _InvalidObject
+from . geometry import (
+    Coordinates,
+    multilinestring_geojson,
+    multilinestring_wkb,
+)
 
 
 class InvalidObject(_InvalidObject):
@@ -32,6 +37,42 @@ class Route(object):
         for leg in self._legs:
             yield leg
 
+    def coordinates(self):
+        # type: () -> Coordinates
+        """Get the vertices of the whole route, as one Coordinates view.
+
+        For a parsed route this copies nothing. The vertex shared by the end
+        of one step and the start of the next appears twice.
+        """
+        return Coordinates.join(leg.coordinates() for leg in self._legs)
+
+    def to_wkb(self, multi=False):
+        # type: (bool) -> bytes
+        """Serialize the route's geometry as WKB.
+
+        :arg multi:
+            If true, write a MultiLineString with one part per leg. Otherwise
+            write one LineString through the whole route.
+        """
+        if multi:
+            return multilinestring_wkb(
+                [leg.coordinates() for leg in self._legs]
+            )
+        return self.coordinates().to_wkb()
+
+    def to_geojson_bytes(self, multi=False):
+        # type: (bool) -> bytes
+        """Serialize the route's geometry as a GeoJSON geometry object.
+
+        :arg multi:
+            As for to_wkb().
+        """
+        if multi:
+            return multilinestring_geojson(
+                [leg.coordinates() for leg in self._legs]
+            )
+        return self.coordinates().to_geojson_bytes()
+
 
 class Leg(object):
     """One leg of a travel route.
@@ -51,6 +92,26 @@ class Leg(object):
         for step in self._steps:
             yield step
 
+    def coordinates(self):
+        # type: () -> Coordinates
+        """Get the vertices of all this leg's steps, as one Coordinates view.
+        """
+        return Coordinates.join(
+            step.points for step in self._steps if step.points is not None
+        )
+
+    def to_wkb(self):
+        # type: () -> bytes
+        """Serialize the leg's geometry as a WKB LineString.
+        """
+        return self.coordinates().to_wkb()
+
+    def to_geojson_bytes(self):
+        # type: () -> bytes
+        """Serialize the leg's geometry as a GeoJSON LineString.
+        """
+        return self.coordinates().to_geojson_bytes()
+
 
 class Step(object):
     """One step of a leg of a travel route.
@@ -60,13 +121,18 @@ class Step(object):
         :arg instructions:
             Text instructions for traveling this step in the route.
         :arg points:
-            List of points representing the geometry of this step.
+            Coordinates, or list of [x, y] points, representing the geometry
+            of this step.
         """
         self.instructions = instructions
+        if points is not None and not isinstance(points, Coordinates):
+            points = Coordinates.from_points(points)
         self._points = points
         self.distance = distance
         self.duration = duration
 
     @property
     def points(self):
-        return list(self._points)
+        """Coordinates view of this step's vertices, or None.
+        """
+        return self._points
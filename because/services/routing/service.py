@@ -1,11 +1,19 @@
 """This module is a place for code which customizes a BCS service definition.
 """
 
+import json
 from decimal import Decimal
 from typing import Text
+from because.headers import Headers
 from because.services.headers import DEFAULT_HEADERS
 from because.service import Service, Endpoint
-from . parse import parse
+from . parse import (
+    parse,
+    parse_summary,
+    iter_steps,
+    parse_batch_submission,
+    parse_batch_status,
+)
 
 
 WRAPPED_SERVICES = set([
@@ -73,16 +81,25 @@ class RoutingService(Service):
                 },
             ),
 
-            # Coming soon
+            # POST a list of waypoint sequences, get a job uuid back.
+            # See parse.parse_batch_submission for the expected forms.
             u"batch": Endpoint(
                 path="/route/{service}/batch",
+                methods=["POST"],
                 parameters={
+                    "service": WRAPPED_SERVICES,
                 },
+                headers=Headers([
+                    (b"Content-Type", b"application/json"),
+                ]),
             ),
 
+            # GET the status (and when complete, the routes) of a batch job.
             u"batch_status": Endpoint(
                 path="/route/{service}/batch/{uuid}",
+                methods=["GET"],
                 parameters={
+                    "service": WRAPPED_SERVICES,
                     "uuid": Text,
                 },
             ),
@@ -94,3 +111,25 @@ class RoutingService(Service):
 
     def parse(self, response):
         return parse(response)
+
+    def iter_steps(self, response, chunks):
+        return iter_steps(response, chunks)
+
+    def parse_summary(self, response):
+        return parse_summary(response)
+
+    def batch_body(self, routes):
+        """Serialize a list of waypoint sequences for the batch endpoint.
+        """
+        return json.dumps({
+            "routes": [
+                {"waypoints": list(waypoints)}
+                for waypoints in routes
+            ],
+        }).encode("utf-8")
+
+    def parse_batch_submission(self, response):
+        return parse_batch_submission(response)
+
+    def parse_batch_status(self, response):
+        return parse_batch_status(response)
@@ -0,0 +1,291 @@
+"""Simplify route geometry for display at a given zoom level.
+
+A cross-country route has tens of thousands of vertices, but at low zoom most
+of them fall in the same pixel. Sending or drawing them all wastes bandwidth
+and render time, so this module drops the ones which don't matter at a given
+tolerance, with either Douglas-Peucker or Visvalingam-Whyatt.
+
+Rather than simplifying from scratch for each tolerance, each vertex is given
+an importance once: the largest tolerance at which it survives. Simplifying
+is then just keeping the vertices more important than the tolerance, so a
+whole pyramid of zoom levels costs little more than one level (this is the
+approach of geojson-vt).
+
+Steps are simplified separately, so step boundaries are always kept, and a
+simplified route still has all its legs and steps with their instructions.
+
+Coordinates are treated as planar, in the units they come in (degrees of
+WGS84 longitude and latitude from the routing service).
+"""
+import heapq
+from array import array
+from typing import (
+    Dict,
+    Iterable,
+    Optional,
+)
+from . geometry import Coordinates
+from . route import Route, Leg, Step
+
+DOUGLAS_PEUCKER = "douglas-peucker"
+VISVALINGAM = "visvalingam"
+
+#: Default tile size in pixels, for converting zoom levels to tolerances.
+TILE_SIZE = 256
+
+_INFINITY = float("inf")
+
+
+def zoom_tolerance(zoom, pixels=0.5, tile_size=TILE_SIZE):
+    # type: (float, float, int) -> float
+    """Get a tolerance in degrees for a web map zoom level.
+
+    :arg zoom:
+        Zoom level, where level 0 shows the world on one tile.
+    :arg pixels:
+        How many pixels a vertex may move when simplified.
+    :arg tile_size:
+        Size of tiles in pixels.
+    """
+    return pixels * 360.0 / (tile_size * 2.0 ** zoom)
+
+
+def douglas_peucker_importance(coordinates):
+    # type: (Coordinates) -> array
+    """Squared distance tolerance at which each vertex stops being kept.
+    """
+    count = len(coordinates)
+    importance = array("d", [0.0]) * count
+    if not count:
+        return importance
+    importance[0] = importance[count - 1] = _INFINITY
+    values = coordinates.buffer.tolist()
+    stack = [(0, count - 1, _INFINITY)]
+    while stack:
+        first, last, ceiling = stack.pop()
+        if last - first < 2:
+            continue
+        ax, ay = values[2 * first], values[2 * first + 1]
+        dx, dy = values[2 * last] - ax, values[2 * last + 1] - ay
+        length = dx * dx + dy * dy
+        best = -1.0
+        split = first + 1
+        for index in range(first + 1, last):
+            px = values[2 * index] - ax
+            py = values[2 * index + 1] - ay
+            if length:
+                t = (px * dx + py * dy) / length
+                if t > 1.0:
+                    t = 1.0
+                elif t < 0.0:
+                    t = 0.0
+                px -= t * dx
+                py -= t * dy
+            distance = px * px + py * py
+            if distance > best:
+                best = distance
+                split = index
+        # A vertex can't outlive the one whose split exposed it.
+        value = best if best < ceiling else ceiling
+        importance[split] = value
+        stack.append((first, split, value))
+        stack.append((split, last, value))
+    return importance
+
+
+def visvalingam_importance(coordinates):
+    # type: (Coordinates) -> array
+    """Effective triangle area below which each vertex is removed.
+
+    Areas are doubled, so they compare with squared distances much as the
+    Douglas-Peucker importance does.
+    """
+    count = len(coordinates)
+    importance = array("d", [0.0]) * count
+    if not count:
+        return importance
+    importance[0] = importance[count - 1] = _INFINITY
+    values = coordinates.buffer.tolist()
+    previous = list(range(-1, count - 1))
+    following = list(range(1, count + 1))
+
+    def area(index):
+        first, last = previous[index], following[index]
+        ax, ay = values[2 * first], values[2 * first + 1]
+        return abs(
+            (values[2 * index] - ax) * (values[2 * last + 1] - ay) -
+            (values[2 * last] - ax) * (values[2 * index + 1] - ay)
+        )
+
+    current = [0.0] * count
+    for index in range(1, count - 1):
+        current[index] = area(index)
+    heap = [(current[index], index) for index in range(1, count - 1)]
+    heapq.heapify(heap)
+    removed = [False] * count
+    floor = 0.0
+    while heap:
+        value, index = heapq.heappop(heap)
+        if removed[index] or value != current[index]:
+            # Stale entry, from before a neighbor was removed.
+            continue
+        removed[index] = True
+        # Keep importance monotonic, so thresholds nest properly.
+        if value < floor:
+            value = floor
+        floor = value
+        importance[index] = value
+        first, last = previous[index], following[index]
+        following[first] = last
+        previous[last] = first
+        for neighbor in (first, last):
+            if 0 < neighbor < count - 1:
+                current[neighbor] = area(neighbor)
+                heapq.heappush(heap, (current[neighbor], neighbor))
+    return importance
+
+
+_IMPORTANCE = {
+    DOUGLAS_PEUCKER: douglas_peucker_importance,
+    VISVALINGAM: visvalingam_importance,
+}
+
+
+def importance(coordinates, method=DOUGLAS_PEUCKER):
+    # type: (Coordinates, str) -> array
+    try:
+        function = _IMPORTANCE[method]
+    except KeyError:
+        raise ValueError("unknown simplification method {0!r}".format(method))
+    return function(coordinates)
+
+
+def _keep(coordinates, importance, threshold, values):
+    # type: (Coordinates, array, float, array) -> Coordinates
+    """Append the vertices more important than threshold to values.
+    """
+    start = len(values) // 2
+    source = coordinates.buffer
+    for index, value in enumerate(importance):
+        if value > threshold:
+            values.append(source[2 * index])
+            values.append(source[2 * index + 1])
+    return Coordinates(values, start, len(values) // 2)
+
+
+def _tolerance(tolerance, zoom):
+    # type: (Optional[float], Optional[float]) -> float
+    if tolerance is None:
+        if zoom is None:
+            raise ValueError("give either a tolerance or a zoom level")
+        tolerance = zoom_tolerance(zoom)
+    return tolerance
+
+
+def simplify(coordinates, tolerance=None, zoom=None, method=DOUGLAS_PEUCKER):
+    # type: (Coordinates, Optional[float], Optional[float], str) -> Coordinates
+    """Simplify one line, returning new Coordinates.
+
+    :arg tolerance:
+        Distance in coordinate units a vertex may be off the simplified line.
+    :arg zoom:
+        Instead of a tolerance, a web map zoom level (see zoom_tolerance).
+    :arg method:
+        DOUGLAS_PEUCKER or VISVALINGAM.
+    """
+    tolerance = _tolerance(tolerance, zoom)
+    return _keep(
+        coordinates, importance(coordinates, method), tolerance * tolerance,
+        array("d"),
+    )
+
+
+class RoutePyramid(object):
+    """Simplified versions of one route, at any number of zoom levels.
+
+    The importance of each vertex is worked out once, when this is created;
+    each level is then quick to make, and is kept once made.
+    """
+
+    def __init__(self, route, method=DOUGLAS_PEUCKER, zooms=None):
+        # type: (Route, str, Optional[Iterable[int]]) -> None
+        """
+        :arg route:
+            The full resolution Route.
+        :arg method:
+            DOUGLAS_PEUCKER or VISVALINGAM.
+        :arg zooms:
+            Optional. Zoom levels to make straight away.
+        """
+        self.route = route
+        self.method = method
+        self._importance = [
+            [
+                None if step.points is None
+                else importance(step.points, method)
+                for step in leg.steps()
+            ]
+            for leg in route.legs()
+        ]
+        self.levels = {}  # type: Dict[int, Route]
+        for zoom in zooms or ():
+            self.at_zoom(zoom)
+
+    def at_zoom(self, zoom):
+        # type: (int) -> Route
+        """Get the route simplified for a zoom level.
+        """
+        level = self.levels.get(zoom)
+        if level is None:
+            level = self.levels[zoom] = self.at_tolerance(zoom_tolerance(zoom))
+        return level
+
+    def at_tolerance(self, tolerance):
+        # type: (float) -> Route
+        """Get the route simplified to a tolerance, in coordinate units.
+        """
+        threshold = tolerance * tolerance
+        # Like a parsed route, the simplified one keeps all its vertices in
+        # one array.
+        values = array("d")
+        legs = []
+        for leg, leg_importance in zip(self.route.legs(), self._importance):
+            steps = []
+            for step, step_importance in zip(leg.steps(), leg_importance):
+                points = None
+                if step.points is not None:
+                    points = _keep(
+                        step.points, step_importance, threshold, values,
+                    )
+                steps.append(Step(
+                    step.instructions, points,
+                    distance=step.distance, duration=step.duration,
+                ))
+            legs.append(Leg(
+                steps, distance=leg.distance, duration=leg.duration,
+            ))
+        return Route(
+            legs, distance=self.route.distance, duration=self.route.duration,
+        )
+
+
+def simplify_route(route, tolerance=None, zoom=None, method=DOUGLAS_PEUCKER):
+    # type: (Route, Optional[float], Optional[float], str) -> Route
+    """Simplify a route, keeping its legs and steps.
+
+    Arguments are as for simplify(). To simplify the same route for several
+    zoom levels, use RoutePyramid instead.
+    """
+    tolerance = _tolerance(tolerance, zoom)
+    return RoutePyramid(route, method).at_tolerance(tolerance)
+
+
+__all__ = [
+    "DOUGLAS_PEUCKER",
+    "RoutePyramid",
+    "VISVALINGAM",
+    "importance",
+    "simplify",
+    "simplify_route",
+    "zoom_tolerance",
+]
@@ -0,0 +1,139 @@
+"""Run one search query against many categories at once.
+
+Categories are searched concurrently with fan_out, and each category's results
+are yielded as soon as it answers, so a fast category is never held back by a
+slow one. With a timeout, a category which takes too long is given up on and
+recorded as an error, like one which fails.
+
+Results from different categories can't be compared directly, so they are
+ranked by reciprocal rank fusion: a result at position rank (from 0) in its
+category's list scores 1 / (RRF_K + rank + 1), and a result found in several
+categories adds up its scores. This needs nothing but each category's order.
+"""
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Text,
+)
+from because.fanout import fan_out
+from because.reprs import ReprMixin
+from . search_result import SearchResult
+
+#: Constant of reciprocal rank fusion, damping the lead of top ranks.
+RRF_K = 60
+
+
+class FederatedHit(ReprMixin):
+    """One result of a federated search, with where it was found.
+    """
+    __slots__ = ("category", "rank", "result")
+
+    def __init__(self, category, rank, result):
+        # type: (Text, int, SearchResult) -> None
+        """
+        :arg category:
+            Key of the category which returned the result.
+        :arg rank:
+            Position of the result in that category's results, from 0.
+        :arg result:
+            The SearchResult.
+        """
+        self.category = category
+        self.rank = rank
+        self.result = result
+
+    @property
+    def score(self):
+        # type: () -> float
+        return 1.0 / (RRF_K + self.rank + 1)
+
+    def repr_data(self):
+        return OrderedDict([
+            ("category", self.category),
+            ("rank", self.rank),
+            ("result", self.result),
+        ])
+
+
+class FederatedSearch(object):
+    """Iterable of FederatedHits from searching several categories.
+
+    Iterating yields hits category by category, in the order the categories
+    answer; ranked() gives them all merged into one ranking. Categories which
+    failed or timed out are recorded in errors as iteration reaches them.
+    """
+
+    def __init__(self, search, categories, concurrency=8, timeout=None):
+        # type: (Callable[[Text], List[SearchResult]], Iterable[Text], int, Optional[float]) -> None
+        """
+        :arg search:
+            Callable taking a category key and returning its results; it is
+            called from worker threads.
+        :arg categories:
+            Keys of the categories to search.
+        :arg concurrency:
+            Maximum number of categories to search at once.
+        :arg timeout:
+            Optional. Seconds to wait for each category before giving up on
+            it, counted from when it is queued rather than from when a worker
+            gets to it, so that categories queued behind slow ones get the
+            same deadline. Like fan_out's, it needs concurrent.futures.
+        """
+        self.categories = list(categories)
+        self.hits = []  # type: List[FederatedHit]
+        self.errors = OrderedDict()  # type: Dict[Text, Exception]
+        self._outcomes = fan_out(
+            search, self.categories,
+            concurrency=concurrency, ordered=False, timeout=timeout,
+        )
+
+    def __iter__(self):
+        # type: () -> Iterator[FederatedHit]
+        for outcome in self._outcomes:
+            if outcome.error is not None:
+                self.errors[outcome.item] = outcome.error
+                continue
+            for rank, result in enumerate(outcome.value or ()):
+                hit = FederatedHit(outcome.item, rank, result)
+                self.hits.append(hit)
+                yield hit
+
+    def ranked(self):
+        # type: () -> List[FederatedHit]
+        """Wait for all categories, then rank every hit.
+
+        Hits with the same url are merged into the best ranked of them,
+        which gets the sum of their scores.
+        """
+        for _ in self:
+            pass
+        order = {key: index for index, key in enumerate(self.categories)}
+        scores = OrderedDict()  # type: Dict[Any, float]
+        best = {}  # type: Dict[Any, FederatedHit]
+        for hit in self.hits:
+            key = hit.result.url or id(hit)
+            scores[key] = scores.get(key, 0.0) + hit.score
+            if key not in best or hit.rank < best[key].rank:
+                best[key] = hit
+        return sorted(
+            (best[key] for key in scores),
+            key=lambda hit: (
+                -scores[hit.result.url or id(hit)],
+                order.get(hit.category, len(order)),
+            ),
+        )
+
+    def close(self):
+        # type: () -> None
+        """Stop, cancelling category searches which haven't started.
+        """
+        self._outcomes.close()
+
+
+__all__ = ["FederatedHit", "FederatedSearch", "RRF_K"]
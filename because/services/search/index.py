@@ -0,0 +1,230 @@
+"""Search results already fetched, indexed for answering queries locally.
+
+Type-ahead search sends a query per keystroke, though most of what each one
+returns was returned for the previous keystroke too. SearchIndex keeps every
+SearchResult it is given in an inverted index, from each word of its title,
+author and description to the results containing it, so a query can first be
+answered from what has already been fetched.
+
+Every word of a query must match a word of a result; the last word of the
+query may match just the start of one, since it may not be finished yet.
+Results are ranked by where their words matched, title counting most.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Text,
+)
+from . search_result import SearchResult
+
+#: How much a match in each field of a SearchResult counts for.
+FIELD_WEIGHTS = (
+    ("title", 3.0),
+    ("author", 2.0),
+    ("description", 1.0),
+)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Sorts after any text starting with the same prefix, to bound prefix ranges.
+_PREFIX_END = u"\U0010ffff"
+
+
+def tokenize(text):
+    # type: (Optional[Text]) -> List[Text]
+    """Split text into lowercased words.
+    """
+    if not text:
+        return []
+    return _WORD.findall(text.lower())
+
+
+class SearchIndex(object):
+    """Inverted index of SearchResults, safe to use from several threads.
+
+    Results are told apart by url (or title, without one); adding a result
+    again replaces the one already indexed.
+    """
+
+    def __init__(self, max_age=300.0, clock=time.time):
+        # type: (float, Callable[[], float]) -> None
+        """
+        :arg max_age:
+            Seconds for which a query refreshed from the server is not
+            refreshed again; see begin_refresh().
+        :arg clock:
+            Function returning the current time in seconds.
+        """
+        self.max_age = max_age
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._results = {}  # type: Dict[int, SearchResult]
+        self._ids = {}  # type: Dict[Any, int]
+        self._next_id = 0
+        # Word to {result id: weight of the fields containing it}.
+        self._postings = {}  # type: Dict[Text, Dict[int, float]]
+        # The words of _postings in order, for finding those with a prefix.
+        self._words = []  # type: List[Text]
+        self._refreshed = {}  # type: Dict[Hashable, float]
+        self._refreshing = set()  # type: Set[Hashable]
+
+    @staticmethod
+    def _key(result):
+        # type: (SearchResult) -> Any
+        return result.url or result.title
+
+    def _weights(self, result):
+        # type: (SearchResult) -> Dict[Text, float]
+        weights = {}  # type: Dict[Text, float]
+        for field, weight in FIELD_WEIGHTS:
+            for word in set(tokenize(getattr(result, field, None))):
+                weights[word] = weights.get(word, 0.0) + weight
+        return weights
+
+    def _unindex(self, result_id):
+        # type: (int) -> None
+        result = self._results.pop(result_id)
+        for word in self._weights(result):
+            posting = self._postings[word]
+            del posting[result_id]
+            if not posting:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+
+    def add(self, result):
+        # type: (SearchResult) -> None
+        self.add_all([result])
+
+    def add_all(self, results):
+        # type: (Iterable[SearchResult]) -> None
+        with self._lock:
+            for result in results:
+                key = self._key(result)
+                old_id = self._ids.get(key)
+                if old_id is not None:
+                    self._unindex(old_id)
+                result_id = self._ids[key] = self._next_id
+                self._next_id += 1
+                self._results[result_id] = result
+                for word, weight in self._weights(result).items():
+                    posting = self._postings.get(word)
+                    if posting is None:
+                        posting = self._postings[word] = {}
+                        insort(self._words, word)
+                    posting[result_id] = weight
+
+    def remove(self, result):
+        # type: (SearchResult) -> bool
+        """Remove the indexed result with the same url, if any.
+        """
+        with self._lock:
+            result_id = self._ids.pop(self._key(result), None)
+            if result_id is None:
+                return False
+            self._unindex(result_id)
+            return True
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._results.clear()
+            self._ids.clear()
+            self._postings.clear()
+            del self._words[:]
+            self._refreshed.clear()
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._results)
+
+    def _matches(self, word, prefix):
+        # type: (Text, bool) -> Dict[int, float]
+        """Weights of the results containing a word, or one with a prefix.
+        """
+        if not prefix:
+            return self._postings.get(word, {})
+        start = bisect_left(self._words, word)
+        stop = bisect_left(self._words, word + _PREFIX_END, start)
+        if stop - start == 1:
+            return self._postings[self._words[start]]
+        matches = {}  # type: Dict[int, float]
+        for match in self._words[start:stop]:
+            for result_id, weight in self._postings[match].items():
+                if weight > matches.get(result_id, 0.0):
+                    matches[result_id] = weight
+        return matches
+
+    def search(self, query, limit=None):
+        # type: (Text, Optional[int]) -> List[SearchResult]
+        """Find indexed results matching every word of a query, best first.
+
+        :arg query:
+            Text as typed. Unless it ends with a space, its last word is
+            matched as a prefix.
+        :arg limit:
+            Optional. Most results to return.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        last_is_prefix = not query[-1:].isspace()
+        with self._lock:
+            matches = [
+                self._matches(word, last_is_prefix and index == len(words) - 1)
+                for index, word in enumerate(words)
+            ]
+            matches.sort(key=len)
+            scores = dict(matches[0])
+            for weights in matches[1:]:
+                if not scores:
+                    break
+                scores = {
+                    result_id: score + weights[result_id]
+                    for result_id, score in scores.items()
+                    if result_id in weights
+                }
+            # Among equals, results indexed earlier come first.
+            ranked = sorted(scores, key=lambda result_id: (
+                -scores[result_id], result_id,
+            ))
+            if limit is not None:
+                ranked = ranked[:limit]
+            return [self._results[result_id] for result_id in ranked]
+
+    def begin_refresh(self, key):
+        # type: (Hashable) -> bool
+        """Claim the refresh of a query from the server.
+
+        Returns false if the query is being refreshed already, or was
+        refreshed less than max_age seconds ago, in which case the caller
+        should not refresh it. Otherwise, the caller must call end_refresh().
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            refreshed = self._refreshed.get(key)
+            if refreshed is not None and \
+                    self.clock() - refreshed < self.max_age:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key, succeeded=True):
+        # type: (Hashable, bool) -> None
+        with self._lock:
+            self._refreshing.discard(key)
+            if succeeded:
+                self._refreshed[key] = self.clock()
+
+
+__all__ = ["FIELD_WEIGHTS", "SearchIndex", "tokenize"]
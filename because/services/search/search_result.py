@@ -1,6 +1,15 @@
-from xml.dom.minidom import parseString
-from xml.parsers.expat import ExpatError
+from xml.etree import ElementTree
 from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Text,
+    Union,
+)
 from because.errors import ParseError
 from because.reprs import ReprMixin
 from because.pretty import PrettyMixin
@@ -34,43 +43,145 @@ class SearchResult(ReprMixin, PrettyMixin):
         ])
 
 
+try:
+    XMLPullParser = ElementTree.XMLPullParser
+except AttributeError:
+    # Python 2 has no push parser; iterparse pulls the chunks instead.
+    XMLPullParser = None
 
-def _xml_text(el):
-    return el.firstChild.nodeValue if el and el.firstChild else None
+# Elements of an entry which parse_opensearch_xml_entry reads.
+_ENTRY_FIELDS = ("title", "link", "category", "author", "content")
+
+
+def _local_name(tag):
+    # type: (Any) -> Text
+    """Strip any {namespace} from an ElementTree tag.
+    """
+    # Comments and processing instructions have functions as tags.
+    if callable(tag):
+        return u""
+    return tag.rpartition("}")[2]
+
+
+def _first_elements(element, names):
+    # type: (ElementTree.Element, Iterable[Text]) -> Dict[Text, ElementTree.Element]
+    """Find the first descendant with each local name, in one pass.
+    """
+    wanted = set(names)
+    found = {}  # type: Dict[Text, ElementTree.Element]
+    for child in element.iter():
+        if child is element:
+            continue
+        name = _local_name(child.tag)
+        if name in wanted and name not in found:
+            found[name] = child
+            if len(found) == len(wanted):
+                break
+    return found
+
+
+class _ChunkReader(object):
+    """File-like object reading chunks one at a time, for iterparse.
+    """
+
+    def __init__(self, chunks):
+        # type: (Iterable[bytes]) -> None
+        self._chunks = iter(chunks)
+
+    def read(self, size=-1):
+        # type: (int) -> bytes
+        # iterparse only feeds what it gets to a parser, so a chunk larger
+        # than size does no harm.
+        for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b""
+
+
+def _events(chunks):
+    # type: (Iterable[bytes]) -> Iterator[Any]
+    """Yield (event, element) pairs for XML arriving in chunks.
+    """
+    if XMLPullParser is None:
+        for item in ElementTree.iterparse(
+                _ChunkReader(chunks), events=("start", "end")):
+            yield item
+        return
+    parser = XMLPullParser(events=("start", "end"))
+    for chunk in chunks:
+        parser.feed(chunk)
+        for item in parser.read_events():
+            yield item
+    parser.close()
+    for item in parser.read_events():
+        yield item
+
+
+def iter_opensearch_xml(data):
+    # type: (Union[bytes, Iterable[bytes]]) -> Iterator[SearchResult]
+    """Parse an opensearch Atom feed, yielding a SearchResult per entry.
+
+    Each entry is parsed as soon as its end tag arrives and is then thrown
+    away, so memory use doesn't grow with the size of the feed.
+
+    :arg data:
+        The feed, as bytes or an iterable of bytes chunks, e.g. from a
+        streaming transfer.
+    """
+    chunks = [data] if isinstance(data, bytes) else data
+    root = None
+    depth = 0
+    try:
+        for event, element in _events(chunks):
+            if event == "start":
+                if root is None:
+                    root = element
+                if _local_name(element.tag) == "entry":
+                    depth += 1
+                continue
+            if _local_name(element.tag) != "entry":
+                continue
+            depth -= 1
+            # Only act on outermost entries; a nested one is part of its entry.
+            if depth:
+                continue
+            yield SearchResult(**parse_opensearch_xml_entry(element))
+            # Drop what has been parsed so far, this entry included.
+            root.clear()
+    # raise a predictable exception type wrapping the xml exception
+    except ElementTree.ParseError as error:
+        raise ParseError(
+            "error parsing opensearch XML",
+            error=error,
+        )
 
 
 def parse_opensearch_xml(data):
-    doc = parseString(data)
-    entries = doc.getElementsByTagName("entry")
-
-    # I like comprehensions, but this will give better tracebacks
-    results = []
-    for entry in entries:
-        try:
-            data = parse_opensearch_xml_entry(entry)
-        # raise a predictable exception type wrapping the xml exception
-        except ExpatError as error:
-            raise ParseError(
-                "error parsing opensearch XML",
-                error=error,
-            )
-        result = SearchResult(**data)
-        results.append(result)
-    return results
+    # type: (Union[bytes, Iterable[bytes]]) -> List[SearchResult]
+    return list(iter_opensearch_xml(data))
+
+
+def _xml_text(el):
+    # type: (Optional[ElementTree.Element]) -> Optional[Text]
+    return el.text if el is not None else None
 
 
 def parse_opensearch_xml_entry(entry):
-    el_title = entry.getElementsByTagName("title")[0]
-    el_link = entry.getElementsByTagName("link")[0]
-    el_category = entry.getElementsByTagName("category")[0]
-    el_author = entry.getElementsByTagName("author")[0]
-    el_name = el_author.getElementsByTagName("name")[0]
-    el_content = entry.getElementsByTagName("content")[0]
+    # type: (ElementTree.Element) -> Dict[Text, Any]
+    found = _first_elements(entry, _ENTRY_FIELDS)
+    missing = [name for name in _ENTRY_FIELDS if name not in found]
+    if missing:
+        raise ParseError(
+            "opensearch entry missing {0}".format(", ".join(missing)),
+        )
+    el_name = _first_elements(found["author"], ["name"]).get("name")
+    if el_name is None:
+        raise ParseError("opensearch entry missing author name")
 
     return {
-        "title": _xml_text(el_title),
-        "url": el_link.getAttribute("href"),
-        "category": el_category.getAttribute("term"),
+        "title": _xml_text(found["title"]),
+        "url": found["link"].get("href", u""),
+        "category": found["category"].get("term", u""),
         "author": _xml_text(el_name),
-        "content": _xml_text(el_content),
+        "content": _xml_text(found["content"]),
     }
@@ -1,18 +1,36 @@
 """This module is a place for code which customizes a BCS service definition.
 """
 
-import json
 from typing import Text
 from because.errors import ParseError
+from because.json_stream import stream_json
+from because.response import parse_json
 from because.services.headers import DEFAULT_HEADERS
 from because.headers import Headers
 from because.service import Service, Endpoint
 from . search_category import SearchCategory
-from . search_result import SearchResult, parse_opensearch_xml
+from . search_result import (
+    SearchResult,
+    iter_opensearch_xml,
+    parse_opensearch_xml,
+)
 # TODO Should be standard repr
 # from . goemetry import Geometry
 
 
+def feature_to_result(feature):
+    """Convert one feature of a category response into a SearchResult.
+    """
+    # Ignored for now, later could be encapsulated and offered up
+    # maybe set it to None if it's some stupid null island point
+    # feature_type = feature["type"]
+    # geometry = feature["geometry"]
+
+    properties = feature["properties"]
+    del properties["id"]
+    return SearchResult(**properties)
+
+
 class SearchService(Service):
     """Define endpoints for BCS search service.
     """
@@ -85,11 +103,9 @@ class SearchService(Service):
     def parse_osd(self, response):
         return response
 
-    def parse_opensearch(self, response):
+    def _check_opensearch(self, response):
         if not response:
             raise ParseError("falsy response", response=response)
-        if not response.body:
-            raise ParseError("empty response body", response=response)
         if response.status != 200:
             raise ParseError("error response", response=response)
 
@@ -105,11 +121,22 @@ class SearchService(Service):
                 "unexpected content-type {0!r}".format(content_type),
                 response=response
             )
+
+    def parse_opensearch(self, response):
+        if response and not response.body:
+            raise ParseError("empty response body", response=response)
+        self._check_opensearch(response)
         return parse_opensearch_xml(response.body)
 
+    def iter_opensearch(self, response, chunks):
+        """Yield SearchResults from an opensearch response as it arrives.
+        """
+        self._check_opensearch(response)
+        for result in iter_opensearch_xml(chunks):
+            yield result
+
     def parse_categories(self, response):
-        # TODO more checking
-        records = json.loads(response.body.decode("utf-8"))
+        records = parse_json(response)
 
         table = {
             record["key"]: SearchCategory(
@@ -123,19 +150,14 @@ class SearchService(Service):
         return table
 
     def parse_category(self, response):
-        top = json.loads(response.body.decode("utf-8"))
+        top = parse_json(response, required_keys=["features"])
 
         # expect top["type"] == "FeatureCollection"
         features = top["features"]
-        results = []
-        for feature in features:
-            # Ignored for now, later could be encapsulated and offered up
-            # maybe set it to None if it's some stupid null island point
-            # feature_type = feature["type"]
-            # geometry = feature["geometry"]
-
-            properties = feature["properties"]
-            del properties["id"]
-            results.append(SearchResult(**properties))
-
-        return results
+        return [feature_to_result(feature) for feature in features]
+
+    def iter_category(self, response, chunks):
+        """Yield SearchResults from a category response as it arrives.
+        """
+        for _, feature in stream_json(response, chunks, ("features",)):
+            yield feature_to_result(feature)
@@ -6,6 +6,7 @@ import base64
 from datetime import datetime
 import collections
 from typing import Text
+from because import json_backends
 from because.response import parse_json
 from because.errors import ParseError, InvalidObject
 from because.headers import Headers
@@ -70,8 +71,7 @@ def parse_token_blob(blob, response=None):
     payload = base64.b64decode(middle + padding)
     # Reminder: JSON is required to be utf-8, we want to fail if it's not
     try:
-        decoded = payload.decode("utf-8")
-        data = json.loads(decoded)
+        data = json_backends.loads(payload)
     except (UnicodeDecodeError, ValueError, TypeError) as error:
         raise ParseError(
             "Could not parse decoded token blob as JSON",
@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+import pytest
+from because.future import Present
+from because.services.basemaps.cache import BasemapsCache
+from because.tests.stand_in import StandIn, json_response
+
+BODY = json.dumps([{
+    "accessList": ["bcs-basemap-boundless"],
+    "attribution": "Boundlessgeo",
+    "description": "A Boundless created OSM basemap",
+    "endpoint": "http://example.com/basemaps/boundless/osm/{x}/{y}/{z}.png",
+    "name": "Boundless OSM Basemap",
+    "standard": "XYZ",
+    "thumbnail": None,
+    "tileFormat": "PNG",
+}])
+
+ETAG = b'"v1"'
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _handler(method, path, body):
+    return json_response(BODY, headers=[(b"ETag", ETAG)])
+
+
+class TestBasemapsCache(object):
+
+    def test_shared_across_frontends(self):
+        cache = BasemapsCache()
+        with StandIn(_handler) as server:
+            first = server.frontend(basemaps_cache=cache)
+            basemaps = first.basemaps().wait()
+            second = server.frontend(basemaps_cache=cache)
+            result = second.basemap(u"Boundless OSM Basemap")
+        assert u"boundless osm basemap" in basemaps
+        assert isinstance(result, Present)
+        assert result.wait().title == u"Boundless OSM Basemap"
+        assert len(server.requests) == 1
+        assert cache.get(server.url).etag == ETAG
+
+    def test_stale_is_served_and_revalidated(self):
+        clock = FakeClock()
+        cache = BasemapsCache(ttl=60, clock=clock)
+        refreshed = threading.Event()
+
+        def handler(method, path, body):
+            if len(server.requests) > 1:
+                refreshed.set()
+                return json_response("", status=304)
+            return _handler(method, path, body)
+
+        with StandIn(handler) as server:
+            frontend = server.frontend(basemaps_cache=cache)
+            frontend.basemaps().wait()
+            clock.now += 120
+            stale = frontend.basemaps()
+            assert isinstance(stale, Present)
+            assert refreshed.wait(5)
+            # Give the refresh thread a moment to record the 304.
+            for _ in range(100):
+                if cache.is_fresh(cache.get(server.url)):
+                    break
+                time.sleep(0.01)
+        assert u"boundless osm basemap" in stale.wait()
+        assert cache.is_fresh(cache.get(server.url))
+        assert len(server.requests) == 2
+
+    def test_failed_refresh_released(self, monkeypatch):
+        clock = FakeClock()
+        cache = BasemapsCache(ttl=60, clock=clock)
+        with StandIn(_handler) as server:
+            frontend = server.frontend(basemaps_cache=cache)
+            frontend.basemaps().wait()
+            clock.now += 120
+
+            def send(request):
+                raise IOError("network is unreachable")
+
+            monkeypatch.setattr(frontend.client, "send", send)
+            with pytest.raises(IOError):
+                frontend.basemaps()
+        # The refresh can be claimed again.
+        assert cache.begin_refresh(server.url)
+
+    def test_expired(self):
+        clock = FakeClock()
+        cache = BasemapsCache(ttl=60, stale_ttl=60, clock=clock)
+        cache.store("http://example.com", BODY.encode("utf-8"))
+        clock.now += 121
+        assert cache.get("http://example.com") is None
+
+    def test_disk(self, tmpdir):
+        path = str(tmpdir.join("basemaps.db"))
+        BasemapsCache(path=path).store(
+            "http://example.com", BODY.encode("utf-8"), etag=ETAG,
+        )
+        entry = BasemapsCache(path=path).get("http://example.com")
+        assert entry.etag == ETAG
+        assert u"boundless osm basemap" in entry.basemaps
+
+    def test_one_refresh_at_a_time(self):
+        cache = BasemapsCache()
+        assert cache.begin_refresh("http://example.com")
+        assert not cache.begin_refresh("http://example.com")
+        cache.end_refresh("http://example.com")
+        assert cache.begin_refresh("http://example.com")
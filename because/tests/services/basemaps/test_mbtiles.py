@@ -0,0 +1,67 @@
+import sqlite3
+from because.services.basemaps.mbtiles import MBTiles
+
+
+class TestMBTiles(object):
+
+    def test_put_get(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        with MBTiles(path) as store:
+            store.put((1, 0, 1), b"a")
+            assert store.get((1, 0, 1)) is None  # not flushed yet
+            store.flush()
+            assert store.get((1, 0, 1)) == b"a"
+            assert store.get((0, 0, 1)) is None
+
+    def test_rows_flipped(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        with MBTiles(path) as store:
+            store.put((1, 0, 2), b"a")
+        connection = sqlite3.connect(path)
+        rows = list(connection.execute(
+            "SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles"
+        ))
+        # Python 2's sqlite3 gives blobs as buffers.
+        assert [row[:3] + (bytes(row[3]),) for row in rows] == \
+            [(2, 1, 3, b"a")]
+
+    def test_deduplicates(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        with MBTiles(path, batch_size=2) as store:
+            for x in range(5):
+                store.put((x, 0, 3), b"ocean")
+            store.put((5, 0, 3), b"land")
+        with MBTiles(path) as store:
+            assert store.counts() == (6, 2)
+            assert store.get((4, 0, 3)) == b"ocean"
+            store.put((6, 0, 3), b"ocean")
+            store.flush()
+            assert store.duplicates == 1
+
+    def test_batches(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        store = MBTiles(path, batch_size=3)
+        store.put((0, 0, 2), b"a")
+        store.put((1, 0, 2), b"b")
+        assert store.counts() == (0, 0)
+        store.put_empty((2, 0, 2))
+        assert store.counts() == (2, 2)
+        store.close()
+
+    def test_done(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        with MBTiles(path) as store:
+            store.put((0, 0, 1), b"a")
+            store.put_empty((1, 1, 1))
+            store.flush()
+            tiles = [(x, y, 1) for x in range(2) for y in range(2)]
+            assert store.done(tiles) == set([(0, 0, 1), (1, 1, 1)])
+            many = [(x, y, 10) for x in range(40) for y in range(40)]
+            assert store.done(many) == set()
+
+    def test_metadata(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        with MBTiles(path) as store:
+            assert store.metadata() == {}
+            store.set_metadata(name="osm", minzoom=0)
+            assert store.metadata() == {"name": "osm", "minzoom": "0"}
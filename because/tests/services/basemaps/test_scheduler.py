@@ -0,0 +1,321 @@
+import threading
+import time
+import pytest
+from because.errors import InvalidObject
+from because.interfaces.python.client import Client as BlockingClient
+from because.response import Response
+from because.services.basemaps.basemap import Basemap
+from because.services.basemaps.scheduler import TileScheduler, viewport_tiles
+from because.services.basemaps.tile_cache import TileCache
+from because.tests.stand_in import StandIn
+
+try:
+    from because.interfaces.concurrent.client import Client
+except ImportError:
+    # It needs concurrent.futures, a backport on Python 2.
+    Client = None
+
+# Tiles 3-4 x 3-4 at zoom 3, centred on (0, 0).
+VIEW = (-40, -40, 40, 40)
+# The same size of view, moved east onto columns 5-6.
+PANNED = (50, -40, 130, 40)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+class Gate(object):
+    """Serve tiles, holding each response until released."""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.event = threading.Event()
+
+    def __call__(self, method, path, body):
+        self.event.wait(5)
+        return Response(self.status, body=path.encode("utf-8"))
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Collect(object):
+    def __init__(self):
+        self.tiles = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, tile, data):
+        with self.lock:
+            self.tiles[tile] = data
+
+
+@pytest.fixture
+def qt():
+    """The Qt interface, with an application for its timers."""
+    qt = pytest.importorskip("because.interfaces.qt.tile_scheduler")
+    try:
+        from PyQt5.QtCore import QCoreApplication
+    except ImportError:
+        from PyQt4.QtCore import QCoreApplication
+    app = QCoreApplication.instance() or QCoreApplication([])
+    yield qt
+    del app
+
+
+class FakeReply(object):
+    """Stand in for a QNetworkReply which has had an error."""
+
+    def __init__(self, status):
+        self.status = status
+
+    def attribute(self, attribute):
+        from because.interfaces.qt.transfer import QNetworkRequest
+        if attribute == QNetworkRequest.HttpStatusCodeAttribute:
+            return self.status
+        return None
+
+    def errorString(self):
+        return "error"
+
+    def rawHeaderPairs(self):
+        return []
+
+    def readAll(self):
+        return b""
+
+
+class QtClient(object):
+    """Stand in for a Qt Client, whose transfers never start."""
+
+    def __init__(self):
+        from because.interfaces.qt.transfer import Transfer
+        self.transfer_cls = Transfer
+        self.transfers = []
+
+    def send(self, request):
+        transfer = self.transfer_cls(request, _send=lambda buf: None)
+        self.transfers.append(transfer)
+        return transfer
+
+    def release(self, transfer):
+        pass
+
+
+def fail(transfer, code, status=None):
+    """Fail a Qt transfer as its QNetworkReply would."""
+    transfer._reply = FakeReply(status)
+    transfer._on_error(code)
+
+
+def scheduler(server, on_tile, **kwargs):
+    if Client is None:
+        pytest.skip("needs the concurrent interface")
+    basemap = Basemap(server.url + "/{z}/{x}/{y}")
+    return TileScheduler(basemap, Client(), on_tile, **kwargs)
+
+
+def paths(server):
+    return [path for _, path, _ in server.requests]
+
+
+class TestViewportTiles(object):
+
+    def test_center_out(self):
+        tiles = viewport_tiles((-100, -60, -20, 20), 3)
+        assert tiles[0] == (2, 4, 3)
+        assert set(tiles) == {(x, y, 3) for x in (1, 2, 3) for y in (3, 4, 5)}
+
+    def test_antimeridian(self):
+        tiles = viewport_tiles((170, -10, -170, 10), 4)
+        assert set(tile[0] for tile in tiles[:2]) == {0, 15}
+
+
+class TestTileScheduler(object):
+
+    def test_in_flight_capped(self):
+        gate = Gate()
+        collect = Collect()
+        with StandIn(gate) as server:
+            try:
+                tiles = scheduler(server, collect, max_in_flight=2)
+                tiles.set_viewport(VIEW, 3)
+                wait_for(lambda: len(server.requests) == 2)
+                assert len(tiles.in_flight) == 2
+                assert len(tiles.queued) == 2
+                time.sleep(0.05)
+                assert len(server.requests) == 2
+            finally:
+                gate.event.set()
+            wait_for(lambda: len(collect.tiles) == 4)
+        assert collect.tiles[(3, 4, 3)] == b"/3/3/4"
+        assert sorted(paths(server)) == \
+            ["/3/3/3", "/3/3/4", "/3/4/3", "/3/4/4"]
+        assert tiles.in_flight == [] and tiles.queued == []
+
+    def test_pan_cancels_tiles_out_of_view(self):
+        gate = Gate()
+        collect = Collect()
+        with StandIn(gate) as server:
+            try:
+                tiles = scheduler(server, collect, max_in_flight=2)
+                tiles.set_viewport(VIEW, 3)
+                wait_for(lambda: len(server.requests) == 2)
+                old = tiles.in_flight
+                tiles.set_viewport(PANNED, 3)
+                assert not set(old) & set(tiles.in_flight + tiles.queued)
+                assert all(tile[0] in (5, 6) for tile in tiles.in_flight)
+            finally:
+                gate.event.set()
+            wait_for(lambda: len(collect.tiles) == 4)
+            time.sleep(0.05)
+        # Requests already running finish, but their tiles are dropped.
+        assert all(tile[0] in (5, 6) for tile in collect.tiles)
+
+    def test_not_fetched_again(self):
+        gate = Gate()
+        gate.event.set()
+        collect = Collect()
+        with StandIn(gate) as server:
+            tiles = scheduler(
+                server, collect, is_cached=lambda tile: tile[0] == 4,
+            )
+            tiles.set_viewport(VIEW, 3)
+            wait_for(lambda: len(collect.tiles) == 2)
+            # Overlapping the last view, tiles still in view aren't fetched.
+            tiles.set_viewport((-40, -40, 80, 40), 3)
+            wait_for(lambda: len(collect.tiles) == 4)
+            time.sleep(0.05)
+        assert sorted(paths(server)) == ["/3/3/3", "/3/3/4", "/3/5/3", "/3/5/4"]
+
+    def test_tile_cache(self, tmpdir):
+        gate = Gate()
+        gate.event.set()
+        cache = TileCache(str(tmpdir))
+        with StandIn(gate) as server:
+            collect = Collect()
+            scheduler(server, collect, tile_cache=cache).set_viewport(VIEW, 3)
+            wait_for(lambda: len(collect.tiles) == 4)
+            again = Collect()
+            scheduler(server, again, tile_cache=cache).set_viewport(VIEW, 3)
+            wait_for(lambda: len(again.tiles) == 4)
+        assert len(server.requests) == 4
+        assert again.tiles == collect.tiles
+
+    def test_failed_retried_after_backoff(self):
+        gate = Gate(status=500)
+        gate.event.set()
+        clock = Clock()
+        with StandIn(gate) as server:
+            tiles = scheduler(server, Collect(), clock=clock, retry_delay=60)
+            tiles.set_viewport(VIEW, 3)
+            wait_for(lambda: not tiles.in_flight)
+            tiles.set_viewport(VIEW, 3)
+            assert tiles.in_flight == []
+            clock.now += 60
+            tiles.set_viewport(VIEW, 3)
+            wait_for(lambda: len(server.requests) == 8)
+            wait_for(lambda: not tiles.in_flight)
+            # The delay doubles after each failure.
+            clock.now += 60
+            tiles.set_viewport(VIEW, 3)
+            assert tiles.in_flight == []
+            clock.now += 60
+            tiles.set_viewport(VIEW, 3)
+            wait_for(lambda: len(server.requests) == 12)
+
+    def test_failed_retried_on_coming_back_into_view(self):
+        gate = Gate(status=503)
+        gate.event.set()
+        with StandIn(gate) as server:
+            tiles = scheduler(server, Collect(), retry_delay=60)
+            tiles.set_viewport(VIEW, 3)
+            wait_for(lambda: not tiles.in_flight)
+            tiles.set_viewport(PANNED, 3)
+            wait_for(lambda: not tiles.in_flight)
+            tiles.set_viewport(VIEW, 3)
+            wait_for(lambda: len(server.requests) == 12)
+
+    def test_refused_not_retried(self):
+        gate = Gate(status=403)
+        gate.event.set()
+        clock = Clock()
+        with StandIn(gate) as server:
+            tiles = scheduler(server, Collect(), clock=clock)
+            tiles.set_viewport(VIEW, 3)
+            wait_for(lambda: not tiles.in_flight)
+            clock.now += 1000
+            tiles.set_viewport(PANNED, 3)
+            wait_for(lambda: not tiles.in_flight)
+            tiles.set_viewport(VIEW, 3)
+            assert tiles.in_flight == []
+            tiles.retry_failed()
+            wait_for(lambda: len(server.requests) == 12)
+
+    def test_retried_by_itself(self):
+        attempts = []
+
+        def flaky(method, path, body):
+            attempts.append(path)
+            if attempts.count(path) == 1:
+                return Response(503)
+            return Response(200, body=b"tile")
+
+        collect = Collect()
+        with StandIn(flaky) as server:
+            tiles = scheduler(server, collect, retry_delay=0.05)
+            tiles.set_viewport(VIEW, 3)
+            wait_for(lambda: len(collect.tiles) == 4)
+        assert len(server.requests) == 8
+
+    def test_empty_tiles(self):
+        gate = Gate(status=404)
+        gate.event.set()
+        collect = Collect()
+        with StandIn(gate) as server:
+            scheduler(server, collect).set_viewport(VIEW, 3)
+            wait_for(lambda: len(collect.tiles) == 4)
+        assert set(collect.tiles.values()) == {None}
+
+    def test_qt_http_error_status(self, qt):
+        client = QtClient()
+        collect = Collect()
+        clock = Clock()
+        tiles = qt.QtTileScheduler(
+            Basemap("http://127.0.0.1:9/{z}/{x}/{y}"), client, collect,
+            clock=clock, retry_delay=60,
+        )
+        tiles.set_viewport(VIEW, 3)
+        empty, refused, unavailable, unreachable = tiles.in_flight
+        # QNetworkReply.NetworkError codes: ContentNotFoundError,
+        # ContentAccessDenied, ServiceUnavailableError and HostNotFoundError.
+        fail(client.transfers[0], 203, status=404)
+        fail(client.transfers[1], 201, status=403)
+        fail(client.transfers[2], 403, status=503)
+        fail(client.transfers[3], 3)
+        assert collect.tiles == {empty: None}
+        assert tiles.in_flight == []
+        clock.now += 60
+        tiles.set_viewport(VIEW, 3)
+        assert tiles.in_flight == [unavailable, unreachable]
+        assert refused not in tiles.queued
+
+    def test_blocking_client(self):
+        basemap = Basemap("http://127.0.0.1:9/{z}/{x}/{y}")
+        tiles = TileScheduler(basemap, BlockingClient(), Collect())
+        with pytest.raises(InvalidObject):
+            tiles.set_viewport(VIEW, 3)
+
+    def test_bad_max_in_flight(self):
+        with pytest.raises(InvalidObject):
+            TileScheduler(Basemap("http://t/{z}/{x}/{y}"), BlockingClient(),
+                          Collect(), max_in_flight=0)
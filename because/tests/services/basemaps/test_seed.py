@@ -0,0 +1,84 @@
+import pytest
+from because.errors import InvalidObject
+from because.response import Response
+from because.services.basemaps.basemap import Basemap
+from because.services.basemaps.mbtiles import MBTiles
+from because.services.basemaps.seed import seed
+from because.services.basemaps.tiles import count_bbox_tiles
+from because.tests.stand_in import StandIn
+
+BBOX = (-10, -10, 10, 10)
+
+
+def _handler(method, path, body):
+    z, x, y = [int(part) for part in path.split("/")[-3:]]
+    if y == 0:
+        return Response(404)
+    if z == 2 and (x, y) == (1, 2):
+        return Response(500)
+    # Only tile x differs, so tiles in each column are duplicates.
+    return Response(200, body=("tile %d" % x).encode("utf-8"))
+
+
+def _basemap(server):
+    return Basemap(server.url + "/{z}/{x}/{y}", title="test")
+
+
+class TestSeed(object):
+
+    def test_seed(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        with StandIn(_handler, keep_alive=True) as server:
+            report = seed(_basemap(server), path, range(0, 4), bbox=BBOX,
+                          concurrency=4, batch_size=3)
+        total = count_bbox_tiles(BBOX, range(0, 4))
+        assert len(server.requests) == total
+        assert list(report.errors) == [(1, 2, 2)]
+        assert report.errors[(1, 2, 2)].code == 500
+        assert report.empty == 3  # the tiles with y=0, at zooms 0 and 1
+        assert report.stored == total - 4
+        assert report.skipped == 0
+        # Fewer connections than requests, thanks to the pool.
+        assert len(server.connections) < total
+        with MBTiles(path) as store:
+            assert store.get((3, 4, 3)) == b"tile 3"
+            metadata = store.metadata()
+            tiles, images = store.counts()
+        assert metadata["name"] == "test"
+        assert metadata["minzoom"] == "0"
+        assert metadata["maxzoom"] == "3"
+        assert tiles == report.stored
+        assert images == 5  # x from 0 to 4
+        assert report.duplicates == tiles - images
+
+    def test_resume(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        with StandIn(_handler) as server:
+            seed(_basemap(server), path, [2], bbox=BBOX)
+            first = len(server.requests)
+            report = seed(_basemap(server), path, [2, 3], bbox=BBOX)
+            retried = [request[1] for request in server.requests[first:]]
+        # Only the failed tile of zoom 2 is requested again.
+        assert report.skipped == count_bbox_tiles(BBOX, [2]) - 1
+        assert "/2/1/2" in retried
+        assert len(retried) == 1 + count_bbox_tiles(BBOX, [3])
+
+    def test_polygon(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        ring = [[0, 1], [40, 1], [0, 40]]
+        with StandIn(_handler) as server:
+            report = seed(_basemap(server), path, [5], polygon=[ring])
+            paths = [request[1] for request in server.requests]
+        assert "/5/16/15" in paths
+        assert "/5/19/12" not in paths
+        assert report.stored == len(paths)
+
+    def test_arguments(self, tmpdir):
+        path = str(tmpdir.join("t.mbtiles"))
+        basemap = Basemap("http://t/{z}/{x}/{y}")
+        with pytest.raises(InvalidObject):
+            seed(basemap, path, [1])
+        with pytest.raises(InvalidObject):
+            seed(basemap, path, [1], bbox=BBOX, polygon=[[[0, 0]]])
+        with pytest.raises(InvalidObject):
+            seed(basemap, path, [], bbox=BBOX)
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import pytest
+from because.headers import Headers
+from because.response import Response
+from because.transfer import TransferError
+from because.services.basemaps.basemap import Basemap
+from because.services.basemaps.seed import seed
+from because.services.basemaps.tile_cache import TileCache, max_age
+from because.tests.stand_in import StandIn
+
+URL = u"https://t/1/2/3.png"
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMaxAge(object):
+
+    @pytest.mark.parametrize("values, expected", [
+        ([], 60),
+        ([b"public, max-age=300"], 300),
+        ([b"Max-Age = 5"], 5),
+        ([b"no-store"], 0),
+        ([b"no-cache, max-age=300"], 0),
+    ])
+    def test_max_age(self, values, expected):
+        headers = Headers([(b"Cache-Control", value) for value in values])
+        assert max_age(headers, 60) == expected
+
+
+class TestTileCache(object):
+
+    def test_put_get(self, tmpdir):
+        cache = TileCache(str(tmpdir))
+        assert cache.get(URL) is None
+        cache.put(URL, b"png", etag=b'"a"')
+        cached = cache.get(URL)
+        assert (cached.data, cached.etag, cached.fresh) == (
+            b"png", b'"a"', True,
+        )
+
+    def test_gdal_layout(self, tmpdir):
+        cache = TileCache(str(tmpdir), depth=2, extension=".png")
+        cache.put(URL, b"png")
+        digest = hashlib.md5(URL.encode("utf-8")).hexdigest()
+        path = os.path.join(
+            str(tmpdir), "tiles", digest[0], digest[1], digest + ".png",
+        )
+        assert cache.file_path(URL) == path
+        with open(path, "rb") as stream:
+            assert stream.read() == b"png"
+        xml = cache.gdal_cache_xml()
+        assert "<Path>{0}</Path>".format(cache.tiles_path) in xml
+        assert "<Unique>False</Unique>" in xml
+
+    def test_reads_tiles_from_gdal(self, tmpdir):
+        clock = Clock()
+        cache = TileCache(str(tmpdir), ttl=100, clock=clock)
+        path = cache.file_path(URL)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as stream:
+            stream.write(b"from gdal")
+        os.utime(path, (clock.now - 50, clock.now - 50))
+        cached = cache.get(URL)
+        assert (cached.data, cached.etag, cached.fresh) == (
+            b"from gdal", None, True,
+        )
+        clock.now += 60
+        assert not cache.get(URL).fresh
+
+    def test_expiry_and_touch(self, tmpdir):
+        clock = Clock()
+        cache = TileCache(str(tmpdir), ttl=100, clock=clock)
+        cache.put(URL, b"png", ttl=10)
+        clock.now += 11
+        cached = cache.get(URL)
+        assert cached.data == b"png" and not cached.fresh
+        cache.touch(URL, ttl=10)
+        assert cache.get(URL).fresh
+
+    def test_trim_least_recently_used(self, tmpdir):
+        clock = Clock()
+        cache = TileCache(str(tmpdir), max_size=10000, clock=clock)
+        urls = [u"https://t/{0}/0/0.png".format(i) for i in range(5)]
+        for url in urls:
+            cache.put(url, b"x" * 100)
+            clock.now += 100
+        cache.get(urls[0])
+        assert cache.size() == 500
+        assert cache.trim(max_size=300) == 300
+        kept = [url for url in urls if cache.get(url) is not None]
+        assert kept == [urls[0], urls[4]]
+
+    def test_put_trims(self, tmpdir):
+        clock = Clock()
+        cache = TileCache(str(tmpdir), max_size=1000, clock=clock)
+        for i in range(30):
+            cache.put(u"https://t/{0}/0/0.png".format(i), b"x" * 100)
+            clock.now += 1
+        assert cache.size() <= 1000
+        assert cache.get(u"https://t/29/0/0.png") is not None
+        assert cache.get(u"https://t/0/0/0.png") is None
+
+    def test_clear(self, tmpdir):
+        cache = TileCache(str(tmpdir))
+        cache.put(URL, b"png")
+        cache.clear()
+        assert cache.get(URL) is None
+        assert cache.size() == 0
+
+    def test_store_response(self, tmpdir):
+        clock = Clock()
+        cache = TileCache(str(tmpdir), clock=clock)
+        response = Response(200, headers=[
+            (b"ETag", b'"v1"'), (b"Cache-Control", b"max-age=5"),
+        ], body=b"png")
+        assert cache.store_response(URL, response) == b"png"
+        cached = cache.get(URL)
+        assert cached.etag == b'"v1"'
+        clock.now += 6
+        cached = cache.get(URL)
+        assert not cached.fresh
+        not_modified = Response(
+            304, headers=[(b"Cache-Control", b"max-age=5")],
+        )
+        assert cache.store_response(URL, not_modified, cached) == b"png"
+        assert cache.get(URL).fresh
+
+    def test_store_response_empty_and_errors(self, tmpdir):
+        cache = TileCache(str(tmpdir))
+        assert cache.store_response(URL, Response(404)) is None
+        assert cache.get(URL) is None
+        with pytest.raises(TransferError):
+            cache.store_response(URL, Response(500))
+        no_store = Response(
+            200, headers=[(b"Cache-Control", b"no-store")], body=b"png",
+        )
+        assert cache.store_response(URL, no_store) == b"png"
+        assert cache.get(URL) is None
+
+    def test_shared_between_instances(self, tmpdir):
+        TileCache(str(tmpdir)).put(URL, b"png")
+        assert TileCache(str(tmpdir)).get(URL).data == b"png"
+
+
+def _etag_handler(method, path, body):
+    return Response(200, headers=[(b"ETag", b'"same"')], body=b"tile")
+
+
+class TestRevalidation(object):
+
+    def test_frontend_tile(self, tmpdir):
+        clock = Clock()
+        cache = TileCache(str(tmpdir), ttl=10, clock=clock)
+        with StandIn(_etag_handler) as server:
+            frontend = server.frontend(tile_cache=cache)
+            basemap = Basemap(server.url + "/{z}/{x}/{y}")
+            assert frontend.tile(basemap, 1, 2, 3).wait() == b"tile"
+            assert frontend.tile(basemap, 1, 2, 3).wait() == b"tile"
+            assert len(server.requests) == 1
+            clock.now += 11
+            assert frontend.tile(basemap, 1, 2, 3).wait() == b"tile"
+        assert [path for _, path, _ in server.requests] == ["/3/1/2"] * 2
+
+    def test_seed_through_cache(self, tmpdir):
+        cache = TileCache(str(tmpdir.join("cache")))
+        bbox = (-10, -10, 10, 10)
+        with StandIn(_etag_handler) as server:
+            basemap = Basemap(server.url + "/{z}/{x}/{y}")
+            seed(basemap, str(tmpdir.join("a.mbtiles")), [2], bbox=bbox,
+                 cache=cache)
+            first = len(server.requests)
+            report = seed(basemap, str(tmpdir.join("b.mbtiles")), [2],
+                          bbox=bbox, cache=cache)
+            assert len(server.requests) == first
+        assert report.stored == first
+        assert cache.get(basemap.tile_url(1, 1, 2)).data == b"tile"
@@ -0,0 +1,228 @@
+from array import array
+import pytest
+from because.errors import InvalidObject
+from because.services.basemaps.basemap import Basemap
+from because.services.basemaps.tiles import (
+    ORIGIN_SHIFT,
+    TileRange,
+    TileURLTemplate,
+    bbox_tiles,
+    bbox_to_tile_ranges,
+    center_out,
+    count_bbox_tiles,
+    lonlat_to_mercator,
+    lonlat_to_mercator_many,
+    lonlat_to_tile,
+    lonlat_to_tile_many,
+    mercator_to_lonlat,
+    mercator_to_lonlat_many,
+    polygon_tiles,
+    quadkey_to_tile,
+    tile_bounds,
+    tile_bounds_mercator,
+    tile_to_lonlat,
+    tile_to_quadkey,
+    zoom_for_resolution,
+)
+
+
+class TestConversions(object):
+
+    def test_mercator_round_trip(self):
+        x, y = lonlat_to_mercator(-122.4194, 37.7749)
+        assert x == pytest.approx(-13627665.27, abs=0.01)
+        assert y == pytest.approx(4547675.35, abs=0.01)
+        lon, lat = mercator_to_lonlat(x, y)
+        assert (lon, lat) == (pytest.approx(-122.4194), pytest.approx(37.7749))
+
+    def test_mercator_edges(self):
+        assert lonlat_to_mercator(180, 90) == (
+            pytest.approx(ORIGIN_SHIFT), pytest.approx(ORIGIN_SHIFT),
+        )
+
+    def test_tile(self):
+        assert lonlat_to_tile(0, 0, 0) == (0, 0)
+        assert lonlat_to_tile(-122.4194, 37.7749, 12) == (655, 1583)
+        # Off the edges of the world: clamped.
+        assert lonlat_to_tile(180, -90, 3) == (7, 7)
+        assert lonlat_to_tile(-200, 89.9, 3) == (0, 0)
+
+    def test_tile_corners(self):
+        assert tile_to_lonlat(0, 0, 0) == (-180.0, pytest.approx(85.0511287))
+        west, south, east, north = tile_bounds(655, 1583, 12)
+        assert west <= -122.4194 <= east
+        assert south <= 37.7749 <= north
+        assert tile_bounds_mercator(0, 0, 1) == (
+            -ORIGIN_SHIFT, 0.0, 0.0, ORIGIN_SHIFT,
+        )
+
+    def test_quadkey(self):
+        assert tile_to_quadkey(3, 5, 3) == "213"
+        assert quadkey_to_tile("213") == (3, 5, 3)
+        assert tile_to_quadkey(0, 0, 0) == ""
+        with pytest.raises(InvalidObject):
+            quadkey_to_tile("14")
+
+
+class TestMany(object):
+
+    def test_matches_single(self):
+        lons = array("d", [-180.0, -122.4194, 0.0, 151.2, 180.0])
+        lats = array("d", [-90.0, 37.7749, 0.0, -33.87, 90.0])
+        xs, ys = lonlat_to_mercator_many(lons, lats)
+        for lon, lat, x, y in zip(lons, lats, xs, ys):
+            expected = lonlat_to_mercator(lon, lat)
+            assert (x, y) == tuple(map(pytest.approx, expected))
+        back_lons, back_lats = mercator_to_lonlat_many(xs, ys)
+        assert list(back_lons) == list(map(pytest.approx, lons))
+        tile_xs, tile_ys = lonlat_to_tile_many(lons, lats, 10)
+        assert list(zip(tile_xs, tile_ys)) == [
+            lonlat_to_tile(lon, lat, 10) for lon, lat in zip(lons, lats)
+        ]
+
+    def test_numpy(self):
+        numpy = pytest.importorskip("numpy")
+        lons = numpy.array([-122.4194, 200.0])
+        lats = numpy.array([37.7749, 0.0])
+        xs, ys = lonlat_to_tile_many(lons, lats, 12)
+        assert list(xs) == [655, 4095]
+        assert list(ys) == [1583, 2048]
+
+
+class TestTileRanges(object):
+
+    def test_bbox(self):
+        ranges = bbox_to_tile_ranges((-122.5, 37.7, -122.3, 37.8), 12)
+        assert ranges == [TileRange(12, 654, 1582, 656, 1584)]
+        assert len(ranges[0]) == 9
+        assert (656, 1582, 12) in ranges[0]
+        assert (656, 1582, 11) not in ranges[0]
+
+    def test_edges_not_overcounted(self):
+        assert bbox_to_tile_ranges((-180, -85.06, 180, 85.06), 1) == \
+            [TileRange(1, 0, 0, 1, 1)]
+        north = tile_to_lonlat(0, 1, 2)[1]
+        assert bbox_to_tile_ranges((0, 0, 90, north), 2) == \
+            [TileRange(2, 2, 1, 2, 1)]
+
+    def test_antimeridian(self):
+        ranges = bbox_to_tile_ranges((170, -10, -170, 10), 3)
+        assert [(r.x_min, r.x_max) for r in ranges] == [(7, 7), (0, 0)]
+
+    def test_bad_bbox(self):
+        with pytest.raises(InvalidObject):
+            bbox_to_tile_ranges((0, 10, 1, 0), 3)
+
+    def test_bbox_tiles(self):
+        bbox = (-10, -10, 10, 10)
+        tiles = list(bbox_tiles(bbox, range(0, 4)))
+        assert tiles[0] == (0, 0, 0)
+        assert len(tiles) == count_bbox_tiles(bbox, range(0, 4)) == 13
+        assert len(set(tiles)) == len(tiles)
+
+
+class TestURLs(object):
+
+    def test_template(self):
+        template = TileURLTemplate("https://t/{z}/{x}/{y}.png?a={x}")
+        assert template.url(1, 2, 3) == "https://t/3/1/2.png?a=1"
+        assert list(template.urls([(1, 2, 3), (4, 5, 6)])) == [
+            "https://t/3/1/2.png?a=1", "https://t/6/4/5.png?a=4",
+        ]
+
+    @pytest.mark.parametrize("url, expected", [
+        ("https://t/{x}/{y}/{z}", "https://t/1/2/3"),
+        ("https://t/{z}/{x}/{y}", "https://t/3/1/2"),
+        ("https://t/{z}/{x}/{-y}", "https://t/3/1/5"),
+        ("https://t/{quadkey}?z={z}", "https://t/021?z=3"),
+    ])
+    def test_forms(self, url, expected):
+        template = TileURLTemplate(url)
+        assert template.url(1, 2, 3) == expected
+        assert list(template.urls([(1, 2, 3)])) == [expected]
+
+    def test_unknown_parameter(self):
+        with pytest.raises(InvalidObject):
+            TileURLTemplate("https://t/{s}/{x}/{y}/{z}")
+
+    def test_basemap(self):
+        basemap = Basemap("https://t/{x}/{y}/{z}.png")
+        assert basemap.tile_url(1, 2, 3) == "https://t/1/2/3.png"
+        urls = list(basemap.tile_urls(bbox_tiles((-1, -1, 1, 1), [1])))
+        assert urls == [
+            "https://t/0/0/1.png", "https://t/1/0/1.png",
+            "https://t/0/1/1.png", "https://t/1/1/1.png",
+        ]
+        basemap.url = "https://u/{z}/{x}/{y}.png"
+        assert basemap.tile_url(1, 2, 3) == "https://u/3/1/2.png"
+
+
+class TestPolygonTiles(object):
+
+    def test_rectangle_matches_bbox(self):
+        ring = [[-10, -5], [20, -5], [20, 30], [-10, 30]]
+        zooms = range(0, 9)
+        assert set(polygon_tiles([ring], zooms)) == set(
+            bbox_tiles((-10, -5, 20, 30), zooms)
+        )
+
+    def test_triangle_within_bbox(self):
+        ring = [[0, 0], [40, 0], [0, 40], [0, 0]]
+        tiles = set(polygon_tiles([ring], [6]))
+        box = set(bbox_tiles((0, 0, 40, 40), [6]))
+        assert tiles < box
+        # The corner away from the hypotenuse is in; the far one is not.
+        assert lonlat_to_tile(1, 1, 6) + (6,) in tiles
+        assert lonlat_to_tile(39, 39, 6) + (6,) not in tiles
+
+    def test_hole(self):
+        outer = [[0, 0], [40, 0], [40, 40], [0, 40]]
+        hole = [[10, 10], [30, 10], [30, 30], [10, 30]]
+        tiles = set(polygon_tiles([outer, hole], [6]))
+        assert lonlat_to_tile(20, 20, 6) + (6,) not in tiles
+        assert lonlat_to_tile(5, 5, 6) + (6,) in tiles
+
+    def test_no_duplicates(self):
+        ring = [[0, 0], [40, 0], [0, 40]]
+        tiles = list(polygon_tiles([ring], [3, 7]))
+        assert len(tiles) == len(set(tiles))
+
+    def test_degenerate_ring(self):
+        with pytest.raises(InvalidObject):
+            list(polygon_tiles([[[0, 0], [1, 1]]], [1]))
+
+
+class TestViewport(object):
+
+    @pytest.mark.parametrize("resolution, expected", [
+        (156543.03, 0),
+        (78271.52, 1),
+        (0.5972, 18),
+        (0.45, 18),
+        (0.4, 19),
+        (0.001, 22),
+        (1e9, 0),
+    ])
+    def test_zoom_for_resolution(self, resolution, expected):
+        assert zoom_for_resolution(resolution) == expected
+
+    def test_zoom_for_resolution_limits(self):
+        assert zoom_for_resolution(0.001, max_zoom=19) == 19
+        assert zoom_for_resolution(1.1943, tile_size=512) == 16
+        with pytest.raises(InvalidObject):
+            zoom_for_resolution(0)
+
+    def test_center_out(self):
+        tiles = list(bbox_tiles((-10, -10, 10, 10), [4]))
+        ordered = center_out(tiles, 0, 0)
+        assert sorted(ordered) == sorted(tiles)
+        # The four tiles meeting at (0, 0) come first.
+        assert set(ordered[:4]) == set([(7, 7, 4), (8, 7, 4), (7, 8, 4),
+                                        (8, 8, 4)])
+        ordered = center_out(tiles, -9, 9)
+        assert ordered[0] == (7, 7, 4)
+        assert ordered[-1] == (8, 8, 4)
+
+    def test_center_out_antimeridian(self):
+        tiles = [(0, 0, 2), (1, 0, 2), (3, 0, 2)]
+        assert center_out(tiles, 179, 80) == [(3, 0, 2), (0, 0, 2), (1, 0, 2)]
@@ -0,0 +1,298 @@
+import gzip
+import io
+import struct
+import pytest
+from because.errors import InvalidObject, ParseError
+from because.response import Response
+from because.services.basemaps import vector_tile
+from because.services.basemaps.basemap import Basemap
+from because.services.basemaps.vector_tile import (
+    LINESTRING,
+    POINT,
+    POLYGON,
+    VectorTile,
+    decode_geometry,
+)
+from because.tests.stand_in import StandIn
+
+
+# A minimal protobuf encoder, to write tiles as the spec describes them.
+
+def varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def field(number, value):
+    if isinstance(value, bytes):
+        return varint(number << 3 | 2) + varint(len(value)) + value
+    return varint(number << 3) + varint(value)
+
+
+def packed(number, values):
+    return field(number, b"".join(varint(value) for value in values))
+
+
+def zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def command(command_id, count):
+    return command_id | count << 3
+
+
+def draw(*paths, **kwargs):
+    """Encode paths of (x, y) points as geometry commands."""
+    close = kwargs.get("close", False)
+    integers = []
+    x = y = 0
+    for path in paths:
+        integers.append(command(1, 1))
+        integers += [zigzag(path[0][0] - x), zigzag(path[0][1] - y)]
+        x, y = path[0]
+        if len(path) > 1:
+            integers.append(command(2, len(path) - 1))
+            for px, py in path[1:]:
+                integers += [zigzag(px - x), zigzag(py - y)]
+                x, y = px, py
+        if close:
+            integers.append(command(7, 1))
+    return integers
+
+
+def feature(geometry_type, geometry, tags=(), feature_id=None):
+    data = b""
+    if feature_id is not None:
+        data += field(1, feature_id)
+    if tags:
+        data += packed(2, tags)
+    data += field(3, geometry_type) + packed(4, geometry)
+    return data
+
+
+def value(text=None, double=None, sint=None, boolean=None, uint=None):
+    if text is not None:
+        return field(1, text.encode("utf-8"))
+    if double is not None:
+        return varint(3 << 3 | 1) + struct.pack("<d", double)
+    if sint is not None:
+        return field(6, zigzag(sint))
+    if boolean is not None:
+        return field(7, int(boolean))
+    return field(5, uint)
+
+
+def layer(name, features, keys=(), values=(), extent=4096):
+    data = field(15, 2) + field(1, name.encode("utf-8"))
+    for item in features:
+        data += field(2, item)
+    for key in keys:
+        data += field(3, key.encode("utf-8"))
+    for item in values:
+        data += field(4, item)
+    return data + field(5, extent)
+
+
+def tile(*layers):
+    return b"".join(field(3, item) for item in layers)
+
+
+SQUARE = [(0, 0), (10, 0), (10, 10), (0, 10)]
+HOLE = [(2, 2), (2, 8), (8, 8), (8, 2)]
+
+
+def roads():
+    return layer(
+        "roads",
+        [
+            feature(LINESTRING, draw([(1, 1), (5, 1), (5, 9)]),
+                    tags=[0, 0, 1, 2], feature_id=7),
+            feature(LINESTRING, draw([(3, 3), (4, 4)], [(8, 8), (6, 2)]),
+                    tags=[0, 1, 1, 3]),
+        ],
+        keys=["class", "lanes"],
+        values=[value(text=u"primary"), value(text=u"path"),
+                value(sint=-2), value(uint=1)],
+    )
+
+
+def sample():
+    return tile(
+        layer("water", [feature(POLYGON, draw(SQUARE, HOLE, close=True))]),
+        roads(),
+        layer("poi", [feature(POINT, draw([(5, 5)]), tags=[0, 0]),
+                      feature(POINT, draw([(1, 2)], [(3, 4)]), tags=[0, 1])],
+              keys=["open"], values=[value(boolean=True), value(double=2.5)]),
+    )
+
+
+class TestVectorTile(object):
+
+    def test_layers(self):
+        decoded = VectorTile(sample())
+        assert decoded.names == ["water", "roads", "poi"]
+        assert len(decoded) == 3
+        assert "roads" in decoded and "rail" not in decoded
+        assert decoded.get("rail") is None
+        roads = decoded["roads"]
+        assert roads is decoded["roads"]
+        assert (roads.name, roads.version, roads.extent) == ("roads", 2, 4096)
+        assert roads.keys == ["class", "lanes"]
+        assert roads.values == ["primary", "path", -2, 1]
+
+    def test_layers_decoded_on_demand(self):
+        decoded = VectorTile(sample())
+        list(decoded["poi"])
+        assert list(decoded._layers) == ["poi"]
+
+    def test_features(self):
+        roads = VectorTile(sample())["roads"]
+        assert len(roads) == 2
+        first, second = roads
+        assert first.id == 7 and second.id is None
+        assert first.type == LINESTRING
+        assert first.properties == {"class": "primary", "lanes": -2}
+        assert roads[-1].properties == {"class": "path", "lanes": 1}
+        with pytest.raises(IndexError):
+            roads[2]
+
+    def test_property_types(self):
+        poi = VectorTile(sample())["poi"]
+        assert poi.values == [True, 2.5]
+        assert poi[0].properties["open"] is True
+
+    def test_streaming(self):
+        decoded = VectorTile(sample())
+        assert [item.type for item in decoded.features()] == \
+            [POLYGON, LINESTRING, LINESTRING, POINT, POINT]
+        assert [item.layer.name for item in decoded.features(["poi", "x"])] \
+            == ["poi", "poi"]
+
+    def test_where(self):
+        roads = VectorTile(sample())["roads"]
+        assert [item.id for item in roads.where(**{"class": "primary"})] == [7]
+        assert list(roads.where(lanes=1, **{"class": "primary"})) == []
+        assert list(roads.where(surface="paved")) == []
+        # True == 1, but a bool property is not an int one.
+        assert list(roads.where(lanes=True)) == []
+
+    def test_gzipped(self):
+        out = io.BytesIO()
+        with gzip.GzipFile(fileobj=out, mode="wb") as stream:
+            stream.write(sample())
+        assert VectorTile(out.getvalue()).names == ["water", "roads", "poi"]
+
+    def test_truncated(self):
+        with pytest.raises(ParseError):
+            VectorTile(sample()[:-3])
+
+    def test_truncated_fixed_value(self):
+        # A float value, then a double, cut short at the end of the tile.
+        for value in (varint(2 << 3 | 5) + b"\0\0\0",
+                      varint(3 << 3 | 1) + b"\0" * 7):
+            data = tile(field(1, b"bad") + field(4, value))
+            with pytest.raises(ParseError):
+                VectorTile(data)["bad"]
+
+    def test_bad_wire_type(self):
+        with pytest.raises(ParseError):
+            VectorTile(varint(3 << 3 | 3))
+
+
+class TestGeometry(object):
+
+    def test_linestrings(self):
+        first, second = VectorTile(sample())["roads"]
+        geometry = first.geometry
+        assert list(geometry.coordinates) == [1, 1, 5, 1, 5, 9]
+        assert list(geometry.parts) == [0, 3]
+        assert len(geometry) == 3
+        # The cursor carries on from one line to the next.
+        assert list(second.geometry.coordinates) == [3, 3, 4, 4, 8, 8, 6, 2]
+        assert second.geometry.part_ranges() == [(0, 2), (2, 4)]
+        assert second.to_geojson()["geometry"] == {
+            "type": "MultiLineString",
+            "coordinates": [[[3, 3], [4, 4]], [[8, 8], [6, 2]]],
+        }
+
+    def test_polygon_with_hole(self):
+        water = next(iter(VectorTile(sample())["water"]))
+        assert water.geometry.polygons() == [[(0, 4), (4, 8)]]
+        geojson = water.to_geojson()["geometry"]
+        assert geojson["type"] == "Polygon"
+        assert geojson["coordinates"][0] == [
+            [0, 0], [10, 0], [10, 10], [0, 10], [0, 0],
+        ]
+        assert len(geojson["coordinates"]) == 2
+
+    def test_multipolygon(self):
+        other = [(20, 20), (30, 20), (30, 30), (20, 30)]
+        integers = draw(SQUARE, other, close=True)
+        data = tile(layer("water", [feature(POLYGON, integers)]))
+        water = VectorTile(data)["water"][0]
+        assert water.to_geojson()["geometry"]["type"] == "MultiPolygon"
+
+    def test_points(self):
+        single, multiple = VectorTile(sample())["poi"]
+        assert single.to_geojson()["geometry"] == \
+            {"type": "Point", "coordinates": [5, 5]}
+        assert multiple.to_geojson()["geometry"]["type"] == "MultiPoint"
+
+    def test_lonlat(self):
+        single = VectorTile(sample())["poi"][0]
+        # The middle of tile 0/0/0 is (0, 0) degrees.
+        point = single.geometry.to_geojson((0, 0, 0), extent=10)
+        assert point["coordinates"] == pytest.approx([0, 0], abs=1e-9)
+        corner = single.geometry.to_geojson((0, 0, 1), extent=5)
+        assert corner["coordinates"] == pytest.approx([0, 0], abs=1e-9)
+
+    def test_bad_command(self):
+        with pytest.raises(ParseError):
+            decode_geometry([command(3, 1), 0, 0])
+        with pytest.raises(ParseError):
+            decode_geometry([command(2, 2), 0, 0])
+
+    def test_numpy_matches(self, monkeypatch):
+        numpy = pytest.importorskip("numpy")
+        path = [(i * 3 % 97, i * 7 % 89) for i in range(400)]
+        integers = draw(path, path[:50])
+        expected = decode_geometry(integers)
+        data = tile(layer("long", [feature(LINESTRING, integers)]))
+        buf = bytearray(packed(4, integers))
+        length, offset = vector_tile._varint(buf, 1)
+        decoded = vector_tile._packed_numpy(buf, offset, offset + length)
+        assert list(decoded) == integers
+        assert decode_geometry(numpy.asarray(integers, numpy.uint32)) == \
+            expected
+        assert VectorTile(data)["long"][0].geometry.coordinates == expected[0]
+
+
+def _pbf_handler(method, path, body):
+    if path == "/0/0/0":
+        return Response(200, body=sample())
+    return Response(404)
+
+
+class TestFrontend(object):
+
+    def test_vector_tile(self):
+        with StandIn(_pbf_handler) as server:
+            frontend = server.frontend()
+            basemap = Basemap(server.url + "/{z}/{x}/{y}", tile_format="PBF")
+            decoded = frontend.vector_tile(basemap, 0, 0, 0).wait()
+            assert decoded.names == ["water", "roads", "poi"]
+            assert frontend.vector_tile(basemap, 1, 0, 1).wait() is None
+
+    def test_not_pbf(self):
+        with StandIn(_pbf_handler) as server:
+            frontend = server.frontend()
+            with pytest.raises(InvalidObject):
+                frontend.vector_tile(Basemap(server.url + "/{z}/{x}/{y}"),
+                                     0, 0, 0)
@@ -0,0 +1,104 @@
+import json
+import math
+import pytest
+from because.services.geocoding.candidate import Candidate
+from because.services.geocoding.table import CandidateTable
+from because.tests.stand_in import StandIn, json_response
+
+
+def _batch_handler(method, path, body):
+    addresses = json.loads(body.decode("utf-8"))["addresses"]
+    results = [
+        {"errorCode": 400, "errorMessage": "bad"} if address == "bad"
+        else {"geocodePoints": [{"x": 1.0, "y": 2.0,
+                                 "candidatePlace": address}]}
+        for address in addresses
+    ]
+    return json_response(json.dumps({"results": results}))
+
+
+def _table():
+    table = CandidateTable()
+    table.extend(0, [
+        Candidate(1.0, 1.0, u"a1", score=50, source=u"s"),
+        Candidate(2.0, 2.0, u"a2", score=90, source=u"s"),
+        Candidate(3.0, 3.0, u"a3", score=70, source=u"t"),
+    ])
+    table.extend_records(1, [
+        {"x": 10.0, "y": 10.0, "candidatePlace": u"b1", "score": 80,
+         "candidateSource": u"s"},
+        {"x": 11.0, "y": 11.0, "candidatePlace": u"b2"},
+    ])
+    return table
+
+
+class TestCandidateTable(object):
+
+    def test_views(self):
+        table = _table()
+        assert len(table) == 5
+        view = table[1]
+        assert (view.x, view.y, view.address, view.score, view.source,
+                view.row) == (2.0, 2.0, u"a2", 90.0, u"s", 0)
+        assert table[-1].score is None
+        assert table[-1].source is None
+        assert [view.address for view in table] == \
+            [u"a1", u"a2", u"a3", u"b1", u"b2"]
+        with pytest.raises(IndexError):
+            table[5]
+        with pytest.raises(AttributeError):
+            view.extra = 1
+
+    def test_sources_interned(self):
+        table = _table()
+        assert table.sources.count(u"s") == 1
+        assert table.source_codes[0] == table.source_codes[3]
+
+    def test_addresses(self):
+        table = CandidateTable()
+        table.append(0, 0.0, 0.0, u"caf\u00e9")
+        table.append(0, 0.0, 0.0, None)
+        table.append(0, 0.0, 0.0, u"")
+        assert [view.address for view in table] == [u"caf\u00e9", None, u""]
+        taken = table.take([2, 1, 0])
+        assert [view.address for view in taken] == [u"", None, u"caf\u00e9"]
+
+    def test_to_candidate(self):
+        candidate = _table()[2].to_candidate()
+        assert isinstance(candidate, Candidate)
+        assert (candidate.x, candidate.address, candidate.score) == \
+            (3.0, u"a3", 70.0)
+
+    def test_filter_min_score(self):
+        table = _table().filter(min_score=70)
+        assert [view.address for view in table] == [u"a2", u"a3", u"b1"]
+
+    def test_filter_bbox(self):
+        table = _table().filter(bbox=(1.5, 0, 10, 10))
+        assert [view.address for view in table] == [u"a2", u"a3", u"b1"]
+        table = _table().filter(min_score=75, bbox=(1.5, 0, 10, 10))
+        assert [view.address for view in table] == [u"a2", u"b1"]
+
+    def test_top_k(self):
+        table = _table()
+        assert [view.address for view in table.top_k()] == [u"a2", u"b1"]
+        assert [view.address for view in table.top_k(2)] == \
+            [u"a2", u"a3", u"b1", u"b2"]
+
+    def test_for_row(self):
+        assert [view.address for view in _table().for_row(1)] == \
+            [u"b1", u"b2"]
+
+    def test_missing_score_is_nan(self):
+        assert math.isnan(_table().score[4])
+
+    def test_geocode_table(self):
+        addresses = ["a{0}".format(index) for index in range(5)] + ["bad"]
+        with StandIn(_batch_handler) as server:
+            table = server.frontend().geocode_table(
+                addresses, batch_size=2, concurrency=2, ordered=False,
+            )
+        assert len(table) == 5
+        assert sorted(table.errors) == [5]
+        for view in table:
+            assert view.address == addresses[view.row]
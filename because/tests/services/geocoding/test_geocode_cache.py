@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import json
+from because.services.geocoding.cache import (
+    GeocodeCache,
+    cache_key,
+    normalize_address,
+)
+from because.services.geocoding.candidate import Candidate
+from because.tests.stand_in import StandIn, json_response
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _candidates():
+    return [
+        Candidate(1.5, 2.5, u"Somewhere", score=90, source=u"mapbox"),
+        Candidate(3.0, 4.0, u"Elsewhere"),
+    ]
+
+
+def _fields(candidates):
+    return [
+        (c.x, c.y, c.address, c.score, c.source) for c in candidates
+    ]
+
+
+class TestNormalize(object):
+
+    def test_variants_match(self):
+        variants = [
+            u"1600 Pennsylvania Ave., Washington DC",
+            u"  1600 PENNSYLVANIA AVE WASHINGTON, DC ",
+            b"1600 pennsylvania ave. washington dc",
+        ]
+        keys = set(normalize_address(variant) for variant in variants)
+        assert keys == set([u"1600 pennsylvania ave washington dc"])
+
+    def test_unicode_folding(self):
+        assert normalize_address(u"Café Straße") == u"cafe strasse"
+
+    def test_service_in_key(self):
+        assert cache_key(u"a", "mapbox") != cache_key(u"a", "mapzen")
+
+
+class TestGeocodeCache(object):
+
+    def test_memory(self):
+        cache = GeocodeCache()
+        assert cache.get(u"Main St", "mapbox") is None
+        cache.set(u"Main St", "mapbox", _candidates())
+        got = cache.get(u"main st.", "mapbox")
+        assert _fields(got) == _fields(_candidates())
+        assert cache.get(u"Main St", "mapzen") is None
+
+    def test_disk_shared(self, tmpdir):
+        path = str(tmpdir.join("geocode.db"))
+        GeocodeCache(path=path).set(u"Main St", "mapbox", _candidates())
+        got = GeocodeCache(path=path).get(u"MAIN ST", "mapbox")
+        assert _fields(got) == _fields(_candidates())
+
+    def test_negative_ttl(self, tmpdir):
+        clock = FakeClock()
+        cache = GeocodeCache(path=str(tmpdir.join("g.db")), ttl=100,
+                             negative_ttl=10, clock=clock)
+        cache.set(u"nowhere", "mapbox", [])
+        cache.set(u"somewhere", "mapbox", _candidates())
+        assert cache.get(u"nowhere", "mapbox") == []
+        clock.now += 50
+        assert cache.get(u"nowhere", "mapbox") is None
+        assert cache.get(u"somewhere", "mapbox")
+        clock.now += 100
+        assert cache.get(u"somewhere", "mapbox") is None
+
+
+def _handler(method, path, body):
+    if "error" in path:
+        return json_response("{}", status=500)
+    address = path.rsplit("/", 1)[-1]
+    return json_response(json.dumps({"geocodePoints": [{
+        "x": 1.0, "y": 2.0, "candidatePlace": address,
+    }]}))
+
+
+class TestFrontendCache(object):
+
+    def test_geocode_uses_cache(self):
+        with StandIn(_handler) as server:
+            frontend = server.frontend(geocode_cache=GeocodeCache())
+            first = frontend.geocode(u"Main St").wait()
+            second = frontend.geocode(u"MAIN ST.").wait()
+            frontend.geocode(u"error").wait()
+            frontend.geocode(u"error").wait()
+        assert _fields(first) == _fields(second)
+        # One request for Main St; errors aren't cached, so two for those
+        assert len(server.requests) == 3
+
+    def test_geocode_many_uses_cache(self):
+        cache = GeocodeCache()
+        cache.set(u"a", "mapbox", _candidates())
+        with StandIn(_handler) as server:
+            frontend = server.frontend(geocode_cache=cache)
+            outcomes = list(frontend.geocode_many(
+                [u"a", u"b", u"A"], use_batch=False,
+            ))
+        assert [o.value[0].address for o in outcomes] == [
+            u"Somewhere", u"b", u"Somewhere",
+        ]
+        assert len(server.requests) == 1
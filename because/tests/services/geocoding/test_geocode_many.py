@@ -0,0 +1,73 @@
+import json
+from because.errors import ParseError
+from because.tests.stand_in import StandIn, json_response
+
+
+def _point(address):
+    return {
+        "x": 1.0,
+        "y": 2.0,
+        "candidatePlace": address,
+        "score": 90,
+        "candidateSource": "test",
+    }
+
+
+def _batch_handler(method, path, body):
+    if method == "POST" and path.endswith("/batch"):
+        addresses = json.loads(body.decode("utf-8"))["addresses"]
+        results = [
+            {"errorCode": 400, "errorMessage": "bad"} if address == "bad"
+            else {"geocodePoints": [_point(address)]}
+            for address in addresses
+        ]
+        return json_response(json.dumps({"results": results}))
+    return json_response("{}", status=500)
+
+
+def _single_handler(method, path, body):
+    if method == "POST":
+        return json_response("{}", status=404)
+    address = path.rsplit("/", 1)[-1]
+    if address == "bad":
+        return json_response("not json", status=500)
+    return json_response(json.dumps({"geocodePoints": [_point(address)]}))
+
+
+class TestGeocodeMany(object):
+
+    def test_batch(self):
+        addresses = ["a{0}".format(index) for index in range(7)] + ["bad"]
+        with StandIn(_batch_handler) as server:
+            frontend = server.frontend()
+            outcomes = list(frontend.geocode_many(
+                iter(addresses), batch_size=3, concurrency=2,
+            ))
+        assert [outcome.item for outcome in outcomes] == addresses
+        assert [outcome.value[0].address for outcome in outcomes[:-1]] == \
+            addresses[:-1]
+        assert outcomes[-1].error is not None
+        posts = [req for req in server.requests if req[0] == "POST"]
+        assert len(posts) == 3
+
+    def test_fallback_to_single(self):
+        addresses = [u"a{0}".format(index) for index in range(5)]
+        with StandIn(_single_handler) as server:
+            frontend = server.frontend()
+            outcomes = list(frontend.geocode_many(
+                addresses, batch_size=2, concurrency=1,
+            ))
+        assert [outcome.value[0].address for outcome in outcomes] == addresses
+        assert frontend._geocode_batch_available is False
+        posts = [req for req in server.requests if req[0] == "POST"]
+        assert len(posts) == 1
+
+    def test_fallback_errors_per_item(self):
+        addresses = [u"a0", u"bad", u"a1"]
+        with StandIn(_single_handler) as server:
+            frontend = server.frontend()
+            outcomes = list(frontend.geocode_many(
+                addresses, batch_size=3, concurrency=1,
+            ))
+        assert [outcome.ok for outcome in outcomes] == [True, False, True]
+        assert isinstance(outcomes[1].error, ParseError)
@@ -0,0 +1,102 @@
+import json
+import re
+from because.services.geocoding.candidate import Candidate
+from because.services.geocoding.reverse_cache import (
+    ReverseGeocodeCache,
+    geohash,
+    geohash_cell_size,
+    haversine,
+)
+from because.tests.stand_in import StandIn, json_response
+
+# About 1.1 meters of latitude, in degrees.
+METER = 0.00001
+
+
+class TestGeometry(object):
+
+    def test_geohash(self):
+        # Well-known example from the geohash literature
+        assert geohash(-5.6, 42.6, 5) == u"ezs42"
+
+    def test_geohash_cell_size(self):
+        width, height = geohash_cell_size(1)
+        assert (width, height) == (45.0, 45.0)
+
+    def test_haversine(self):
+        assert haversine(0, 0, 0, 0) == 0
+        # One degree of latitude is about 111 km
+        assert 111000 < haversine(0, 0, 0, 1) < 111400
+
+
+class TestReverseGeocodeCache(object):
+
+    def _candidates(self):
+        return [Candidate(1.0, 2.0, u"Here")]
+
+    def test_nearby_hit(self):
+        cache = ReverseGeocodeCache(grid=0.001, max_distance=20)
+        cache.set(-97.0, 30.0, "mapbox", self._candidates())
+        hit = cache.get(-97.0 + 5 * METER, 30.0, "mapbox")
+        assert hit[0].address == u"Here"
+        assert cache.get(-97.0, 30.0, "mapzen") is None
+
+    def test_too_far(self):
+        cache = ReverseGeocodeCache(grid=0.01, max_distance=20)
+        cache.set(-97.0, 30.0, "mapbox", self._candidates())
+        assert cache.get(-97.0, 30.0 + 100 * METER, "mapbox") is None
+
+    def test_across_cell_boundary(self):
+        cache = ReverseGeocodeCache(grid=0.001, max_distance=20)
+        cache.set(-97.0 - METER, 30.0, "mapbox", self._candidates())
+        assert cache.key(-97.0 - METER, 30.0, "mapbox") != \
+            cache.key(-97.0 + METER, 30.0, "mapbox")
+        assert cache.get(-97.0 + METER, 30.0, "mapbox")
+
+    def test_geohash_mode(self):
+        cache = ReverseGeocodeCache(precision=8, max_distance=20)
+        cache.set(-97.0, 30.0, "mapbox", self._candidates())
+        assert cache.get(-97.0, 30.0 + 3 * METER, "mapbox")
+
+    def test_lru(self):
+        cache = ReverseGeocodeCache(grid=0.001, max_size=1)
+        cache.set(0.0, 0.0, "mapbox", self._candidates())
+        cache.set(1.0, 1.0, "mapbox", self._candidates())
+        assert len(cache) == 1
+        assert cache.get(0.0, 0.0, "mapbox") is None
+
+    def test_partition(self):
+        cache = ReverseGeocodeCache(grid=0.001)
+        cache.set(0.0, 0.0, "mapbox", self._candidates())
+        hits, misses = cache.partition(
+            [(0.0, METER), (5.0, 5.0), (0.0, 0.0)], "mapbox",
+        )
+        assert [index for index, _, _ in hits] == [0, 2]
+        assert misses == [(1, (5.0, 5.0))]
+
+
+def _handler(method, path, body):
+    x, y = re.search("/x/([^/]+)/y/([^/?]+)", path).groups()
+    return json_response(json.dumps({"geocodePoints": [{
+        "x": float(x), "y": float(y), "candidatePlace": "{0},{1}".format(x, y),
+    }]}))
+
+
+class TestReverseGeocodeMany(object):
+
+    def test_reverse_geocode_many(self):
+        cache = ReverseGeocodeCache(grid=0.001, max_distance=30)
+        points = [
+            (-97.0, 30.0),
+            (-97.0 + METER, 30.0 + METER),
+            (-97.0, 30.0 + 2 * METER),
+            (-90.0, 35.0),
+        ]
+        with StandIn(_handler) as server:
+            frontend = server.frontend(reverse_geocode_cache=cache)
+            frontend.reverse_geocode(-90.0, 35.0).wait()
+            outcomes = list(frontend.reverse_geocode_many(points))
+        assert sorted(outcome.index for outcome in outcomes) == [0, 1, 2, 3]
+        assert all(outcome.ok for outcome in outcomes)
+        # One for the warm-up, one for the cell holding the first three
+        assert len(server.requests) == 2
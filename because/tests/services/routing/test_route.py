@@ -1,7 +1,17 @@
+import json
+import struct
+import sys
+from array import array
+import pytest
+from because.services.routing import geometry
+from because.services.routing.geometry import Coordinates
+from because.services.routing.parse import dict_to_route, parse_points
+from because.services.routing.simplify import simplify
 from because.services.routing.route import (
     Route,
     Leg,
     Step,
+    InvalidObject,
 )
 
 
@@ -84,3 +94,147 @@ class TestRoute(object):
         """
         instance = self.cls(Fixtures.legs)
         assert list(instance.legs()) == Fixtures.legs
+
+
+def _route_data():
+    def step(name, points):
+        return {
+            "instructions": name,
+            "distance": 1.0,
+            "duration": 1.0,
+            "geometry": {"type": "LineString", "coordinates": points},
+        }
+    return {
+        "distance": 4.0,
+        "duration": 4.0,
+        "legs": [
+            {"distance": 2.0, "duration": 2.0, "steps": [
+                step(u"a", Fixtures.geometries[0]),
+                step(u"b", Fixtures.geometries[1]),
+            ]},
+            {"distance": 2.0, "duration": 2.0, "steps": [
+                step(u"c", Fixtures.geometries[2]),
+                step(u"d", [x + [100.0] for x in Fixtures.geometries[3]]),
+            ]},
+        ],
+    }
+
+
+class TestCoordinates(object):
+
+    def test_parsed_route_shares_one_array(self):
+        route = dict_to_route(_route_data())
+        steps = [step for leg in route.legs() for step in leg.steps()]
+        arrays = set(id(step.points._values) for step in steps)
+        assert len(arrays) == 1
+        assert [step.points for step in steps] == Fixtures.geometries
+
+    def test_route_coordinates(self):
+        route = dict_to_route(_route_data())
+        coordinates = route.coordinates()
+        assert coordinates == Fixtures.points
+        assert len(coordinates) == 8
+        assert coordinates[-1] == [14.0, 15.0]
+        assert coordinates[2:4] == Fixtures.points[2:4]
+        assert list(coordinates.buffer) == [
+            value for point in Fixtures.points for value in point
+        ]
+
+    def test_leg_coordinates(self):
+        route = dict_to_route(_route_data())
+        legs = list(route.legs())
+        assert legs[1].coordinates() == Fixtures.points[4:8]
+
+    def test_join_copies_separate_steps(self):
+        instance = Route(Fixtures.legs)
+        assert instance.coordinates() == Fixtures.points
+
+    @pytest.mark.skipif(sys.version_info < (3,),
+                        reason="Python 2 buffers are copies")
+    def test_buffer_read_only(self):
+        points = Coordinates.from_points(Fixtures.points)
+        with pytest.raises(TypeError):
+            points.buffer[0] = 1.0
+
+    def test_without_memoryview(self, monkeypatch):
+        def memoryview(obj):
+            raise TypeError("cannot make memory view because object does "
+                            "not have the buffer interface")
+        # As on Python 2, whose memoryview doesn't take arrays.
+        monkeypatch.setattr(geometry, "memoryview", memoryview, raising=False)
+        route = Route(Fixtures.legs)
+        coordinates = route.coordinates()
+        assert coordinates == Fixtures.points
+        parsed = dict_to_route(_route_data()).coordinates()
+        assert coordinates[2:4] == parsed[2:4]
+        assert isinstance(parsed.buffer, array)
+        assert list(coordinates[2:4].buffer) == [4.0, 5.0, 6.0, 7.0]
+        points, _ = _read_linestring_wkb(route.to_wkb())
+        assert points == Fixtures.points
+        assert simplify(coordinates, 100.0) == [
+            Fixtures.points[0], Fixtures.points[-1],
+        ]
+
+    def test_single_point(self):
+        assert parse_points({"coordinates": [1.0, 2.0]}) == [[1.0, 2.0]]
+
+    def test_null_coordinates(self):
+        assert parse_points({"coordinates": None}) is None
+
+    def test_invalid_coordinates(self):
+        with pytest.raises(InvalidObject):
+            parse_points({"coordinates": [[1.0, u"x"]]})
+
+
+def _read_linestring_wkb(wkb, offset=0):
+    order, kind, count = struct.unpack_from("<BII", wkb, offset)
+    assert (order, kind) == (1, 2) or sys.byteorder != "little"
+    offset += 9
+    values = struct.unpack_from("<{0}d".format(2 * count), wkb, offset)
+    points = [list(values[i:i + 2]) for i in range(0, len(values), 2)]
+    return points, offset + 16 * count
+
+
+class TestExport(object):
+
+    def test_route_wkb(self):
+        wkb = dict_to_route(_route_data()).to_wkb()
+        points, end = _read_linestring_wkb(wkb)
+        assert points == Fixtures.points
+        assert end == len(wkb)
+
+    def test_route_wkb_multi(self):
+        wkb = Route(Fixtures.legs).to_wkb(multi=True)
+        assert struct.unpack_from("<BII", wkb, 0) == (1, 5, 2)
+        first, offset = _read_linestring_wkb(wkb, 9)
+        second, end = _read_linestring_wkb(wkb, offset)
+        assert first == Fixtures.points[0:4]
+        assert second == Fixtures.points[4:8]
+        assert end == len(wkb)
+
+    def test_leg_wkb(self):
+        leg = list(dict_to_route(_route_data()).legs())[1]
+        points, _ = _read_linestring_wkb(leg.to_wkb())
+        assert points == Fixtures.points[4:8]
+
+    def test_route_geojson(self):
+        route = dict_to_route(_route_data())
+        assert json.loads(route.to_geojson_bytes().decode("ascii")) == {
+            "type": "LineString",
+            "coordinates": Fixtures.points,
+        }
+        assert json.loads(
+            route.to_geojson_bytes(multi=True).decode("ascii")
+        ) == {
+            "type": "MultiLineString",
+            "coordinates": [Fixtures.points[0:4], Fixtures.points[4:8]],
+        }
+
+    def test_geojson_precision(self):
+        points = [[-122.41941550000001, 37.7749295], [1e-07, -0.1]]
+        text = Coordinates.from_points(points).to_geojson_bytes()
+        assert json.loads(text.decode("ascii"))["coordinates"] == points
+
+    def test_geojson_not_finite(self):
+        with pytest.raises(ValueError):
+            Coordinates.from_points([[float("nan"), 0.0]]).to_geojson_bytes()
@@ -0,0 +1,97 @@
+import json
+import re
+import pytest
+from because.errors import ParseError
+from because.polling import Poller
+from because.response import Response
+from because.services.routing.parse import parse_batch_status
+from because.tests.stand_in import StandIn, json_response
+
+
+def route_dict(distance):
+    """Make a minimal JSON-like dict for a one-leg, one-step route.
+    """
+    return {
+        "distance": distance,
+        "duration": distance * 2,
+        "legs": [{
+            "distance": distance,
+            "duration": distance * 2,
+            "steps": [{
+                "instructions": "go",
+                "distance": distance,
+                "duration": distance * 2,
+                "geometry": {"coordinates": [[0.0, 0.0], [1.0, 1.0]]},
+            }],
+        }],
+    }
+
+
+class BatchServer(object):
+    """Pretend to run batch routing jobs which finish after a few checks.
+    """
+    def __init__(self, checks_needed=2):
+        self.checks_needed = checks_needed
+        self.jobs = {}
+
+    def __call__(self, method, path, body):
+        if method == "POST" and path.endswith("/batch"):
+            routes = json.loads(body.decode("utf-8"))["routes"]
+            uuid = "job{0}".format(len(self.jobs))
+            self.jobs[uuid] = {"routes": routes, "checks": 0}
+            return json_response(json.dumps({"uuid": uuid}))
+        match = re.search("/batch/([^/?]+)$", path)
+        if method == "GET" and match:
+            job = self.jobs[match.group(1)]
+            job["checks"] += 1
+            if job["checks"] < self.checks_needed:
+                return json_response(
+                    json.dumps({"status": "running", "completed": 0}),
+                    headers=[(b"Retry-After", b"0")],
+                )
+            routes = [
+                route_dict(float(len(route["waypoints"][0])))
+                if route["waypoints"][0] != "nowhere"
+                else {"errorCode": 404}
+                for route in job["routes"]
+            ]
+            return json_response(json.dumps({
+                "status": "complete",
+                "completed": len(routes),
+                "routes": routes,
+            }))
+        return json_response("{}", status=404)
+
+
+class TestRouteMany(object):
+
+    def test_route_many(self):
+        pairs = [("a" * length, "b") for length in range(1, 6)]
+        pairs.append(("nowhere", "b"))
+        with StandIn(BatchServer()) as server:
+            frontend = server.frontend()
+            poller = Poller(initial=0.0)
+            outcomes = list(frontend.route_many(
+                pairs, batch_size=2, max_jobs=2, poller=poller,
+            ))
+        assert sorted(outcome.index for outcome in outcomes) == list(range(6))
+        by_index = {outcome.index: outcome for outcome in outcomes}
+        for index in range(5):
+            assert by_index[index].value.distance == float(index + 1)
+            assert list(by_index[index].value.legs())
+        assert by_index[5].error is not None
+        posts = [req for req in server.requests if req[0] == "POST"]
+        assert len(posts) == 3
+
+    def test_route_many_unavailable(self):
+        with StandIn(lambda *_: json_response("{}", status=404)) as server:
+            frontend = server.frontend()
+            outcomes = list(frontend.route_many([("a", "b")]))
+        assert len(outcomes) == 1
+        assert outcomes[0].error is not None
+
+    def test_batch_failed(self):
+        body = {"status": "failed", "errorMessage": "no route server"}
+        with pytest.raises(ParseError) as info:
+            parse_batch_status(Response(200, body=json.dumps(body).encode()))
+        assert "no route server" in str(info.value)
@@ -0,0 +1,79 @@
+import json
+import math
+import re
+from because.services.routing.matrix import (
+    RouteMatrix,
+    location_key,
+    plan_matrix,
+)
+from because.tests.stand_in import StandIn, json_response
+
+
+def _summary_handler(method, path, body):
+    """Answer latlon requests with distance = |dx| + |dy| and no geometry.
+    """
+    match = re.search(
+        "originx/([^/]+)/originy/([^/]+)/destinationx/([^/]+)"
+        "/destinationy/([^/?]+)",
+        path,
+    )
+    if not match:
+        return json_response("{}", status=404)
+    ox, oy, dx, dy = [float(value) for value in match.groups()]
+    if dx == 99.0:
+        return json_response("{}", status=500)
+    distance = abs(dx - ox) + abs(dy - oy)
+    return json_response(json.dumps({
+        "distance": distance,
+        "duration": distance * 10,
+        "legs": [],
+    }))
+
+
+class TestPlanMatrix(object):
+
+    def test_dedupe(self):
+        places = [(1, 2), (1.0, 2.0), "  a  b ", "a b"]
+        needed, same = plan_matrix(places[:2], places[2:])
+        assert list(needed) == [(location_key((1, 2)), location_key("a b"))]
+        assert len(needed[list(needed)[0]]) == 4
+        assert same == []
+
+    def test_same_place(self):
+        needed, same = plan_matrix([(1, 2)], [(1.0, 2.0)])
+        assert not needed
+        assert same == [(0, 0)]
+
+    def test_symmetric(self):
+        places = [(0, 0), (1, 1), (2, 2)]
+        needed, _ = plan_matrix(places, places)
+        assert len(needed) == 6
+        needed, _ = plan_matrix(places, places, symmetric=True)
+        assert len(needed) == 3
+
+
+class TestRouteMatrix(object):
+
+    def test_empty_cells_nan(self):
+        matrix = RouteMatrix(2, 3)
+        assert len(matrix.distances) == 6
+        assert math.isnan(matrix.distance(1, 2))
+        matrix.set(1, 2, 5.0, 6.0)
+        assert matrix.distance(1, 2) == 5.0
+        assert list(matrix.duration_rows())[1][2] == 6.0
+
+    def test_route_matrix(self):
+        origins = [(0.0, 0.0), (1.0, 1.0)]
+        destinations = [(1.0, 1.0), (3.0, 0.5), (99.0, 0.0)]
+        with StandIn(_summary_handler) as server:
+            frontend = server.frontend()
+            matrix = frontend.route_matrix(origins, destinations,
+                                           concurrency=4)
+        assert matrix.distance(0, 0) == 2.0
+        assert matrix.distance(1, 0) == 0.0
+        assert matrix.distance(0, 1) == 3.5
+        assert matrix.duration(1, 1) == 25.0
+        assert math.isnan(matrix.distance(0, 2))
+        assert set(matrix.errors) == set([(0, 2), (1, 2)])
+        # 5 distinct pairs; the (1, 1) -> (1, 1) cell needs no request
+        assert len(server.requests) == 5
@@ -0,0 +1,108 @@
+import math
+import pytest
+from because.services.routing.geometry import Coordinates
+from because.services.routing.route import Route, Leg, Step
+from because.services.routing.simplify import (
+    DOUGLAS_PEUCKER,
+    VISVALINGAM,
+    RoutePyramid,
+    simplify,
+    simplify_route,
+    zoom_tolerance,
+)
+
+
+def _wiggly(count, phase=0.0):
+    return [
+        [i * 0.01, math.sin(i / 5.0 + phase) * 0.05 + (i % 3) * 0.001]
+        for i in range(count)
+    ]
+
+
+def _reference_douglas_peucker(points, tolerance):
+    """Plain recursive Douglas-Peucker, to check the importance approach.
+    """
+    if len(points) < 3:
+        return points
+    (ax, ay), (bx, by) = points[0], points[-1]
+
+    def distance(point):
+        dx, dy = bx - ax, by - ay
+        px, py = point[0] - ax, point[1] - ay
+        length = dx * dx + dy * dy
+        t = max(0.0, min(1.0, (px * dx + py * dy) / length)) if length else 0
+        return (px - t * dx) ** 2 + (py - t * dy) ** 2
+
+    split = max(range(1, len(points) - 1), key=lambda i: distance(points[i]))
+    if distance(points[split]) > tolerance ** 2:
+        return (_reference_douglas_peucker(points[:split + 1], tolerance)[:-1] +
+                _reference_douglas_peucker(points[split:], tolerance))
+    return [points[0], points[-1]]
+
+
+def _route():
+    steps = [
+        Step(u"a", _wiggly(100)),
+        Step(u"b", _wiggly(50, phase=1.0)),
+        Step(u"c", None),
+    ]
+    return Route([Leg(steps[:2], 1.0, 2.0), Leg(steps[2:])], 3.0, 4.0)
+
+
+class TestSimplify(object):
+
+    @pytest.mark.parametrize("tolerance", [0.0005, 0.005, 0.02, 0.1])
+    def test_matches_reference(self, tolerance):
+        points = _wiggly(200)
+        simplified = simplify(Coordinates.from_points(points), tolerance)
+        assert simplified == _reference_douglas_peucker(points, tolerance)
+
+    @pytest.mark.parametrize("method", [DOUGLAS_PEUCKER, VISVALINGAM])
+    def test_keeps_ends_and_shrinks(self, method):
+        points = _wiggly(200)
+        previous = None
+        for zoom in range(0, 16, 3):
+            simplified = simplify(Coordinates.from_points(points), zoom=zoom,
+                                  method=method)
+            assert simplified[0] == points[0]
+            assert simplified[-1] == points[-1]
+            if previous is not None:
+                assert len(simplified) >= previous
+            previous = len(simplified)
+        # Only (nearly) collinear vertices are dropped at high zoom.
+        assert previous > 0.95 * len(points)
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            simplify(Coordinates.from_points(_wiggly(5)), 1.0, method="nope")
+
+    def test_needs_tolerance_or_zoom(self):
+        with pytest.raises(ValueError):
+            simplify(Coordinates.from_points(_wiggly(5)))
+
+    def test_zoom_tolerance_halves(self):
+        assert zoom_tolerance(3) == 2 * zoom_tolerance(4)
+
+
+class TestRouteSimplification(object):
+
+    def test_step_boundaries_kept(self):
+        route = _route()
+        simplified = simplify_route(route, tolerance=1.0)
+        steps = [step for leg in simplified.legs() for step in leg.steps()]
+        assert [step.instructions for step in steps] == [u"a", u"b", u"c"]
+        assert list(steps[0].points) == [_wiggly(100)[0], _wiggly(100)[-1]]
+        assert len(steps[1].points) == 2
+        assert steps[2].points is None
+        assert simplified.distance == 3.0
+        assert list(simplified.legs())[0].duration == 2.0
+
+    def test_pyramid(self):
+        route = _route()
+        pyramid = RoutePyramid(route, zooms=range(0, 20, 4))
+        assert sorted(pyramid.levels) == [0, 4, 8, 12, 16]
+        sizes = [len(pyramid.at_zoom(zoom).coordinates())
+                 for zoom in sorted(pyramid.levels)]
+        assert sizes == sorted(sizes)
+        assert sizes[-1] == len(route.coordinates())
+        assert pyramid.at_zoom(4) is pyramid.levels[4]
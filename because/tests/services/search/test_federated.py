@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+import pytest
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse  # type: ignore
+from because import fanout
+from because.fanout import FanOutTimeout
+from because.services.search.federated import FederatedSearch
+from because.services.search.search_result import SearchResult
+from because.tests.stand_in import StandIn, json_response
+
+CATEGORIES = {
+    u"fast": [u"a", u"shared", u"b"],
+    u"other": [u"shared", u"c"],
+    u"slow": [u"d"],
+    u"broken": None,
+}
+
+
+def _feature(category, url):
+    return {
+        "type": "Feature",
+        "geometry": None,
+        "properties": {
+            "id": url,
+            "title": url.upper(),
+            "url": url,
+            "category": category,
+        },
+    }
+
+
+def _handler(release):
+    def handler(method, path, body):
+        parsed = urlparse(path)
+        if parsed.path.endswith("/search/categories"):
+            return json_response(json.dumps([
+                {"key": key, "description": key} for key in sorted(CATEGORIES)
+            ]))
+        key = parsed.path.rsplit("/", 1)[-1]
+        assert parse_qs(parsed.query)["q"] == ["query"]
+        if key == "slow":
+            release.wait(5)
+        urls = CATEGORIES[key]
+        if urls is None:
+            return json_response("{}", status=500)
+        return json_response(json.dumps({
+            "type": "FeatureCollection",
+            "features": [_feature(key, url) for url in urls],
+        }))
+    return handler
+
+
+# Timeouts need fan_out's thread pool.
+needs_pool = pytest.mark.skipif(
+    fanout.futures is None, reason="needs concurrent.futures",
+)
+
+
+class TestFederatedSearch(object):
+
+    @needs_pool
+    def test_stream_and_rank(self):
+        release = threading.Event()
+        with StandIn(_handler(release)) as server:
+            try:
+                search = server.frontend().federated_search(
+                    u"query", timeout=0.3,
+                )
+                hits = list(search)
+            finally:
+                release.set()
+        assert sorted(set(hit.category for hit in hits)) == \
+            [u"fast", u"other"]
+        assert sorted(search.errors) == [u"broken", u"slow"]
+        assert isinstance(search.errors[u"slow"], FanOutTimeout)
+        ranked = search.ranked()
+        assert [hit.result.url for hit in ranked] == \
+            [u"shared", u"a", u"c", u"b"]
+
+    def test_chosen_categories(self):
+        release = threading.Event()
+        release.set()
+        with StandIn(_handler(release)) as server:
+            search = server.frontend().federated_search(
+                u"query", categories=[u"fast", u"slow"],
+            )
+            ranked = search.ranked()
+        assert [hit.result.url for hit in ranked] == \
+            [u"a", u"d", u"shared", u"b"]
+        assert not search.errors
+        paths = [path for _, path, _ in server.requests]
+        assert not any(path.endswith("/categories") for path in paths)
+
+    @needs_pool
+    def test_timeout_with_more_categories_than_workers(self):
+        release = threading.Event()
+
+        def lookup(key):
+            if key.startswith(u"slow"):
+                release.wait(5)
+            return [SearchResult(key, key)]
+
+        keys = [u"fast", u"slow1", u"slow2", u"slow3"]
+        start = time.time()
+        try:
+            search = FederatedSearch(lookup, keys, concurrency=2, timeout=0.3)
+            hits = list(search)
+        finally:
+            release.set()
+        assert time.time() - start < 1.5
+        assert sorted(search.errors) == [u"slow1", u"slow2", u"slow3"]
+        assert all(isinstance(error, FanOutTimeout)
+                   for error in search.errors.values())
+        assert [hit.category for hit in hits] == [u"fast"]
+
+
+class TestRanking(object):
+
+    def test_ties_follow_category_order(self):
+        lists = {
+            u"x": [SearchResult(u"1", u"u1")],
+            u"y": [SearchResult(u"2", u"u2")],
+        }
+        search = FederatedSearch(lists.get, [u"y", u"x"], concurrency=1)
+        assert [hit.category for hit in search.ranked()] == [u"y", u"x"]
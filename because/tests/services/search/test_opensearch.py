@@ -0,0 +1,177 @@
+import pytest
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse  # type: ignore
+from because.errors import ParseError
+from because.headers import Headers
+from because.response import Response
+from because.services.search import search_result
+from because.services.search.search_result import (
+    iter_opensearch_xml,
+    parse_opensearch_xml,
+)
+from because.services.search.service import SearchService
+from because.tests.stand_in import StandIn
+
+
+def _entry(index):
+    return (
+        u"<entry>"
+        u"<title>Result {0}</title>"
+        u"<link href=\"http://example.com/{0}\"/>"
+        u"<category term=\"LC\"/>"
+        u"<author><name>Author {0}</name></author>"
+        u"<content>Content \u00e9 {0}</content>"
+        u"</entry>"
+    ).format(index)
+
+
+def _feed(count):
+    return (
+        u"<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+        u"<feed xmlns=\"http://www.w3.org/2005/Atom\">"
+        u"<title>Search</title>" +
+        u"".join(_entry(index) for index in range(count)) +
+        u"</feed>"
+    ).encode("utf-8")
+
+
+def _chunks(data, size):
+    return [data[offset:offset + size] for offset in range(0, len(data), size)]
+
+
+@pytest.fixture(params=["pull", "iterparse"])
+def xml_parser(request, monkeypatch):
+    """Parse with XMLPullParser, and with iterparse as on Python 2."""
+    if request.param == "iterparse":
+        monkeypatch.setattr(search_result, "XMLPullParser", None)
+    elif search_result.XMLPullParser is None:
+        pytest.skip("no XMLPullParser")
+    return request.param
+
+
+class TestOpensearchXML(object):
+
+    def test_parse(self):
+        results = parse_opensearch_xml(_feed(3))
+        assert [result.title for result in results] == \
+            [u"Result 0", u"Result 1", u"Result 2"]
+        assert results[1].url == u"http://example.com/1"
+        assert results[1].category == u"LC"
+        assert results[1].author == u"Author 1"
+
+    @pytest.mark.parametrize("size", [1, 7, 100])
+    def test_chunks(self, size, xml_parser):
+        results = list(iter_opensearch_xml(_chunks(_feed(5), size)))
+        assert [result.author for result in results] == \
+            [u"Author {0}".format(index) for index in range(5)]
+
+    def test_yields_before_end(self, xml_parser):
+        data = _feed(3)
+        cut = data.index(b"</entry>") + len(b"</entry>")
+
+        def chunks():
+            yield data[:cut]
+            raise AssertionError("read past the first entry")
+
+        results = iter_opensearch_xml(chunks())
+        assert next(results).title == u"Result 0"
+
+    def test_empty_feed(self):
+        assert parse_opensearch_xml(_feed(0)) == []
+
+    def test_malformed(self):
+        with pytest.raises(ParseError):
+            parse_opensearch_xml(_feed(2)[:-20])
+
+    def test_missing_field(self):
+        data = b"<feed><entry><title>x</title></entry></feed>"
+        with pytest.raises(ParseError):
+            parse_opensearch_xml(data)
+
+
+class TestOpensearchResponse(object):
+
+    def _response(self, content_type=b"application/atom+xml", status=200):
+        headers = Headers([(b"content-type", content_type)])
+        return Response(status, headers, b"")
+
+    def test_iter(self):
+        service = SearchService()
+        results = service.iter_opensearch(
+            self._response(), _chunks(_feed(2), 10),
+        )
+        assert [result.title for result in results] == \
+            [u"Result 0", u"Result 1"]
+
+    def test_iter_bad_content_type(self):
+        service = SearchService()
+        results = service.iter_opensearch(
+            self._response(content_type=b"text/html"), [_feed(1)],
+        )
+        with pytest.raises(ParseError):
+            list(results)
+
+
+def _paged_handler(total):
+    def handler(method, path, body):
+        query = parse_qs(urlparse(path).query)
+        page, size = int(query["si"][0]), int(query["c"][0])
+        first = page * size
+        count = max(0, min(size, total - first))
+        feed = (
+            u"<feed xmlns=\"http://www.w3.org/2005/Atom\">" +
+            u"".join(_entry(first + index) for index in range(count)) +
+            u"</feed>"
+        ).encode("utf-8")
+        headers = Headers([(b"content-type", b"application/atom+xml")])
+        return Response(200, headers, feed)
+    return handler
+
+
+class TestIterOpensearch(object):
+
+    def _pages(self, server):
+        return sorted(
+            int(parse_qs(urlparse(path).query)["si"][0])
+            for _, path, _ in server.requests
+        )
+
+    def test_all_pages(self):
+        with StandIn(_paged_handler(45)) as server:
+            results = list(server.frontend().iter_opensearch(
+                u"q", page_size=10, prefetch=3,
+            ))
+        assert [result.title for result in results] == \
+            [u"Result {0}".format(index) for index in range(45)]
+        # Pages past the end may have been prefetched, but at most two.
+        assert self._pages(server)[:5] == [0, 1, 2, 3, 4]
+        assert len(server.requests) <= 5 + 2
+
+    def test_exact_multiple(self):
+        with StandIn(_paged_handler(20)) as server:
+            results = list(server.frontend().iter_opensearch(
+                u"q", page_size=10, prefetch=1,
+            ))
+        assert len(results) == 20
+        assert self._pages(server) == [0, 1, 2]
+
+    def test_stop_early(self):
+        with StandIn(_paged_handler(10000)) as server:
+            results = server.frontend().iter_opensearch(
+                u"q", page_size=10, prefetch=2,
+            )
+            first = [next(results) for _ in range(3)]
+            results.close()
+        assert first[-1].title == u"Result 2"
+        assert len(server.requests) <= 2
+
+    def test_max_pages(self):
+        with StandIn(_paged_handler(100)) as server:
+            results = list(server.frontend().iter_opensearch(
+                u"q", start_page=2, page_size=10, max_pages=3,
+            ))
+        assert results[0].title == u"Result 20"
+        assert len(results) == 30
+        assert self._pages(server) == [2, 3, 4]
@@ -0,0 +1,121 @@
+import json
+import time
+import pytest
+from because.services.search.index import SearchIndex, tokenize
+from because.services.search.search_result import SearchResult
+from because.tests.stand_in import StandIn, json_response
+
+
+def _result(title, url, description="", author=None):
+    return SearchResult(title, url, description=description, author=author)
+
+
+def _index():
+    index = SearchIndex()
+    index.add_all([
+        _result(u"Springfield roads", u"u1", description=u"Main streets"),
+        _result(u"Main Street parks", u"u2", author=u"Springer"),
+        _result(u"Rivers", u"u3", description=u"Spring water, main rivers"),
+    ])
+    return index
+
+
+def _urls(results):
+    return [result.url for result in results]
+
+
+class TestSearchIndex(object):
+
+    def test_tokenize(self):
+        assert tokenize(u"Main-Street, CAF\u00c9!") == \
+            [u"main", u"street", u"caf\u00e9"]
+        assert tokenize(None) == []
+
+    def test_exact_and_ranked(self):
+        index = _index()
+        # Title matches outrank author and description matches.
+        assert _urls(index.search(u"main ")) == [u"u2", u"u1", u"u3"]
+
+    def test_prefix_last_word(self):
+        index = _index()
+        assert _urls(index.search(u"spring")) == [u"u1", u"u2", u"u3"]
+        assert _urls(index.search(u"main spr")) == [u"u2", u"u1", u"u3"]
+        assert index.search(u"spring ") == [index.search(u"rivers")[0]]
+
+    def test_all_words_must_match(self):
+        index = _index()
+        assert _urls(index.search(u"rivers main")) == [u"u3"]
+        assert index.search(u"rivers nothing") == []
+        assert index.search(u"  ") == []
+
+    def test_limit(self):
+        assert len(_index().search(u"m", limit=2)) == 2
+
+    def test_replace_and_remove(self):
+        index = _index()
+        index.add(_result(u"Lakes", u"u3"))
+        assert len(index) == 3
+        assert index.search(u"rivers") == []
+        assert _urls(index.search(u"lak")) == [u"u3"]
+        assert index.remove(_result(u"whatever", u"u3"))
+        assert not index.remove(_result(u"whatever", u"u3"))
+        assert index.search(u"lakes") == []
+        assert u"lakes" not in index._words
+
+    def test_refresh_claims(self):
+        now = [100.0]
+        index = SearchIndex(max_age=10, clock=lambda: now[0])
+        assert index.begin_refresh("k")
+        assert not index.begin_refresh("k")
+        index.end_refresh("k")
+        assert not index.begin_refresh("k")
+        now[0] += 11
+        assert index.begin_refresh("k")
+        index.end_refresh("k", succeeded=False)
+        assert index.begin_refresh("k")
+
+
+def _handler(method, path, body):
+    return json_response(json.dumps({
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "geometry": None,
+            "properties": {"id": 1, "title": u"Main Street", "url": u"u9"},
+        }],
+    }))
+
+
+class TestSearchLocal(object):
+
+    def test_fetched_results_are_indexed(self):
+        with StandIn(_handler) as server:
+            frontend = server.frontend(search_index=SearchIndex())
+            frontend.search_category(u"LC", u"main").wait()
+        assert _urls(frontend.search_local(u"stre", refresh=False)) == [u"u9"]
+        assert len(server.requests) == 1
+
+    def test_background_refresh(self):
+        with StandIn(_handler) as server:
+            frontend = server.frontend(search_index=SearchIndex())
+            assert frontend.search_local(u"main", category=u"LC") == []
+            deadline = time.time() + 5
+            while not len(frontend.search_index) and time.time() < deadline:
+                time.sleep(0.01)
+            assert _urls(frontend.search_local(u"main", category=u"LC")) == \
+                [u"u9"]
+        # The second query was refreshed recently, so wasn't sent again.
+        assert len(server.requests) == 1
+
+    def test_failed_refresh_released(self, monkeypatch):
+        with StandIn(_handler) as server:
+            frontend = server.frontend(search_index=SearchIndex())
+
+            def send(request):
+                raise IOError("network is unreachable")
+
+            monkeypatch.setattr(frontend.client, "send", send)
+            with pytest.raises(IOError):
+                frontend.search_local(u"main", category=u"LC")
+        # The refresh can be claimed again.
+        assert frontend.search_index.begin_refresh((u"LC", u"main"))
@@ -0,0 +1,119 @@
+"""A local stand-in for BCS, for tests which need to make real requests.
+
+The server runs in a background thread on an ephemeral port. Each test
+supplies a handler function which maps (method, path, body) to a Response,
+so tests can describe just the endpoints they exercise.
+"""
+import threading
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler  # type: ignore
+try:
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from SocketServer import ThreadingMixIn  # type: ignore
+from because.frontend import Frontend
+from because.response import Response
+from because.service import Host
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StandIn(object):
+    """Serve canned responses on localhost until closed.
+
+    Use as a context manager; the requests received are recorded on the
+    requests attribute as (method, path, body) tuples, and the client address
+    of each connection on the connections attribute.
+    """
+
+    def __init__(self, handler, keep_alive=False):
+        """
+        :arg handler:
+            Callable taking (method, path, body) and returning a Response.
+        :arg keep_alive:
+            If true, speak HTTP/1.1 so clients can reuse connections.
+        """
+        self.handler = handler
+        self.requests = []
+        self.connections = []
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            if keep_alive:
+                protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                with stand_in._lock:
+                    stand_in.connections.append(self.client_address)
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with stand_in._lock:
+                    stand_in.requests.append((self.command, self.path, body))
+                response = stand_in.handler(self.command, self.path, body)
+                self.send_response(response.status)
+                for key, value in response.headers.pairs():
+                    self.send_header(key.decode("utf-8"), value.decode("utf-8"))
+                self.send_header("Content-Length", str(len(response.body)))
+                self.end_headers()
+                self.wfile.write(response.body)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+        )
+        self._thread.daemon = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return "http://{0}:{1}".format(host, port)
+
+    def frontend(self, interface="python", **kwargs):
+        """Make a logged-in Frontend pointed at this server.
+        """
+        frontend = Frontend(interface, "local", **kwargs)
+        frontend.host = Host(self.url)
+        frontend.token = _FakeToken()
+        return frontend
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _FakeToken(object):
+    def as_text(self):
+        return u"fake"
+
+    def __bool__(self):
+        return True
+
+    __nonzero__ = __bool__
+
+
+def json_response(text, status=200, headers=None):
+    """Shortcut for making a JSON Response from a str.
+    """
+    return Response(
+        status,
+        headers=[(b"Content-Type", b"application/json")] + (headers or []),
+        body=text.encode("utf-8"),
+    )
@@ -0,0 +1,77 @@
+import os
+from because.cache import (
+    LRUCache,
+    SQLiteCache,
+    MISSING,
+)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(object):
+
+    def test_get_set(self):
+        cache = LRUCache(max_size=2)
+        assert cache.get("a") is None
+        assert cache.get("a", MISSING) is MISSING
+        cache.set("a", None)
+        assert "a" in cache
+        assert cache.get("a", MISSING) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert len(cache) == 2
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = LRUCache(ttl=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=100)
+        clock.now += 50
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert len(cache) == 1
+
+
+class TestSQLiteCache(object):
+
+    def test_get_set(self, tmpdir):
+        path = os.path.join(str(tmpdir), "sub", "cache.db")
+        cache = SQLiteCache(path)
+        assert cache.get(u"a") is None
+        cache.set(u"a", b"\x00bytes")
+        assert cache.get(u"a") == b"\x00bytes"
+        # Another instance (e.g. in another process) sees the same data
+        assert SQLiteCache(path).get(u"a") == b"\x00bytes"
+
+    def test_ttl(self, tmpdir):
+        clock = FakeClock()
+        cache = SQLiteCache(str(tmpdir.join("c.db")), ttl=10, clock=clock)
+        cache.set(u"a", b"1")
+        cache.set(u"b", b"2", ttl=100)
+        assert cache.get_entry(u"a") == (b"1", 1010.0)
+        clock.now += 50
+        assert cache.get(u"a") is None
+        assert cache.get_many([u"a", u"b", u"c"]) == {u"b": b"2"}
+        clock.now += 100
+        assert cache.purge() == 1
+
+    def test_tables_separate(self, tmpdir):
+        path = str(tmpdir.join("c.db"))
+        one = SQLiteCache(path, table="one")
+        two = SQLiteCache(path, table="two")
+        one.set(u"a", b"1")
+        assert two.get(u"a") is None
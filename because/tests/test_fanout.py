@@ -0,0 +1,159 @@
+import threading
+import time
+import pytest
+from because import fanout
+from because.fanout import (
+    FanOutTimeout,
+    Outcome,
+    chunked,
+    fan_out,
+)
+
+# Without a thread pool, fan_out runs one call at a time, in order.
+needs_pool = pytest.mark.skipif(
+    fanout.futures is None, reason="needs concurrent.futures",
+)
+
+
+def _double(value):
+    if value == 3:
+        raise ValueError("three")
+    return value * 2
+
+
+class TestChunked(object):
+
+    def test_chunked(self):
+        assert list(chunked(range(5), 2)) == [
+            (0, [0, 1]),
+            (2, [2, 3]),
+            (4, [4]),
+        ]
+
+    def test_chunked_empty(self):
+        assert list(chunked([], 3)) == []
+
+    def test_chunked_size_foolish(self):
+        with pytest.raises(ValueError):
+            list(chunked([1], 0))
+
+
+class TestFanOut(object):
+
+    @pytest.mark.parametrize("concurrency", [1, 4])
+    def test_ordered(self, concurrency):
+        outcomes = list(fan_out(_double, range(6), concurrency=concurrency))
+        assert [outcome.index for outcome in outcomes] == list(range(6))
+        assert [outcome.value for outcome in outcomes if outcome.ok] == [
+            0, 2, 4, 8, 10,
+        ]
+
+    def test_per_item_error(self):
+        outcomes = list(fan_out(_double, range(6), concurrency=4))
+        failed = [outcome for outcome in outcomes if not outcome.ok]
+        assert len(failed) == 1
+        assert failed[0].item == 3
+        with pytest.raises(ValueError):
+            failed[0].unwrap()
+
+    @needs_pool
+    def test_unordered(self):
+        def sleepy(value):
+            time.sleep(0.05 if value == 0 else 0)
+            return value
+
+        outcomes = list(fan_out(sleepy, range(4), concurrency=4,
+                                ordered=False))
+        assert sorted(outcome.value for outcome in outcomes) == [0, 1, 2, 3]
+        assert outcomes[-1].value == 0
+
+    def test_bounded(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def track(value):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return value
+
+        list(fan_out(track, range(20), concurrency=3))
+        assert state["peak"] <= 3
+
+    def test_lazy_input(self):
+        consumed = []
+
+        def source():
+            for value in range(1000):
+                consumed.append(value)
+                yield value
+
+        outcomes = fan_out(_double, source(), concurrency=2)
+        assert next(outcomes) == Outcome(0, 0, value=0)
+        outcomes.close()
+        assert len(consumed) < 10
+
+    @needs_pool
+    def test_window(self):
+        consumed = []
+
+        def source():
+            for value in range(1000):
+                consumed.append(value)
+                yield value
+
+        outcomes = fan_out(_double, source(), concurrency=2, window=2)
+        assert next(outcomes) == Outcome(0, 0, value=0)
+        assert consumed == [0, 1]
+        outcomes.close()
+
+    def test_window_foolish(self):
+        with pytest.raises(ValueError):
+            list(fan_out(_double, range(3), concurrency=2, window=0))
+
+    @needs_pool
+    @pytest.mark.parametrize("ordered", [True, False])
+    def test_timeout(self, ordered):
+        release = threading.Event()
+
+        def stuck(value):
+            if value == 1:
+                release.wait(5)
+            return value
+
+        start = time.time()
+        try:
+            outcomes = list(fan_out(stuck, range(4), concurrency=4,
+                                    ordered=ordered, timeout=0.1))
+        finally:
+            release.set()
+        assert time.time() - start < 2
+        by_index = {outcome.index: outcome for outcome in outcomes}
+        assert sorted(by_index) == [0, 1, 2, 3]
+        assert isinstance(by_index[1].error, FanOutTimeout)
+        assert by_index[1].item == 1
+        assert [by_index[index].value for index in (0, 2, 3)] == [0, 2, 3]
+
+    @needs_pool
+    @pytest.mark.parametrize("concurrency", [1, 2])
+    def test_timeout_queued_behind_slow_calls(self, concurrency):
+        release = threading.Event()
+
+        def stuck(value):
+            release.wait(5)
+            return value
+
+        start = time.time()
+        try:
+            outcomes = list(fan_out(stuck, range(3), concurrency=concurrency,
+                                    ordered=False, timeout=0.3))
+        finally:
+            release.set()
+        # Calls which never got a worker time out as well.
+        assert time.time() - start < 1.5
+        assert sorted(outcome.index for outcome in outcomes) == [0, 1, 2]
+        assert all(isinstance(outcome.error, FanOutTimeout)
+                   for outcome in outcomes)
@@ -5,3 +5,20 @@ class TestFrontend(object):
     def test_frontend_simple(self):
         frontend = Frontend("python", "local")
         assert frontend
+
+    def test_headers_reused_per_token(self):
+        frontend = Frontend("python", "local")
+        frontend.token = _Token(u"one")
+        headers = frontend.headers()
+        assert headers[b"Authorization"] == (b"Bearer one",)
+        assert frontend.headers() is headers
+        frontend.token = _Token(u"two")
+        assert frontend.headers()[b"Authorization"] == (b"Bearer two",)
+
+
+class _Token(object):
+    def __init__(self, text):
+        self.text = text
+
+    def as_text(self):
+        return self.text
@@ -1,6 +1,7 @@
 import pytest
 import collections
 from because.headers import (
+    FrozenHeaders,
     Headers,
     InvalidHeader,
     InvalidHeaders,
@@ -167,3 +168,111 @@ class TestHeaders(object):
         headers = Headers.coerce(given)
         assert sorted(headers.pairs()) == expected
 
+
+
+class TestFrozenHeaders(object):
+
+    def test_freeze(self):
+        headers = Headers([(b"X", b"y")])
+        frozen = headers.freeze()
+        assert isinstance(frozen, FrozenHeaders)
+        assert frozen == headers
+        assert frozen[b"x"] == (b"y",)
+        # Later changes to the original don't show through.
+        headers.add(b"X", b"z")
+        assert frozen[b"X"] == (b"y",)
+        assert frozen.freeze() is frozen
+
+    @pytest.mark.parametrize("change", [
+        lambda headers: headers.set(b"X", b"z"),
+        lambda headers: headers.add(b"X", b"z"),
+        lambda headers: headers.unset(b"X"),
+        lambda headers: headers.__setitem__(b"X", [b"z"]),
+    ])
+    def test_immutable(self, change):
+        frozen = Headers([(b"X", b"y")]).freeze()
+        with pytest.raises(InvalidHeader):
+            change(frozen)
+        assert list(frozen.pairs()) == [(b"X", b"y")]
+
+    def test_lookup_miss(self):
+        frozen = Headers().freeze()
+        assert frozen[b"X"] == ()
+        assert b"X" not in frozen
+
+    def test_copy_is_mutable(self):
+        frozen = Headers([(b"X", b"y")]).freeze()
+        copy = frozen.copy()
+        copy.add(b"X", b"z")
+        assert copy[b"X"] == [b"y", b"z"]
+        assert frozen[b"X"] == (b"y",)
+
+    def test_layered(self):
+        base = Headers([(b"A", b"1"), (b"B", b"1")]).freeze()
+        top = Headers([(b"b", b"2")])
+        layered = Headers.layered(base, None, top)
+        assert isinstance(layered, FrozenHeaders)
+        assert sorted(layered.pairs()) == [(b"A", b"1"), (b"B", b"2")]
+
+    def test_layered_shares_single_layer(self):
+        base = Headers([(b"A", b"1")]).freeze()
+        assert Headers.layered(None, base, Headers()) is base
+
+    def test_merged_is_mutable(self):
+        base = Headers([(b"A", b"1")]).freeze()
+        merged = Headers.merged(base, {b"B": [b"2"]})
+        merged.add(b"A", b"3")
+        assert merged[b"A"] == [b"1", b"3"]
+        assert base[b"A"] == (b"1",)
+
+
+class TestCompactHeaders(object):
+
+    def test_lookup_has_no_side_effects(self):
+        headers = Headers([(b"X", b"y")])
+        assert headers[b"Missing"] == []
+        assert b"Missing" not in headers
+        assert list(headers.keys()) == [b"X"]
+        assert headers == Headers([(b"X", b"y")])
+
+    def test_returned_list_is_a_copy(self):
+        headers = Headers([(b"X", b"y")])
+        headers[b"X"].append(b"z")
+        assert headers[b"X"] == [b"y"]
+
+    def test_names_shared(self):
+        one = Headers([(b"Content-Type", b"a")])
+        two = Headers([(b"CONTENT-TYPE", b"b")])
+        assert one._pairs[0][0] is two._pairs[0][0]
+
+    def test_no_instance_dict(self):
+        assert not hasattr(Headers(), "__dict__")
+
+    def test_case_insensitive(self):
+        headers = Headers([(b"Content-Type", b"a")])
+        assert headers[b"content-type"] == [b"a"]
+        headers.add(b"CONTENT-TYPE", b"b")
+        assert list(headers.items()) == [(b"Content-type", [b"a", b"b"])]
+
+    def test_add_after_lookup(self):
+        headers = Headers([(b"X", b"1")])
+        assert headers[b"X"] == [b"1"]
+        headers.add(b"X", b"2")
+        assert headers[b"X"] == [b"1", b"2"]
+
+    def test_unset_missing(self):
+        headers = Headers([(b"X", b"1")])
+        headers.unset(b"Y")
+        assert list(headers.pairs()) == [(b"X", b"1")]
+
+    def test_copy_shares_until_changed(self):
+        headers = Headers([(b"X", b"1")])
+        copy = headers.copy()
+        copy.set(b"X", b"2")
+        assert headers[b"X"] == [b"1"]
+        assert copy[b"X"] == [b"2"]
+
+    def test_setitem_rejects_text_values(self):
+        headers = Headers()
+        with pytest.raises(InvalidHeader):
+            headers[b"X"] = [u"text"]
@@ -0,0 +1,76 @@
+import pytest
+from because import json_backends
+from because.errors import ParseError
+from because.json_backends import JSONBackend, UnknownBackend
+from because.response import Response, parse_json
+
+
+@pytest.fixture(params=json_backends.available())
+def backend_name(request):
+    previous = json_backends.backend()
+    json_backends.use(request.param)
+    yield request.param
+    json_backends.register(previous, prefer=True)
+
+
+class TestJSONBackends(object):
+
+    def test_stdlib_always_available(self):
+        assert "json" in json_backends.available()
+        assert json_backends.available()[-1] == "json"
+
+    def test_default_is_most_preferred(self):
+        assert json_backends.use().name == json_backends.available()[0]
+
+    def test_use_unknown(self):
+        with pytest.raises(UnknownBackend):
+            json_backends.use("no-such-backend")
+
+    @pytest.mark.parametrize("data", [
+        b'{"a": [1, 2.5, "\xc3\xa9"], "b": null}',
+        bytearray(b'{"a": [1, 2.5, "\xc3\xa9"], "b": null}'),
+        memoryview(b'{"a": [1, 2.5, "\xc3\xa9"], "b": null}'),
+    ])
+    def test_loads(self, backend_name, data):
+        assert json_backends.loads(data) == {
+            u"a": [1, 2.5, u"\xe9"], u"b": None,
+        }
+
+    def test_loads_bad_utf8(self, backend_name):
+        with pytest.raises(UnicodeDecodeError):
+            json_backends.loads(b'"\xff"')
+
+    def test_loads_unencodable_text(self, backend_name):
+        # Text with a lone surrogate either decodes or fails as utf-8.
+        try:
+            assert json_backends.loads(u'"\ud800"') == u"\ud800"
+        except UnicodeDecodeError:
+            pass
+
+    def test_loads_bad_json(self, backend_name):
+        with pytest.raises(ValueError) as info:
+            json_backends.loads(b'{"a": ')
+        assert not isinstance(info.value, UnicodeDecodeError)
+
+    def test_parse_json_errors(self, backend_name):
+        with pytest.raises(ParseError) as info:
+            parse_json(Response(200, body=b'"\xff"'))
+        assert "utf-8" in str(info.value)
+        with pytest.raises(ParseError) as info:
+            parse_json(Response(200, body=b"{"))
+        assert "as JSON" in str(info.value)
+
+    def test_register_prefer(self):
+        previous = json_backends.backend()
+        calls = []
+
+        def loads(data):
+            calls.append(data)
+            return 42
+        try:
+            json_backends.register(JSONBackend("custom", loads), prefer=True)
+            assert parse_json(Response(200, body=b"[]")) == 42
+            assert calls == [b"[]"]
+        finally:
+            json_backends.BACKENDS.pop("custom", None)
+            json_backends.register(previous, prefer=True)
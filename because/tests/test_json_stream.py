@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import json
+import pytest
+from because.errors import ParseError
+from because.interfaces import INTERFACES
+from because.json_stream import JSONArrayStream, iter_json_items, stream_json
+from because.response import Response
+from because.services.geocoding.parse import iter_forward_geocodes
+from because.services.routing.parse import iter_steps
+from because.services.search.service import SearchService
+from because.tests.stand_in import StandIn, json_response
+
+
+def _chunks(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+ROUTE = {
+    "distance": 3.0,
+    "duration": 4.0,
+    "legs": [
+        {
+            "distance": 1.0,
+            "duration": 2.0,
+            "steps": [
+                {
+                    "instructions": u"Head north on \"Main\" St [1]",
+                    "distance": 1.0,
+                    "duration": 2.0,
+                    "geometry": {"coordinates": [[1.0, 2.0], [3.0, 4.0]]},
+                },
+                {
+                    "instructions": u"Turn right \\ then é {2}",
+                    "distance": 0.5,
+                    "duration": 1.0,
+                    "geometry": {"coordinates": [[3.0, 4.0], [5.0, 6.0]]},
+                },
+            ],
+        },
+        {
+            "distance": 2.0,
+            "duration": 2.0,
+            "steps": [
+                {
+                    "instructions": u"Arrive",
+                    "distance": 0,
+                    "duration": 0,
+                    "geometry": None,
+                },
+            ],
+        },
+    ],
+}
+
+
+class TestJSONArrayStream(object):
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+    def test_nested_path(self, size):
+        body = json.dumps(ROUTE, ensure_ascii=False).encode("utf-8")
+        stream = JSONArrayStream(("legs", None, "steps"))
+        items = list(iter_json_items(_chunks(body, size), None, stream))
+        assert items == [
+            (("legs", 0, "steps", 0), ROUTE["legs"][0]["steps"][0]),
+            (("legs", 0, "steps", 1), ROUTE["legs"][0]["steps"][1]),
+            (("legs", 1, "steps", 0), ROUTE["legs"][1]["steps"][0]),
+        ]
+        assert stream.top == {"distance": 3.0, "duration": 4.0}
+        assert stream.found
+
+    def test_elements_as_soon_as_complete(self):
+        stream = JSONArrayStream(("a",))
+        assert stream.feed(b'{"a": [{"x": 1}, {"x"') == [(("a", 0), {"x": 1})]
+        assert stream.feed(b': 2}, 3') == [(("a", 1), {"x": 2})]
+        assert stream.feed(b"]}") == [(("a", 2), 3)]
+        assert stream.close() == []
+
+    def test_memory_bounded(self):
+        stream = JSONArrayStream(("a",))
+        stream.feed(b'{"a": [')
+        for _ in range(1000):
+            stream.feed(b'{"x": "' + b"y" * 100 + b'"},')
+        assert len(stream._text) < 200
+
+    def test_not_found(self):
+        stream = JSONArrayStream(("a",))
+        stream.feed(b'{"a": {"b": [1]}, "c": [2]}')
+        stream.close()
+        assert not stream.found
+        assert stream.top == {"a": {"b": [1]}, "c": [2]}
+
+    @pytest.mark.parametrize("body", [
+        b'{"a": [1,',
+        b'{"a" 1}',
+        b'{"a": [1]} x',
+        b'{"a": [1}',
+        b'{1: []}',
+    ])
+    def test_malformed(self, body):
+        stream = JSONArrayStream(("a",))
+        with pytest.raises(ValueError):
+            stream.feed(body)
+            stream.close()
+
+
+class TestStreamJSON(object):
+
+    def test_error_status(self):
+        with pytest.raises(ParseError):
+            list(stream_json(Response(500), [b"[]"], ("a",)))
+
+    def test_empty_body(self):
+        with pytest.raises(ParseError):
+            list(stream_json(Response(200), [], ("a",)))
+
+    def test_error_key(self):
+        with pytest.raises(ParseError):
+            list(stream_json(Response(200), [b'{"error": "no"}'], ("a",)))
+
+    def test_missing_key(self):
+        with pytest.raises(ParseError):
+            list(stream_json(Response(200), [b'{"b": []}'], ("a",)))
+
+    def test_bad_json(self):
+        with pytest.raises(ParseError):
+            list(stream_json(Response(200), [b'{"a": [1,'], ("a",)))
+
+
+class TestStreamingParsers(object):
+
+    def test_iter_steps(self):
+        body = json.dumps(ROUTE).encode("utf-8")
+        steps = list(iter_steps(Response(200), _chunks(body, 5)))
+        assert [step.instructions for step in steps] == [
+            u"Head north on \"Main\" St [1]",
+            u"Turn right \\ then é {2}",
+            u"Arrive",
+        ]
+
+    def test_iter_forward_geocodes_error(self):
+        body = b'{"geocodePoints": [], "errorCode": 7, "errorMessage": "x"}'
+        with pytest.raises(ParseError):
+            list(iter_forward_geocodes(Response(200), [body]))
+
+    def test_iter_category(self):
+        body = json.dumps({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "geometry": None, "properties": {
+                "id": 1, "title": u"One", "url": u"https://example.com/1",
+            }},
+        ]}).encode("utf-8")
+        results = list(
+            SearchService().iter_category(Response(200), _chunks(body, 4))
+        )
+        assert [result.title for result in results] == [u"One"]
+
+
+def _geocode_handler(method, path, body):
+    return json_response(json.dumps({"geocodePoints": [
+        {"x": i, "y": -i, "candidatePlace": u"Place {0}".format(i),
+         "score": 1.0, "candidateSource": "mapbox"}
+        for i in range(50)
+    ]}))
+
+
+class TestFrontendStreaming(object):
+
+    @pytest.mark.parametrize("interface", ["python", "concurrent"])
+    def test_iter_geocode(self, interface):
+        if interface not in INTERFACES:
+            pytest.skip("no {0} interface".format(interface))
+        with StandIn(_geocode_handler) as server:
+            frontend = server.frontend(interface=interface)
+            candidates = list(frontend.iter_geocode(u"somewhere",
+                                                    chunk_size=64))
+        assert [candidate.x for candidate in candidates] == list(range(50))
+        assert candidates[3].address == u"Place 3"
@@ -0,0 +1,103 @@
+import pytest
+from because.polling import (
+    Poller,
+    PollTimeout,
+    Status,
+)
+
+
+class FakeClock(object):
+    """Stand in for time.time and time.sleep without really waiting.
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _countdown(checks, value, progress=None):
+    """Make a check which finishes after the given number of calls.
+    """
+    state = {"left": checks}
+
+    def check():
+        state["left"] -= 1
+        return Status(
+            state["left"] <= 0,
+            value=value,
+            progress=progress(state["left"]) if progress else None,
+        )
+    return check
+
+
+class TestPoller(object):
+
+    def _poller(self, clock):
+        return Poller(initial=1.0, factor=2.0, maximum=5.0,
+                      clock=clock.clock, sleep=clock.sleep)
+
+    def test_backoff(self):
+        clock = FakeClock()
+        poller = self._poller(clock)
+        poller.add("a", _countdown(5, "done"))
+        outcome = poller.next()
+        assert outcome.value == "done"
+        # initial wait, then 2, 4, capped at 5
+        assert clock.sleeps == [1.0, 2.0, 4.0, 5.0, 5.0]
+        assert len(poller) == 0
+
+    def test_progress_resets_backoff(self):
+        clock = FakeClock()
+        poller = self._poller(clock)
+        poller.add("a", _countdown(4, "done", progress=lambda left: left))
+        poller.next()
+        assert clock.sleeps == [1.0, 1.0, 1.0, 1.0]
+
+    def test_retry_after(self):
+        clock = FakeClock()
+        poller = self._poller(clock)
+        calls = []
+
+        def check():
+            calls.append(clock.now)
+            return Status(len(calls) > 1, value=1, retry_after=0.25)
+
+        poller.add("a", check)
+        poller.next()
+        assert calls == [1.0, 1.25]
+
+    def test_shared_schedule(self):
+        clock = FakeClock()
+        poller = self._poller(clock)
+        poller.add("slow", _countdown(4, "slow"))
+        poller.add("fast", _countdown(1, "fast"))
+        assert [outcome.item for outcome in poller] == ["fast", "slow"]
+
+    def test_error(self):
+        clock = FakeClock()
+        poller = self._poller(clock)
+
+        def check():
+            raise ValueError("nope")
+
+        poller.add("a", check)
+        outcome = poller.next()
+        assert isinstance(outcome.error, ValueError)
+
+    def test_timeout(self):
+        clock = FakeClock()
+        poller = self._poller(clock)
+        poller.add("a", _countdown(100, None), timeout=10.0)
+        outcome = poller.next()
+        assert isinstance(outcome.error, PollTimeout)
+        assert clock.now == 10.0
+
+    def test_empty(self):
+        with pytest.raises(IndexError):
+            Poller().next()
@@ -0,0 +1,95 @@
+import socket
+try:
+    import http.client as httplib
+except ImportError:
+    import httplib  # type: ignore
+import pytest
+from because.interfaces.python.client import Client
+from because.interfaces.python.pool import ConnectionPool
+from because.request import Request
+from because.response import Response
+from because.tests.stand_in import StandIn
+
+
+def _handler(method, path, body):
+    return Response(200, body=path.encode("utf-8"))
+
+
+def _get(client, server, path):
+    url = (server.url + path).encode("utf-8")
+    return client.transfer(Request(b"GET", url)).wait()
+
+
+def _go_stale(pool):
+    # Swap each kept connection's socket for one whose other end has been
+    # closed, as a server closes a connection which idled for too long.
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    for connection in pool._idle().values():
+        connection.sock.close()
+        connection.sock = socket.create_connection(listener.getsockname())
+        listener.accept()[0].close()
+    listener.close()
+
+
+class TestConnectionPool(object):
+
+    def test_reuses_connection(self):
+        with StandIn(_handler, keep_alive=True) as server:
+            with ConnectionPool() as pool:
+                client = Client(pool=pool)
+                bodies = [
+                    _get(client, server, "/%d" % i).body for i in range(5)
+                ]
+        assert bodies == [b"/0", b"/1", b"/2", b"/3", b"/4"]
+        assert len(server.requests) == 5
+        assert len(server.connections) == 1
+
+    def test_without_pool(self):
+        with StandIn(_handler, keep_alive=True) as server:
+            client = Client()
+            for i in range(3):
+                assert _get(client, server, "/%d" % i).status == 200
+        assert len(server.connections) == 3
+
+    def test_server_closes(self):
+        # HTTP/1.0 servers close after each response, so nothing is kept.
+        with StandIn(_handler) as server:
+            with ConnectionPool() as pool:
+                client = Client(pool=pool)
+                for i in range(3):
+                    assert _get(client, server, "/%d" % i).status == 200
+        assert len(server.connections) == 3
+
+    def test_stale_connection_retried(self):
+        with StandIn(_handler, keep_alive=True) as server:
+            with ConnectionPool() as pool:
+                client = Client(pool=pool)
+                assert _get(client, server, "/a").body == b"/a"
+                _go_stale(pool)
+                assert _get(client, server, "/b").body == b"/b"
+        assert [path for _, path, _ in server.requests] == ["/a", "/b"]
+        assert len(server.connections) == 2
+
+    def test_post_not_retried(self):
+        with StandIn(_handler, keep_alive=True) as server:
+            with ConnectionPool() as pool:
+                client = Client(pool=pool)
+                assert _get(client, server, "/a").body == b"/a"
+                _go_stale(pool)
+                url = (server.url + "/b").encode("utf-8")
+                with pytest.raises((httplib.HTTPException, IOError)):
+                    client.transfer(Request(b"POST", url, body=b"x")).wait()
+                assert pool._idle() == {}
+        assert [path for _, path, _ in server.requests] == ["/a"]
+
+    def test_streamed_response_returned(self):
+        with StandIn(_handler, keep_alive=True) as server:
+            with ConnectionPool() as pool:
+                client = Client(pool=pool)
+                url = (server.url + "/s").encode("utf-8")
+                head, chunks = client.transfer(Request(b"GET", url)).stream(1)
+                assert b"".join(chunks) == b"/s"
+                assert _get(client, server, "/t").body == b"/t"
+        assert len(server.connections) == 1
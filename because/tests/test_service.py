@@ -1,4 +1,13 @@
-from because.service import Service, Endpoint
+# -*- coding: utf-8 -*-
+import pytest
+from typing import Text
+from because.service import (
+    Endpoint,
+    InvalidEndpoint,
+    Service,
+    Template,
+    URLError,
+)
 
 
 class TestService(object):
@@ -9,3 +18,88 @@ class TestService(object):
             )
         })
         assert service
+
+
+class TestEndpoint(object):
+
+    def _endpoint(self):
+        return Endpoint(
+            "/geocode/{service}/address/{address}",
+            query="limit={limit}&q={q}",
+            parameters={
+                "service": set(["mapbox", "mapzen"]),
+                "address": Text,
+                "limit": int,
+                "q": Text,
+            },
+        )
+
+    def _values(self, **overrides):
+        values = {
+            "service": "mapbox",
+            "address": u"1 Main St",
+            "limit": 5,
+            "q": u"x",
+        }
+        values.update(overrides)
+        return values
+
+    def test_uri(self):
+        uri = self._endpoint().uri(self._values())
+        assert uri == u"/geocode/mapbox/address/1%20Main%20St?limit=5&q=x"
+
+    def test_path_and_query_encoding(self):
+        uri = self._endpoint().uri(self._values(
+            address=u"Zürich 1/2", q=u"a&b=c/d",
+        ))
+        assert uri == (
+            u"/geocode/mapbox/address/Z%C3%BCrich%201/2"
+            u"?limit=5&q=a%26b%3Dc%2Fd"
+        )
+
+    def test_url_bytes(self):
+        endpoint = self._endpoint()
+        url = endpoint.url_bytes(b"https://example.com/", self._values())
+        assert url == (
+            b"https://example.com/geocode/mapbox/address/1%20Main%20St"
+            b"?limit=5&q=x"
+        )
+        assert endpoint.url(u"https://example.com", self._values()) == \
+            url.decode("utf-8")
+
+    def test_invalid_option(self):
+        with pytest.raises(URLError):
+            self._endpoint().uri(self._values(service="nope"))
+
+    def test_invalid_type(self):
+        with pytest.raises(URLError):
+            self._endpoint().uri(self._values(limit="5"))
+
+    def test_missing_value(self):
+        values = self._values()
+        del values["q"]
+        with pytest.raises(URLError):
+            self._endpoint().uri(values)
+
+    def test_bad_base(self):
+        with pytest.raises(URLError):
+            self._endpoint().url_bytes(b"ftp://example.com", self._values())
+
+    def test_request(self):
+        request = Service({"e": self._endpoint()}).request(
+            "e", method=u"GET", base=u"https://example.com",
+            values=self._values(),
+        )
+        assert request.method == b"GET"
+        assert request.url.startswith(b"https://example.com/geocode/")
+
+
+class TestTemplate(object):
+
+    def test_escaped_braces(self):
+        template = Template("/a/{{literal}}/{b}", parameters={"b": int})
+        assert template.expand({"b": 1}) == b"/a/{literal}/1"
+
+    def test_format_spec_rejected(self):
+        with pytest.raises(InvalidEndpoint):
+            Template("/a/{b:>5}")
@@ -3,8 +3,10 @@ from typing import (
     Any,
     Optional,
     Callable,
+    Iterator,
     List,
     Text,
+    Tuple,
 )
 from datetime import (
     datetime as Datetime,
@@ -127,6 +129,21 @@ class Transfer(Future):
         # NOTE: this call should probably raise if we got an exception.
         return self.result()
 
+    def stream(self, chunk_size=65536):
+        # type: (int) -> Tuple[Response, Iterator[bytes]]
+        """Get the response as soon as its head arrives, and its body in chunks.
+
+        Returns a tuple (response, chunks): response has the status and
+        headers but an empty body, and chunks iterates over the bytes of the
+        body as they arrive.
+
+        This base implementation waits for the whole response, so it works
+        with any transfer; interfaces which can read incrementally override it.
+        """
+        response = self.wait()
+        head = Response(response.status, headers=response.headers)
+        return head, iter([response.body] if response.body else [])
+
     def cancel(self):
         """Cancel ongoing work and abort the transfer.
         """
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""Compare memory of geocoding candidates as objects and in a CandidateTable.
+
+Run from the repository root:
+
+    python benchmarks/bench_candidates.py
+
+This makes candidates for a batch of synthetic addresses, then measures what
+keeping them costs per candidate: as lists of Candidate instances (as
+geocode_many yields them), or in one CandidateTable.
+"""
+from __future__ import print_function
+
+import gc
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from because.services.geocoding.parse import records_to_candidates  # noqa: E402
+from because.services.geocoding.table import CandidateTable  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+ROWS = 20000
+PER_ROW = 5
+SOURCES = [u"address", u"street", u"postcode", u"place"]
+
+
+def records(row):
+    return [
+        {
+            "x": -122.0 + row * 1e-5 + index * 1e-6,
+            "y": 37.0 + row * 1e-5,
+            "candidatePlace": u"{0} Main St, Springfield #{1}".format(
+                row, index),
+            "score": 100 - index * 10,
+            "candidateSource": SOURCES[index % len(SOURCES)],
+        }
+        for index in range(PER_ROW)
+    ]
+
+
+def as_candidates(batch):
+    return [records_to_candidates(row_records) for row_records in batch]
+
+
+def as_table(batch):
+    table = CandidateTable()
+    for row, row_records in enumerate(batch):
+        table.extend_records(row, row_records)
+    return table
+
+
+def measure(build, batch):
+    gc.collect()
+    tracemalloc.start()
+    kept = build(batch)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main():
+    batch = [records(row) for row in range(ROWS)]
+    count = ROWS * PER_ROW
+    print("{0} candidates for {1} addresses".format(count, ROWS))
+    table = as_table(batch)
+    for label, function in (
+            ("filter(min_score=)", lambda: table.filter(min_score=75)),
+            ("filter(bbox=)", lambda: table.filter(
+                bbox=(-122.0, 37.0, -121.9, 37.1))),
+            ("top_k(1)", lambda: table.top_k(1)),
+    ):
+        seconds = timeit.timeit(function, number=3) / 3
+        print("{0:>18}: {1:7.1f} ms".format(label, seconds * 1e3))
+    if tracemalloc is None:
+        print("tracemalloc unavailable; skipping memory comparison")
+        return
+    for label, build in (("Candidate lists", as_candidates),
+                         ("CandidateTable", as_table)):
+        used = measure(build, batch)
+        print("{0:>15}: {1:7.1f} bytes per candidate".format(
+            label, float(used) / count,
+        ))
+
+
+if __name__ == "__main__":
+    main()
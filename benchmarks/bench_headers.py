@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""Compare memory and speed of Headers with the old dict-of-lists storage.
+
+Run from the repository root:
+
+    python benchmarks/bench_headers.py
+
+The workload mimics what because does most: building Headers from response
+header pairs, looking a few of them up, and keeping lots of them around in
+cached Responses.
+"""
+from __future__ import print_function
+
+import collections
+import gc
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from because.headers import Headers  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class LegacyHeaders(object):
+    """The essentials of Headers as it was: a defaultdict of lists.
+    """
+
+    def __init__(self, pairs=None):
+        self._data = collections.defaultdict(list)
+        for key, value in pairs or ():
+            if not isinstance(key, bytes) or not isinstance(value, bytes):
+                raise TypeError("not bytes")
+            self._data[key.lower()].append(value)
+
+    def __getitem__(self, key):
+        return self._data[key.lower()]
+
+    def __contains__(self, key):
+        return key.lower() in self._data
+
+    def items(self):
+        return ((key.capitalize(), value) for key, value in self._data.items())
+
+    def pairs(self):
+        for key, values in self.items():
+            for value in values:
+                yield key, value
+
+
+# Typical headers of a JSON API response.
+PAIRS = [
+    (b"Date", b"Mon, 19 Oct 2026 09:00:00 GMT"),
+    (b"Content-Type", b"application/json;charset=UTF-8"),
+    (b"Content-Length", b"1234"),
+    (b"Connection", b"keep-alive"),
+    (b"Cache-Control", b"no-cache, no-store, max-age=0, must-revalidate"),
+    (b"Pragma", b"no-cache"),
+    (b"Expires", b"0"),
+    (b"X-Content-Type-Options", b"nosniff"),
+    (b"X-Frame-Options", b"DENY"),
+    (b"X-XSS-Protection", b"1; mode=block"),
+    (b"Vary", b"Accept-Encoding"),
+    (b"Server", b"nginx"),
+]
+
+
+def workload(cls):
+    headers = cls(PAIRS)
+    headers[b"Content-Type"]
+    b"ETag" in headers
+    headers[b"etag"]
+    list(headers.pairs())
+
+
+def measure_memory(cls, count):
+    # Fresh bytes values, as a transfer would produce for each response.
+    rows = [
+        [(key, value + str(i).encode("ascii")) for key, value in PAIRS]
+        for i in range(count)
+    ]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [cls(pairs) for pairs in rows]
+    for headers in kept:
+        # Lookups are part of normal use, and used to add entries.
+        headers[b"etag"]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    used = sum(stat.size_diff for stat in stats)
+    del kept
+    return used
+
+
+def main():
+    number = 20000
+    count = 20000
+    for cls in (LegacyHeaders, Headers):
+        seconds = timeit.timeit(lambda: workload(cls), number=number)
+        print("{0:>14}: {1:7.2f} us per build+lookups+pairs".format(
+            cls.__name__, seconds / number * 1e6,
+        ))
+    if tracemalloc is None:
+        print("tracemalloc unavailable; skipping memory comparison")
+        return
+    for cls in (LegacyHeaders, Headers):
+        used = measure_memory(cls, count)
+        print("{0:>14}: {1:7.0f} bytes per instance (excluding values)".format(
+            cls.__name__, float(used) / count,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""Compare JSON backends on typical route, geocode and search payloads.
+
+Run from the repository root:
+
+    python benchmarks/bench_json.py
+
+For each backend which can be imported, this times decoding the raw bytes
+alone, then the full parse into because objects (Route, Candidate,
+SearchResult), which is what callers actually wait for, then the streaming
+parse of the same body in chunks.
+"""
+from __future__ import print_function
+
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from because import json_backends  # noqa: E402
+from because.response import Response  # noqa: E402
+from because.json_stream import DEFAULT_CHUNK_SIZE  # noqa: E402
+from because.services.geocoding.parse import (  # noqa: E402
+    iter_forward_geocodes,
+    parse_forward_geocodes,
+)
+from because.services.routing.parse import (  # noqa: E402
+    iter_steps,
+    parse as parse_route,
+)
+from because.services.search.service import SearchService  # noqa: E402
+
+
+def route_payload(steps=400, points_per_step=25):
+    rand = random.Random(1)
+    legs = []
+    for _ in range(2):
+        leg_steps = []
+        for i in range(steps // 2):
+            coordinates = [
+                [-122.4 + rand.random(), 37.7 + rand.random()]
+                for _ in range(points_per_step)
+            ]
+            leg_steps.append({
+                "instructions": "Turn left onto Street {0}".format(i),
+                "distance": rand.random() * 1000,
+                "duration": rand.random() * 100,
+                "geometry": {"type": "LineString", "coordinates": coordinates},
+            })
+        legs.append({
+            "steps": leg_steps,
+            "distance": 10000.0,
+            "duration": 1000.0,
+        })
+    return {"distance": 20000.0, "duration": 2000.0, "legs": legs}
+
+
+def geocode_payload(count=1000):
+    rand = random.Random(2)
+    return {"geocodePoints": [
+        {
+            "x": -122.4 + rand.random(),
+            "y": 37.7 + rand.random(),
+            "candidatePlace": u"{0} Market St, San Francisco, CA".format(i),
+            "score": rand.random(),
+            "candidateSource": "mapbox",
+        }
+        for i in range(count)
+    ]}
+
+
+def search_payload(count=1000):
+    return {"type": "FeatureCollection", "features": [
+        {
+            "type": "Feature",
+            "geometry": None,
+            "properties": {
+                "id": i,
+                "title": u"Layer {0}".format(i),
+                "url": u"https://example.com/layers/{0}".format(i),
+                "role": u"data",
+                "description": u"A layer of things — number {0}".format(i),
+                "category": u"imagery",
+                "author": u"Someone",
+            },
+        }
+        for i in range(count)
+    ]}
+
+
+def main():
+    search = SearchService()
+    cases = [
+        ("route", route_payload(), parse_route, iter_steps),
+        ("geocode", geocode_payload(), parse_forward_geocodes,
+         iter_forward_geocodes),
+        ("search", search_payload(), search.parse_category,
+         search.iter_category),
+    ]
+    for label, payload, parse, iterate in cases:
+        body = json.dumps(payload).encode("utf-8")
+        print("{0} payload: {1} bytes".format(label, len(body)))
+        chunks = [
+            body[i:i + DEFAULT_CHUNK_SIZE]
+            for i in range(0, len(body), DEFAULT_CHUNK_SIZE)
+        ]
+        number = 20
+        for name in json_backends.available():
+            json_backends.use(name)
+            loads = timeit.timeit(
+                lambda: json_backends.loads(body), number=number,
+            )
+            full = timeit.timeit(
+                # A fresh Response each time, as parse_category edits data.
+                lambda: parse(Response(200, body=body)), number=number,
+            )
+            streamed = timeit.timeit(
+                lambda: list(iterate(Response(200), chunks)), number=number,
+            )
+            print("  {0:>9}: {1:7.2f} ms loads, {2:7.2f} ms full parse, "
+                  "{3:7.2f} ms streamed".format(
+                      name, loads / number * 1e3, full / number * 1e3,
+                      streamed / number * 1e3,
+                  ))
+    json_backends.use()
+
+
+if __name__ == "__main__":
+    main()
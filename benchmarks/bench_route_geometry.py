@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""Compare memory of route geometry as nested lists and as flat arrays.
+
+Run from the repository root:
+
+    python benchmarks/bench_route_geometry.py
+
+This parses a synthetic cross-country route, then measures what keeping the
+Route costs per vertex, with the geometry held as the nested lists parsed from
+GeoJSON (as Step used to keep it) or in one array of doubles. It also times
+exporting the route as WKB and GeoJSON, against packing point by point.
+"""
+from __future__ import print_function
+
+import gc
+import json
+import os
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from because.json_backends import loads  # noqa: E402
+from because.services.routing.parse import dict_to_route  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from bench_json import route_payload  # noqa: E402
+
+
+def nested_lists(data):
+    # The old representation: the parsed coordinates, kept as they are.
+    return [
+        step["geometry"]["coordinates"]
+        for leg in data["legs"] for step in leg["steps"]
+    ]
+
+
+def per_point_wkb(route):
+    # What building WKB one vertex at a time looks like.
+    points = route.coordinates().to_list()
+    parts = [struct.pack("<BII", 1, 2, len(points))]
+    for x, y in points:
+        parts.append(struct.pack("<dd", x, y))
+    return b"".join(parts)
+
+
+def per_point_geojson(route):
+    return json.dumps({
+        "type": "LineString",
+        "coordinates": route.coordinates().to_list(),
+    }).encode("utf-8")
+
+
+def measure(build, body):
+    gc.collect()
+    tracemalloc.start()
+    kept = build(loads(body))
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main():
+    payload = route_payload(steps=2000, points_per_step=25)
+    body = json.dumps(payload).encode("utf-8")
+    vertices = sum(
+        len(step["geometry"]["coordinates"])
+        for leg in payload["legs"] for step in leg["steps"]
+    )
+    print("route with {0} vertices, {1} bytes of JSON".format(
+        vertices, len(body),
+    ))
+    route = dict_to_route(loads(body))
+    number = 10
+    seconds = timeit.timeit(lambda: dict_to_route(loads(body)), number=number)
+    print("parse: {0:.1f} ms".format(seconds / number * 1e3))
+    seconds = timeit.timeit(lambda: route.coordinates(), number=number)
+    print("Route.coordinates(): {0:.1f} us".format(seconds / number * 1e6))
+    for label, function in (
+            ("per-point WKB", per_point_wkb),
+            ("to_wkb()", lambda route: route.to_wkb()),
+            ("per-point GeoJSON", per_point_geojson),
+            ("to_geojson_bytes()", lambda route: route.to_geojson_bytes()),
+    ):
+        seconds = timeit.timeit(lambda: function(route), number=number)
+        print("{0:>18}: {1:7.2f} ms".format(label, seconds / number * 1e3))
+    if tracemalloc is None:
+        print("tracemalloc unavailable; skipping memory comparison")
+        return
+    for label, build in (("nested lists", nested_lists),
+                         ("flat array", dict_to_route)):
+        used = measure(build, body)
+        print("{0:>13}: {1:7.1f} bytes per vertex".format(
+            label, float(used) / vertices,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Time enumerating tiles and their URLs, as a seeding job would.
+
+Run from the repository root:
+
+    python benchmarks/bench_tiles.py
+"""
+from __future__ import print_function
+
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from because.services.basemaps.basemap import Basemap  # noqa: E402
+from because.services.basemaps.tiles import (  # noqa: E402
+    bbox_tiles,
+    count_bbox_tiles,
+    lonlat_to_tile,
+    lonlat_to_tile_many,
+)
+
+# Roughly the San Francisco Bay Area.
+BBOX = (-123.0, 37.0, -121.5, 38.5)
+ZOOMS = range(0, 16)
+
+
+def timed(label, function):
+    start = time.time()
+    result = function()
+    elapsed = time.time() - start
+    print("{0:>28}: {1:8.1f} ms".format(label, elapsed * 1e3))
+    return result
+
+
+def main():
+    count = count_bbox_tiles(BBOX, ZOOMS)
+    print("{0} tiles in zooms {1}-{2}".format(count, ZOOMS[0], ZOOMS[-1]))
+    basemap = Basemap("https://tiles.example.com/{z}/{x}/{y}.png")
+    timed("enumerate tiles", lambda: sum(1 for _ in bbox_tiles(BBOX, ZOOMS)))
+    timed("enumerate URLs", lambda: sum(
+        1 for _ in basemap.tile_urls(bbox_tiles(BBOX, ZOOMS))
+    ))
+    timed("str.format per tile", lambda: sum(
+        1 for x, y, z in bbox_tiles(BBOX, ZOOMS)
+        if basemap.url.replace("{x}", str(x)).replace(
+            "{y}", str(y)).replace("{z}", str(z))
+    ))
+
+    points = 1000000
+    lons = array("d", [random.uniform(-180, 180) for _ in range(points)])
+    lats = array("d", [random.uniform(-85, 85) for _ in range(points)])
+    print("{0} points to tiles at zoom 14".format(points))
+    timed("lonlat_to_tile per point", lambda: [
+        lonlat_to_tile(lon, lat, 14) for lon, lat in zip(lons, lats)
+    ])
+    timed("lonlat_to_tile_many", lambda: lonlat_to_tile_many(lons, lats, 14))
+
+
+if __name__ == "__main__":
+    main()